@@ -0,0 +1,48 @@
+"""Add events.title_sig and backfill it
+
+Revision ID: 3e8f0b6d2a57
+Revises: 5d9c1f3a8e62
+Create Date: 2026-10-19 15:42:08.213547
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e8f0b6d2a57'
+down_revision: Union[str, Sequence[str], None] = '5d9c1f3a8e62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_BATCH = 500
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('events', sa.Column('title_sig', sa.LargeBinary(), nullable=True))
+
+    from app.event_signature import title_signature
+    bind = op.get_bind()
+    events = sa.table('events', sa.column('id', sa.Integer), sa.column('title', sa.Text),
+                      sa.column('title_sig', sa.LargeBinary))
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(events.c.id, events.c.title)
+            .where(events.c.id > last_id).order_by(events.c.id).limit(_BATCH)
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            events.update().where(events.c.id == sa.bindparam('b_id')).values(title_sig=sa.bindparam('b_sig')),
+            [{'b_id': r.id, 'b_sig': title_signature(r.title)} for r in rows],
+        )
+        last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('events', 'title_sig')
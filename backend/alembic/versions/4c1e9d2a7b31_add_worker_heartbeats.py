@@ -0,0 +1,41 @@
+"""Add worker_heartbeats table
+
+Revision ID: 4c1e9d2a7b31
+Revises: 2f8b9a615e3a
+Create Date: 2026-10-18 09:12:44.512303
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c1e9d2a7b31'
+down_revision: Union[str, Sequence[str], None] = '2f8b9a615e3a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('worker_heartbeats',
+    sa.Column('worker_id', sa.String(length=128), nullable=False),
+    sa.Column('hostname', sa.String(length=128), nullable=False),
+    sa.Column('pid', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=False),
+    sa.Column('last_beat_at', sa.DateTime(), nullable=False),
+    sa.Column('last_job', sa.String(length=64), nullable=True),
+    sa.Column('last_job_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('worker_id')
+    )
+    op.create_index(op.f('ix_worker_heartbeats_last_beat_at'), 'worker_heartbeats', ['last_beat_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_worker_heartbeats_last_beat_at'), table_name='worker_heartbeats')
+    op.drop_table('worker_heartbeats')
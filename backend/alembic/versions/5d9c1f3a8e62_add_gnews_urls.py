@@ -0,0 +1,37 @@
+"""Add gnews_urls resolution cache
+
+Revision ID: 5d9c1f3a8e62
+Revises: 7a2e5c9b4d13
+Create Date: 2026-10-19 13:05:47.610392
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d9c1f3a8e62'
+down_revision: Union[str, Sequence[str], None] = '7a2e5c9b4d13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('gnews_urls',
+    sa.Column('gnews_hash', sa.String(length=40), nullable=False),
+    sa.Column('gnews_url', sa.Text(), nullable=False),
+    sa.Column('resolved_url', sa.Text(), nullable=False),
+    sa.Column('method', sa.String(length=8), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('gnews_hash')
+    )
+    op.create_index(op.f('ix_gnews_urls_created_at'), 'gnews_urls', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_gnews_urls_created_at'), table_name='gnews_urls')
+    op.drop_table('gnews_urls')
@@ -0,0 +1,32 @@
+"""Add events.aggregates
+
+Revision ID: 6b4d2e9f1c85
+Revises: 3e8f0b6d2a57
+Create Date: 2026-10-19 16:20:31.904215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6b4d2e9f1c85'
+down_revision: Union[str, Sequence[str], None] = '3e8f0b6d2a57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Left NULL: the matcher rebuilds an event's aggregates on its next merge,
+    # or run `python -m app.event_aggregates` to fill them eagerly
+    op.add_column('events', sa.Column('aggregates', sa.JSON().with_variant(postgresql.JSONB(), 'postgresql'),
+                                      nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('events', 'aggregates')
@@ -0,0 +1,51 @@
+"""Add raw_fetches archive index
+
+Revision ID: 7a2e5c9b4d13
+Revises: e4a7c2d91f08
+Create Date: 2026-10-19 11:40:05.318224
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a2e5c9b4d13'
+down_revision: Union[str, Sequence[str], None] = 'e4a7c2d91f08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('raw_fetches',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('kind', sa.String(length=8), nullable=False),
+    sa.Column('url', sa.Text(), nullable=False),
+    sa.Column('url_hash', sa.String(length=40), nullable=False),
+    sa.Column('domain', sa.String(length=128), nullable=False),
+    sa.Column('fetched_at', sa.DateTime(), nullable=False),
+    sa.Column('status_code', sa.Integer(), nullable=True),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('dict_id', sa.String(length=16), nullable=True),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('stored_size', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_raw_fetches_kind'), 'raw_fetches', ['kind'], unique=False)
+    op.create_index(op.f('ix_raw_fetches_domain'), 'raw_fetches', ['domain'], unique=False)
+    op.create_index(op.f('ix_raw_fetches_fetched_at'), 'raw_fetches', ['fetched_at'], unique=False)
+    op.create_index(op.f('ix_raw_fetches_sha256'), 'raw_fetches', ['sha256'], unique=False)
+    op.create_index('ix_raw_fetch_url_time', 'raw_fetches', ['url_hash', 'fetched_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_raw_fetch_url_time', table_name='raw_fetches')
+    op.drop_index(op.f('ix_raw_fetches_sha256'), table_name='raw_fetches')
+    op.drop_index(op.f('ix_raw_fetches_fetched_at'), table_name='raw_fetches')
+    op.drop_index(op.f('ix_raw_fetches_domain'), table_name='raw_fetches')
+    op.drop_index(op.f('ix_raw_fetches_kind'), table_name='raw_fetches')
+    op.drop_table('raw_fetches')
@@ -0,0 +1,67 @@
+"""Add events.state and events_archive
+
+Revision ID: 8c2f4a7e1d39
+Revises: 6b4d2e9f1c85
+Create Date: 2026-10-19 21:05:12.418730
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c2f4a7e1d39'
+down_revision: Union[str, Sequence[str], None] = '6b4d2e9f1c85'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Every event starts active; the worker's hourly lifecycle job (or
+    # `python -m app.event_lifecycle`) cools and closes the quiet ones
+    op.add_column('events', sa.Column('state', sa.String(length=16), nullable=False, server_default='active'))
+    op.create_index('ix_event_state_province_updated', 'events', ['state', 'province', 'last_updated_at'],
+                    unique=False)
+
+    json_type = sa.JSON().with_variant(postgresql.JSONB(), 'postgresql')
+    op.create_table(
+        'events_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('key', sa.String(length=256), nullable=False),
+        sa.Column('title', sa.Text(), nullable=False),
+        sa.Column('disaster_type', sa.String(length=32), nullable=False),
+        sa.Column('province', sa.String(length=64), nullable=False),
+        sa.Column('commune', sa.String(length=128), nullable=True),
+        sa.Column('village', sa.String(length=128), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=False),
+        sa.Column('last_updated_at', sa.DateTime(), nullable=False),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.Column('deaths', sa.Integer(), nullable=True),
+        sa.Column('missing', sa.Integer(), nullable=True),
+        sa.Column('injured', sa.Integer(), nullable=True),
+        sa.Column('damage_billion_vnd', sa.Float(), nullable=True),
+        sa.Column('lat', sa.Float(), nullable=True),
+        sa.Column('lon', sa.Float(), nullable=True),
+        sa.Column('details', json_type, nullable=True),
+        sa.Column('confidence', sa.Float(), nullable=False),
+        sa.Column('sources_count', sa.Integer(), nullable=False),
+        sa.Column('needs_verification', sa.Integer(), nullable=False),
+        sa.Column('is_red_alert', sa.Boolean(), nullable=False),
+        sa.Column('article_ids', json_type, nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_event_archive_type_date', 'events_archive', ['disaster_type', 'started_at'], unique=False)
+    op.create_index('ix_event_archive_province_date', 'events_archive', ['province', 'started_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_event_archive_province_date', table_name='events_archive')
+    op.drop_index('ix_event_archive_type_date', table_name='events_archive')
+    op.drop_table('events_archive')
+    op.drop_index('ix_event_state_province_updated', table_name='events')
+    op.drop_column('events', 'state')
@@ -0,0 +1,44 @@
+"""Add source_poll_state table
+
+Revision ID: 9d3b5e07c1a4
+Revises: 4c1e9d2a7b31
+Create Date: 2026-10-18 10:41:03.118842
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3b5e07c1a4'
+down_revision: Union[str, Sequence[str], None] = '4c1e9d2a7b31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('source_poll_state',
+    sa.Column('source_name', sa.String(length=64), nullable=False),
+    sa.Column('interval_minutes', sa.Float(), nullable=False),
+    sa.Column('last_polled_at', sa.DateTime(), nullable=True),
+    sa.Column('next_poll_at', sa.DateTime(), nullable=True),
+    sa.Column('polls', sa.Integer(), nullable=False),
+    sa.Column('publish_per_hour', sa.Float(), nullable=False),
+    sa.Column('not_modified_ratio', sa.Float(), nullable=False),
+    sa.Column('error_ratio', sa.Float(), nullable=False),
+    sa.Column('hits_per_hour', sa.Float(), nullable=False),
+    sa.Column('boosted', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('source_name')
+    )
+    op.create_index(op.f('ix_source_poll_state_next_poll_at'), 'source_poll_state', ['next_poll_at'], unique=False)
+    op.add_column('crawler_status', sa.Column('feeds_not_modified', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('crawler_status', 'feeds_not_modified')
+    op.drop_index(op.f('ix_source_poll_state_next_poll_at'), table_name='source_poll_state')
+    op.drop_table('source_poll_state')
@@ -0,0 +1,42 @@
+"""Add event_duplicate_dismissals
+
+Revision ID: a4d6e8f0b2c1
+Revises: 8c2f4a7e1d39
+Create Date: 2026-10-19 23:14:05.662091
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d6e8f0b2c1'
+down_revision: Union[str, Sequence[str], None] = '8c2f4a7e1d39'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'event_duplicate_dismissals',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('event_a', sa.Integer(), nullable=False),
+        sa.Column('event_b', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('event_a', 'event_b', name='uq_event_duplicate_dismissal')
+    )
+    op.create_index(op.f('ix_event_duplicate_dismissals_event_a'), 'event_duplicate_dismissals', ['event_a'], unique=False)
+    op.create_index(op.f('ix_event_duplicate_dismissals_event_b'), 'event_duplicate_dismissals', ['event_b'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_event_duplicate_dismissals_event_b'), table_name='event_duplicate_dismissals')
+    op.drop_index(op.f('ix_event_duplicate_dismissals_event_a'), table_name='event_duplicate_dismissals')
+    op.drop_table('event_duplicate_dismissals')
@@ -0,0 +1,30 @@
+"""Add crawl_deferred claimed_by / claimed_at (resume leases)
+
+Revision ID: a7c3e9f1b5d2
+Revises: f2b8d4c6a1e3
+Create Date: 2026-10-20 09:47:31.226904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e9f1b5d2'
+down_revision: Union[str, Sequence[str], None] = 'f2b8d4c6a1e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('crawl_deferred', sa.Column('claimed_by', sa.String(length=64), nullable=True))
+    op.add_column('crawl_deferred', sa.Column('claimed_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('crawl_deferred', 'claimed_at')
+    op.drop_column('crawl_deferred', 'claimed_by')
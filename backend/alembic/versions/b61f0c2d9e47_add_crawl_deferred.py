@@ -0,0 +1,44 @@
+"""Add crawl_deferred table
+
+Revision ID: b61f0c2d9e47
+Revises: 9d3b5e07c1a4
+Create Date: 2026-10-18 11:58:20.904117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b61f0c2d9e47'
+down_revision: Union[str, Sequence[str], None] = '9d3b5e07c1a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('crawl_deferred',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('kind', sa.String(length=16), nullable=False),
+    sa.Column('source_name', sa.String(length=64), nullable=False),
+    sa.Column('article_id', sa.Integer(), nullable=True),
+    sa.Column('article_kind', sa.String(length=16), nullable=True),
+    sa.Column('priority', sa.Integer(), nullable=False),
+    sa.Column('deferred_at', sa.DateTime(), nullable=False),
+    sa.Column('times_deferred', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['article_id'], ['articles.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('kind', 'source_name', 'article_id', name='uq_crawl_deferred_item')
+    )
+    op.create_index(op.f('ix_crawl_deferred_kind'), 'crawl_deferred', ['kind'], unique=False)
+    op.create_index(op.f('ix_crawl_deferred_source_name'), 'crawl_deferred', ['source_name'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_crawl_deferred_source_name'), table_name='crawl_deferred')
+    op.drop_index(op.f('ix_crawl_deferred_kind'), table_name='crawl_deferred')
+    op.drop_table('crawl_deferred')
@@ -0,0 +1,35 @@
+"""Add listing_snapshots (sitemap / listing link snapshots, formerly in feed_state.json)
+
+Revision ID: b9e1d3f5a7c4
+Revises: a7c3e9f1b5d2
+Create Date: 2026-10-20 10:21:44.906315
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9e1d3f5a7c4'
+down_revision: Union[str, Sequence[str], None] = 'a7c3e9f1b5d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'listing_snapshots',
+        sa.Column('key', sa.String(length=512), nullable=False),
+        sa.Column('seen', sa.JSON().with_variant(postgresql.JSONB(), 'postgresql'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('listing_snapshots')
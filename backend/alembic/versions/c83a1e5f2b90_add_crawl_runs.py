@@ -0,0 +1,54 @@
+"""Add crawl_runs and crawl_run_sources tables
+
+Revision ID: c83a1e5f2b90
+Revises: b61f0c2d9e47
+Create Date: 2026-10-18 13:20:47.551019
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c83a1e5f2b90'
+down_revision: Union[str, Sequence[str], None] = 'b61f0c2d9e47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('crawl_runs',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('trigger', sa.String(length=32), nullable=False),
+    sa.Column('worker_id', sa.String(length=128), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('resumed_at', sa.DateTime(), nullable=True),
+    sa.Column('sources_total', sa.Integer(), nullable=False),
+    sa.Column('sources_done', sa.Integer(), nullable=False),
+    sa.Column('new_articles', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_crawl_runs_status'), 'crawl_runs', ['status'], unique=False)
+    op.create_index(op.f('ix_crawl_runs_started_at'), 'crawl_runs', ['started_at'], unique=False)
+    op.create_table('crawl_run_sources',
+    sa.Column('run_id', sa.String(length=32), nullable=False),
+    sa.Column('source_name', sa.String(length=64), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('articles_added', sa.Integer(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['run_id'], ['crawl_runs.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('run_id', 'source_name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('crawl_run_sources')
+    op.drop_index(op.f('ix_crawl_runs_started_at'), table_name='crawl_runs')
+    op.drop_index(op.f('ix_crawl_runs_status'), table_name='crawl_runs')
+    op.drop_table('crawl_runs')
@@ -0,0 +1,47 @@
+"""Add articles SimHash fingerprint, syndicated_from_id and article_simhash_bands
+
+Revision ID: d1e3f5a7b9c2
+Revises: a4d6e8f0b2c1
+Create Date: 2026-10-20 00:42:37.104583
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd1e3f5a7b9c2'
+down_revision: Union[str, Sequence[str], None] = 'a4d6e8f0b2c1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Filled during enrichment (app.syndication); existing articles stay
+    # unfingerprinted and count as distinct texts
+    op.add_column('articles', sa.Column('text_simhash', sa.BigInteger(), nullable=True))
+    op.add_column('articles', sa.Column('syndicated_from_id', sa.Integer(), nullable=True))
+    op.create_index(op.f('ix_articles_syndicated_from_id'), 'articles', ['syndicated_from_id'], unique=False)
+    op.create_table(
+        'article_simhash_bands',
+        sa.Column('article_id', sa.Integer(), nullable=False),
+        sa.Column('band', sa.Integer(), nullable=False),
+        sa.Column('value', sa.Integer(), nullable=False),
+        sa.Column('published_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['article_id'], ['articles.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('article_id', 'band')
+    )
+    op.create_index('ix_simhash_band_value_published', 'article_simhash_bands', ['band', 'value', 'published_at'],
+                    unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_simhash_band_value_published', table_name='article_simhash_bands')
+    op.drop_table('article_simhash_bands')
+    op.drop_index(op.f('ix_articles_syndicated_from_id'), table_name='articles')
+    op.drop_column('articles', 'syndicated_from_id')
+    op.drop_column('articles', 'text_simhash')
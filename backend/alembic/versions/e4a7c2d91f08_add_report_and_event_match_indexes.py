@@ -0,0 +1,31 @@
+"""Add indexes for report matching, keyset pagination and bbox queries
+
+Revision ID: e4a7c2d91f08
+Revises: c83a1e5f2b90
+Create Date: 2026-10-19 09:12:31.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a7c2d91f08'
+down_revision: Union[str, Sequence[str], None] = 'c83a1e5f2b90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_event_province_updated', 'events', ['province', 'last_updated_at'], unique=False)
+    op.create_index('ix_report_status_id', 'crowdsourced_reports', ['status', 'id'], unique=False)
+    op.create_index('ix_report_lat_lon', 'crowdsourced_reports', ['lat', 'lon'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_report_lat_lon', table_name='crowdsourced_reports')
+    op.drop_index('ix_report_status_id', table_name='crowdsourced_reports')
+    op.drop_index('ix_event_province_updated', table_name='events')
@@ -0,0 +1,32 @@
+"""Add events.updated_at (row modification time)
+
+Revision ID: f2b8d4c6a1e3
+Revises: d1e3f5a7b9c2
+Create Date: 2026-10-20 09:12:05.418220
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b8d4c6a1e3'
+down_revision: Union[str, Sequence[str], None] = 'd1e3f5a7b9c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('events', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    # Best guess for existing rows; the related-event index is fully rebuilt at startup anyway
+    op.execute("UPDATE events SET updated_at = last_updated_at")
+    op.create_index(op.f('ix_events_updated_at'), 'events', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_events_updated_at'), table_name='events')
+    op.drop_column('events', 'updated_at')
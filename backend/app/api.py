@@ -5,18 +5,18 @@ from sqlalchemy.sql import text
 from .database import get_db, engine
 from . import models
 from .models import Article, Event, Blacklist, CrawlerStatus, AiFeedback
-from .schemas import ArticleOut, EventOut, EventDetailOut, EventUpdate
+from .schemas import ArticleOut, EventOut, EventDetailOut, EventUpdate, RelatedEventOut, DuplicatePairOut
 from datetime import datetime, timedelta
 from fastapi import Response, Request, HTTPException, status
 from fastapi.responses import StreamingResponse
-from .event_matcher import upsert_event_for_article
+from .event_matcher import merge_events, upsert_event_for_article
 import asyncio
 from pathlib import Path
 import json
 from .nlp import RECOVERY_KEYWORDS, PROVINCES
 from .sources import DISASTER_KEYWORDS
 from .risk_lookup import canon
-from . import broadcast, auth
+from . import broadcast, auth, event_aggregates, event_lsh, jsonl_log
 from .cache import cache
 import time
 import io
@@ -55,6 +55,26 @@ router = APIRouter(prefix="/api", tags=["api"])
 def health():
     return {"ok": True}
 
+@router.get("/health/crawler")
+def crawler_health(db: Session = Depends(get_db)):
+    """Heartbeat of the standalone crawler worker (python -m app.worker)."""
+    from .worker import HEARTBEAT_STALE_SECONDS
+    now = datetime.utcnow()
+    workers = []
+    for hb in db.query(models.WorkerHeartbeat).order_by(desc(models.WorkerHeartbeat.last_beat_at)).all():
+        age = (now - hb.last_beat_at).total_seconds() if hb.last_beat_at else None
+        workers.append({
+            "worker_id": hb.worker_id,
+            "status": hb.status,
+            "alive": hb.status == "running" and age is not None and age <= HEARTBEAT_STALE_SECONDS,
+            "last_beat_at": hb.last_beat_at,
+            "seconds_since_beat": round(age, 1) if age is not None else None,
+            "last_job": hb.last_job,
+            "last_job_at": hb.last_job_at,
+            "last_error": hb.last_error,
+        })
+    return {"ok": any(w["alive"] for w in workers), "workers": workers}
+
 @router.get("/articles/latest", response_model=list[ArticleOut])
 def latest_articles(
     limit: int = Query(50, ge=1, le=200),
@@ -105,12 +125,13 @@ def events(
     wrapper: bool = Query(False),
     db: Session = Depends(get_db),
     sort: str = Query("impact"),
+    state: str | None = Query(None, pattern="^(active|cooling|closed)$"),
     current_user: Optional[models.User] = Depends(auth.get_current_user_optional),
 ):
     is_admin = current_user and current_user.role == "admin"
     
     # Cache optimization - include is_admin, offset, and wrapper in key
-    cache_key = f"ev_v2_{limit}_{offset}_{hours}_{type}_{province}_{start_date}_{end_date}_{q}_{date}_{sort}_{is_admin}_{wrapper}"
+    cache_key = f"ev_v2_{limit}_{offset}_{hours}_{type}_{province}_{start_date}_{end_date}_{q}_{date}_{sort}_{state}_{is_admin}_{wrapper}"
     cached = cache.get(cache_key)
     if cached:
         response.headers["X-Cache"] = "HIT"
@@ -152,6 +173,7 @@ def events(
 
     if type: query = query.filter(Event.disaster_type == type)
     if province: query = query.filter(Event.province == province)
+    if state: query = query.filter(Event.state == state)
     if q: query = query.filter(Event.title.ilike(f"%{q}%"))
     
     if start_date:
@@ -311,7 +333,23 @@ def event_detail(event_id: int, response: Response, db: Session = Depends(get_db
     ).filter(Event.id == event_id).first()
     
     if not ev:
-        raise HTTPException(status_code=404, detail="Sự kiện không tồn tại.")
+        # Long-closed events live on as summaries (app.event_lifecycle)
+        archived = db.get(models.EventArchive, event_id)
+        if not archived:
+            raise HTTPException(status_code=404, detail="Sự kiện không tồn tại.")
+        articles = db.query(Article).filter(
+            Article.id.in_(archived.article_ids or []),
+            Article.status.in_(("approved", "pending"))
+        ).order_by(desc(Article.published_at)).all()
+        ev_data = EventDetailOut.model_validate({
+            **{c.name: getattr(archived, c.name) for c in models.EventArchive.__table__.columns},
+            "state": "archived",
+            "articles": [ArticleOut.model_validate(a) for a in articles],
+        })
+        result = ev_data.model_dump()
+        cache.set(cache_key, result, ttl=3600)
+        response.headers["Cache-Control"] = "public, max-age=3600"
+        return result
         
     # 3. Filter and Sort Articles
     # Only show relevant articles (approved/pending)
@@ -322,8 +360,8 @@ def event_detail(event_id: int, response: Response, db: Session = Depends(get_db
     ev_data = EventDetailOut.model_validate(ev)
     ev_data.articles = [ArticleOut.model_validate(a) for a in articles]
     
-    # Update count to match visible list
-    ev_data.sources_count = len(set(a.source for a in articles))
+    # Update count to match visible list (syndicated copies count once)
+    ev_data.sources_count = len(event_aggregates.fold(sorted(articles, key=lambda a: a.id))["sources"])
     
     # 4. Save to Cache
     result = ev_data.model_dump()
@@ -332,6 +370,34 @@ def event_detail(event_id: int, response: Response, db: Session = Depends(get_db
     response.headers["Cache-Control"] = "public, max-age=60"
     return result
 
+@router.get("/events/{event_id}/related", response_model=list[RelatedEventOut])
+def related_events(
+    event_id: int,
+    response: Response,
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: Optional[models.User] = Depends(auth.get_current_user_optional),
+):
+    """Events with similar titles (MinHash-LSH, app.event_lsh), flagged when they look like duplicates."""
+    is_admin = current_user and current_user.role == "admin"
+    cache_key = f"ev_related_{event_id}_{limit}_{is_admin}"
+    cached = cache.get(cache_key)
+    if cached is not None:
+        response.headers["X-Cache"] = "HIT"
+        return cached
+
+    out = []
+    for ev, similarity, duplicate in event_lsh.related(db, event_id, limit):
+        # Same visibility rule as /events
+        if not is_admin and not (ev.confidence >= 0.8 or (ev.needs_verification == 0 and ev.sources_count >= 2)):
+            continue
+        item = RelatedEventOut.model_validate({**EventOut.model_validate(ev).model_dump(),
+                                               "similarity": round(similarity, 3), "probable_duplicate": duplicate})
+        out.append(item.model_dump())
+    cache.set(cache_key, out, ttl=300)
+    response.headers["Cache-Control"] = "public, max-age=300"
+    return out
+
 @router.put("/events/{event_id}", response_model=EventOut)
 def update_event(
     event_id: int, 
@@ -454,6 +520,11 @@ def delete_article(
             cache.delete_match(f"ev_detail_{old_event_id}*")
             cache.delete_match("stats_*")
             cache.delete_match("articles_latest_*")
+        else:
+            ev = db.get(Event, old_event_id)
+            if ev is not None:
+                event_aggregates.recompute(db, ev)
+                db.commit()
     
     # Always clear the detail of the article's parent event even if not deleted
     if old_event_id:
@@ -502,6 +573,8 @@ def stats_summary(
         end = datetime.utcnow()
 
     # 1. New articles count (total signals)
+    article_count_q = db.query(func.count(Article.id)).filter(
+        Article.published_at >= start,
         Article.published_at < end,
         Article.status == "approved"
     )
@@ -539,6 +612,9 @@ def stats_summary(
     
     # Counts by distinct provinces
     # SQLAlchemy doesn't support count(distinct) cleanly in all dialects without func, but usually fine
+    provinces_count_q = db.query(func.count(func.distinct(Event.province))).filter(
+        Event.started_at >= start,
+        Event.started_at < end,
         Event.disaster_type.notin_(["unknown", "other"]),
         Event.sources_count > 0,
         Event.province.in_(PROVINCES) # Only count valid provinces
@@ -604,6 +680,9 @@ def stats_summary(
     events_property_damage = agg_res[5] or 0
 
     # Type breakdown
+    type_counts_q = db.query(Event.disaster_type, func.count(Event.id)).filter(
+        Event.started_at >= start,
+        Event.started_at < end,
         Event.disaster_type.notin_(["unknown", "other"]),
         Event.sources_count > 0
     )
@@ -635,6 +714,10 @@ def stats_summary(
             type_counts["unknown"] += cnt # Should be 0 since we filtered unknown
 
     # Top Provinces breakdown (for hotspots) (Limit to top 20)
+    prov_counts_q = db.query(Event.province, func.count(Event.id)).filter(
+        Event.started_at >= start,
+        Event.started_at < end,
+        Event.disaster_type.notin_(["unknown", "other"]),
         Event.sources_count > 0,
         Event.province.in_(PROVINCES)
     )
@@ -771,22 +854,18 @@ async def stream_events(request: Request):
 from .auth import get_current_admin
 
 @router.get('/admin/skip-logs')
-def get_skip_logs(limit: int = Query(200, ge=1, le=5000), admin: models.User = Depends(get_current_admin)):
-    logs_dir = Path(__file__).resolve().parents[1] / 'logs'
-    log_file = logs_dir / 'review_potential_disasters.jsonl'
-    out = []
-    if not log_file.exists():
-        return []
+def get_skip_logs(
+    limit: int = Query(200, ge=1, le=5000),
+    action: Optional[str] = None,
+    source: Optional[str] = None,
+    since: Optional[datetime] = None,
+    admin: models.User = Depends(get_current_admin),
+):
+    """Newest ``limit`` review-log records (oldest first), read through the log's offset index."""
     try:
-        with log_file.open('r', encoding='utf-8') as f:
-            for line in f:
-                try:
-                    out.append(json.loads(line))
-                except Exception:
-                    continue
-    except Exception:
+        return jsonl_log.review_log.tail(limit, since=since, action=action, source=source)
+    except OSError:
         return []
-    return out[-limit:]
 
 
 @router.post('/admin/label')
@@ -1019,6 +1098,94 @@ def sources_health():
 def get_crawler_status(db: Session = Depends(get_db), admin: models.User = Depends(get_current_admin)):
     return db.query(CrawlerStatus).all()
 
+@router.get("/admin/poll-schedule")
+def get_poll_schedule(db: Session = Depends(get_db), admin: models.User = Depends(get_current_admin)):
+    """Learned polling interval and next poll time of every source."""
+    return db.query(models.SourcePollState).order_by(models.SourcePollState.next_poll_at).all()
+
+@router.get("/admin/crawl-runs")
+def get_crawl_runs(limit: int = Query(20, ge=1, le=200), db: Session = Depends(get_db),
+                   admin: models.User = Depends(get_current_admin)):
+    """Recent crawl runs with their per-source checkpoints."""
+    runs = db.query(models.CrawlRun).order_by(models.CrawlRun.started_at.desc()).limit(limit).all()
+    return [
+        {
+            "id": r.id, "trigger": r.trigger, "worker_id": r.worker_id, "status": r.status,
+            "started_at": r.started_at, "resumed_at": r.resumed_at, "finished_at": r.finished_at,
+            "sources_total": r.sources_total, "sources_done": r.sources_done, "new_articles": r.new_articles,
+            "pending": [s.source_name for s in r.sources if s.status == "pending"],
+            "deferred": [s.source_name for s in r.sources if s.status == "deferred"],
+        }
+        for r in runs
+    ]
+
+@router.post("/admin/events/recompute-aggregates")
+def recompute_event_aggregates(event_id: list[int] | None = Query(None), db: Session = Depends(get_db),
+                               admin: models.User = Depends(get_current_admin)):
+    """Rebuild source/confidence aggregates from linked articles (all events when no id is given)."""
+    changed = event_aggregates.repair(db, event_id)
+    cache.delete_match("ev_detail_*")
+    return {"repaired": changed}
+
+@router.get("/admin/events/duplicates", response_model=list[DuplicatePairOut])
+def duplicate_events(hours: int = Query(168, ge=1, le=24 * 90), limit: int = Query(50, ge=1, le=200),
+                     db: Session = Depends(get_db), admin: models.User = Depends(get_current_admin)):
+    """Probable duplicate events updated in the last ``hours``, most similar first."""
+    return [
+        {"a": EventOut.model_validate(a), "b": EventOut.model_validate(b), "similarity": round(sim, 3)}
+        for a, b, sim in event_lsh.probable_duplicates(db, hours, limit)
+    ]
+
+@router.post("/admin/events/duplicates/dismiss")
+def dismiss_duplicate_events(a: int = Query(...), b: int = Query(...), db: Session = Depends(get_db),
+                             admin: models.User = Depends(get_current_admin)):
+    """Mark two events as not duplicates; the pair leaves the queue."""
+    if a == b:
+        raise HTTPException(status_code=400, detail="Two different events are required")
+    event_lsh.dismiss(db, a, b, admin.id)
+    cache.delete_match(f"ev_related_{a}_*")
+    cache.delete_match(f"ev_related_{b}_*")
+    return {"ok": True}
+
+@router.post("/admin/events/{event_id}/merge", response_model=EventOut)
+def merge_event(event_id: int, into: int = Query(..., description="Event that absorbs event_id"),
+                db: Session = Depends(get_db), admin: models.User = Depends(get_current_admin)):
+    """Merge a duplicate event into another: articles, reports and followers move, the duplicate is deleted."""
+    if event_id == into:
+        raise HTTPException(status_code=400, detail="Cannot merge an event into itself")
+    source = db.get(models.Event, event_id)
+    target = db.get(models.Event, into)
+    if source is None or target is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    moved = merge_events(db, target, source)
+    db.commit()
+    db.refresh(target)
+    index = event_lsh.index()
+    index.discard(event_id)
+    index.put(target)
+
+    cache.delete_match(f"ev_detail_{event_id}*")
+    cache.delete_match(f"ev_detail_{into}*")
+    cache.delete_match("ev_related_*")
+    cache.delete_match("ev_v2_*")
+    cache.delete_match("stats_*")
+    try:
+        logs_dir = Path(__file__).resolve().parents[1] / 'logs'
+        logs_dir.mkdir(parents=True, exist_ok=True)
+        record = {
+            'timestamp': datetime.utcnow().isoformat(),
+            'event_id': event_id,
+            'merged_into': into,
+            'articles': moved,
+            'admin_id': admin.id,
+            'action': 'merge_duplicate'
+        }
+        with (logs_dir / 'audit_log.jsonl').open('a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    except Exception: pass
+    return target
+
 @router.post("/admin/ai-feedback")
 async def submit_ai_feedback(payload: dict, db: Session = Depends(get_db), admin: models.User = Depends(get_current_admin)):
     article_id = payload.get("article_id")
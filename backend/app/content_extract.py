@@ -0,0 +1,490 @@
+# -*- coding: utf-8 -*-
+"""
+Main-content extraction for article pages.
+
+One pass of the stdlib tokenizer (no DOM is built) collects page metadata,
+text chunks and, for every element, its text and link-text length. Blocks
+are then scored readability-style:
+
+* every chunk of >= 25 chars that is mostly not link text adds ``1 + commas + min(len/100, 3)`` to its
+  container, half of that to the grandparent and a third to the next level
+* class/id names like ``content``, ``detail``, ``fck_detail`` add 25, names
+  like ``comment``, ``sidebar``, ``related`` subtract 25
+* the result is scaled by ``1 - link_density``
+
+The winning block gives the text, the lead image and the selector
+(``tag#id``, or ``tag.class`` for a content-like class; either must match
+nothing else in the page, or there is none). Once a domain's selector has won
+``_LEARN_AFTER`` times it is cached in ``data/content_selectors.json`` and
+later pages only collect text inside that element and stop tokenizing when
+it closes. A fast-path result that comes back too short falls back to the
+full scoring pass, and repeated misses evict the selector.
+"""
+
+import json
+import logging
+import re
+import threading
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urljoin, urlparse
+
+logger = logging.getLogger(__name__)
+
+SELECTOR_CACHE_FILE = Path(__file__).resolve().parents[1] / "data" / "content_selectors.json"
+
+MIN_TEXT_CHARS = 200       # below this the fast path is considered a miss
+_LEARN_AFTER = 2           # wins before a selector is used as the fast path
+_EVICT_AFTER = 3           # consecutive fast-path misses before it is dropped
+
+_SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "iframe", "form", "button", "select", "textarea"}
+_VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+# Tags that end the current text chunk
+_BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "aside", "header", "footer", "nav", "ul", "ol", "li",
+    "table", "tbody", "tr", "td", "th", "blockquote", "figure", "figcaption", "h1", "h2", "h3", "h4",
+    "h5", "h6", "pre", "br", "dl", "dt", "dd", "body",
+}
+# Elements that can hold the article body
+_CONTAINER_TAGS = {"div", "section", "article", "main", "td", "body"}
+_NEGATIVE_TAGS = {"nav", "footer", "aside"}
+
+_POSITIVE_RE = re.compile(r"article|body|content|entry|main|post|text|detail|fck|story|cms|singular", re.I)
+_NEGATIVE_RE = re.compile(
+    r"comment|sidebar|related|relate|footer|menu|share|social|banner|\bads?\b|advert|promo|breadcrumb|"
+    r"tags?\b|widget|popup|newsletter|subscribe|recommend|most-?read|tinlienquan|box-?tin|navigation",
+    re.I,
+)
+_BAD_IMAGE_RE = re.compile(r"logo|icon|avatar|\bads?\b|placeholder|blank|spacer|1x1", re.I)
+_IMAGE_EXT_RE = re.compile(r"\.(jpe?g|png|webp)(\?|$)", re.I)
+_DYNAMIC_NAME_RE = re.compile(r"\d{3,}|^[a-f0-9]{8,}$", re.I)
+_WS_RE = re.compile(r"\s+")
+
+# meta attribute value -> metadata key, in priority order per key
+_META_KEYS = {
+    "og:image": ("image", 0), "og:image:url": ("image", 1), "og:image:secure_url": ("image", 2),
+    "twitter:image": ("image", 3), "twitter:image:src": ("image", 4),
+    "og:description": ("description", 0), "twitter:description": ("description", 1), "description": ("description", 2),
+    "og:title": ("title", 0), "twitter:title": ("title", 1), "headline": ("title", 2),
+    "article:published_time": ("published_time", 0), "article:modified_time": ("published_time", 1),
+    "pubdate": ("published_time", 2), "publish-date": ("published_time", 3), "datepublished": ("published_time", 4),
+}
+
+
+class _Stop(Exception):
+    pass
+
+
+@dataclass
+class _Node:
+    tag: str
+    id: str
+    classes: str
+    parent: int
+    start: int
+    end: int = 0
+    text_chars: int = 0
+    link_chars: int = 0
+    score: float = 0.0
+    scored: bool = False
+    negative: bool = False
+    images: list = field(default_factory=list)
+
+
+@dataclass
+class _Chunk:
+    text: str
+    node: int          # innermost open element
+    neg: int           # innermost negative ancestor, -1 if none
+    link_chars: int
+
+
+def _selector(node: _Node, nodes: list[_Node]) -> Optional[str]:
+    """``tag#id`` or ``tag.class`` naming ``node`` alone in the page (classes only with a positive hint)."""
+    if node.id and not _DYNAMIC_NAME_RE.search(node.id):
+        if sum(1 for nd in nodes if nd.id == node.id and nd.tag == node.tag) == 1:
+            return f"{node.tag}#{node.id}"
+    for cls in node.classes.split():
+        if _DYNAMIC_NAME_RE.search(cls) or not _POSITIVE_RE.search(cls):
+            continue
+        if sum(1 for nd in nodes if nd.tag == node.tag and cls in nd.classes.split()) == 1:
+            return f"{node.tag}.{cls}"
+    return None
+
+
+def _parse_selector(selector: str) -> tuple[str, str, str]:
+    if "#" in selector:
+        tag, ident = selector.split("#", 1)
+        return tag, "#", ident
+    tag, cls = selector.split(".", 1)
+    return tag, ".", cls
+
+
+class _Tokenizer(HTMLParser):
+    def __init__(self, fast_selector: Optional[str] = None):
+        super().__init__(convert_charrefs=True)
+        self.nodes: list[_Node] = []
+        self.stack: list[int] = []
+        self.chunks: list[_Chunk] = []
+        self.meta: dict = {}
+        self._meta_rank: dict = {}
+        self.title_tag = ""
+        self._in_title = False
+        self._skip = 0
+        self._link = 0
+        self._neg: list[int] = []
+        self._buf: list[str] = []
+        self._buf_link = 0
+        self.fast = _parse_selector(fast_selector) if fast_selector else None
+        self.fast_node: Optional[int] = None
+
+    # --- helpers -------------------------------------------------------
+    def _flush(self) -> None:
+        if not self._buf:
+            return
+        text = _WS_RE.sub(" ", "".join(self._buf)).strip()
+        link = self._buf_link
+        self._buf, self._buf_link = [], 0
+        if not text or not self.stack:
+            return
+        node = self.stack[-1]
+        self.chunks.append(_Chunk(text, node, self._neg[-1] if self._neg else -1, min(link, len(text))))
+        n = len(text)
+        for idx in self.stack:
+            nd = self.nodes[idx]
+            nd.text_chars += n
+            nd.link_chars += link
+
+    def _set_meta(self, key: str, value: str) -> None:
+        name, rank = _META_KEYS[key]
+        if rank < self._meta_rank.get(name, 99):
+            self.meta[name] = value
+            self._meta_rank[name] = rank
+
+    def _add_image(self, attrs: dict) -> None:
+        src = attrs.get("data-src") or attrs.get("data-original") or attrs.get("src") or ""
+        if not src or src.startswith("data:") or _BAD_IMAGE_RE.search(src):
+            return
+        for idx in self.stack:
+            nd = self.nodes[idx]
+            if len(nd.images) < 4:
+                nd.images.append(src)
+
+    def _matches_fast(self, tag: str, attrs: dict) -> bool:
+        ftag, kind, name = self.fast
+        if tag != ftag:
+            return False
+        if kind == "#":
+            return attrs.get("id") == name
+        return name in (attrs.get("class") or "").split()
+
+    # --- HTMLParser callbacks -----------------------------------------
+    def handle_starttag(self, tag, attrs_list):
+        attrs = {k: (v or "") for k, v in attrs_list}
+        if tag == "meta":
+            key = (attrs.get("property") or attrs.get("name") or attrs.get("itemprop") or "").lower()
+            if key in _META_KEYS and attrs.get("content"):
+                self._set_meta(key, attrs["content"].strip())
+            return
+        if tag == "link" and "canonical" in attrs.get("rel", "").lower().split() and attrs.get("href"):
+            self.meta.setdefault("canonical", attrs["href"])
+            return
+        if tag == "title":
+            self._in_title = True
+            return
+        if self._skip:
+            if tag in _SKIP_TAGS:
+                self._skip += 1
+            return
+        if tag in _SKIP_TAGS:
+            self._skip = 1
+            return
+        if self.fast and self.fast_node is None:
+            # Fast path: ignore everything before the known content element
+            if not self._matches_fast(tag, attrs):
+                return
+        if tag == "img":
+            self._add_image(attrs)
+            return
+        if tag in _BLOCK_TAGS:
+            self._flush()
+        if tag in _VOID_TAGS:
+            return
+        if tag == "a":
+            self._link += 1
+        ident, classes = attrs.get("id", ""), attrs.get("class", "")
+        node = _Node(tag, ident, classes, self.stack[-1] if self.stack else -1, len(self.nodes))
+        names = f"{ident} {classes}"
+        node.negative = tag in _NEGATIVE_TAGS or bool(names.strip() and _NEGATIVE_RE.search(names) and not _POSITIVE_RE.search(names))
+        self.nodes.append(node)
+        self.stack.append(node.start)
+        if node.negative:
+            self._neg.append(node.start)
+        if self.fast and self.fast_node is None:
+            self.fast_node = node.start
+
+    def handle_startendtag(self, tag, attrs_list):
+        self.handle_starttag(tag, attrs_list)
+        if tag not in _VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+            return
+        if self._skip:
+            if tag in _SKIP_TAGS:
+                self._skip -= 1
+            return
+        if tag in _VOID_TAGS or not self.stack:
+            return
+        # Close up to the matching open tag; stray end tags are ignored
+        for depth in range(len(self.stack) - 1, -1, -1):
+            if self.nodes[self.stack[depth]].tag == tag:
+                break
+        else:
+            return
+        if tag in _BLOCK_TAGS:
+            self._flush()
+        while len(self.stack) > depth:
+            idx = self.stack.pop()
+            nd = self.nodes[idx]
+            nd.end = len(self.nodes) - 1
+            if nd.tag == "a":
+                self._link = max(0, self._link - 1)
+            if self._neg and self._neg[-1] == idx:
+                self._neg.pop()
+            if idx == self.fast_node:
+                raise _Stop()
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title_tag += data
+            return
+        if self._skip or (self.fast and self.fast_node is None):
+            return
+        self._buf.append(data)
+        if self._link:
+            self._buf_link += len(data.strip())
+
+    def finish(self, stopped: bool = False) -> None:
+        # After a fast-path stop the parser still holds unconsumed input;
+        # close() would tokenize it again
+        if not stopped:
+            try:
+                self.close()
+            except _Stop:
+                pass
+        self._flush()
+        for idx in self.stack:
+            self.nodes[idx].end = len(self.nodes) - 1
+
+
+def _container(nodes: list[_Node], idx: int) -> int:
+    while idx >= 0 and nodes[idx].tag not in _CONTAINER_TAGS:
+        idx = nodes[idx].parent
+    return idx
+
+
+def _score(tok: _Tokenizer) -> Optional[_Node]:
+    nodes = tok.nodes
+    for ch in tok.chunks:
+        n = len(ch.text)
+        if n < 25 or ch.link_chars > n * 0.5:
+            continue
+        points = 1 + ch.text.count(",") + min(n / 100.0, 3.0)
+        idx, level = _container(nodes, ch.node), 0
+        while idx >= 0 and level < 3:
+            nd = nodes[idx]
+            if not nd.scored:
+                nd.scored = True
+                names = f"{nd.id} {nd.classes}"
+                if _POSITIVE_RE.search(names):
+                    nd.score += 25
+                if nd.negative:
+                    nd.score -= 25
+                if nd.tag == "article":
+                    nd.score += 10
+            nd.score += points / (1, 2, 3)[level]
+            idx, level = _container(nodes, nd.parent), level + 1
+
+    best, best_score = None, 0.0
+    for nd in nodes:
+        if not nd.scored or nd.tag == "body":
+            continue
+        density = nd.link_chars / nd.text_chars if nd.text_chars else 1.0
+        final = nd.score * (1.0 - density)
+        if final > best_score:
+            best, best_score = nd, final
+    return best
+
+
+def _collect(tok: _Tokenizer, node: _Node) -> str:
+    lines = []
+    for ch in tok.chunks:
+        if ch.node < node.start or ch.node > node.end:
+            continue
+        # Drop boxes (related news, share bars) nested inside the article
+        if ch.neg >= node.start and ch.neg != node.start:
+            continue
+        if ch.link_chars > len(ch.text) * 0.5:
+            continue
+        lines.append(ch.text)
+    return "\n".join(lines)
+
+
+@dataclass
+class Extraction:
+    text: str
+    lead_image: Optional[str]
+    images: list[str]
+    meta: dict
+    selector: Optional[str]
+    fast_path: bool
+
+
+class SelectorCache:
+    """Per-domain winning selectors, persisted as JSON (in memory only when ``path`` is None)."""
+
+    def __init__(self, path: Optional[Path] = SELECTOR_CACHE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data: Optional[dict] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self) -> dict:
+        if self._data is None:
+            try:
+                self._data = json.loads(self.path.read_text(encoding="utf-8")) if self.path and self.path.exists() else {}
+            except Exception:
+                self._data = {}
+        return self._data
+
+    def _save(self) -> None:
+        if self.path is None:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps(self._data, ensure_ascii=False, indent=2), encoding="utf-8")
+        except Exception as e:
+            logger.debug(f"Failed to save content selector cache: {e}")
+
+    def get(self, domain: str) -> Optional[str]:
+        with self._lock:
+            entry = self._load().get(domain)
+            if entry and entry.get("wins", 0) >= _LEARN_AFTER:
+                return entry["selector"]
+            return None
+
+    def record_win(self, domain: str, selector: Optional[str], after_miss: bool = False) -> None:
+        """Count a full-pass win; one right after a fast-path miss of the same selector keeps the miss."""
+        if not domain or not selector:
+            return
+        with self._lock:
+            data = self._load()
+            entry = data.get(domain)
+            if entry and entry["selector"] == selector:
+                if after_miss:
+                    return
+                entry["misses"] = 0
+                if entry["wins"] >= _LEARN_AFTER:
+                    return
+                entry["wins"] += 1
+            else:
+                data[domain] = {"selector": selector, "wins": 1, "misses": 0}
+            self._save()
+
+    def record_fast(self, domain: str, ok: bool) -> None:
+        with self._lock:
+            entry = self._load().get(domain)
+            if ok:
+                self.hits += 1
+                if entry and entry.get("misses"):
+                    entry["misses"] = 0
+                return
+            self.misses += 1
+            if entry is None:
+                return
+            entry["misses"] = entry.get("misses", 0) + 1
+            if entry["misses"] >= _EVICT_AFTER:
+                del self._data[domain]
+                logger.info(f"Dropped content selector {entry['selector']} for {domain}")
+            self._save()
+
+
+selector_cache = SelectorCache()
+
+
+def _domain(url: Optional[str]) -> str:
+    if not url:
+        return ""
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def _absolute(src: Optional[str], base_url: Optional[str]) -> Optional[str]:
+    if not src:
+        return None
+    if src.startswith("//"):
+        return "https:" + src
+    return urljoin(base_url, src) if base_url else src
+
+
+def _run(html: str, fast_selector: Optional[str]) -> _Tokenizer:
+    tok = _Tokenizer(fast_selector)
+    try:
+        tok.feed(html)
+        stopped = False
+    except _Stop:
+        stopped = True
+    tok.finish(stopped)
+    return tok
+
+
+def extract(html: str, url: Optional[str] = None, cache: Optional[SelectorCache] = selector_cache) -> Extraction:
+    """Main text, lead image, images and metadata of an article page."""
+    domain = _domain(url)
+    fast = cache.get(domain) if cache is not None and domain else None
+    if fast:
+        tok = _run(html, fast)
+        node = tok.nodes[tok.fast_node] if tok.fast_node is not None else None
+        text = _collect(tok, node) if node else ""
+        ok = len(text) >= MIN_TEXT_CHARS
+        cache.record_fast(domain, ok)
+        if ok:
+            return _result(tok, node, text, url, fast, True)
+
+    tok = _run(html, None)
+    node = _score(tok)
+    text = _collect(tok, node) if node else ""
+    selector = _selector(node, tok.nodes) if node else None
+    if cache is not None and len(text) >= MIN_TEXT_CHARS:
+        cache.record_win(domain, selector, after_miss=bool(fast))
+    return _result(tok, node, text, url, selector, False)
+
+
+def _result(tok: _Tokenizer, node: Optional[_Node], text: str, url: Optional[str],
+            selector: Optional[str], fast_path: bool) -> Extraction:
+    meta = {"image": None, "description": None, "title": None, "published_time": None}
+    meta.update(tok.meta)
+    if not meta["title"] and tok.title_tag.strip():
+        meta["title"] = _WS_RE.sub(" ", tok.title_tag).strip()
+    images = []
+    if meta["image"]:
+        images.append(_absolute(meta["image"], url))
+    for src in (node.images if node else []):
+        src = _absolute(src, url)
+        if src and _IMAGE_EXT_RE.search(src):
+            images.append(src)
+    images = list(dict.fromkeys(images))[:4]
+    return Extraction(
+        text=text,
+        lead_image=images[0] if images else None,
+        images=images,
+        meta=meta,
+        selector=selector,
+        fast_path=fast_path,
+    )
@@ -11,8 +11,11 @@ import time
 import json
 import html
 import logging
+import os
+import uuid
 from pathlib import Path
-from datetime import datetime, timezone
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
 import random
 import feedparser
 import httpx
@@ -64,15 +67,18 @@ try:
 except Exception:
     BeautifulSoup = None
     _HAS_BS4 = False
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
 from .settings import settings
 from .database import SessionLocal, engine, Base
-from .models import Article, Blacklist, CrawlerStatus
-from .sources import SOURCES, build_gnews_rss, CONFIG
+from .models import Article, Blacklist, CrawlerStatus, CrawlDeferred, CrawlRun, CrawlRunSource
+from .sources import SOURCES, build_gnews_rss, CONFIG, source_tier
 from . import nlp
 from .dedup import find_duplicate_article, get_article_hash, normalize_url
 from .event_matcher import upsert_event_for_article
 from .html_scraper import HTMLScraper, fetch_article_full_text_async, extract_metadata
+from .pipeline import Pipeline, Stage, format_report
+from . import event_batch, event_index, gnews_cache, http_replay, jsonl_log, listing_crawler, metrics, poll_scheduler, raw_archive, syndication
 
 Base.metadata.create_all(bind=engine)
 
@@ -180,16 +186,27 @@ FEED_STATE_FILE = Path(__file__).resolve().parents[1] / "data" / "feed_state.jso
 
 
 def _load_feed_state() -> dict:
+    if settings.crawl_distributed:
+        # Shared across crawler nodes; writes go straight to Redis
+        from .job_queue import SharedFeedState, get_redis_client
+        return SharedFeedState(get_redis_client())
     try:
         if FEED_STATE_FILE.exists():
             with FEED_STATE_FILE.open("r", encoding="utf-8") as f:
-                return json.load(f)
+                state = json.load(f)
+            # Listing snapshots used to live here; they are in listing_snapshots now
+            for entry in state.values():
+                if isinstance(entry, dict):
+                    entry.pop("seen", None)
+            return state
     except Exception:
         pass
     return {}
 
 
 def _save_feed_state(state: dict) -> None:
+    if settings.crawl_distributed:
+        return
     try:
         FEED_STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
         with FEED_STATE_FILE.open("w", encoding="utf-8") as f:
@@ -198,770 +215,1234 @@ def _save_feed_state(state: dict) -> None:
         pass
 
 
-async def _fetch_all_feeds(feed_urls: list[str], headers: dict, timeout_seconds: int, force_update: bool = False) -> dict:
-    """Fetch all feeds concurrently with conditional requests (ETag / If-Modified-Since).
-    
-    Includes User-Agent rotation and retries (3 attempts).
-    Returns mapping url -> dict(text/elapsed,error,not_modified,status_code).
-    """
-    results: dict = {}
+def _feed_client_kwargs(timeout_seconds: int) -> dict:
+    """httpx.AsyncClient options shared by every feed request of a cycle."""
     # Increased limits and shorter timeouts for faster cycle
     timeout = httpx.Timeout(timeout_seconds, connect=10.0, read=20.0)
     limits = httpx.Limits(max_keepalive_connections=20, max_connections=50)
-    
-    # Default headers for feed fetching
-    default_headers = {
-        "Accept": "application/rss+xml, application/xml;q=0.9, */*;q=0.8"
-    }
-    headers = {**default_headers, **headers}
-
-    # load persisted feed state for ETag/Last-Modified
-    feed_state = _load_feed_state()
 
     # Allow insecure SSL (verify=False) to support gov sites with bad certs
     transport = httpx.AsyncHTTPTransport(retries=3, verify=False)
-    
+
     # Proxy rotation logic
     client_kwargs = {
         "timeout": timeout,
         "follow_redirects": True,
         "limits": limits,
-        "transport": transport
+        "transport": http_replay.wrap_transport(transport)
     }
-    
+
     if settings.crawler_proxies:
         proxy_url = random.choice(settings.crawler_proxies)
         client_kwargs["proxy"] = proxy_url
         logger.debug(f"Using proxy for feed crawl: {proxy_url}")
+    return client_kwargs
 
-    async with httpx.AsyncClient(**client_kwargs) as client:
-        tasks = {}
-        for url in feed_urls:
-            async def _get(u=url):
-                # INNER JITTER: Sleep for 0.5 - 3.0 seconds to avoid slamming servers at once
-                await asyncio.sleep(random.uniform(0.5, 3.0))
-                
-                start = time.perf_counter()
-                
-                # Retry loop
-                for attempt in range(3):
-                    try:
-                        # Rotate User-Agent
-                        current_ua = random.choice(settings.user_agents)
-                        local_headers = {**headers, "User-Agent": current_ua}
-                        
-                        state = feed_state.get(u, {})
-                        if not force_update:
-                            if state.get("etag"):
-                                local_headers["If-None-Match"] = state.get("etag")
-                            if state.get("last_modified"):
-                                local_headers["If-Modified-Since"] = state.get("last_modified")
-
-                        r = await client.get(u, headers=local_headers)
-                        
-                        elapsed = time.perf_counter() - start
-
-                        # handle 304 Not Modified
-                        if r.status_code == 304:
-                            return (u, {"not_modified": True, "elapsed": elapsed, "status_code": 304})
-
-                        r.raise_for_status() # successful or raise error
-
-                        # successful fetch, update state
-                        try:
-                            h = {}
-                            if r.headers.get("etag"):
-                                h["etag"] = r.headers.get("etag")
-                            if r.headers.get("last-modified"):
-                                h["last_modified"] = r.headers.get("last-modified")
-                            if h:
-                                feed_state[u] = {**feed_state.get(u, {}), **h, "fetched_at": datetime.now(timezone.utc).isoformat()}
-                                _save_feed_state(feed_state)
-                        except Exception:
-                            pass
-
-                        return (u, {"text": r.text, "elapsed": elapsed, "status_code": r.status_code})
-                        
-                    except httpx.HTTPError as e:
-                        # if last attempt, return error
-                        if attempt == 2:
-                            elapsed = time.perf_counter() - start
-                            return (u, {"error": str(e), "elapsed": elapsed})
-                        # otherwise wait briefly and retry
-                        await asyncio.sleep(1 * (attempt + 1))
-                    except Exception as e:
-                         # Non-HTTP errors (e.g. specialized logic), return immediately
-                        elapsed = time.perf_counter() - start
-                        return (u, {"error": str(e), "elapsed": elapsed})
-
-            tasks[url] = asyncio.create_task(_get())
-
-        for u, t in tasks.items():
-            u_ret, data = await t
-            results[u_ret] = data
-
-    return results
-
-
-
-async def _process_once_async(force_update: bool = False, only_sources: list[str] = None) -> dict:
-    """Async implementation of a single crawl run."""
-    db: Session = SessionLocal()
-    new_count = 0
-    start_total = time.perf_counter()
-    try:
-        # Build list of feed urls with fallback chain per source
-        sources_feeds: dict = {}  # source.name -> list of urls (primary, backup, gnews)
-        for src in SOURCES:
-            if only_sources and src.name not in only_sources:
-                continue
-                
-            feed_urls = []
-            
-            # Add primary and backup RSS if available
-            if src.primary_rss:
-                feed_urls.append(("primary_rss", src.primary_rss))
-            if src.backup_rss:
-                feed_urls.append(("backup_rss", src.backup_rss))
-            
-            # Always add GNews fallback with context terms from config
-            gnews_context = CONFIG.get("gnews_context_terms", [])
-            if gnews_context:
-                # Use context terms for better filtering
-                gnews_url = build_gnews_rss(src.domain, context_terms=gnews_context)
-                print(f"[DEBUG] {src.name} GNews with {len(gnews_context)} context terms")
-            else:
-                # Fallback to no context terms
-                gnews_url = build_gnews_rss(src.domain)
-            feed_urls.append(("gnews", gnews_url))
-            
-            sources_feeds[src.name] = {
-                "source": src,
-                "feed_urls": feed_urls,
-                "used_feed": None,
-                "articles_added": 0
-            }
-
-        headers = {"User-Agent": settings.user_agent}
-
-        # Fetch all feeds concurrently
-        all_feed_urls = []
-        feed_to_source_info: dict = {}  # (url, feed_type) -> source_info
-        
-        for src_name, src_info in sources_feeds.items():
-            for feed_type, url in src_info["feed_urls"]:
-                all_feed_urls.append(url)
-                feed_to_source_info[url] = (src_name, feed_type)
 
-        fetched = {}
+async def _fetch_feed(client: httpx.AsyncClient, u: str, headers: dict, feed_state: dict, force_update: bool = False) -> dict:
+    """Fetch one feed with conditional headers, UA rotation and 3 attempts.
+
+    Returns dict(text/elapsed,error,not_modified,status_code).
+    """
+    # INNER JITTER: Sleep for 0.5 - 3.0 seconds to avoid slamming servers at once
+    await asyncio.sleep(random.uniform(0.5, 3.0) * settings.crawl_jitter_scale)
+
+    start = time.perf_counter()
+
+    # Retry loop
+    for attempt in range(3):
         try:
-            fetched = await _fetch_all_feeds(all_feed_urls, headers, settings.request_timeout_seconds, force_update=force_update)
+            # Rotate User-Agent
+            current_ua = random.choice(settings.user_agents)
+            local_headers = {**headers, "User-Agent": current_ua}
+
+            state = feed_state.get(u, {})
+            if not force_update:
+                if state.get("etag"):
+                    local_headers["If-None-Match"] = state.get("etag")
+                if state.get("last_modified"):
+                    local_headers["If-Modified-Since"] = state.get("last_modified")
+
+            r = await client.get(u, headers=local_headers)
+
+            elapsed = time.perf_counter() - start
+
+            # handle 304 Not Modified
+            if r.status_code == 304:
+                return {"not_modified": True, "elapsed": elapsed, "status_code": 304}
+
+            r.raise_for_status() # successful or raise error
+
+            # successful fetch, update state
+            try:
+                h = {}
+                if r.headers.get("etag"):
+                    h["etag"] = r.headers.get("etag")
+                if r.headers.get("last-modified"):
+                    h["last_modified"] = r.headers.get("last-modified")
+                if h:
+                    feed_state[u] = {**feed_state.get(u, {}), **h, "fetched_at": datetime.now(timezone.utc).isoformat()}
+                    _save_feed_state(feed_state)
+            except Exception:
+                pass
+
+            await raw_archive.aput("feed", u, r.content, status_code=r.status_code)
+            return {"text": r.text, "elapsed": elapsed, "status_code": r.status_code}
+
+        except httpx.HTTPError as e:
+            # if last attempt, return error
+            if attempt == 2:
+                elapsed = time.perf_counter() - start
+                return {"error": str(e), "elapsed": elapsed}
+            # otherwise wait briefly and retry
+            await asyncio.sleep(1 * (attempt + 1))
         except Exception as e:
-            print(f"[WARN] concurrent fetch failed: {e}")
-            fetched = {}
+            # Non-HTTP errors (e.g. specialized logic), return immediately
+            elapsed = time.perf_counter() - start
+            return {"error": str(e), "elapsed": elapsed}
 
-        # Try fallback chain per source: primary → backup → gnews
-        per_source_stats = []
-        
-        for src_name, src_info in sources_feeds.items():
-            src = src_info["source"]
-            stat = {"source": src.name, "feed_used": None, "elapsed": 0.0, "error": None, "articles_added": 0}
-            
-            feed_worked = False
-            for feed_type, url in src_info["feed_urls"]:
-                info = fetched.get(url)
-
-                if info is None or "error" in info:
-                    elapsed = info.get("elapsed", 0) if info else 0
-                    err = info.get("error", "no response") if info else "no response"
-                    print(f"[WARN] {src.name} {feed_type} failed ({elapsed:.2f}s): {err}")
-                    continue
 
-                # If feed did not change since last fetch (HTTP 304), treat as a successful feed with no new entries
-                if info.get("not_modified"):
-                    elapsed = info.get("elapsed", 0)
-                    stat["feed_used"] = f"{stat['feed_used']}, {feed_type}" if stat["feed_used"] else feed_type
-                    stat["elapsed"] = (stat["elapsed"] or 0) + elapsed
-                    feed_worked = True
-                    print(f"[OK] {src.name} using {feed_type} (not modified, {elapsed:.2f}s)")
-                    # DO NOT BREAK: Continue to check next feed (e.g. backup/secondary)
-                    continue
-                
-                # Try to parse this feed
+async def _fetch_all_feeds(feed_urls: list[str], headers: dict, timeout_seconds: int, force_update: bool = False) -> dict:
+    """Fetch all feeds concurrently with conditional requests (ETag / If-Modified-Since).
+
+    Includes User-Agent rotation and retries (3 attempts).
+    Returns mapping url -> dict(text/elapsed,error,not_modified,status_code).
+    """
+    headers = {**FEED_HEADERS, **headers}
+
+    # load persisted feed state for ETag/Last-Modified
+    feed_state = _load_feed_state()
+
+    async with httpx.AsyncClient(**_feed_client_kwargs(timeout_seconds)) as client:
+        tasks = {u: asyncio.create_task(_fetch_feed(client, u, headers, feed_state, force_update)) for u in feed_urls}
+        return {u: await t for u, t in tasks.items()}
+
+
+# Default headers for feed fetching
+FEED_HEADERS = {
+    "Accept": "application/rss+xml, application/xml;q=0.9, */*;q=0.8"
+}
+
+STAGE_VN = {
+    "FORECAST": "DỰ BÁO",
+    "INCIDENT": "DIỄN BIẾN",
+    "RECOVERY": "KHẮC PHỤC"
+}
+
+# Crawl pipeline stages, in order. Concurrency per stage comes from settings.
+CRAWL_STAGES = ["fetch", "parse", "prefilter", "analyze", "persist", "cluster", "enrich", "publish"]
+
+
+def _build_source_plan(only_sources: list[str] | None = None) -> list[dict]:
+    """Build the fallback chain (primary → backup → gnews) for each source."""
+    plan = []
+    for src in SOURCES:
+        if only_sources and src.name not in only_sources:
+            continue
+
+        feed_urls = []
+
+        # Add primary and backup RSS if available
+        if src.primary_rss:
+            feed_urls.append(("primary_rss", src.primary_rss))
+        if src.backup_rss:
+            feed_urls.append(("backup_rss", src.backup_rss))
+
+        # Always add GNews fallback with context terms from config
+        gnews_context = CONFIG.get("gnews_context_terms", [])
+        if gnews_context:
+            # Use context terms for better filtering
+            gnews_url = build_gnews_rss(src.domain, context_terms=gnews_context)
+            print(f"[DEBUG] {src.name} GNews with {len(gnews_context)} context terms")
+        else:
+            # Fallback to no context terms
+            gnews_url = build_gnews_rss(src.domain)
+        feed_urls.append(("gnews", gnews_url))
+
+        plan.append({
+            "source": src,
+            "feed_urls": feed_urls,
+            "fetched": {},
+            "articles_added": 0,
+            "stat": {
+                "source": src.name, "feed_used": None, "elapsed": 0.0, "error": None, "articles_added": 0,
+                # Inputs for the adaptive poll scheduler
+                "feeds_requested": 0, "not_modified": 0, "entries": 0, "entries_24h": 0,
+            },
+        })
+    return plan
+
+
+@dataclass
+class _Candidate:
+    """One feed entry or scraped link travelling through the crawl pipeline."""
+    src_info: dict
+    kind: str  # "feed" or "scrape"
+    title: str
+    link: str
+    published_at: datetime
+    summary_raw: str
+    entry: object = None
+    news_hash: str | None = None
+    existing: Article | None = None
+    diag: dict | None = None
+    action: str | None = None  # "new", "upgrade" or "reject"
+    status: str | None = None
+    fields: dict = field(default_factory=dict)
+    article: Article | None = None
+    enriched: bool = False
+    resumed: bool = False  # enrichment deferred by an earlier cycle
+
+    @property
+    def src(self):
+        return self.src_info["source"]
+
+    @property
+    def text_for_nlp(self) -> str:
+        return self.title + " " + self.summary_raw
+
+
+def _log_review_record(record: dict) -> None:
+    jsonl_log.review_log.append(record)
+
+
+class _CrawlRun:
+    """
+    State and stage handlers for one crawl cycle.
+
+    All DB work shares one Session. Handlers never hold uncommitted changes
+    across an ``await``, so interleaved stages cannot commit or roll back
+    each other's work.
+    """
+
+    def __init__(self, db: Session, client: httpx.AsyncClient, force_update: bool = False, deadline: float | None = None,
+                 run_id: str | None = None):
+        self.db = db
+        self.run_id = run_id
+        self.client = client
+        self.force_update = force_update
+        self.headers = {**FEED_HEADERS, "User-Agent": settings.user_agent}
+        self.feed_state = _load_feed_state()
+        self.snapshots = listing_crawler.ListingSnapshots()
+        self.new_count = 0
+        self.nlp_skipped = 0  # diagnose() calls avoided for already-known entries
+        # perf_counter() time after which only priority-0 work is started
+        self.deadline = deadline
+        self.deferred_sources: list[dict] = []
+        self.deferred_enrich: list[_Candidate] = []
+        # Articles waiting for cluster_pending() in batch clustering mode
+        self.to_cluster: list[Article] = []
+
+    # ------------------------------------------------------------------
+    # per-source completion tracking (drives the run checkpoint)
+    # ------------------------------------------------------------------
+    @staticmethod
+    async def _emit_candidate(emit, cand: _Candidate) -> None:
+        cand.src_info["outstanding"] = cand.src_info.get("outstanding", 0) + 1
+        await emit(cand)
+
+    def on_item_done(self, stage: str, item, emitted: int) -> None:
+        """Pipeline hook: a source is finished once it is parsed and none of its entries are in flight."""
+        if stage == "fetch":
+            if not emitted:
+                self.finish_source(item)
+            return
+        if stage == "parse":
+            item["parsed"] = True
+            if not item.get("outstanding"):
+                self.finish_source(item)
+            return
+        if emitted and stage != CRAWL_STAGES[-1]:
+            return
+        src_info = item.src_info
+        src_info["outstanding"] -= 1
+        if src_info.get("parsed") and src_info["outstanding"] == 0:
+            self.finish_source(src_info)
+
+    def finish_source(self, src_info: dict) -> dict:
+        """Record a finished source once: CrawlerStatus plus the run checkpoint."""
+        if src_info.get("finished"):
+            return src_info["stat"]
+        src_info["finished"] = True
+        stat = self.record_source_status(src_info)
+        if self.run_id:
+            try:
+                row = self.db.get(CrawlRunSource, (self.run_id, src_info["source"].name))
+                if row is not None:
+                    if row.status == "pending":
+                        run = self.db.get(CrawlRun, self.run_id)
+                        run.sources_done = (run.sources_done or 0) + 1
+                    row.status = "deferred" if src_info.get("deferred") else "done"
+                    row.articles_added = src_info["articles_added"]
+                    row.finished_at = datetime.utcnow()
+                self.db.commit()
+            except Exception as e:
+                self.db.rollback()
+                logger.error(f"Failed to checkpoint {src_info['source'].name} for run {self.run_id}: {e}")
+        return stat
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.perf_counter() >= self.deadline
+
+    def _defer_source(self, src_info: dict) -> None:
+        src_info["deferred"] = True
+        src_info["stat"]["deferred"] = True
+        self.deferred_sources.append(src_info)
+        print(f"[DEFER] {src_info['source'].name}: cycle budget exhausted, resuming next cycle")
+
+    @staticmethod
+    def _critical(cand: _Candidate) -> bool:
+        """Tier-1 official / red-alert-related work is never deferred."""
+        if cand.src_info.get("priority", 2) == 0:
+            return True
+        if cand.fields.get("is_red_alert"):
+            return True
+        return bool(cand.article is not None and cand.article.is_red_alert)
+
+    def stages(self) -> list[Stage]:
+        conc = settings.crawl_stage_concurrency
+        return [
+            Stage(name, getattr(self, name), concurrency=conc.get(name, 1), queue_size=settings.crawl_queue_size)
+            for name in CRAWL_STAGES
+        ]
+
+    # ------------------------------------------------------------------
+    # fetch: download every feed of a source concurrently
+    # ------------------------------------------------------------------
+    async def fetch(self, src_info: dict, emit) -> None:
+        if self.expired() and src_info.get("priority", 2) > 0:
+            self._defer_source(src_info)
+            return
+        urls = [url for _, url in src_info["feed_urls"]]
+        results = await asyncio.gather(
+            *(_fetch_feed(self.client, u, self.headers, self.feed_state, self.force_update) for u in urls)
+        )
+        src_info["fetched"] = dict(zip(urls, results))
+        name = src_info["source"].name
+        for res in results:
+            metrics.FETCH_SECONDS.observe(res.get("elapsed", 0), source=name)
+            result = "error" if "error" in res else "not_modified" if res.get("not_modified") else "ok"
+            metrics.FETCH_RESULTS.inc(source=name, result=result)
+        await emit(src_info)
+
+    # ------------------------------------------------------------------
+    # parse: walk the fallback chain, fall back to the HTML scraper
+    # ------------------------------------------------------------------
+    async def parse(self, src_info: dict, emit) -> None:
+        src = src_info["source"]
+        stat = src_info["stat"]
+
+        feed_worked = False
+        for feed_type, url in src_info["feed_urls"]:
+            info = src_info["fetched"].get(url)
+            if info is not None:
+                stat["feeds_requested"] += 1
+
+            if info is None or "error" in info:
+                elapsed = info.get("elapsed", 0) if info else 0
+                err = info.get("error", "no response") if info else "no response"
+                print(f"[WARN] {src.name} {feed_type} failed ({elapsed:.2f}s): {err}")
+                continue
+
+            # If feed did not change since last fetch (HTTP 304), treat as a successful feed with no new entries
+            if info.get("not_modified"):
                 elapsed = info.get("elapsed", 0)
-                feed = feedparser.parse(info.get("text", ""))
-                
-                if not feed.entries:
-                    print(f"[WARN] {src.name} {feed_type} returned 0 entries")
-                    continue
-                
-                # Success! Use this feed
+                stat["not_modified"] += 1
                 stat["feed_used"] = f"{stat['feed_used']}, {feed_type}" if stat["feed_used"] else feed_type
                 stat["elapsed"] = (stat["elapsed"] or 0) + elapsed
                 feed_worked = True
-                
-                print(f"[OK] {src.name} using {feed_type} ({len(feed.entries)} entries, {elapsed:.2f}s)")
-                
-                # Process articles from this feed
-                # Differentiated limit: Higher for direct RSS, lower for noisy GNews search
-                max_articles = 50 if feed_type == "gnews" else 200
-                for entry in feed.entries[:max_articles]:
-                    raw_title = getattr(entry, "title", "")
-                    # Double unescape to catch poorly encoded sources
-                    title = html.unescape(html.unescape(raw_title)).strip()
-                    title = re.sub(r"\s+", " ", title)
-                    
-                    link = getattr(entry, "link", "").strip()
-                    
-                    published_at = _to_dt(entry)
-                    if published_at < CRAWL_MIN_DATE:
-                        # Skip historical news before Jan 1st 2025
-                        continue
-                    raw_summary = getattr(entry, "summary", "") or getattr(entry, "description", "") or ""
-                    summary_raw = html.unescape(html.unescape(raw_summary)).strip()
-                    summary_raw = re.sub(r"<[^>]+>", "", summary_raw)
-                    summary_raw = re.sub(r"\s+", " ", summary_raw)
-                    
-                    text_for_nlp = title + " " + summary_raw
-                    
-                    # ---------------------------------------------------------
-                    # 0. PRE-CHECK: Blacklist & Hash Deduplication
-                    # ---------------------------------------------------------
-                    news_hash = get_article_hash(title, src.domain, link)
-                    
-                    # Check blacklist
-                    blacklisted = db.query(Blacklist).filter(Blacklist.news_hash == news_hash).first()
-                    if blacklisted:
-                        continue
-                        
-                    existing = find_duplicate_article(db, src.domain, link, title, published_at)
-
-                    # ---------------------------------------------------------
-                    # 1. TIERED FILTERING: 3-Tier Scoring System (User Adjusted)
-                    # ---------------------------------------------------------
-                    diag = nlp.diagnose(text_for_nlp, title=title, authority_level=src.authority_level)
-                    score = diag["score"]
-
-                    # Logic for upgrading Pending -> Approved
-                    if existing:
-                        if existing.status == "approved":
-                            # We already have this and it's approved
-                            print(f"[DEDUP] {src.name}: {title[:100]}... (already approved)")
+                print(f"[OK] {src.name} using {feed_type} (not modified, {elapsed:.2f}s)")
+                # DO NOT BREAK: Continue to check next feed (e.g. backup/secondary)
+                continue
+
+            # Try to parse this feed (off the event loop, feedparser is CPU-bound)
+            elapsed = info.get("elapsed", 0)
+            t_parse = time.perf_counter()
+            feed = await asyncio.to_thread(feedparser.parse, info.get("text", ""))
+            metrics.PARSE_SECONDS.observe(time.perf_counter() - t_parse)
+
+            if not feed.entries:
+                print(f"[WARN] {src.name} {feed_type} returned 0 entries")
+                continue
+
+            # Success! Use this feed
+            stat["feed_used"] = f"{stat['feed_used']}, {feed_type}" if stat["feed_used"] else feed_type
+            stat["elapsed"] = (stat["elapsed"] or 0) + elapsed
+            feed_worked = True
+
+            print(f"[OK] {src.name} using {feed_type} ({len(feed.entries)} entries, {elapsed:.2f}s)")
+
+            # Differentiated limit: Higher for direct RSS, lower for noisy GNews search
+            max_articles = 50 if feed_type == "gnews" else 200
+            recent_cutoff = datetime.utcnow() - timedelta(hours=24)
+            # Known GNews redirects are swapped for the publisher URL before dedup
+            resolved = gnews_cache.cache.lookup_many(
+                getattr(e, "link", "").strip() for e in feed.entries[:max_articles])
+            for entry in feed.entries[:max_articles]:
+                raw_title = getattr(entry, "title", "")
+                # Double unescape to catch poorly encoded sources
+                title = html.unescape(html.unescape(raw_title)).strip()
+                title = re.sub(r"\s+", " ", title)
+
+                link = getattr(entry, "link", "").strip()
+                link = resolved.get(link, link)
+
+                published_at = _to_dt(entry)
+                stat["entries"] += 1
+                if published_at >= recent_cutoff:
+                    stat["entries_24h"] += 1
+                if published_at < CRAWL_MIN_DATE:
+                    # Skip historical news before Jan 1st 2025
+                    continue
+                raw_summary = getattr(entry, "summary", "") or getattr(entry, "description", "") or ""
+                summary_raw = html.unescape(html.unescape(raw_summary)).strip()
+                summary_raw = re.sub(r"<[^>]+>", "", summary_raw)
+                summary_raw = re.sub(r"\s+", " ", summary_raw)
+
+                await self._emit_candidate(emit, _Candidate(src_info, "feed", title, link, published_at, summary_raw, entry=entry))
+
+            break  # Don't try other feeds for this source, we got articles
+
+        # Force HTML scraper for known difficult sources w/ custom scrapers
+        # or if previous RSS feeds failed
+        force_html_scrape = any(x in src.domain for x in ["thoitietvietnam", "nchmf", "kttv"])
+
+        if ((not feed_worked) or force_html_scrape) and self.expired() and src_info.get("priority", 2) > 0:
+            # Out of budget: the scraper is the slowest path, leave it to the next cycle
+            if not feed_worked:
+                self._defer_source(src_info)
+            metrics.ENTRIES_PARSED.inc(stat["entries"], source=src.name)
+            return
+
+        if not feed_worked:
+            feed_worked = await self._crawl_sitemaps(src_info, emit)
+
+        # Custom scrapers run whatever else worked; the generic one only when nothing did
+        if (not feed_worked) or force_html_scrape:
+            # Try HTML scraper
+            try:
+                if force_html_scrape:
+                    print(f"[INFO] {src.name} - forcing HTML scraper execution...")
+                else:
+                    print(f"[INFO] {src.name} - attempting HTML scraper fallback...")
+
+                scraper = HTMLScraper(timeout=settings.request_timeout_seconds)
+                scraped_articles = await scraper.scrape_source(src.domain)
+
+                if scraped_articles:
+                    stat["feed_used"] = f"{stat['feed_used']}, html_scraper" if stat["feed_used"] else "html_scraper"
+                    stat["entries"] += len(scraped_articles)
+                    # Only links that were not on the listing last cycle; the ones past
+                    # the cap stay unseen and come up again next cycle
+                    scraped_articles = listing_crawler.diff_listing(self.snapshots, src.domain, scraped_articles)
+                    print(f"[OK] {src.name} using html_scraper ({stat['entries']} links, {len(scraped_articles)} new)")
+
+                    handled = []
+                    for scraped in scraped_articles[:50]:
+                        title = html.unescape(scraped.get("title", "")).strip()
+                        url = scraped.get("url", "").strip()
+                        handled.append(scraped.get("url"))
+                        if not title or not url:
                             continue
-                        
-                        # If it was pending but now is approved, we upgrade it
-                        if existing.status == "pending" and score > 13.0:
-                            print(f"[INFO] Upgrading article to Approved: {title} (Score: {score})")
-                            existing.status = "approved"
-                            existing.score = score
-                            # Update impacts with new info if available
-                            impacts = nlp.extract_impacts(text_for_nlp)
-                            existing.deaths = _get_impact_value(impacts["deaths"])
-                            existing.missing = _get_impact_value(impacts["missing"])
-                            existing.injured = _get_impact_value(impacts["injured"])
-                            existing.damage_billion_vnd = _get_impact_value(impacts["damage_billion_vnd"])
-                            existing.is_red_alert = diag["signals"].get("is_red_alert", False)
-                            existing.summary = summary_raw[:1000] # Update summary if it's longer/better
-                            
-                            # Link to an event now that it's approved
-                            upsert_event_for_article(db, existing)
-                            db.commit()
-                            new_count += 1
-                        continue # Skip to next article in feed
-
-                    status = None
-                    if score > 15:
-                        status = "approved"
-                    elif score >= 10.0:
-                        status = "pending"
-                    
-                    if not status:
-                        # Logic for low score items (< 10.0) -> Auto Blacklist
-                        try:
-                            # Add to Blacklist to prevent re-crawling
-                            if news_hash:
-                                # Check if already blacklisted to avoid unique constraint error
-                                bl_exists = db.query(Blacklist).filter(Blacklist.news_hash == news_hash).first()
-                                if not bl_exists:
-                                    bl_entry = Blacklist(
-                                        news_hash=news_hash,
-                                        title=title,
-                                        reason=f"Low Score: {score} ({diag['reason']})"
-                                    )
-                                    db.add(bl_entry)
-                                    db.commit()
-
-                            # Log to file still, for audit (only if score > 3 to avoid complete noise)
-                            if score >= 3.0 or diag["signals"].get("rule_matches"):
-                                logs_dir = Path(__file__).resolve().parents[1] / "logs"
-                                logs_dir.mkdir(parents=True, exist_ok=True)
-                                potential_file = logs_dir / "review_potential_disasters.jsonl"
-                                record = {
-                                    "timestamp": datetime.now(timezone.utc).isoformat(),
-                                    "published_at": published_at.isoformat(),
-                                    "action": "auto_blacklisted",
-                                    "source": src.name,
-                                    "domain": src.domain,
-                                    "title": title,
-                                    "url": link,
-                                    "news_hash": news_hash,
-                                    "score": score,
-                                    "reason": diag["reason"],
-                                    "diagnose": diag["signals"]
-                                }
-                                with potential_file.open("a", encoding="utf-8") as f:
-                                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
-
-                        except Exception as e:
-                            logger.error(f"Error blacklisting low-score item: {e}")
-                            db.rollback()
-                        continue
-
-                    # For articles in the reviewable range (6.0 - 11.5), we also log them to JSONL 
-                    # as per user request, while keeping them in DB as 'pending' for structure
-                    if status == "pending":
-                        try:
-                            logs_dir = Path(__file__).resolve().parents[1] / "logs"
-                            potential_file = logs_dir / "review_potential_disasters.jsonl"
-                            record = {
-                                "timestamp": datetime.now(timezone.utc).isoformat(),
-                                "published_at": published_at.isoformat(),
-                                "action": "pending_review",
-                                "source": src.name,
-                                "domain": src.domain,
-                                "title": title,
-                                "url": link,
-                                "news_hash": news_hash,
-                                "score": score,
-                                "reason": diag["reason"]
-                            }
-                            with potential_file.open("a", encoding="utf-8") as f:
-                                f.write(json.dumps(record, ensure_ascii=False) + "\n")
-                        except Exception: pass
-
-
-                    # If we reach here, it's either 'approved' or 'pending'
-                    
-                    disaster_info = nlp.classify_disaster(text_for_nlp)
-                    disaster_type = disaster_info.get("primary_type", "unknown")
-                    province = nlp.extract_province(text_for_nlp)
-
-                    impacts = nlp.extract_impacts(summary_raw or title)
-                    summary_text = nlp.summarize(summary_raw.replace("&nbsp;", " "), title=title)
-                    
-                    stage = nlp.determine_event_stage(text_for_nlp)
-                    stage_vn = {
-                        "FORECAST": "DỰ BÁO",
-                        "INCIDENT": "DIỄN BIẾN",
-                        "RECOVERY": "KHẮC PHỤC"
-                    }.get(stage, "TIN MỚI")
-                    
-                    summary = f"[{stage_vn}] {summary_text}"
-                    is_red_alert = diag["signals"].get("is_red_alert", False)
-
-                    article = Article(
-                        source=src.name,
-                        domain=src.domain,
-                        title=title,
-                        url=link,
-                        news_hash=news_hash,
-                        status=status,
-                        score=score,
-                        published_at=published_at,
-                        disaster_type=disaster_type,
-                        province=province,
-                        commune=impacts.get("commune"),
-                        village=impacts.get("village"),
-                        route=impacts.get("route"),
-                        cause=impacts.get("cause"),
-                        characteristics=impacts.get("characteristics"),
-                        stage=stage,
-                        deaths=_get_impact_value(impacts["deaths"]),
-                        missing=_get_impact_value(impacts["missing"]),
-                        injured=_get_impact_value(impacts["injured"]),
-                        damage_billion_vnd=_get_impact_value(impacts["damage_billion_vnd"]),
-                        agency=impacts["agency"][:255] if impacts["agency"] else None,
-                        summary=summary,
-                        image_url=_extract_image_url(entry),
-                        impact_details=nlp.extract_impact_details(text_for_nlp),
-                        needs_verification=int(nlp.validate_impacts(impacts)),
-                        is_red_alert=is_red_alert
-                    )
-
-                    try:
-                        db.add(article)
-                        db.flush()
-                        
-                        # Process event matching for both Approved and Pending articles
-                        # This allows "pending" articles to contribute to event metadata (multi-source count)
-                        if status in ("approved", "pending"):
-                            upsert_event_for_article(db, article)
-
-                        if status == "approved":
-                            print(f"   [ADDED] {src.name}: {title[:70]}...")
-                        else:
-                            print(f"   [PENDING] {src.name}: {title[:70]}... (Score: {score:.1f})")
-                            
-                        new_count += 1
-                        src_info["articles_added"] += 1
-                    except Exception as e:
-                        db.rollback()
-                        print(f"   [ERROR_DB] {src.name}: {e}")
-                        continue
-
-                    # Log accepted/inserted candidate (for review)
-                        # Skip logging accepted entries to skip_debug.jsonl to save space.
-                        # We already have them in the Database!
-                        pass
-                    except Exception:
-                        pass
-                    
-                    # Full-page fetch if impact keywords found
-                    try:
-                        # Fetch full HTML for trusted sources, for title-matched entries,
-                        # or when impact keywords are present in feed summary.
-                        should_fetch = False
-                        text_lower = (title + "\n" + (getattr(entry, "summary", "") or "")).lower()
-                        if src.trusted or nlp.title_contains_disaster_keyword(title):
-                            should_fetch = True
-                        else:
-                            for data in nlp.IMPACT_KEYWORDS.values():
-                                terms = data.get("terms", [])
-                                for kw in terms:
-                                    if kw.lower() in text_lower:
-                                        should_fetch = True
-                                        break
-                                if should_fetch:
-                                    break
-
-                        if should_fetch:
-                            try:
-                                timeout = settings.request_timeout_seconds
-                                # Integration of the improved Generic Content Extractor
-                                fetch_res = await fetch_article_full_text_async(link, timeout=timeout)
-                                
-                                if fetch_res:
-                                    full_text = fetch_res["text"]
-                                    images = fetch_res["images"]
-                                    final_url = fetch_res["final_url"]
-                                    
-                                    # Update is_broken status
-                                    if fetch_res.get("is_broken"):
-                                        article.is_broken = 1
-                                        
-                                    # Update URL if it was a redirect (important for Google News/Shorteners)
-                                    if final_url and final_url != link:
-                                        # Check if another article with same domain and final_url already exists
-                                        # to avoid UniqueViolation on (domain, url)
-                                        collision = db.query(Article).filter(Article.domain == article.domain, Article.url == final_url).first()
-                                        if not collision:
-                                            article.url = final_url
-                                        else:
-                                            logger.debug(f"URL resolution collision for {final_url}, skipping update")
-                                    
-                                    # Update Image if missing or if we found a better one
-                                    if not article.image_url and images:
-                                        article.image_url = images[0]
-                                    elif article.image_url and images and "googleusercontent" in article.image_url:
-                                        # Prefer original site image over Google proxy image
-                                        article.image_url = images[0]
-
-                                    full_impacts = nlp.extract_impacts(full_text)
-                                    
-                                    # Update metrics from full text
-                                    if full_impacts.get("deaths") is not None and article.deaths is None:
-                                        article.deaths = _get_impact_value(full_impacts.get("deaths"))
-                                    if full_impacts.get("missing") is not None and article.missing is None:
-                                        article.missing = _get_impact_value(full_impacts.get("missing"))
-                                    if full_impacts.get("injured") is not None and article.injured is None:
-                                        article.injured = _get_impact_value(full_impacts.get("injured"))
-                                    if full_impacts.get("damage_billion_vnd") is not None and article.damage_billion_vnd is None:
-                                        article.damage_billion_vnd = _get_impact_value(full_impacts.get("damage_billion_vnd"))
-                                    
-                                    if full_impacts.get("agency") is not None and article.agency is None:
-                                        raw_agency = full_impacts.get("agency")
-                                        article.agency = raw_agency[:255] if raw_agency else None
-                                        
-                                    # Update extended location and cause from full text if currently missing
-                                    if full_impacts.get("commune") and not article.commune:
-                                        article.commune = full_impacts.get("commune")
-                                    if full_impacts.get("village") and not article.village:
-                                        article.village = full_impacts.get("village")
-                                    if full_impacts.get("route") and not article.route:
-                                        article.route = full_impacts.get("route")
-                                    if full_impacts.get("cause") and not article.cause:
-                                        article.cause = full_impacts.get("cause")
-                                    if full_impacts.get("characteristics") and not article.characteristics:
-                                        article.characteristics = full_impacts.get("characteristics")
-
-                                    if article.province in (None, "unknown"):
-                                        prov = nlp.extract_province(full_text)
-                                        if prov and prov != "unknown":
-                                            article.province = prov
-                                    
-                                    # Re-validate after full text fetch
-                                    needs_v = nlp.validate_impacts(full_impacts)
-                                    if needs_v:
-                                        article.needs_verification = 1
-
-                                    # SAVE FULL TEXT - This powers the "Archived at System" feature
-                                    try:
-                                        article.full_text = full_text[:100000] # Safety limit
-                                        
-                                        # IMPROVED SUMMARY: If original summary was generic or short, replace with better one from full text
-                                        if "Đang tổng hợp dữ liệu" in article.summary or len(article.summary) < 100:
-                                            # Determine stage if not already set correctly
-                                            stage = article.stage or nlp.determine_event_stage(full_text)
-                                            stage_vn = {
-                                                "FORECAST": "DỰ BÁO",
-                                                "INCIDENT": "DIỄN BIẾN",
-                                                "RECOVERY": "KHẮC PHỤC"
-                                            }.get(stage, "TIN MỚI")
-                                            
-                                            better_summary_text = nlp.summarize(full_text, title=article.title)
-                                            article.summary = f"[{stage_vn}] {better_summary_text}"
-                                            logger.debug(f"Updated summary for {article.title} from full text")
-                                            
-                                    except Exception:
-                                        pass
-                            except Exception as e:
-                                logger.debug(f"Full-text fetch failed for {link}: {e}")
-                    except Exception as e:
-                        db.rollback()
-                        logger.error(f"Error processing article {link}: {e}")
-
-                    try:
-                        upsert_event_for_article(db, article)
-                    except Exception as e:
-                        logger.error(f"Failed to upsert event for {article.title}: {e}")
-                        db.rollback()
-                
-                break  # Don't try other feeds for this source, we got articles
-            
-            # Force HTML scraper for known difficult sources w/ custom scrapers
-            # or if previous RSS feeds failed
-            force_html_scrape = any(x in src.domain for x in ["thoitietvietnam", "nchmf", "kttv"])
-
-            if (not feed_worked) or force_html_scrape:
-                # Try HTML scraper
-                try:
-                    if force_html_scrape:
-                         print(f"[INFO] {src.name} - forcing HTML scraper execution...")
-                    else:
-                         print(f"[INFO] {src.name} - attempting HTML scraper fallback...")
-
-                    scraper = HTMLScraper(timeout=settings.request_timeout_seconds)
-                    scraped_articles = await scraper.scrape_source(src.domain)
-                    
-                    if scraped_articles:
-                        stat["feed_used"] = f"{stat['feed_used']}, html_scraper" if stat["feed_used"] else "html_scraper"
-                        # Reset elapsed since this is async/parallel to feed
-                        # stat["elapsed"] += ... 
-                        print(f"[OK] {src.name} using html_scraper ({len(scraped_articles)} articles)")
-                        
-                        # Process scraped articles
-                        for scraped in scraped_articles[:50]:
-                            title = html.unescape(scraped.get("title", "")).strip()
-                            url = scraped.get("url", "").strip()
-                            if not title or not url:
-                                continue
-                            
-                            # Use scrape time as publish time
-                            published_at = datetime.utcnow()
-                            if published_at < CRAWL_MIN_DATE:
-                                continue
-                            
-                            summary_raw_scraper = html.unescape(scraped.get("summary", "") or scraped.get("description", "") or "")
-                            text_for_nlp = title + " " + summary_raw_scraper
-                            
-                            # Pre-filter using main NLP: 
-                            # - Explicitly check using full NLP (Veto/Rules)
-                            # - Pass trusted_source=src.trusted to allow lighter threshold for official sources
-                            if not nlp.contains_disaster_keywords(summary_raw_scraper, title=title, trusted_source=src.trusted, authority_level=src.authority_level):
-                                article_hash = get_article_hash(title, src.domain)
-                                diag = nlp.diagnose(summary_raw_scraper, title=title, authority_level=src.authority_level)
-                                print(f"[SKIP] {src.name} #{article_hash}: nlp-rejected score={diag['score']:.1f} reason={diag['reason']}")
-                                continue
-                            
-                            
-                            disaster_info = nlp.classify_disaster(text_for_nlp)
-                            disaster_type = disaster_info.get("primary_type", "unknown")
-                            province = nlp.extract_province(text_for_nlp)
-                            
-                            impacts = nlp.extract_impacts(summary_raw_scraper or title)
-                            summary = nlp.summarize(summary_raw_scraper, title=title)
-                            
-                            # Check for duplicates
-                            duplicate = find_duplicate_article(
-                                db,
-                                src.domain,
-                                url,
-                                title,
-                                published_at,
-                                time_window_hours=24
-                            )
-                            
-                            if duplicate:
-                                article_hash = get_article_hash(title, src.domain)
-                                print(f"[DEDUP] {src.name} #{article_hash}: duplicate (skipped)")
-                                continue
-                            
-                            article = Article(
-                                source=src.name,
-                                domain=src.domain,
-                                title=title,
-                                url=url,
-                                published_at=published_at,
-                                disaster_type=disaster_type,
-                                province=province,
-                                commune=impacts.get("commune"),
-                                village=impacts.get("village"),
-                                route=impacts.get("route"),
-                                cause=impacts.get("cause"),
-                                characteristics=impacts.get("characteristics"),
-                                deaths=_get_impact_value(impacts["deaths"]),
-                                missing=_get_impact_value(impacts["missing"]),
-                                injured=_get_impact_value(impacts["injured"]),
-                                damage_billion_vnd=_get_impact_value(impacts["damage_billion_vnd"]),
-                                agency=impacts["agency"][:255] if impacts["agency"] else None,
-                                summary=summary,
-                                impact_details=nlp.extract_impact_details(text_for_nlp),
-                                needs_verification=int(nlp.validate_impacts(impacts))
-                            )
-                            
-                            try:
-                                db.add(article)
-                                db.flush()
-                                new_count += 1
-                                src_info["articles_added"] += 1
-                                print(f"   [ADDED_SCRAPE] {src.name}: {title[:70]}...")
-                                try:
-                                    upsert_event_for_article(db, article)
-                                except Exception as e:
-                                    logger.error(f"Failed to upsert event for {article.title} (Scrape): {e}")
-                                    db.rollback()
-                                
-                                # Fetch full text using the robust scraper
-                                from .html_scraper import fetch_article_full_text_async
-                                full_info = await fetch_article_full_text_async(url)
-
-                                if full_info and full_info.get("text"):
-                                    full_text = full_info["text"]
-                                    full_impacts = nlp.extract_impacts(full_text)
-                                    
-                                    # Save full text and image
-                                    article.full_text = full_text[:100000]
-                                    if full_info.get("images") and not article.image_url:
-                                        article.image_url = full_info["images"][0]
-                                    
-                                    # Update stats if currently missing or zero
-                                    if full_impacts.get("deaths") is not None and (article.deaths or 0) == 0:
-                                        article.deaths = _get_impact_value(full_impacts.get("deaths"))
-                                    if full_impacts.get("missing") is not None and (article.missing or 0) == 0:
-                                        article.missing = _get_impact_value(full_impacts.get("missing"))
-                                    if full_impacts.get("injured") is not None and (article.injured or 0) == 0:
-                                        article.injured = _get_impact_value(full_impacts.get("injured"))
-                                    if full_impacts.get("damage_billion_vnd") is not None and (article.damage_billion_vnd or 0) == 0:
-                                        article.damage_billion_vnd = _get_impact_value(full_impacts.get("damage_billion_vnd"))
-                                    
-                                    # Update extended location and cause
-                                    if full_impacts.get("commune") and not article.commune:
-                                        article.commune = full_impacts.get("commune")
-                                    if full_impacts.get("village") and not article.village:
-                                        article.village = full_impacts.get("village")
-                                    if full_impacts.get("route") and not article.route:
-                                        article.route = full_impacts.get("route")
-                                    if full_impacts.get("cause") and not article.cause:
-                                        article.cause = full_impacts.get("cause")
-                                    if full_impacts.get("characteristics") and not article.characteristics:
-                                        article.characteristics = full_impacts.get("characteristics")
-                                        
-                                    if article.province in (None, "unknown"):
-                                        prov = nlp.extract_province(full_text)
-                                        if prov and prov != "unknown":
-                                            article.province = prov
-                                            
-                                    if nlp.validate_impacts(full_impacts):
-                                        article.needs_verification = 1
-                                    
-                                db.commit()
-
-                            except Exception as e:
-                                db.rollback()
-                                print(f"   [ERROR_DB_SCRAPE] {src.name}: {e}")
-                                continue
-                        
-                        feed_worked = True
-                    else:
-                        stat["error"] = "all feeds and scraper failed"
-                        print(f"[ERROR] {src.name} - html scraper returned no articles")
-                except Exception as e:
-                    stat["error"] = f"scraper error: {str(e)[:50]}"
-                    print(f"[ERROR] {src.name} - html scraper failed: {e}")
-                
-                if not feed_worked:
+
+                        # Use scrape time as publish time
+                        published_at = datetime.utcnow()
+                        if published_at < CRAWL_MIN_DATE:
+                            continue
+
+                        summary_raw_scraper = html.unescape(scraped.get("summary", "") or scraped.get("description", "") or "")
+                        await self._emit_candidate(emit, _Candidate(src_info, "scrape", title, url, published_at, summary_raw_scraper))
+
+                    listing_crawler.mark_listing_seen(self.snapshots, src.domain, handled)
+                    feed_worked = True
+                else:
                     stat["error"] = "all feeds and scraper failed"
-                    print(f"[ERROR] {src.name} - all feed sources and scraper failed")
-            
-            stat["articles_added"] = src_info["articles_added"]
-            per_source_stats.append(stat)
-            
-            # Update CrawlerStatus table for this source
+                    print(f"[ERROR] {src.name} - html scraper returned no articles")
+            except Exception as e:
+                stat["error"] = f"scraper error: {str(e)[:50]}"
+                print(f"[ERROR] {src.name} - html scraper failed: {e}")
+
+            if not feed_worked:
+                stat["error"] = "all feeds and scraper failed"
+                print(f"[ERROR] {src.name} - all feed sources and scraper failed")
+
+        metrics.ENTRIES_PARSED.inc(stat["entries"], source=src.name)
+
+    async def _crawl_sitemaps(self, src_info: dict, emit) -> bool:
+        """News-sitemap / sitemap delta (app.listing_crawler); False when the source has none."""
+        src = src_info["source"]
+        stat = src_info["stat"]
+        try:
+            sitemaps = listing_crawler.sitemaps_for(src, self.feed_state)
+            if sitemaps is None:
+                sitemaps = await listing_crawler.discover(self.client, src.domain)
+                listing_crawler.record_discovery(self.feed_state, src.name, sitemaps)
+                _save_feed_state(self.feed_state)
+                print(f"[INFO] {src.name} - sitemap discovery: {', '.join(sitemaps) or 'none'}")
+            if not sitemaps:
+                return False
+
+            since = max(datetime.utcnow() - timedelta(hours=settings.listing_lookback_hours), CRAWL_MIN_DATE)
+            fetch = lambda u: _fetch_feed(self.client, u, self.headers, self.feed_state, self.force_update)
+            items, lstat = await listing_crawler.crawl_sitemaps(self.client, fetch, self.feed_state, self.snapshots,
+                                                                sitemaps, since)
+            _save_feed_state(self.feed_state)
+        except Exception as e:
+            print(f"[WARN] {src.name} - sitemap crawl failed: {e}")
+            return False
+        if lstat["errors"] == lstat["sitemaps"]:
+            return False
+
+        stat["feeds_requested"] += lstat["sitemaps"]
+        stat["not_modified"] += lstat["not_modified"]
+        stat["entries"] += lstat["listed"]
+        stat["entries_24h"] += lstat["listed_24h"]
+        stat["feed_used"] = f"{stat['feed_used']}, sitemap" if stat["feed_used"] else "sitemap"
+        print(f"[OK] {src.name} using sitemap ({lstat['sitemaps']} fetched, {lstat['not_modified']} not modified, "
+              f"{lstat['listed']} recent links, {len(items)} new, {lstat['carried']} carried over)")
+        for it in items:
+            await self._emit_candidate(emit, _Candidate(src_info, "scrape", it.title, it.url, it.published_at, it.summary))
+        return True
+
+    # ------------------------------------------------------------------
+    # prefilter: hash → blacklist → existing status, before any NLP
+    # ------------------------------------------------------------------
+    async def prefilter(self, cand: _Candidate, emit) -> None:
+        with metrics.DEDUP_SECONDS.time():
+            keep = self._prefilter_sync(cand)
+        if keep:
+            await emit(cand)
+
+    def _prefilter_sync(self, cand: _Candidate) -> bool:
+        db = self.db
+        src = cand.src
+
+        if cand.kind == "scrape":
+            duplicate = find_duplicate_article(db, src.domain, cand.link, cand.title, cand.published_at, time_window_hours=24)
+            if duplicate:
+                article_hash = get_article_hash(cand.title, src.domain)
+                print(f"[DEDUP] {src.name} #{article_hash}: duplicate (skipped)")
+                self.nlp_skipped += 1
+                return False
+            return True
+
+        cand.news_hash = get_article_hash(cand.title, src.domain, cand.link)
+
+        # Check blacklist
+        if db.query(Blacklist).filter(Blacklist.news_hash == cand.news_hash).first():
+            return False
+
+        existing = find_duplicate_article(db, src.domain, cand.link, cand.title, cand.published_at)
+
+        # Cheap-first: only new entries and pending ones that might be
+        # upgraded are worth a full NLP pass. Everything else is a repeat.
+        if existing and existing.status != "pending":
+            if existing.status == "approved":
+                print(f"[DEDUP] {src.name}: {cand.title[:100]}... (already approved)")
+            self.nlp_skipped += 1
+            return False
+
+        cand.existing = existing
+        return True
+
+    # ------------------------------------------------------------------
+    # analyze: scoring and extraction (CPU-bound, runs in a worker thread)
+    # ------------------------------------------------------------------
+    async def analyze(self, cand: _Candidate, emit) -> None:
+        def _run() -> bool:
+            with metrics.NLP_SECONDS.time():
+                return self._analyze_sync(cand)
+
+        if await asyncio.to_thread(_run):
+            await emit(cand)
+
+    def _analyze_sync(self, cand: _Candidate) -> bool:
+        src = cand.src
+        title = cand.title
+        text_for_nlp = cand.text_for_nlp
+
+        if cand.kind == "scrape":
+            # Pre-filter using main NLP:
+            # - Explicitly check using full NLP (Veto/Rules)
+            # - Pass trusted_source=src.trusted to allow lighter threshold for official sources
+            if not nlp.contains_disaster_keywords(cand.summary_raw, title=title, trusted_source=src.trusted, authority_level=src.authority_level):
+                article_hash = get_article_hash(title, src.domain)
+                diag = nlp.diagnose(cand.summary_raw, title=title, authority_level=src.authority_level)
+                print(f"[SKIP] {src.name} #{article_hash}: nlp-rejected score={diag['score']:.1f} reason={diag['reason']}")
+                return False
+
+            disaster_info = nlp.classify_disaster(text_for_nlp)
+            impacts = nlp.extract_impacts(cand.summary_raw or title)
+            cand.action = "new"
+            cand.fields = dict(
+                disaster_type=disaster_info.get("primary_type", "unknown"),
+                province=nlp.extract_province(text_for_nlp),
+                summary=nlp.summarize(cand.summary_raw, title=title),
+                impact_details=nlp.extract_impact_details(text_for_nlp),
+                **self._impact_fields(impacts),
+            )
+            return True
+
+        # ---------------------------------------------------------
+        # TIERED FILTERING: 3-Tier Scoring System (User Adjusted)
+        # ---------------------------------------------------------
+        diag = nlp.diagnose(text_for_nlp, title=title, authority_level=src.authority_level)
+        cand.diag = diag
+        score = diag["score"]
+
+        # Logic for upgrading Pending -> Approved
+        if cand.existing:
+            if score <= 13.0:
+                return False
+            cand.action = "upgrade"
+            cand.fields = {"impacts": nlp.extract_impacts(text_for_nlp)}
+            return True
+
+        if score > 15:
+            cand.status = "approved"
+        elif score >= 10.0:
+            cand.status = "pending"
+        else:
+            # Logic for low score items (< 10.0) -> Auto Blacklist
+            cand.action = "reject"
+            return True
+
+        cand.action = "new"
+        disaster_info = nlp.classify_disaster(text_for_nlp)
+        impacts = nlp.extract_impacts(cand.summary_raw or title)
+        summary_text = nlp.summarize(cand.summary_raw.replace("&nbsp;", " "), title=title)
+
+        stage = nlp.determine_event_stage(text_for_nlp)
+        stage_vn = STAGE_VN.get(stage, "TIN MỚI")
+
+        cand.fields = dict(
+            news_hash=cand.news_hash,
+            status=cand.status,
+            score=score,
+            disaster_type=disaster_info.get("primary_type", "unknown"),
+            province=nlp.extract_province(text_for_nlp),
+            stage=stage,
+            summary=f"[{stage_vn}] {summary_text}",
+            image_url=_extract_image_url(cand.entry),
+            impact_details=nlp.extract_impact_details(text_for_nlp),
+            is_red_alert=diag["signals"].get("is_red_alert", False),
+            **self._impact_fields(impacts),
+        )
+        return True
+
+    @staticmethod
+    def _impact_fields(impacts: dict) -> dict:
+        return dict(
+            commune=impacts.get("commune"),
+            village=impacts.get("village"),
+            route=impacts.get("route"),
+            cause=impacts.get("cause"),
+            characteristics=impacts.get("characteristics"),
+            deaths=_get_impact_value(impacts["deaths"]),
+            missing=_get_impact_value(impacts["missing"]),
+            injured=_get_impact_value(impacts["injured"]),
+            damage_billion_vnd=_get_impact_value(impacts["damage_billion_vnd"]),
+            agency=impacts["agency"][:255] if impacts["agency"] else None,
+            needs_verification=int(nlp.validate_impacts(impacts)),
+        )
+
+    # ------------------------------------------------------------------
+    # persist: insert / upgrade / blacklist
+    # ------------------------------------------------------------------
+    async def persist(self, cand: _Candidate, emit) -> None:
+        db = self.db
+        src = cand.src
+        title = cand.title
+
+        if cand.action == "reject":
+            self._blacklist(cand)
+            return
+
+        if cand.action == "upgrade":
+            existing = cand.existing
+            score = cand.diag["score"]
+            impacts = cand.fields["impacts"]
+            print(f"[INFO] Upgrading article to Approved: {title} (Score: {score})")
+            existing.status = "approved"
+            existing.score = score
+            # Update impacts with new info if available
+            existing.deaths = _get_impact_value(impacts["deaths"])
+            existing.missing = _get_impact_value(impacts["missing"])
+            existing.injured = _get_impact_value(impacts["injured"])
+            existing.damage_billion_vnd = _get_impact_value(impacts["damage_billion_vnd"])
+            existing.is_red_alert = cand.diag["signals"].get("is_red_alert", False)
+            existing.summary = cand.summary_raw[:1000] # Update summary if it's longer/better
+            with metrics.INSERT_SECONDS.time():
+                db.commit()
+            cand.article = existing
+            self.new_count += 1
+            await emit(cand)
+            return
+
+        # For articles in the reviewable range we also log them to JSONL
+        # as per user request, while keeping them in DB as 'pending' for structure
+        if cand.status == "pending":
             try:
-                c_status = db.query(CrawlerStatus).filter(CrawlerStatus.source_name == src.name).first()
-                if not c_status:
-                    c_status = CrawlerStatus(source_name=src.name)
-                    db.add(c_status)
-                
-                c_status.last_run_at = datetime.utcnow()
-                c_status.articles_added = src_info["articles_added"]
-                c_status.latency_ms = int((stat.get("elapsed") or 0.0) * 1000)
-                c_status.feed_used = stat.get("feed_used") # Add this line
-                
-                if stat.get("error"):
-                    c_status.status = "error"
-                    c_status.last_error = stat["error"]
-                elif stat.get("feed_used") and "gnews" in stat["feed_used"] and ("primary_rss" not in stat["feed_used"]):
-                    c_status.status = "warning"
-                    c_status.last_error = "Using GNews fallback"
-                else:
-                    c_status.status = "success"
-                    c_status.last_error = None
-                
+                _log_review_record({
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "published_at": cand.published_at.isoformat(),
+                    "action": "pending_review",
+                    "source": src.name,
+                    "domain": src.domain,
+                    "title": title,
+                    "url": cand.link,
+                    "news_hash": cand.news_hash,
+                    "score": cand.diag["score"],
+                    "reason": cand.diag["reason"]
+                })
+            except Exception: pass
+
+        article = Article(
+            source=src.name,
+            domain=src.domain,
+            title=title,
+            url=cand.link,
+            published_at=cand.published_at,
+            **cand.fields,
+        )
+        try:
+            with metrics.INSERT_SECONDS.time():
+                db.add(article)
                 db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"   [ERROR_DB] {src.name}: {e}")
+            return
+
+        if cand.kind == "scrape":
+            print(f"   [ADDED_SCRAPE] {src.name}: {title[:70]}...")
+        elif cand.status == "approved":
+            print(f"   [ADDED] {src.name}: {title[:70]}...")
+        else:
+            print(f"   [PENDING] {src.name}: {title[:70]}... (Score: {cand.diag['score']:.1f})")
+
+        cand.article = article
+        self.new_count += 1
+        cand.src_info["articles_added"] += 1
+        await emit(cand)
+
+    def _blacklist(self, cand: _Candidate) -> None:
+        db = self.db
+        src = cand.src
+        diag = cand.diag
+        score = diag["score"]
+        try:
+            # Add to Blacklist to prevent re-crawling
+            if cand.news_hash:
+                # Check if already blacklisted to avoid unique constraint error
+                bl_exists = db.query(Blacklist).filter(Blacklist.news_hash == cand.news_hash).first()
+                if not bl_exists:
+                    db.add(Blacklist(
+                        news_hash=cand.news_hash,
+                        title=cand.title,
+                        reason=f"Low Score: {score} ({diag['reason']})"
+                    ))
+                    db.commit()
+
+            # Log to file still, for audit (only if score > 3 to avoid complete noise)
+            if score >= 3.0 or diag["signals"].get("rule_matches"):
+                _log_review_record({
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "published_at": cand.published_at.isoformat(),
+                    "action": "auto_blacklisted",
+                    "source": src.name,
+                    "domain": src.domain,
+                    "title": cand.title,
+                    "url": cand.link,
+                    "news_hash": cand.news_hash,
+                    "score": score,
+                    "reason": diag["reason"],
+                    "diagnose": diag["signals"]
+                })
+        except Exception as e:
+            logger.error(f"Error blacklisting low-score item: {e}")
+            db.rollback()
+
+    # ------------------------------------------------------------------
+    # cluster: attach the article to an event
+    # ------------------------------------------------------------------
+    async def cluster(self, cand: _Candidate, emit) -> None:
+        # Process event matching for both Approved and Pending articles
+        # This allows "pending" articles to contribute to event metadata (multi-source count)
+        if settings.event_batch_clustering:
+            # Clustered with the rest of the cycle once enrichment is done
+            self.to_cluster.append(cand.article)
+            await emit(cand)
+            return
+        try:
+            with metrics.CLUSTER_SECONDS.time():
+                upsert_event_for_article(self.db, cand.article)
+                self.db.commit()
+        except Exception as e:
+            logger.error(f"Failed to upsert event for {cand.title}: {e}")
+            self.db.rollback()
+        await emit(cand)
+
+    # ------------------------------------------------------------------
+    # enrich: full-page fetch and re-extraction
+    # ------------------------------------------------------------------
+    async def enrich(self, cand: _Candidate, emit) -> None:
+        if cand.action == "new" and (cand.resumed or self._should_fetch(cand)):
+            if self.expired() and not self._critical(cand):
+                # Article is stored; only the full-text pass is postponed
+                self.deferred_enrich.append(cand)
+                await emit(cand)
+                return
+            t0 = time.perf_counter()
+            try:
+                fetch_res = await fetch_article_full_text_async(cand.link, timeout=settings.request_timeout_seconds)
+                if fetch_res and fetch_res.get("text"):
+                    self._apply_full_text(cand, fetch_res)
+                    self.db.commit()
+                    cand.enriched = True
             except Exception as e:
-                print(f"[WARN] Failed to update CrawlerStatus for {src.name}: {e}")
-                db.rollback()
-            
-        total_elapsed = time.perf_counter() - start_total
-        print(f"[INFO] crawl finished - new_articles={new_count} - elapsed={total_elapsed:.2f}s")
-
-        # Log crawl results
+                self.db.rollback()
+                logger.debug(f"Full-text fetch failed for {cand.link}: {e}")
+            metrics.ENRICH_SECONDS.observe(time.perf_counter() - t0)
+        await emit(cand)
+
+    @staticmethod
+    def _should_fetch(cand: _Candidate) -> bool:
+        # Scraped links carry no summary, always fetch them. For feed entries
+        # fetch full HTML for trusted sources, for title-matched entries,
+        # or when impact keywords are present in feed summary.
+        if cand.kind == "scrape":
+            return True
+        if cand.src.trusted or nlp.title_contains_disaster_keyword(cand.title):
+            return True
+        text_lower = (cand.title + "\n" + (getattr(cand.entry, "summary", "") or "")).lower()
+        for data in nlp.IMPACT_KEYWORDS.values():
+            for kw in data.get("terms", []):
+                if kw.lower() in text_lower:
+                    return True
+        return False
+
+    def _apply_full_text(self, cand: _Candidate, fetch_res: dict) -> None:
+        db = self.db
+        article = cand.article
+        link = cand.link
+        full_text = fetch_res["text"]
+        images = fetch_res.get("images") or []
+        final_url = fetch_res.get("final_url")
+
+        # Update is_broken status
+        if fetch_res.get("is_broken"):
+            article.is_broken = 1
+
+        # Update URL if it was a redirect (important for Google News/Shorteners)
+        if final_url and final_url != link:
+            # Check if another article with same domain and final_url already exists
+            # to avoid UniqueViolation on (domain, url)
+            collision = db.query(Article).filter(Article.domain == article.domain, Article.url == final_url).first()
+            if not collision:
+                article.url = final_url
+            else:
+                logger.debug(f"URL resolution collision for {final_url}, skipping update")
+
+        # Update Image if missing or if we found a better one
+        if not article.image_url and images:
+            article.image_url = images[0]
+        elif article.image_url and images and "googleusercontent" in article.image_url:
+            # Prefer original site image over Google proxy image
+            article.image_url = images[0]
+
+        full_impacts = nlp.extract_impacts(full_text)
+
+        # Update metrics from full text
+        for key in ("deaths", "missing", "injured", "damage_billion_vnd"):
+            if full_impacts.get(key) is not None and not getattr(article, key):
+                setattr(article, key, _get_impact_value(full_impacts.get(key)))
+
+        if full_impacts.get("agency") is not None and article.agency is None:
+            raw_agency = full_impacts.get("agency")
+            article.agency = raw_agency[:255] if raw_agency else None
+
+        # Update extended location and cause from full text if currently missing
+        for key in ("commune", "village", "route", "cause", "characteristics"):
+            if full_impacts.get(key) and not getattr(article, key):
+                setattr(article, key, full_impacts.get(key))
+
+        if article.province in (None, "unknown"):
+            prov = nlp.extract_province(full_text)
+            if prov and prov != "unknown":
+                article.province = prov
+
+        # Re-validate after full text fetch
+        if nlp.validate_impacts(full_impacts):
+            article.needs_verification = 1
+
+        # SAVE FULL TEXT - This powers the "Archived at System" feature
+        article.full_text = full_text[:100000] # Safety limit
+        syndication.link(db, article, article.full_text)
+
+        # IMPROVED SUMMARY: If original summary was generic or short, replace with better one from full text
+        if cand.kind == "feed" and ("Đang tổng hợp dữ liệu" in article.summary or len(article.summary) < 100):
+            stage = article.stage or nlp.determine_event_stage(full_text)
+            stage_vn = STAGE_VN.get(stage, "TIN MỚI")
+            better_summary_text = nlp.summarize(full_text, title=article.title)
+            article.summary = f"[{stage_vn}] {better_summary_text}"
+            logger.debug(f"Updated summary for {article.title} from full text")
+
+    # ------------------------------------------------------------------
+    # publish: fold enriched details back into the event
+    # ------------------------------------------------------------------
+    async def publish(self, cand: _Candidate, emit) -> None:
+        # In batch mode this cycle's articles are clustered after enrichment anyway
+        if cand.enriched and cand.kind == "feed" and (cand.resumed or not settings.event_batch_clustering):
+            try:
+                upsert_event_for_article(self.db, cand.article)
+                self.db.commit()
+            except Exception as e:
+                logger.error(f"Failed to upsert event for {cand.title}: {e}")
+                self.db.rollback()
+        await emit(cand)
+
+    def cluster_pending(self) -> dict:
+        """
+        Batch-cluster the cycle's articles, plus recent ones an earlier cycle
+        left without an event. The sweep skips articles stored within a job
+        lease (longer than a cycle): in distributed mode those may belong to
+        another consumer's cycle, which is about to cluster them itself.
+        """
+        articles = list(self.to_cluster)
+        index = event_index.active()
+        if settings.event_batch_clustering and index is not None:
+            grace = datetime.utcnow() - timedelta(seconds=settings.crawl_job_lease_seconds)
+            articles += self.db.query(Article).filter(
+                Article.event_id.is_(None),
+                Article.status.in_(("approved", "pending")),
+                Article.published_at >= index.since,
+                Article.fetched_at < grace,
+            ).all()
+        self.to_cluster = []
+        with metrics.EVENT_BATCH_SECONDS.time():
+            return event_batch.cluster_batch(self.db, articles)
+
+    def record_source_status(self, src_info: dict) -> dict:
+        """Persist the CrawlerStatus row for a finished source and return its stat."""
+        db = self.db
+        src = src_info["source"]
+        stat = src_info["stat"]
+        stat["articles_added"] = src_info["articles_added"]
+        if src_info.get("deferred"):
+            return stat
         try:
-            logs_dir = Path(__file__).resolve().parents[1] / "logs"
-            logs_dir.mkdir(parents=True, exist_ok=True)
-            log_file = logs_dir / "crawl_log.jsonl"
-            record = {
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "new_articles": new_count,
-                "elapsed": total_elapsed,
-                "per_source": per_source_stats,
-            }
-            with log_file.open("a", encoding="utf-8") as f:
-                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            c_status = db.query(CrawlerStatus).filter(CrawlerStatus.source_name == src.name).first()
+            if not c_status:
+                c_status = CrawlerStatus(source_name=src.name)
+                db.add(c_status)
+
+            c_status.last_run_at = datetime.utcnow()
+            c_status.articles_added = src_info["articles_added"]
+            c_status.latency_ms = int((stat.get("elapsed") or 0.0) * 1000)
+            c_status.feed_used = stat.get("feed_used")
+            c_status.articles_scanned = stat.get("entries", 0)
+            c_status.feeds_not_modified = stat.get("not_modified", 0)
+
+            if stat.get("error"):
+                c_status.status = "error"
+                c_status.last_error = stat["error"]
+            elif stat.get("feed_used") and "gnews" in stat["feed_used"] and ("primary_rss" not in stat["feed_used"]):
+                c_status.status = "warning"
+                c_status.last_error = "Using GNews fallback"
+            else:
+                c_status.status = "success"
+                c_status.last_error = None
+
+            db.commit()
         except Exception as e:
-            print(f"[WARN] failed writing crawl log: {e}")
+            print(f"[WARN] Failed to update CrawlerStatus for {src.name}: {e}")
+            db.rollback()
+        return stat
+
+
+def _prioritize(db: Session, plan: list[dict], carried_over: set[str]) -> list[dict]:
+    """
+    Order the plan so a cycle that runs out of budget has already done the
+    important work: sources tied to active hazard events and tier-1 official
+    sources first, then national, then the rest; within a tier, sources
+    deferred by the previous cycle go first.
+    """
+    boosted = poll_scheduler.boosted_sources(db)
+    for src_info in plan:
+        name = src_info["source"].name
+        src_info["priority"] = 0 if name in boosted else source_tier(name)
+    return sorted(plan, key=lambda si: (si["priority"], si["source"].name not in carried_over))
+
 
-        return {"new_articles": new_count, "timestamp": datetime.now(timezone.utc).isoformat(), "elapsed": total_elapsed, "per_source": per_source_stats}
+# Deferred enrichments one cycle resumes at most
+_RESUME_BATCH = 200
+
+
+def _load_checkpoint(db: Session) -> tuple[set[str], list]:
+    """
+    Sources deferred by earlier cycles, and the deferred enrichments this cycle
+    claims. Distributed consumers get their deferred sources back from the job
+    queue instead. Enrich rows are claimed with a lease (``UPDATE ...
+    RETURNING``, skipping rows another node has locked or holds unexpired), so
+    concurrent consumers resume disjoint sets; ``_save_checkpoint`` deletes the
+    ones this cycle finishes and releases the rest. Rows of a cycle that dies
+    are claimable again once ``crawl_job_lease_seconds`` have passed.
+    """
+    carried: set[str] = set()
+    if not settings.crawl_distributed:
+        carried = {name for (name,) in db.query(CrawlDeferred.source_name).filter(CrawlDeferred.kind == "source")}
+    now = datetime.utcnow()
+    expired = now - timedelta(seconds=settings.crawl_job_lease_seconds)
+    ids = select(CrawlDeferred.id).where(
+        CrawlDeferred.kind == "enrich",
+        CrawlDeferred.claimed_at.is_(None) | (CrawlDeferred.claimed_at < expired),
+    ).order_by(CrawlDeferred.priority, CrawlDeferred.deferred_at).limit(_RESUME_BATCH) \
+        .with_for_update(skip_locked=True)
+    claimed = db.execute(
+        update(CrawlDeferred).where(CrawlDeferred.id.in_(ids))
+        .values(claimed_by=f"{WORKER_ID}/{uuid.uuid4().hex[:8]}", claimed_at=now)
+        .returning(
+            CrawlDeferred.id, CrawlDeferred.kind, CrawlDeferred.source_name, CrawlDeferred.article_id,
+            CrawlDeferred.article_kind, CrawlDeferred.priority, CrawlDeferred.deferred_at, CrawlDeferred.claimed_by,
+        )
+    ).all()
+    db.commit()
+    return carried, sorted(claimed, key=lambda r: (r.priority, r.deferred_at))
+
+
+def _resume_candidates(db: Session, rows: list[CrawlDeferred]) -> list[_Candidate]:
+    by_name = {s.name: s for s in SOURCES}
+    articles = {a.id: a for a in db.query(Article).filter(Article.id.in_([r.article_id for r in rows]))}
+    cands = []
+    for r in rows:
+        article = articles.get(r.article_id)
+        src = by_name.get(r.source_name)
+        if article is None or src is None or article.full_text:
+            continue
+        src_info = {"source": src, "priority": r.priority, "articles_added": 0}
+        cands.append(_Candidate(
+            src_info, r.article_kind or "feed", article.title, article.url, article.published_at,
+            article.summary or "", action="new", article=article, resumed=True,
+        ))
+    return cands
+
+
+def _save_checkpoint(db: Session, run: "_CrawlRun", plan: list[dict], claimed: list, resumed: list) -> None:
+    """Record what this cycle deferred; delete the claimed enrichments it resumed, release the others."""
+    try:
+        items = []
+        if not settings.crawl_distributed:
+            finished = [si["source"].name for si in plan if not si.get("deferred")]
+            if finished:
+                db.query(CrawlDeferred).filter(
+                    CrawlDeferred.kind == "source", CrawlDeferred.source_name.in_(finished)
+                ).delete(synchronize_session=False)
+            items += [("source", si["source"].name, None, None, si.get("priority", 2)) for si in run.deferred_sources]
+        items += [
+            ("enrich", c.src.name, c.article.id, c.kind, c.src_info.get("priority", 2))
+            for c in run.deferred_enrich if c.article is not None and c.article.id
+        ]
+        keys = {(kind, name, article_id) for kind, name, article_id, _, _ in items}
+        previous = {}
+        if items:
+            rows = db.query(CrawlDeferred).filter(
+                CrawlDeferred.source_name.in_({name for _, name, _ in keys}),
+                CrawlDeferred.kind.in_({kind for kind, _, _ in keys}),
+            )
+            previous = {(r.kind, r.source_name, r.article_id): r for r in rows
+                        if (r.kind, r.source_name, r.article_id) in keys}
+        for kind, name, article_id, article_kind, priority in items:
+            key = (kind, name, article_id)
+            if key in previous:
+                previous[key].times_deferred += 1
+                continue
+            db.add(CrawlDeferred(
+                kind=kind, source_name=name, article_id=article_id, article_kind=article_kind,
+                priority=priority, times_deferred=1,
+            ))
+        # Only rows still under this cycle's claim: an expired one may belong to another cycle now
+        ours = [CrawlDeferred.id.in_([r.id for r in claimed]),
+                CrawlDeferred.claimed_by.in_({r.claimed_by for r in claimed})]
+        if resumed:
+            # Enriched, or tried and given up on; the ones deferred again stay
+            done = [r.id for r in claimed if (r.kind, r.source_name, r.article_id) not in keys]
+            db.query(CrawlDeferred).filter(*ours, CrawlDeferred.id.in_(done)).delete(synchronize_session=False)
+        if claimed:
+            db.query(CrawlDeferred).filter(*ours).update(
+                {CrawlDeferred.claimed_by: None, CrawlDeferred.claimed_at: None}, synchronize_session=False)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to save crawl checkpoint: {e}")
+
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _start_run(db: Session, plan: list[dict], trigger: str, resume_run_id: str | None) -> str:
+    """Create (or reopen) the CrawlRun row with a pending checkpoint per planned source."""
+    now = datetime.utcnow()
+    run = db.get(CrawlRun, resume_run_id) if resume_run_id else None
+    if run is None:
+        run = CrawlRun(id=uuid.uuid4().hex, trigger=trigger, started_at=now, sources_done=0, new_articles=0)
+        db.add(run)
+    else:
+        run.resumed_at = now
+    run.status = "running"
+    run.worker_id = WORKER_ID
+    existing = {r.source_name: r for r in run.sources}
+    for si in plan:
+        name = si["source"].name
+        if name not in existing:
+            run.sources.append(CrawlRunSource(source_name=name, status="pending", articles_added=0))
+        else:
+            existing[name].status = "pending"
+    run.sources_total = len(run.sources)
+    run.sources_done = sum(1 for r in run.sources if r.status != "pending")
+    db.commit()
+    return run.id
+
+
+def _end_run(db: Session, run_id: str, status: str, new_articles: int = 0) -> None:
+    try:
+        db.rollback()
+        run = db.get(CrawlRun, run_id)
+        if run is not None:
+            run.status = status
+            run.finished_at = datetime.utcnow()
+            run.new_articles = (run.new_articles or 0) + new_articles
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to close crawl run {run_id}: {e}")
+
+
+async def _process_once_async(force_update: bool = False, only_sources: list[str] = None,
+                              resume_run_id: str | None = None, trigger: str = "manual") -> dict:
+    """Async implementation of a single crawl run.
+
+    Sources flow through CRAWL_STAGES connected by bounded queues; a
+    per-stage throughput table is printed when the run completes.
+
+    The cycle has a budget (``crawl_cycle_budget_seconds``). Once it is spent,
+    sources not yet fetched and pending full-text enrichment are deferred,
+    except priority-0 work; deferred items are checkpointed in
+    ``crawl_deferred`` and the next cycle starts with them. Distributed
+    consumers hand deferred sources back to the job queue instead.
+
+    Every run has an ID (``crawl_runs``) and each source is checkpointed in
+    ``crawl_run_sources`` as soon as it finishes. ``resume_run_id`` continues
+    an interrupted run; pass only its unfinished sources.
+    """
+    db: Session = SessionLocal()
+    start_total = time.perf_counter()
+    budget = settings.crawl_cycle_budget_seconds
+    deadline = start_total + budget if budget else None
+    run_id = None
+    gnews_before = gnews_cache.cache.counts.copy()
+    try:
+        carried_sources, carried_enrich = _load_checkpoint(db)
+        if only_sources is not None:
+            only_sources = list(only_sources) + sorted(carried_sources - set(only_sources))
+        plan = _prioritize(db, _build_source_plan(only_sources), carried_sources)
+        run_id = _start_run(db, plan, trigger, resume_run_id)
+        event_index.load(db)
+        print(f"[INFO] crawl run {run_id} ({trigger}) - {len(plan)} sources")
+
+        async with httpx.AsyncClient(**_feed_client_kwargs(settings.request_timeout_seconds)) as client:
+            run = _CrawlRun(db, client, force_update=force_update, deadline=deadline, run_id=run_id)
+            pipeline = Pipeline(run.stages(), on_item_done=run.on_item_done)
+            stage_report = await pipeline.run(plan)
+
+            # Enrichment left over from earlier cycles, with whatever budget remains
+            resumed = carried_enrich if carried_enrich and not run.expired() else []
+            if resumed:
+                by_name = {s.name: s for s in run.stages()}
+                await Pipeline([by_name["enrich"], by_name["publish"]]).run(_resume_candidates(db, resumed))
+
+        cluster_stat = run.cluster_pending()
+        _save_checkpoint(db, run, plan, carried_enrich, resumed)
+        raw_archive.flush_index()
+        gnews_cache.cache.flush()
+        gnews_stats = gnews_cache.stats_since(gnews_before)
+        per_source_stats = [run.finish_source(src_info) for src_info in plan]
+        poll_scheduler.record_polls(db, [st for st in per_source_stats if not st.get("deferred")])
+        deferred = {
+            "sources": [si["source"].name for si in run.deferred_sources],
+            "enrich": len(run.deferred_enrich),
+            "resumed_enrich": len(resumed),
+            "backlog": db.query(CrawlDeferred).count(),
+        }
+        if deferred["sources"] or deferred["enrich"]:
+            print(f"[DEFERRED] budget {budget}s spent: {len(deferred['sources'])} sources, "
+                  f"{deferred['enrich']} enrichments carried to next cycle: {', '.join(deferred['sources'][:20])}")
+        if deferred["backlog"]:
+            print(f"[DEFERRED] checkpoint backlog: {deferred['backlog']} items")
+        new_count = run.new_count
+        nlp_skipped = run.nlp_skipped
+        _end_run(db, run_id, "completed", new_count)
+
+        total_elapsed = time.perf_counter() - start_total
+        metrics.CRAWL_CYCLES.inc()
+        metrics.CRAWL_CYCLE_SECONDS.observe(total_elapsed)
+        for r in stage_report:
+            metrics.CRAWL_STAGE_BLOCKED_SECONDS.inc(r["blocked_s"], stage=r["stage"])
+            metrics.CRAWL_STAGE_QUEUE_DEPTH.set(r["max_queue"], stage=r["stage"])
+        for st in per_source_stats:
+            if st["articles_added"]:
+                metrics.ARTICLES_ADDED.inc(st["articles_added"], source=st["source"])
+        metrics.flush()
+        print(f"[INFO] crawl finished - new_articles={new_count} - nlp_skipped={nlp_skipped} - elapsed={total_elapsed:.2f}s")
+        print(format_report(stage_report))
+        if cluster_stat["articles"]:
+            print(f"[INFO] clustering: {cluster_stat['articles']} articles in {cluster_stat['groups']} groups -> "
+                  f"{cluster_stat['events_created']} new, {cluster_stat['events_updated']} updated events")
+        if gnews_stats["lookups"]:
+            print(f"[INFO] gnews cache: {gnews_stats['lookups']} lookups, hit_rate={gnews_stats['hit_rate']:.0%} "
+                  f"(lru {gnews_stats['lru_hits']}, store {gnews_stats['store_hits']}), "
+                  f"new: decoded {gnews_stats['decoded']}, fetched {gnews_stats['fetched']}")
+
+        # Log crawl results
+        jsonl_log.crawl_log.append({
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "run_id": run_id,
+            "new_articles": new_count,
+            "nlp_skipped": nlp_skipped,
+            "elapsed": total_elapsed,
+            "stages": stage_report,
+            "deferred": deferred,
+            "gnews_cache": gnews_stats,
+            "clustering": cluster_stat,
+            "per_source": per_source_stats,
+        })
+        jsonl_log.flush_all()
+
+        return {"run_id": run_id, "new_articles": new_count, "nlp_skipped": nlp_skipped, "timestamp": datetime.now(timezone.utc).isoformat(), "elapsed": total_elapsed, "stages": stage_report, "deferred": deferred, "gnews_cache": gnews_stats, "clustering": cluster_stat, "per_source": per_source_stats}
     except Exception as e:
         print(f"[CRITICAL] crawler cycle failed: {e}")
+        if run_id:
+            _end_run(db, run_id, "failed")
         raise e
     finally:
+        event_index.clear()
         db.close()
 
-def process_once(force: bool = False, only_sources: list[str] = None) -> dict:
+def process_once(force: bool = False, only_sources: list[str] = None,
+                 resume_run_id: str | None = None, trigger: str = "manual") -> dict:
     """Synchronous wrapper used by the scheduler/background jobs."""
-    return asyncio.run(_process_once_async(force_update=force, only_sources=only_sources))
+    return asyncio.run(_process_once_async(force_update=force, only_sources=only_sources,
+                                           resume_run_id=resume_run_id, trigger=trigger))
+
+
+def interrupted_run(db: Session, alive_worker_ids: set[str] = frozenset()) -> CrawlRun | None:
+    """Latest run still marked running whose worker is gone (process killed mid-cycle)."""
+    run = db.query(CrawlRun).order_by(CrawlRun.started_at.desc()).first()
+    if run is None or run.status != "running":
+        return None
+    if run.worker_id in alive_worker_ids and run.worker_id != WORKER_ID:
+        return None
+    return run
 
 
 def cleanup_old_pending_articles():
@@ -991,13 +1472,84 @@ def cleanup_old_pending_articles():
     finally:
         db.close()
 
+def replay_benchmark(archive: str, cycles: int = 1, latency_ms: float | None = None, error_rate: float = 0.0,
+                     seed: int | None = 0, only_sources: list[str] | None = None, db_url: str | None = None) -> dict:
+    """
+    Run crawl cycles against a recorded HTTP archive and a scratch database,
+    and report cycle time, entries/sec and inserts/sec. No network access.
+    """
+    global FEED_STATE_FILE
+    import tempfile
+    from sqlalchemy import create_engine
+
+    http_replay.install("replay", archive, latency_ms=latency_ms, error_rate=error_rate, seed=seed)
+    scratch = tempfile.TemporaryDirectory(prefix="vdw-replay-")
+    bench_engine = create_engine(db_url or f"sqlite:///{scratch.name}/replay.db", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=bench_engine)
+    SessionLocal.configure(bind=bench_engine)
+    FEED_STATE_FILE = Path(scratch.name) / "feed_state.json"
+
+    results = []
+    try:
+        for i in range(cycles):
+            # The scraper's pooled client is bound to the previous cycle's loop and transport
+            HTMLScraper._shared_client = None
+            t0 = time.perf_counter()
+            r = process_once(force=True, only_sources=only_sources, trigger="replay")
+            elapsed = time.perf_counter() - t0
+            entries = sum(s.get("entries", 0) for s in r["per_source"])
+            results.append({
+                "cycle": i + 1,
+                "elapsed_s": round(elapsed, 3),
+                "sources": len(r["per_source"]),
+                "entries": entries,
+                "entries_per_s": round(entries / elapsed, 2) if elapsed else None,
+                "inserts": r["new_articles"],
+                "inserts_per_s": round(r["new_articles"] / elapsed, 2) if elapsed else None,
+                "nlp_skipped": r["nlp_skipped"],
+            })
+        archive_stats = http_replay._archive.stats()
+    finally:
+        http_replay.uninstall()
+        SessionLocal.configure(bind=engine)
+        bench_engine.dispose()
+        scratch.cleanup()
+
+    print(f"\n[REPLAY] {archive}  latency_ms={latency_ms} error_rate={error_rate}")
+    print(f"{'cycle':>5} {'elapsed_s':>9} {'entries':>7} {'entries/s':>9} {'inserts':>7} {'inserts/s':>9} {'skipped':>7}")
+    for c in results:
+        print(f"{c['cycle']:>5} {c['elapsed_s']:>9.2f} {c['entries']:>7} {c['entries_per_s'] or 0:>9.1f} "
+              f"{c['inserts']:>7} {c['inserts_per_s'] or 0:>9.1f} {c['nlp_skipped']:>7}")
+    print(f"archive: {archive_stats}")
+    return {"cycles": results, "archive": archive_stats}
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--once", action="store_true")
     parser.add_argument("--force", action="store_true", help="Ignore feed cache and force re-crawl")
+    parser.add_argument("--record", metavar="ARCHIVE", help="With --once: store every HTTP response in ARCHIVE (zip)")
+    parser.add_argument("--replay", metavar="ARCHIVE", help="Offline benchmark: crawl ARCHIVE into a scratch DB")
+    parser.add_argument("--cycles", type=int, default=1, help="Replay: number of cycles to run")
+    parser.add_argument("--latency-ms", type=float, default=None, help="Replay: simulated latency (default: recorded)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Replay: share of requests that fail")
+    parser.add_argument("--seed", type=int, default=0, help="Replay: RNG seed for latency/error injection")
+    parser.add_argument("--sources", nargs="*", default=None, help="Limit to these source names")
+    parser.add_argument("--json", action="store_true", help="Replay: print the report as JSON")
     args = parser.parse_args()
-    if args.once:
-        print(process_once(force=args.force))
+    if args.replay:
+        report = replay_benchmark(args.replay, cycles=args.cycles, latency_ms=args.latency_ms,
+                                  error_rate=args.error_rate, seed=args.seed, only_sources=args.sources)
+        if args.json:
+            print(json.dumps(report, ensure_ascii=False, indent=2))
+    elif args.once:
+        if args.record:
+            # Unconditional requests so every feed body lands in the archive
+            http_replay.install("record", args.record)
+        try:
+            print(process_once(force=args.force or bool(args.record), only_sources=args.sources))
+        finally:
+            http_replay.uninstall()
     else:
         print("Use --once; scheduling is handled by backend server.")
 
@@ -0,0 +1,181 @@
+"""
+Incremental source/confidence aggregates for events.
+
+Merging an article into an event used to reload ``ev.articles`` and rescan
+every title and summary against ``VIP_TERMS_RE`` / ``SENSITIVE_LOCATIONS_RE``
+to recompute ``sources_count``, ``confidence`` and the title. That made each
+new article cost O(articles x patterns) on large events.
+
+``events.aggregates`` now holds what those scans produced::
+
+    domains, sources          distinct values seen so far, one per text
+    texts                     root article ids seen so far (app.syndication)
+    lead_trusted              the founding article came from a trusted source
+    has_trusted, has_vip, has_sensitive, has_strong_metrics
+    best_trusted_title        longest title from a trusted source (first on ties)
+    vip_title                 first title containing a VIP term
+
+A syndicated copy (``syndicated_from_id``) whose root text is already in the
+event adds no domain or source: an agency story republished by ten outlets
+is one source for ``sources_count``, confidence and consensus promotion.
+
+``add`` folds one article in, scanning only that article. ``recompute``
+rebuilds the state from all linked articles; it runs for events that predate
+the column and after admin unlinks, and is exposed as a repair tool::
+
+    python -m app.event_aggregates [--event ID ...]
+"""
+
+import argparse
+from functools import lru_cache
+from typing import Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from .models import Article, Event
+from .sources import SENSITIVE_LOCATIONS_RE, SOURCES, VIP_TERMS_RE
+
+
+@lru_cache(maxsize=1)
+def _trusted() -> frozenset[str]:
+    return frozenset(s.name for s in SOURCES if s.trusted)
+
+
+def is_trusted(source: Optional[str]) -> bool:
+    return source in _trusted()
+
+
+def has_vip_term(text: str) -> bool:
+    text = text.lower()
+    return any(pat.search(text) for pat in VIP_TERMS_RE)
+
+
+def _has_sensitive_loc(text: str) -> bool:
+    text = text.lower()
+    return any(pat.search(text) for pat in SENSITIVE_LOCATIONS_RE)
+
+
+def empty() -> dict:
+    return {
+        "domains": [], "sources": [], "texts": [], "lead_trusted": False,
+        "has_trusted": False, "has_vip": False, "has_sensitive": False, "has_strong_metrics": False,
+        "best_trusted_title": None, "vip_title": None,
+    }
+
+
+def add(agg: Optional[dict], article: Article) -> dict:
+    """A new aggregate dict with ``article`` folded in (JSON columns only track reassignment)."""
+    first = agg is None
+    agg = dict(agg or empty())
+    trusted = is_trusted(article.source)
+    title = article.title or ""
+    combined_text = f"{title} {article.summary or ''}"
+
+    root = getattr(article, "syndicated_from_id", None) or article.id
+    texts = agg.get("texts", [])
+    if root is None or root not in texts:
+        if root is not None:
+            agg["texts"] = texts + [root]
+        if article.domain and article.domain not in agg["domains"]:
+            agg["domains"] = agg["domains"] + [article.domain]
+        if article.source not in agg["sources"]:
+            agg["sources"] = agg["sources"] + [article.source]
+    if first:
+        agg["lead_trusted"] = trusted
+    if trusted:
+        agg["has_trusted"] = True
+        if agg["best_trusted_title"] is None or len(title) > len(agg["best_trusted_title"]):
+            agg["best_trusted_title"] = title
+    if not agg["has_vip"] and has_vip_term(combined_text):
+        agg["has_vip"] = True
+    if agg["vip_title"] is None and has_vip_term(title):
+        agg["vip_title"] = title
+    if not agg["has_sensitive"] and _has_sensitive_loc(combined_text):
+        agg["has_sensitive"] = True
+    if article.deaths or article.missing or (article.damage_billion_vnd and article.damage_billion_vnd > 0.5):
+        agg["has_strong_metrics"] = True
+    return agg
+
+
+def fold(articles: Iterable[Article]) -> dict:
+    agg = None
+    for a in articles:
+        agg = add(agg, a)
+    return agg or empty()
+
+
+def best_title(agg: dict, current: str) -> str:
+    """Prefer a title with a VIP term, else the longest trusted one."""
+    if agg["has_vip"] and not has_vip_term(current):
+        return agg["vip_title"] or current
+    if agg["has_trusted"] and agg["best_trusted_title"]:
+        return agg["best_trusted_title"]
+    return current
+
+
+def confidence(agg: dict, is_red_alert: bool) -> float:
+    sources_count = len(agg["sources"])
+    if agg["has_vip"]:
+        return 1.0  # Absolute priority (Emergency dispatch)
+    if is_red_alert:
+        return 1.0  # Red Alert implies extreme danger
+    if agg["has_sensitive"] and agg["has_trusted"]:
+        return 0.98  # Strategic infrastructure at risk
+    if agg["has_trusted"]:
+        return 0.95 if sources_count >= 2 else 0.9
+    if agg["has_sensitive"]:
+        return 0.85 if sources_count >= 2 else 0.7
+    if agg["has_strong_metrics"]:
+        return 0.8 if sources_count >= 2 else 0.6
+    # Pure crowd-sourced / general news
+    return {1: 0.3, 2: 0.5, 3: 0.75}.get(sources_count, 0.85)
+
+
+def recompute(db: Session, ev: Event) -> dict:
+    """Rebuild aggregates, sources_count and confidence from every linked article."""
+    articles = db.query(Article).filter(Article.event_id == ev.id).order_by(Article.id).all()
+    ev.aggregates = fold(articles)
+    if articles:
+        ev.sources_count = len(ev.aggregates["sources"])
+        ev.confidence = confidence(ev.aggregates, bool(ev.is_red_alert))
+    return ev.aggregates
+
+
+def repair(db: Session, event_ids: list[int] | None = None, batch: int = 200) -> int:
+    """Recompute the given events (default all) and report how many were out of date."""
+    query = db.query(Event).order_by(Event.id)
+    if event_ids:
+        query = query.filter(Event.id.in_(event_ids))
+    changed = 0
+    last_id = 0
+    while True:
+        events = query.filter(Event.id > last_id).limit(batch).all()
+        if not events:
+            break
+        for ev in events:
+            before = (ev.aggregates, ev.sources_count, ev.confidence)
+            recompute(db, ev)
+            if (ev.aggregates, ev.sources_count, ev.confidence) != before:
+                changed += 1
+        db.commit()
+        last_id = events[-1].id
+    return changed
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.event_aggregates",
+                                     description="Recompute event source/confidence aggregates")
+    parser.add_argument("--event", type=int, action="append", help="Event ID (repeatable); default all")
+    args = parser.parse_args(argv)
+
+    from .database import SessionLocal
+    db = SessionLocal()
+    try:
+        changed = repair(db, args.event)
+    finally:
+        db.close()
+    print(f"{changed} events repaired")
+
+
+if __name__ == "__main__":
+    main()
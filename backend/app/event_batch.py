@@ -0,0 +1,214 @@
+"""
+Batch event clustering for a crawl cycle.
+
+``upsert_event_for_article`` handles one article at a time: five outlets
+reporting the same landslide in one cycle cost five candidate searches, one
+event creation, four merges and five broadcasts/notification fan-outs.
+
+The crawler instead hands the cycle's persisted articles to ``cluster_batch``:
+
+1. articles of the same (disaster_type, province) whose titles match under
+   ``event_matcher.match_score`` within the 24h match window are joined with
+   union-find (single linkage, as sequential upserts would chain them);
+2. every article is matched against the live events of the active-event
+   index, as ``event_matcher.find_matching_event`` would; a group joins the
+   best-scoring event any member matched, otherwise it founds a new event
+   from its earliest article;
+3. each affected event is written once (members folded in with
+   ``merge_article_into_event`` before a single flush), committed, and gets
+   one notification and one broadcast.
+
+Both scoring steps are one sparse matrix product per hazard/province
+(app.similarity) rather than pair-by-pair set operations. A group never
+merges two existing events; they stay separate as before.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Iterable
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from . import event_index, similarity
+from .event_matcher import (
+    _lower,
+    announce_event_update,
+    announce_new_event,
+    find_matching_event,
+    insert_event,
+    match_window,
+    merge_article_into_event,
+    new_event_for_article,
+)
+from .event_signature import token_ids
+from .models import Article, Event
+
+logger = logging.getLogger(__name__)
+
+# An article sees events last updated up to 24h before it (match_window)
+_PAIR_WINDOW = timedelta(hours=24)
+
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int) -> None:
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            # Lower index (earlier article) stays the root
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+def _key(a: Article) -> tuple:
+    return a.published_at, a.id or 0
+
+
+_EPOCH = datetime(1970, 1, 1)
+_US = timedelta(microseconds=1)
+
+
+def _ts(values) -> np.ndarray:
+    """Naive UTC datetimes as integer microseconds, so window tests match datetime comparisons exactly."""
+    return np.fromiter(((v - _EPOCH) // _US for v in values), dtype=np.int64, count=len(values))
+
+
+def group_articles(articles: list[Article]) -> list[list[Article]]:
+    """Connected components of the title-similarity graph, each in publish order."""
+    articles = sorted(articles, key=_key)
+    uf = _UnionFind(len(articles))
+    by_bucket: dict[tuple, list[int]] = defaultdict(list)
+    for i, a in enumerate(articles):
+        by_bucket[(a.disaster_type, a.province)].append(i)
+
+    feats = [(token_ids(a.title), _lower(a.commune), _lower(a.village)) for a in articles]
+    for idxs in by_bucket.values():
+        if len(idxs) < 2:
+            continue
+        # One sparse product for the whole bucket; idxs is in publish order
+        m = similarity.TitleMatrix(*zip(*(feats[i] for i in idxs)))
+        pairs = similarity.match_scores(m, m).tocoo()
+        t = _ts([articles[i].published_at for i in idxs])
+        edges = (pairs.row < pairs.col) & (t[pairs.col] - t[pairs.row] <= _PAIR_WINDOW // _US)
+        for r, c in zip(pairs.row[edges], pairs.col[edges]):
+            uf.union(idxs[r], idxs[c])
+
+    groups: dict[int, list[Article]] = defaultdict(list)
+    for i, a in enumerate(articles):
+        groups[uf.find(i)].append(a)
+    return [groups[root] for root in sorted(groups)]
+
+
+def event_matches(db: Session, articles: list[Article]) -> dict[Article, tuple[Event | None, float]]:
+    """``find_matching_event`` for every article, scored per hazard/province against the active index at once."""
+    out: dict[Article, tuple[Event | None, float]] = {}
+    index = event_index.active()
+    by_bucket: dict[tuple, list[Article]] = defaultdict(list)
+    for a in articles:
+        if index is not None and index.covers(match_window(a)[0]):
+            by_bucket[(a.disaster_type, a.province)].append(a)
+        else:
+            out[a] = find_matching_event(db, a)
+
+    for (disaster_type, province), arts in by_bucket.items():
+        windows = [match_window(a) for a in arts]
+        cands = event_index.lookup(db, disaster_type, province,
+                                   min(w[0] for w in windows), max(w[1] for w in windows))
+        q = similarity.TitleMatrix([token_ids(a.title) for a in arts],
+                                   [_lower(a.commune) for a in arts], [_lower(a.village) for a in arts])
+        c = similarity.TitleMatrix([e.tokens for e in cands], [e.commune for e in cands], [e.village for e in cands])
+        scores = similarity.within(similarity.match_scores(q, c), _ts([w[0] for w in windows]),
+                                   _ts([w[1] for w in windows]), _ts([e.last_updated_at for e in cands]))
+        for a, (col, score) in zip(arts, similarity.best_matches(scores)):
+            ev = db.get(Event, cands[col].id) if col >= 0 else None
+            if col >= 0 and ev is None:
+                # Created earlier in a transaction that was rolled back
+                index.discard(cands[col].id)
+                out[a] = find_matching_event(db, a)
+            else:
+                out[a] = (ev, score)
+    return out
+
+
+def _target(members: list[Article], matches: dict) -> Event | None:
+    """The live event the best-matching member of a group would join."""
+    best, best_score = None, 0.0
+    for a in members:
+        ev, score = matches[a]
+        if ev is not None and score > best_score:
+            best, best_score = ev, score
+    return best
+
+
+def _apply(db: Session, target: Event | None, members: list[Article]) -> Event:
+    """Write one group into its event with a single flush."""
+    with db.no_autoflush:
+        if target is None:
+            ev, rest = new_event_for_article(db, members[0]), members[1:]
+        else:
+            ev, rest = target, members
+        for a in rest:
+            merge_article_into_event(db, ev, a)
+    if target is None:
+        insert_event(db, ev)
+    db.flush()
+
+    for a in members:
+        a.event_id = ev.id
+    # Members merged before the group reached three domains missed the consensus promotion
+    if len((ev.aggregates or {}).get("domains", [])) >= 3:
+        for a in members:
+            if a.status == "pending":
+                a.status = "approved"
+    db.commit()
+    if event_index.active() is not None:
+        event_index.active().put(ev)
+    return ev
+
+
+def cluster_batch(db: Session, articles: Iterable[Article]) -> dict:
+    """Cluster a cycle's articles together and into live events; one write and one announcement per event."""
+    articles = [a for a in dict.fromkeys(articles) if a is not None and a.id is not None and a.published_at]
+    stat = {"articles": len(articles), "groups": 0, "events_created": 0, "events_updated": 0, "errors": 0}
+    if not articles:
+        return stat
+
+    groups = group_articles(articles)
+    stat["groups"] = len(groups)
+
+    # Groups that land in the same live event are written together
+    matches = event_matches(db, articles)
+    plan: dict = {}
+    for n, members in enumerate(groups):
+        target = _target(members, matches)
+        key = ("event", target.id) if target is not None else ("new", n)
+        if key in plan:
+            plan[key][1].extend(members)
+        else:
+            plan[key] = (target, list(members))
+
+    for target, members in plan.values():
+        members.sort(key=_key)
+        try:
+            ev = _apply(db, target, members)
+        except Exception as e:
+            db.rollback()
+            stat["errors"] += 1
+            logger.error(f"[event-batch] failed to cluster {len(members)} articles ({members[0].title[:60]}): {e}")
+            continue
+        if target is None:
+            stat["events_created"] += 1
+            # A new event has no followers yet: its announcement covers every member
+            announce_new_event(db, ev)
+        else:
+            stat["events_updated"] += 1
+            announce_event_update(db, ev, members)
+    return stat
@@ -0,0 +1,154 @@
+"""
+In-memory index of live events for article clustering.
+
+``upsert_event_for_article`` used to query every event of the same
+type/province in a 36 hour window and re-tokenize each candidate title, for
+every article. During a storm that is hundreds of articles against the same
+growing candidate list. The crawler now loads the active and cooling events
+updated in the last ``event_index_hours`` once per cycle into buckets keyed by
+``(disaster_type, province, 12h bucket of last_updated_at)``, each entry
+holding the unigram/bigram id sets from the stored title signature
+(app.event_signature) and the lowercased commune/village. Candidate
+retrieval and scoring read the index; only the winning event is loaded from
+the session.
+
+The matcher keeps the index current as it creates events and merges
+articles into them. Windows that start before the loaded range (old
+articles, admin approvals outside a crawl) fall back to the DB query.
+"""
+
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from . import event_lifecycle, metrics
+from .event_signature import event_tokens
+from .models import Event
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+_BUCKET_SECONDS = 12 * 3600
+
+
+def _bucket(at: datetime) -> int:
+    return int(at.timestamp() // _BUCKET_SECONDS)
+
+
+def _split_key(key: str) -> tuple[str, int]:
+    """``hazard|province|YYYYmmddHHMM_N`` -> (base, N); a bare base has N = 0."""
+    base, _, suffix = key.rpartition("_")
+    if base and suffix.isdigit():
+        return base, int(suffix)
+    return key, 0
+
+
+@dataclass
+class IndexedEvent:
+    id: int
+    disaster_type: str
+    province: str
+    last_updated_at: datetime
+    tokens: tuple[frozenset, frozenset]
+    commune: Optional[str]
+    village: Optional[str]
+
+
+def _entry(ev: Event) -> IndexedEvent:
+    return IndexedEvent(
+        id=ev.id,
+        disaster_type=ev.disaster_type,
+        province=ev.province,
+        last_updated_at=ev.last_updated_at,
+        tokens=event_tokens(ev),
+        commune=ev.commune.lower() if ev.commune else None,
+        village=ev.village.lower() if ev.village else None,
+    )
+
+
+class ActiveEventIndex:
+    def __init__(self, since: datetime):
+        self.since = since
+        self._buckets: dict[tuple, dict[int, IndexedEvent]] = defaultdict(dict)
+        self._where: dict[int, tuple] = {}
+        # Key base -> next free ``_N`` suffix, for insert-without-probe key allocation
+        self._key_suffix: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def put(self, ev: Event) -> None:
+        """Add or refresh an event after it was created, merged into or retitled."""
+        if ev.id is None or ev.last_updated_at is None:
+            return
+        self.discard(ev.id)
+        entry = _entry(ev)
+        key = (entry.disaster_type, entry.province, _bucket(entry.last_updated_at))
+        self._buckets[key][entry.id] = entry
+        self._where[entry.id] = key
+        if ev.key:
+            base, counter = _split_key(ev.key)
+            self._key_suffix[base] = max(self._key_suffix.get(base, 0), counter + 1)
+
+    def discard(self, event_id: int) -> None:
+        key = self._where.pop(event_id, None)
+        if key is not None:
+            self._buckets[key].pop(event_id, None)
+
+    def next_key_suffix(self, base: str) -> int:
+        """First ``_N`` suffix of a key base not held by an indexed event (0 = the bare base)."""
+        return self._key_suffix.get(base, 0)
+
+    def covers(self, window_start: datetime) -> bool:
+        return window_start >= self.since
+
+    def candidates(self, disaster_type: str, province: str,
+                   window_start: datetime, window_end: datetime) -> list[IndexedEvent]:
+        """Same rows as ``candidate_events`` for the window, in id order."""
+        out = []
+        for b in range(_bucket(window_start), _bucket(window_end) + 1):
+            for entry in self._buckets.get((disaster_type, province, b), {}).values():
+                if window_start <= entry.last_updated_at <= window_end:
+                    out.append(entry)
+        out.sort(key=lambda e: e.id)
+        return out
+
+
+_active: Optional[ActiveEventIndex] = None
+
+
+def load(db: Session, hours: int | None = None) -> ActiveEventIndex:
+    """Build the index from events updated in the last ``hours``; the crawler calls this per cycle."""
+    global _active
+    hours = settings.event_index_hours if hours is None else hours
+    since = datetime.utcnow() - timedelta(hours=hours)
+    index = ActiveEventIndex(since)
+    for ev in db.query(Event).filter(Event.state.in_(event_lifecycle.MATCHABLE),
+                                    Event.last_updated_at >= since):
+        index.put(ev)
+    _active = index
+    logger.info(f"[event-index] {len(index)} events since {since:%Y-%m-%d %H:%M}")
+    return index
+
+
+def clear() -> None:
+    global _active
+    _active = None
+
+
+def active() -> Optional[ActiveEventIndex]:
+    return _active
+
+
+def lookup(db: Session, disaster_type: str, province: str,
+           window_start: datetime, window_end: datetime) -> Optional[list[IndexedEvent]]:
+    """Indexed candidates, or None when no index is loaded or it does not cover the window."""
+    if _active is None or not _active.covers(window_start):
+        metrics.EVENT_INDEX_LOOKUPS.inc(result="db")
+        return None
+    metrics.EVENT_INDEX_LOOKUPS.inc(result="index")
+    return _active.candidates(disaster_type, province, window_start, window_end)
@@ -0,0 +1,174 @@
+"""
+Event lifecycle: active -> cooling -> closed -> archived.
+
+Events used to stay candidates forever, kept out of matching only by the
+``last_updated_at`` window, and every list/stats query scanned the whole
+``events`` table. Now each event carries an indexed ``state``:
+
+* ``active``  - takes new articles;
+* ``cooling`` - no article for the hazard's cooling period; still listed,
+  back to ``active`` once an update (a late article, an admin edit) brings
+  it inside the cooling period again;
+* ``closed``  - no article for the hazard's closing period;
+* archived    - closed for ``event_archive_days``: summarized into
+  ``events_archive`` (same id, impact figures, article ids) and deleted from
+  ``events``. Articles and reports stay, unlinked; follows are dropped.
+
+Slow-onset hazards (drought, salinity, subsidence...) get longer periods than
+the ``event_cooling_hours`` / ``event_closed_hours`` defaults.
+
+The matcher, the active-event index and crowdsourced report matching look
+at ``MATCHABLE`` (active and cooling) events. Their window is relative to
+the article's ``published_at``, not now, and articles arrive late (the 48h
+``listing_lookback_hours``, deferred sources, resumed runs): an event that
+went cooling since must still take them. Closed events are never matched.
+
+The worker runs ``run`` hourly; ``python -m app.event_lifecycle`` runs it once.
+"""
+
+import argparse
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import metrics
+from .models import Article, CrowdsourcedReport, Event, EventArchive, EventFollow
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+ACTIVE = "active"
+COOLING = "cooling"
+CLOSED = "closed"
+MATCHABLE = (ACTIVE, COOLING)
+
+# (cooling, closed) hours per hazard; others use the settings defaults
+HAZARD_HOURS = {
+    "drought": (14 * 24, 60 * 24),
+    "salinity": (14 * 24, 60 * 24),
+    "subsidence": (7 * 24, 30 * 24),
+    "erosion": (7 * 24, 30 * 24),
+    "heatwave": (72, 14 * 24),
+    "cold_surge": (72, 14 * 24),
+    "recovery": (7 * 24, 30 * 24),
+    "earthquake": (36, 72),
+}
+
+_ARCHIVE_COLUMNS = [c.name for c in EventArchive.__table__.columns if c.name not in ("archived_at", "article_ids")]
+
+
+def thresholds(disaster_type: str | None) -> tuple[int, int]:
+    """(cooling, closed) hours of inactivity for a hazard."""
+    return HAZARD_HOURS.get(disaster_type, (settings.event_cooling_hours, settings.event_closed_hours))
+
+
+def touch(ev: Event, now: datetime | None = None) -> None:
+    """Reactivate a cooling event an update brought back inside its cooling period (the ``advance`` rule)."""
+    now = now or datetime.utcnow()
+    if ev.state == COOLING and ev.last_updated_at >= now - timedelta(hours=thresholds(ev.disaster_type)[0]):
+        ev.state = ACTIVE
+
+
+def advance(db: Session, now: datetime | None = None) -> dict:
+    """Move events between active/cooling/closed by hazard-specific inactivity; returns transitions."""
+    now = now or datetime.utcnow()
+    stat = {"cooling": 0, "closed": 0, "reactivated": 0}
+    groups = [(Event.disaster_type == t, hours) for t, hours in HAZARD_HOURS.items()]
+    groups.append((Event.disaster_type.notin_(list(HAZARD_HOURS)) | Event.disaster_type.is_(None),
+                   (settings.event_cooling_hours, settings.event_closed_hours)))
+    for hazard, (cooling_h, closed_h) in groups:
+        cool_before = now - timedelta(hours=cooling_h)
+        close_before = now - timedelta(hours=closed_h)
+        stat["closed"] += db.query(Event).filter(
+            hazard, Event.state.in_((ACTIVE, COOLING)), Event.last_updated_at < close_before,
+        ).update({Event.state: CLOSED}, synchronize_session=False)
+        stat["cooling"] += db.query(Event).filter(
+            hazard, Event.state == ACTIVE, Event.last_updated_at < cool_before,
+        ).update({Event.state: COOLING}, synchronize_session=False)
+        stat["reactivated"] += db.query(Event).filter(
+            hazard, Event.state == COOLING, Event.last_updated_at >= cool_before,
+        ).update({Event.state: ACTIVE}, synchronize_session=False)
+    db.commit()
+    return stat
+
+
+def archive(db: Session, now: datetime | None = None, batch: int = 500) -> int:
+    """Summarize events closed for ``event_archive_days`` into events_archive and delete them."""
+    now = now or datetime.utcnow()
+    before = now - timedelta(days=settings.event_archive_days)
+    archived = 0
+    while True:
+        events = db.query(Event).filter(Event.state == CLOSED, Event.last_updated_at < before) \
+            .order_by(Event.id).limit(batch).all()
+        if not events:
+            break
+        ids = [ev.id for ev in events]
+        article_ids: dict[int, list[int]] = {i: [] for i in ids}
+        for article_id, event_id in db.query(Article.id, Article.event_id).filter(Article.event_id.in_(ids)):
+            article_ids[event_id].append(article_id)
+
+        db.bulk_insert_mappings(EventArchive, [
+            {**{c: getattr(ev, c) for c in _ARCHIVE_COLUMNS}, "archived_at": now, "article_ids": sorted(article_ids[ev.id])}
+            for ev in events
+        ])
+        db.query(Article).filter(Article.event_id.in_(ids)).update({Article.event_id: None}, synchronize_session=False)
+        db.query(CrowdsourcedReport).filter(CrowdsourcedReport.event_id.in_(ids)) \
+            .update({CrowdsourcedReport.event_id: None}, synchronize_session=False)
+        db.query(EventFollow).filter(EventFollow.event_id.in_(ids)).delete(synchronize_session=False)
+        db.query(Event).filter(Event.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        db.expunge_all()
+        archived += len(ids)
+    return archived
+
+
+def archived_article_ids(db: Session) -> set[int]:
+    """Articles whose event was archived; re-clustering leaves them alone."""
+    out: set[int] = set()
+    for (ids,) in db.query(EventArchive.article_ids):
+        out.update(ids or ())
+    return out
+
+
+def report_states(db: Session) -> dict[str, int]:
+    counts = dict(db.query(Event.state, func.count(Event.id)).group_by(Event.state).all())
+    counts["archived"] = db.query(func.count(EventArchive.id)).scalar() or 0
+    for state in (ACTIVE, COOLING, CLOSED, "archived"):
+        metrics.EVENTS_BY_STATE.set(counts.get(state, 0), state=state)
+    return counts
+
+
+def run() -> dict:
+    """Scheduler job: advance states, archive long-closed events, refresh the state gauge."""
+    from .database import SessionLocal
+    db = SessionLocal()
+    try:
+        stat = advance(db)
+        stat["archived"] = archive(db)
+        stat["states"] = report_states(db)
+    finally:
+        db.close()
+    if stat["cooling"] or stat["closed"] or stat["archived"]:
+        try:
+            from .cache import cache
+            cache.delete_match("ev_*")
+            cache.delete_match("stats_*")
+        except Exception as e:
+            logger.warning(f"[event-lifecycle] cache invalidation failed: {e}")
+    logger.info(f"[event-lifecycle] {stat}")
+    return stat
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.event_lifecycle",
+                                     description="Advance event lifecycle states and archive closed events")
+    parser.parse_args(argv)
+    stat = run()
+    print(f"{stat['cooling']} cooling, {stat['closed']} closed, {stat['reactivated']} reactivated, "
+          f"{stat['archived']} archived; now {stat['states']}")
+
+
+if __name__ == "__main__":
+    main()
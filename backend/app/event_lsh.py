@@ -0,0 +1,333 @@
+"""
+MinHash-LSH index of event titles: related events and probable duplicates.
+
+The same incident often ends up as two events: articles name different
+provinces, or their titles score just under the matcher's 0.7 threshold.
+Every event already stores a 32-value MinHash of its title tokens
+(``events.title_sig``, app.event_signature). The index bands it into
+16 bands of 2 values; events sharing any band bucket are candidates
+(~50% recall at Jaccard 0.2, ~90% at 0.35), re-scored with the matcher's
+unigram/bigram similarity. A lookup touches 16 buckets and re-scores at
+most ``MAX_CANDIDATES`` events (those sharing the most bands) whatever the
+number of events; buckets of generic titles over ``MAX_BUCKET`` are skipped.
+
+The index lives in the API process and is maintained by a background
+thread, never by a request: it is built once (requests see an empty index
+until the reference is swapped in), then every ``_REFRESH_SECONDS`` topped
+up with events modified since the last refresh (``events.updated_at``, less
+``_OVERLAP`` for transactions still open at the previous one; not
+``last_updated_at``, the newest article's publish time, which late articles
+leave in the past) and swept, ``_SWEEP_BATCH`` ids at a time, for events
+deleted or archived since. Lookups check their results against the DB
+anyway and drop misses.
+
+Probable duplicates: same hazard, started within ``DUPLICATE_HOURS`` of each
+other, title similarity >= ``DUPLICATE_SIMILARITY``. Pairs an admin
+dismissed are kept in ``event_duplicate_dismissals``.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from .event_matcher import _calculate_similarity
+from .event_signature import MINHASH_K, decode, minhash, token_ids
+from .models import Event, EventDuplicateDismissal
+
+logger = logging.getLogger(__name__)
+
+BANDS = 16
+ROWS = MINHASH_K // BANDS
+RELATED_SIMILARITY = 0.25
+DUPLICATE_SIMILARITY = 0.5
+DUPLICATE_HOURS = 72
+# A bucket this full only says "common words"; at most this many candidates are re-scored
+MAX_BUCKET = 1000
+MAX_CANDIDATES = 200
+_REFRESH_SECONDS = 30
+_SWEEP_BATCH = 5000
+_OVERLAP = timedelta(minutes=5)
+
+
+@dataclass
+class LshEntry:
+    id: int
+    disaster_type: str
+    province: str
+    started_at: datetime
+    last_updated_at: datetime
+    tokens: tuple[frozenset, frozenset]
+    bands: tuple[tuple, ...]
+
+
+def _bands(mh: tuple[int, ...]) -> tuple[tuple, ...]:
+    return tuple((b, *mh[b * ROWS:(b + 1) * ROWS]) for b in range(BANDS))
+
+
+def _entry(ev) -> Optional[LshEntry]:
+    decoded = decode(ev.title_sig) if ev.title_sig else None
+    if decoded is not None:
+        tokens, mh = decoded
+    else:
+        tokens = token_ids(ev.title)
+        mh = minhash(tokens[0] | tokens[1])
+    if not tokens[0]:
+        return None
+    return LshEntry(ev.id, ev.disaster_type, ev.province, ev.started_at, ev.last_updated_at, tokens, _bands(mh))
+
+
+class LshIndex:
+    """Band buckets over event titles; safe to read while the refresher thread writes."""
+
+    def __init__(self):
+        self._buckets: dict[tuple, set[int]] = defaultdict(set)
+        self._entries: dict[int, LshEntry] = {}
+        self._lock = threading.RLock()
+        self.watermark: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, event_id: int) -> Optional[LshEntry]:
+        return self._entries.get(event_id)
+
+    def put(self, ev) -> None:
+        """Add or refresh an event (anything with id/title/title_sig/disaster_type/province/started/updated)."""
+        entry = _entry(ev)
+        with self._lock:
+            self.discard(ev.id)
+            if entry is None:
+                return
+            self._entries[entry.id] = entry
+            for key in entry.bands:
+                self._buckets[key].add(entry.id)
+
+    def discard(self, event_id: int) -> None:
+        with self._lock:
+            entry = self._entries.pop(event_id, None)
+            if entry is None:
+                return
+            for key in entry.bands:
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(event_id)
+                    if not bucket:
+                        del self._buckets[key]
+
+    def candidates(self, entry: LshEntry) -> list[int]:
+        """Events sharing the most bands with ``entry``, best first; oversized buckets are skipped."""
+        hits: Counter = Counter()
+        with self._lock:
+            for key in entry.bands:
+                bucket = self._buckets.get(key)
+                if bucket and len(bucket) <= MAX_BUCKET:
+                    hits.update(bucket)
+        hits.pop(entry.id, None)
+        return [cid for cid, _ in hits.most_common(MAX_CANDIDATES)]
+
+    def similar(self, event_id: int, min_similarity: float) -> list[tuple[LshEntry, float]]:
+        """Indexed events sharing a band with ``event_id``, by title similarity (highest first)."""
+        entry = self._entries.get(event_id)
+        if entry is None:
+            return []
+        out = []
+        for cid in self.candidates(entry):
+            other = self._entries.get(cid)
+            if other is None:
+                continue
+            sim = _calculate_similarity(entry.tokens, other.tokens)
+            if sim >= min_similarity:
+                out.append((other, sim))
+        out.sort(key=lambda x: (-x[1], x[0].id))
+        return out
+
+    def entries_since(self, since: datetime) -> list[LshEntry]:
+        with self._lock:
+            return [e for e in self._entries.values() if e.last_updated_at and e.last_updated_at >= since]
+
+    def ids_after(self, event_id: int, limit: int) -> list[int]:
+        with self._lock:
+            ids = sorted(i for i in self._entries if i > event_id)
+        return ids[:limit]
+
+
+_COLUMNS = (Event.id, Event.title, Event.title_sig, Event.disaster_type, Event.province,
+            Event.started_at, Event.last_updated_at, Event.updated_at)
+
+_index = LshIndex()
+_ready = threading.Event()
+_refresher_pid: Optional[int] = None
+_start_lock = threading.Lock()
+_sweep_cursor = 0
+
+
+def _load(db: Session, since: Optional[datetime], into: LshIndex) -> None:
+    query = db.query(*_COLUMNS)
+    if since is not None:
+        query = query.filter(Event.updated_at >= since - _OVERLAP)
+    for row in query.yield_per(2000):
+        into.put(row)
+        if row.updated_at and (into.watermark is None or row.updated_at > into.watermark):
+            into.watermark = row.updated_at
+
+
+def _sweep(db: Session, idx: LshIndex) -> int:
+    """Drop the next ``_SWEEP_BATCH`` indexed ids that no longer exist (deleted, merged, archived)."""
+    global _sweep_cursor
+    ids = idx.ids_after(_sweep_cursor, _SWEEP_BATCH)
+    if not ids:
+        _sweep_cursor = 0
+        return 0
+    alive = {i for (i,) in db.query(Event.id).filter(Event.id.in_(ids))}
+    for i in ids:
+        if i not in alive:
+            idx.discard(i)
+    _sweep_cursor = ids[-1]
+    return len(ids) - len(alive)
+
+
+def refresh(db: Session) -> None:
+    """One refresher step: full build (swapped in when done) if needed, else top-up and sweep."""
+    global _index
+    if not _ready.is_set():
+        fresh = LshIndex()
+        started = datetime.utcnow()
+        _load(db, None, fresh)
+        # No event has a modification time yet: top up from the build on
+        fresh.watermark = fresh.watermark or started
+        _index = fresh
+        _ready.set()
+        logger.info(f"[event-lsh] indexed {len(fresh)} events")
+        return
+    idx = _index
+    _load(db, idx.watermark, idx)
+    _sweep(db, idx)
+
+
+def _refresh_loop() -> None:
+    from .database import SessionLocal
+    while True:
+        try:
+            db = SessionLocal()
+            try:
+                refresh(db)
+            finally:
+                db.close()
+        except Exception as e:
+            logger.warning(f"[event-lsh] refresh failed: {e}")
+        time.sleep(_REFRESH_SECONDS)
+
+
+def start() -> None:
+    """Start this process's refresher thread (again after a fork)."""
+    global _refresher_pid
+    pid = os.getpid()
+    if _refresher_pid == pid:
+        return
+    with _start_lock:
+        if _refresher_pid == pid:
+            return
+        _refresher_pid = pid
+    threading.Thread(target=_refresh_loop, name="event-lsh-refresh", daemon=True).start()
+
+
+def index() -> LshIndex:
+    """The process-wide index as of the last refresh; empty until the first build is swapped in."""
+    start()
+    return _index
+
+
+def clear() -> None:
+    """Rebuild in the background; the current index keeps serving meanwhile."""
+    _ready.clear()
+
+
+def _dismissed(db: Session, ids: set[int]) -> set[tuple[int, int]]:
+    if not ids:
+        return set()
+    rows = db.query(EventDuplicateDismissal.event_a, EventDuplicateDismissal.event_b).filter(
+        EventDuplicateDismissal.event_a.in_(ids) | EventDuplicateDismissal.event_b.in_(ids)
+    )
+    return {(a, b) for a, b in rows}
+
+
+def _pair(a: int, b: int) -> tuple[int, int]:
+    return (a, b) if a < b else (b, a)
+
+
+def is_probable_duplicate(a: LshEntry, b: LshEntry, similarity: float) -> bool:
+    if a.disaster_type != b.disaster_type or similarity < DUPLICATE_SIMILARITY:
+        return False
+    if a.started_at is None or b.started_at is None:
+        return False
+    return abs(a.started_at - b.started_at) <= timedelta(hours=DUPLICATE_HOURS)
+
+
+def related(db: Session, event_id: int, limit: int = 10) -> list[tuple[Event, float, bool]]:
+    """(event, title similarity, probable duplicate) for events related to ``event_id``."""
+    idx = index()
+    if idx.get(event_id) is None:
+        ev = db.get(Event, event_id)
+        if ev is None:
+            return []
+        idx.put(ev)
+    entry = idx.get(event_id)
+    if entry is None:
+        return []
+    hits = idx.similar(event_id, RELATED_SIMILARITY)[:limit * 2]
+    events = {ev.id: ev for ev in db.query(Event).filter(Event.id.in_([h.id for h, _ in hits]))} if hits else {}
+    dismissed = _dismissed(db, {event_id})
+    out = []
+    for other, sim in hits:
+        ev = events.get(other.id)
+        if ev is None:
+            idx.discard(other.id)
+            continue
+        dup = is_probable_duplicate(entry, other, sim) and _pair(event_id, other.id) not in dismissed
+        out.append((ev, sim, dup))
+        if len(out) == limit:
+            break
+    return out
+
+
+def probable_duplicates(db: Session, hours: int = 168, limit: int = 50) -> list[tuple[Event, Event, float]]:
+    """Undismissed duplicate pairs among events updated in the last ``hours``, most similar first."""
+    idx = index()
+    since = datetime.utcnow() - timedelta(hours=hours)
+    pairs: dict[tuple[int, int], float] = {}
+    for entry in idx.entries_since(since):
+        for other, sim in idx.similar(entry.id, DUPLICATE_SIMILARITY):
+            if is_probable_duplicate(entry, other, sim):
+                pairs[_pair(entry.id, other.id)] = sim
+    if not pairs:
+        return []
+    ids = {i for pair in pairs for i in pair}
+    dismissed = _dismissed(db, ids)
+    events = {ev.id: ev for ev in db.query(Event).filter(Event.id.in_(ids))}
+    out = []
+    for i in ids - events.keys():
+        idx.discard(i)
+    for (a, b), sim in sorted(pairs.items(), key=lambda x: (-x[1], x[0])):
+        if (a, b) in dismissed or a not in events or b not in events:
+            continue
+        out.append((events[a], events[b], sim))
+        if len(out) == limit:
+            break
+    return out
+
+
+def dismiss(db: Session, a: int, b: int, user_id: Optional[int] = None) -> None:
+    """Remember that two events are not duplicates."""
+    a, b = _pair(a, b)
+    exists = db.query(EventDuplicateDismissal).filter(
+        EventDuplicateDismissal.event_a == a, EventDuplicateDismissal.event_b == b).first()
+    if exists is None:
+        db.add(EventDuplicateDismissal(event_a=a, event_b=b, user_id=user_id))
+        db.commit()
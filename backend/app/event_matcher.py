@@ -1,7 +1,9 @@
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from .models import Article, Event
-from . import broadcast
+from typing import Callable
+from sqlalchemy.orm import Session, make_transient_to_detached
+from .models import Article, CrowdsourcedReport, Event, EventFollow
+from . import broadcast, event_aggregates, event_index, event_lifecycle, metrics
+from .event_signature import event_tokens, token_ids
 import re
 
 # Vietnamese stop words to improve similarity accuracy
@@ -70,139 +72,239 @@ def _get_impact_bucket(article: Article) -> str:
     
     return f"{cb}_{db}"
 
-def upsert_event_for_article(db: Session, article: Article) -> Event:
+def candidate_events(db: Session, province: str, window_start: datetime, window_end: datetime,
+                     disaster_type: str | None = None) -> list[Event]:
     """
-    Groups articles into Events using a Fingerprint Strategy:
-    (Hazard, Province, Time_Bucket, Impact_Bucket) + Title Similarity.
+    Active or cooling events of a province updated inside the window,
+    optionally for one hazard. Served by ix_event_state_province_updated;
+    shared by article clustering and crowdsourced report matching.
     """
-    # 1. Broad Candidate Search (24h window for new events)
-    window_start = article.published_at - timedelta(hours=24)
-    window_end = article.published_at + timedelta(hours=12)
-    
-    impact_bucket = _get_impact_bucket(article)
-    
-    candidates = db.query(Event).filter(
-        Event.disaster_type == article.disaster_type,
-        Event.province == article.province,
+    query = db.query(Event).filter(
+        Event.state.in_(event_lifecycle.MATCHABLE),
+        Event.province == province,
         Event.last_updated_at >= window_start,
         Event.last_updated_at <= window_end
-    ).all()
+    )
+    if disaster_type is not None:
+        query = query.filter(Event.disaster_type == disaster_type)
+    # Oldest event first, so equal scores always resolve the same way
+    return query.order_by(Event.id).all()
+
+def match_window(article: Article) -> tuple[datetime, datetime]:
+    """Candidate events for an article were last updated in this window."""
+    return article.published_at - timedelta(hours=24), article.published_at + timedelta(hours=12)
+
+def match_score(tokens, commune, village, cand_tokens, cand_commune, cand_village) -> float:
+    """Title similarity plus location boost; 0.0 below the title threshold. Communes/villages lowercased."""
+    title_sim = _calculate_similarity(tokens, cand_tokens)
+
+    # Semantic threshold: 0.7 for hybrid is quite restrictive and accurate
+    if title_sim < 0.7:
+        return 0.0
+
+    score = title_sim
+
+    # LOCATION BOOST: If same group & high title sim, use location to confirm the matches
+    if commune and cand_commune and commune == cand_commune:
+        score += 0.3
+    if village and cand_village and village == cand_village:
+        score += 0.4
+    return score
+
+def _lower(value: str | None) -> str | None:
+    return value.lower() if value else None
+
+def find_matching_event(db: Session, article: Article) -> tuple[Event | None, float]:
+    """Best-scoring live event for an article (hazard, province, time window, title), with its score."""
+    # 1. Broad Candidate Search (24h window for new events)
+    window_start, window_end = match_window(article)
+
+    new_tokens = token_ids(article.title)
+    article_commune = _lower(article.commune)
+    article_village = _lower(article.village)
 
     matched_event = None
     best_score = 0.0
-    new_tokens = _get_tokens(article.title)
+
+    # Live events come pre-tokenized from the crawl cycle's index (app.event_index)
+    indexed = event_index.lookup(db, article.disaster_type, article.province, window_start, window_end)
+    if indexed is not None:
+        best_id = None
+        for cand in indexed:
+            score = match_score(new_tokens, article_commune, article_village, cand.tokens, cand.commune, cand.village)
+            # The threshold for a definitive match remains high to ensure quality
+            if score > best_score:
+                best_score, best_id = score, cand.id
+        if best_id is not None:
+            matched_event = db.get(Event, best_id)
+            if matched_event is None:
+                # Created earlier in a transaction that was rolled back
+                event_index.active().discard(best_id)
+                return find_matching_event(db, article)
+    else:
+        for cand in candidate_events(db, article.province, window_start, window_end, article.disaster_type):
+            score = match_score(new_tokens, article_commune, article_village,
+                                event_tokens(cand), _lower(cand.commune), _lower(cand.village))
+            if score > best_score:
+                best_score = score
+                matched_event = cand
+    return matched_event, best_score
+
+def key_base(article: Article) -> str:
+    """Clustering key ``hazard|province|YYYYmmddHHMM`` before any ``_N`` suffix."""
+    timestamp_slug = article.published_at.strftime("%Y%m%d%H%M")
+    return f"{article.disaster_type}|{article.province}|{timestamp_slug}"
+
+def event_key(article: Article, taken: Callable[[str], bool]) -> str:
+    """Clustering key ``hazard|province|YYYYmmddHHMM``, suffixed ``_1``, ``_2``... while ``taken``."""
+    base = key_base(article)
+    unique_key = base
     
-    for cand in candidates:
-        cand_tokens = _get_tokens(cand.title)
-        title_sim = _calculate_similarity(new_tokens, cand_tokens)
-        
-        # Semantic threshold: 0.7 for hybrid is quite restrictive and accurate
-        if title_sim < 0.7:
+    # Guard against key collision
+    counter = 0
+    while taken(unique_key):
+        counter += 1
+        unique_key = f"{base}_{counter}"
+    return unique_key
+
+def column_values(ev: Event) -> dict:
+    """Column values of a transient event, with the column defaults a flush would have applied."""
+    row = {}
+    for col in Event.__table__.columns:
+        if col.name == "id":
             continue
+        value = getattr(ev, col.name)
+        if value is None and col.default is not None:
+            value = col.default.arg if col.default.is_scalar else col.default.arg(None)
+        row[col.name] = value
+    return row
 
-        score = title_sim
-        
-        # LOCATION BOOST: If same group & high title sim, use location to confirm the matches
-        if article.commune and cand.commune and article.commune.lower() == cand.commune.lower():
-            score += 0.3
-        if article.village and cand.village and article.village.lower() == cand.village.lower():
-            score += 0.4
-            
-        # The threshold for a definitive match remains high to ensure quality
-        if score > best_score:
-            best_score = score
-            matched_event = cand
+def _insert(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(Event)
 
-    if matched_event is None:
-        # Create a unique key for the new event sequence
-        timestamp_slug = article.published_at.strftime("%Y%m%d%H%M")
-        unique_key = f"{article.disaster_type}|{article.province}|{timestamp_slug}"
-        
-        # Guard against key collision
-        counter = 0
-        while db.query(Event).filter(Event.key == unique_key).first():
-            counter += 1
-            unique_key = f"{article.disaster_type}|{article.province}|{timestamp_slug}_{counter}"
-
-        # Get coordinates for the province
-        from .nlp import PROVINCE_COORDINATES
-        coords = PROVINCE_COORDINATES.get(article.province, [None, None])
-
-        ev = Event(
-            key=unique_key,
-            title=article.title,
-            disaster_type=article.disaster_type,
-            province=article.province,
-            stage=article.stage,
-            started_at=article.published_at,
-            last_updated_at=article.published_at,
-            deaths=article.deaths,
-            missing=article.missing,
-            injured=article.injured,
-            damage_billion_vnd=article.damage_billion_vnd,
-            confidence=0.5 if article.deaths or article.needs_verification else 0.3, # Initial confidence
-            sources_count=1,
-            lat=coords[0],
-            lon=coords[1],
-            needs_verification=article.needs_verification,
-            commune=article.commune,
-            village=article.village,
-            route=article.route,
-            cause=article.cause,
-            characteristics=article.characteristics,
-            details={"impact_bucket": impact_bucket},
-            is_red_alert=article.is_red_alert
-        )
-        db.add(ev)
-        db.flush()
-        article.event_id = ev.id
-        
-        # publish new event to subscribers
-        try:
-            import asyncio
-            data = {
-                "type": "new_event",
-                "event_id": ev.id,
-                "title": ev.title,
-                "disaster_type": ev.disaster_type,
-                "province": ev.province,
-                "started_at": ev.started_at.isoformat() if ev.started_at else None,
-            }
-            try:
-                loop = asyncio.get_running_loop()
-                loop.create_task(broadcast.publish_event(data))
-                
-                # Also Push via WebSocket
-                from .ws import manager
-                loop.create_task(manager.broadcast({"type": "EVENT_UPSERT", "data": data}))
-            except RuntimeError:
-                # No running loop (likely running from a script or background worker outside FastAPI loop)
-                # We still append to buffer as publish_event does internally (but publish_event is async)
-                msg = broadcast._make_message(data)
-                broadcast._append_to_buffer(msg)
-        except Exception:
-            pass
+def insert_event(db: Session, ev: Event) -> Event:
+    """
+    INSERT a new event under the first free ``_N`` suffix of its key base.
+
+    No probe queries: the active-event index remembers the suffixes of the
+    keys it holds, and a key taken anyway (another crawler, an event older
+    than the index) turns the INSERT into a no-op through
+    ``ON CONFLICT (key) DO NOTHING``, so the next suffix is tried.
+    """
+    base = ev.key
+    index = event_index.active()
+    counter = index.next_key_suffix(base) if index is not None else 0
+    row = column_values(ev)
+    while True:
+        key = base if counter == 0 else f"{base}_{counter}"
+        row["key"] = key
+        stmt = _insert(db).values(**row).on_conflict_do_nothing(index_elements=["key"]).returning(Event.id)
+        event_id = db.execute(stmt).scalar()
+        if event_id is not None:
+            break
+        metrics.EVENT_KEY_CONFLICTS.inc()
+        counter += 1
+
+    # The row is exactly the transient event: attach it without reloading
+    for name, value in row.items():
+        if getattr(ev, name) is None:
+            setattr(ev, name, value)
+    ev.key = key
+    ev.id = event_id
+    make_transient_to_detached(ev)
+    db.add(ev)
+    return ev
+
+def new_event_for_article(db: Session, article: Article, key: str | None = None) -> Event:
+    """A new, not yet inserted Event seeded from one article; without ``key`` it carries the key base for ``insert_event``."""
+    impact_bucket = _get_impact_bucket(article)
+    unique_key = key or key_base(article)
 
-        # Telegram Notifications
+    # Get coordinates for the province
+    from .nlp import PROVINCE_COORDINATES
+    coords = PROVINCE_COORDINATES.get(article.province, [None, None])
+
+    ev = Event(
+        key=unique_key,
+        title=article.title,
+        disaster_type=article.disaster_type,
+        province=article.province,
+        stage=article.stage,
+        started_at=article.published_at,
+        last_updated_at=article.published_at,
+        deaths=article.deaths,
+        missing=article.missing,
+        injured=article.injured,
+        damage_billion_vnd=article.damage_billion_vnd,
+        confidence=0.5 if article.deaths or article.needs_verification else 0.3, # Initial confidence
+        sources_count=1,
+        lat=coords[0],
+        lon=coords[1],
+        needs_verification=article.needs_verification,
+        commune=article.commune,
+        village=article.village,
+        route=article.route,
+        cause=article.cause,
+        characteristics=article.characteristics,
+        details={"impact_bucket": impact_bucket},
+        is_red_alert=article.is_red_alert,
+        aggregates=event_aggregates.add(None, article)
+    )
+    return ev
+
+def announce_new_event(db: Session, ev: Event) -> None:
+    # publish new event to subscribers
+    try:
+        import asyncio
+        data = {
+            "type": "new_event",
+            "event_id": ev.id,
+            "title": ev.title,
+            "disaster_type": ev.disaster_type,
+            "province": ev.province,
+            "started_at": ev.started_at.isoformat() if ev.started_at else None,
+        }
         try:
-            from .notifications import notify_users_of_event
-            notify_users_of_event(db, ev)
-        except Exception as e:
-            import logging
-            logging.getLogger(__name__).error(f"Notification error: {e}")
+            loop = asyncio.get_running_loop()
+            loop.create_task(broadcast.publish_event(data))
+            
+            # Also Push via WebSocket
+            from .ws import manager
+            loop.create_task(manager.broadcast({"type": "EVENT_UPSERT", "data": data}))
+        except RuntimeError:
+            # No running loop (likely running from a script or background worker outside FastAPI loop)
+            # We still append to buffer as publish_event does internally (but publish_event is async)
+            msg = broadcast._make_message(data)
+            broadcast._append_to_buffer(msg)
+    except Exception:
+        pass
 
-        return ev
-    
-    # If match found, update event metrics
-    ev = matched_event
+    # Telegram Notifications
+    try:
+        from .notifications import notify_users_of_event
+        notify_users_of_event(db, ev)
+    except Exception as e:
+        import logging
+        logging.getLogger(__name__).error(f"Notification error: {e}")
+
+def merge_article_into_event(db: Session, ev: Event, article: Article) -> None:
+    """Fold one article into an event's title, stage, impact figures, details and confidence."""
+    impact_bucket = _get_impact_bucket(article)
+
+    # Aggregates predating the column (or reset by an admin unlink) are rebuilt once
+    if ev.aggregates is None:
+        event_aggregates.recompute(db, ev)
+    agg = ev.aggregates
 
     # UPDATE LEADER: If this article is from a trusted source or is more detailed, update title
     # We compare using a length-weighted trusted score
-    from .sources import SOURCES
-    trusted_map = {s.name: (s.trusted or False) for s in SOURCES}
-    
-    current_lead_is_trusted = trusted_map.get(ev.articles[0].source, False) if ev.articles else False
-    new_is_trusted = trusted_map.get(article.source, False)
+    current_lead_is_trusted = agg["lead_trusted"]
+    new_is_trusted = event_aggregates.is_trusted(article.source)
     
     # Swap criteria: (Trusted wins over non-trusted) OR (Longer titles if both equal trust)
     if (new_is_trusted and not current_lead_is_trusted) or \
@@ -220,6 +322,7 @@ def upsert_event_for_article(db: Session, article: Article) -> Event:
 
     ev.last_updated_at = max(ev.last_updated_at, article.published_at)
     ev.started_at = min(ev.started_at, article.published_at)
+    event_lifecycle.touch(ev)
 
     # Update global event impact metrics (Cumulative logic)
     # Note: For deaths/missing, if sources report DIFFERENT numbers for SAME event, 
@@ -279,109 +382,69 @@ def upsert_event_for_article(db: Session, article: Article) -> Event:
                     current_details[key] = unique
         ev.details = current_details
 
-    # Update source count and smart confidence
-    from .sources import SOURCES, VIP_TERMS_RE, SENSITIVE_LOCATIONS_RE
-    from . import nlp
-    
-    # [OPTIMIZATION 3] Multi-Source Consolidation & Auto-Promotion
-    # Get all articles current linked to this event + the new one
-    all_articles = [a for a in ev.articles if a.id != article.id] + [article]
-    
-    unique_domains = {a.domain for a in all_articles if a.domain}
-    sources_used = {a.source for a in all_articles}
-    ev.sources_count = len(sources_used)
+    # Update source count and smart confidence from the single new article
+    domains_before = len(agg["domains"])
+    agg = ev.aggregates = event_aggregates.add(agg, article)
+    ev.sources_count = len(agg["sources"])
 
+    # [OPTIMIZATION 3] Multi-Source Consolidation & Auto-Promotion
     # If we have 3 or more unique domains reporting this, it's a strong consensus signal.
     # We auto-promote all "pending" articles linked to this event.
-    if len(unique_domains) >= 3:
+    if len(agg["domains"]) >= 3:
         promoted = 0
-        for a in all_articles:
-            if a.status == "pending":
-                a.status = "approved"
-                promoted += 1
+        if domains_before < 3 and ev.id is not None:
+            promoted = db.query(Article).filter(
+                Article.event_id == ev.id, Article.status == "pending"
+            ).update({Article.status: "approved"}, synchronize_session="fetch")
+        if article.status == "pending":
+            article.status = "approved"
+            promoted += 1
         if promoted > 0:
-            print(f"   [AUTO-UPGRADE] Event ID {ev.id}: Promoted {promoted} articles to APPROVED based on consensus ({len(unique_domains)} sources).")
+            print(f"   [AUTO-UPGRADE] Event ID {ev.id}: Promoted {promoted} articles to APPROVED based on consensus ({len(agg['domains'])} sources).")
             # We don't need to manually broadcast here as the main upsert_event_for_article loop
             # sends an EVENT_UPSERT notification at the end of the process.
-    
-    # 1. Check for Strong Signals across all articles in this event
-    trusted_map = {s.name: (s.trusted or False) for s in SOURCES}
-    has_trusted_source = any(trusted_map.get(a.source, False) for a in all_articles)
-    
-    # Check for Red Alert, VIP, Sensitive Locations, and Metrics
-    has_red_alert = any(a.is_red_alert for a in all_articles)
-    has_vip_term = False
-    has_sensitive_loc = False
-    has_strong_metrics = False
-    
-    for a in all_articles:
-        combined_text = f"{a.title} {a.summary or ''}".lower()
-        
-        # VIP Check
-        if not has_vip_term:
-            for vip_re in VIP_TERMS_RE:
-                if vip_re.search(combined_text):
-                    has_vip_term = True; break
-        
-        # Sensitive Loc Check
-        if not has_sensitive_loc:
-            for loc_re in SENSITIVE_LOCATIONS_RE:
-                if loc_re.search(combined_text):
-                    has_sensitive_loc = True; break
-        
-        # Metrics Check (High rainfall or winds)
-        if not has_strong_metrics:
-            if a.deaths or a.missing or (a.damage_billion_vnd and a.damage_billion_vnd > 0.5):
-                has_strong_metrics = True
-    
-    # 2. Smart Title Selection: 
-    # Use the most descriptive title (often from trusted or longest titles)
-    # Prefer title with VIP terms
-    best_title = ev.title
-    if has_vip_term and not any(pat.search(best_title.lower()) for pat in VIP_TERMS_RE):
-        # Current title doesn't have VIP but new article might
-        for a in all_articles:
-            if any(pat.search(a.title.lower()) for pat in VIP_TERMS_RE):
-                best_title = a.title; break
-    elif has_trusted_source:
-        # If we have trusted sources, prefer their titles (take the longest one for detail)
-        trusted_titles = [a.title for a in all_articles if trusted_map.get(a.source, False)]
-        if trusted_titles:
-            best_title = max(trusted_titles, key=len)
-    
-    ev.title = best_title
-
-    # 3. Calculate Smart Confidence
-    if has_vip_term:
-        ev.confidence = 1.0  # Absolute priority (Emergency dispatch)
-    elif has_red_alert:
-        ev.confidence = 1.0  # Red Alert implies extreme danger
-    elif has_sensitive_loc and has_trusted_source:
-        ev.confidence = 0.98 # Strategic infrastructure at risk
-    elif has_trusted_source:
-        # confirmed by at least one official source
-        ev.confidence = 0.95 if ev.sources_count >= 2 else 0.9
-    elif has_sensitive_loc:
-        ev.confidence = 0.85 if ev.sources_count >= 2 else 0.7
-    elif has_strong_metrics:
-        ev.confidence = 0.8 if ev.sources_count >= 2 else 0.6
-    else:
-        # Pure crowd-sourced / general news
-        if ev.sources_count == 1:
-            ev.confidence = 0.3
-        elif ev.sources_count == 2:
-            ev.confidence = 0.5
-        elif ev.sources_count == 3:
-            ev.confidence = 0.75
-        else:
-            ev.confidence = 0.85
 
-    article.event_id = ev.id
+    # Smart Title Selection: prefer a title with VIP terms, else the longest trusted title
+    ev.title = event_aggregates.best_title(agg, ev.title)
 
+    # Calculate Smart Confidence
+    ev.confidence = event_aggregates.confidence(agg, bool(ev.is_red_alert))
+
+def merge_events(db: Session, target: Event, source: Event) -> int:
+    """
+    Fold every article of ``source`` into ``target`` (as the matcher would
+    have), move its reports and followers over and delete it. Returns the
+    number of articles moved; the caller commits.
+    """
+    articles = db.query(Article).filter(Article.event_id == source.id) \
+        .order_by(Article.published_at, Article.id).all()
+    for article in articles:
+        merge_article_into_event(db, target, article)
+        article.event_id = target.id
+    # Moved articles merged before target reached three domains missed the consensus promotion
+    if len((target.aggregates or {}).get("domains", [])) >= 3:
+        for article in articles:
+            if article.status == "pending":
+                article.status = "approved"
+
+    db.query(CrowdsourcedReport).filter(CrowdsourcedReport.event_id == source.id) \
+        .update({CrowdsourcedReport.event_id: target.id}, synchronize_session=False)
+    following = db.query(EventFollow.user_id).filter(EventFollow.event_id == target.id)
+    db.query(EventFollow).filter(EventFollow.event_id == source.id, EventFollow.user_id.in_(following)) \
+        .delete(synchronize_session=False)
+    db.query(EventFollow).filter(EventFollow.event_id == source.id) \
+        .update({EventFollow.event_id: target.id}, synchronize_session=False)
+    # Flush the relinks first, or deleting source would null out its (stale) article collection
+    db.flush()
+    db.delete(source)
+    return len(articles)
+
+def announce_event_update(db: Session, ev: Event, articles: list[Article]) -> None:
+    """One follower notification and one broadcast for the articles just merged into ``ev``."""
     # Notification for followers
     try:
-        from .notifications import notify_followers_of_article
-        notify_followers_of_article(db, ev, article)
+        from .notifications import notify_followers_of_articles
+        notify_followers_of_articles(db, ev, articles)
     except Exception as e:
         import logging
         logging.getLogger(__name__).error(f"Follower notification error: {e}")
@@ -417,4 +480,30 @@ def upsert_event_for_article(db: Session, article: Article) -> Event:
     except Exception:
         pass
 
+def upsert_event_for_article(db: Session, article: Article) -> Event:
+    """
+    Groups articles into Events using a Fingerprint Strategy:
+    (Hazard, Province, Time_Bucket, Impact_Bucket) + Title Similarity.
+
+    Crawl cycles cluster their articles together instead (app.event_batch).
+    """
+    matched_event, _ = find_matching_event(db, article)
+
+    if matched_event is None:
+        ev = insert_event(db, new_event_for_article(db, article))
+        article.event_id = ev.id
+        if event_index.active() is not None:
+            event_index.active().put(ev)
+        announce_new_event(db, ev)
+        return ev
+
+    # If match found, update event metrics
+    ev = matched_event
+    merge_article_into_event(db, ev, article)
+
+    article.event_id = ev.id
+    if event_index.active() is not None:
+        event_index.active().put(ev)
+
+    announce_event_update(db, ev, [article])
     return ev
@@ -0,0 +1,99 @@
+"""
+Stored title signatures for events.
+
+Clustering compares a new article's title against every candidate event
+title with the unigram/bigram Jaccard mix of ``event_matcher``. Instead of
+re-tokenizing ``ev.title`` on every comparison, each event keeps
+``events.title_sig``, rewritten whenever ``Event.title`` is assigned:
+
+    b"S1" | n_uni u16 | n_bi u16 | sorted unigram ids u32[] | sorted bigram ids u32[] | MinHash u32[32]
+
+Token ids are CRC32s of the normalized tokens, so article and event sides
+hash identically in every process. Similarity is computed on the id sets;
+the MinHash sketch (over unigrams and bigrams together) estimates Jaccard
+without the sets and is what near-duplicate lookups band on.
+"""
+
+import random
+import struct
+import zlib
+from typing import Optional
+
+from sqlalchemy import event as sa_event
+
+from .models import Event
+
+_MAGIC = b"S1"
+_HEADER = struct.Struct("<2sHH")
+MINHASH_K = 32
+_PRIME = (1 << 61) - 1
+_rnd = random.Random(0x5EED)
+_PERMS = [(_rnd.randrange(1, _PRIME), _rnd.randrange(0, _PRIME)) for _ in range(MINHASH_K)]
+
+Tokens = tuple[frozenset, frozenset]
+
+
+def _id(token: str) -> int:
+    return zlib.crc32(token.encode("utf-8"))
+
+
+def token_ids(text: Optional[str]) -> Tokens:
+    """``event_matcher._get_tokens`` with every token replaced by its id."""
+    from .event_matcher import _get_tokens
+    unigrams, bigrams = _get_tokens(text)
+    return frozenset(map(_id, unigrams)), frozenset(map(_id, bigrams))
+
+
+def minhash(ids) -> tuple[int, ...]:
+    if not ids:
+        return (0xFFFFFFFF,) * MINHASH_K
+    return tuple(min(((a * x + b) % _PRIME) & 0xFFFFFFFF for x in ids) for a, b in _PERMS)
+
+
+def estimate_jaccard(s1: tuple[int, ...], s2: tuple[int, ...]) -> float:
+    return sum(1 for x, y in zip(s1, s2) if x == y) / MINHASH_K
+
+
+def encode(tokens: Tokens) -> bytes:
+    uni, bi = sorted(tokens[0]), sorted(tokens[1])
+    ids = uni + bi + list(minhash(tokens[0] | tokens[1]))
+    return _HEADER.pack(_MAGIC, len(uni), len(bi)) + struct.pack(f"<{len(ids)}I", *ids)
+
+
+def title_signature(title: Optional[str]) -> bytes:
+    return encode(token_ids(title))
+
+
+def decode(sig: bytes) -> Optional[tuple[Tokens, tuple[int, ...]]]:
+    """((unigram ids, bigram ids), minhash), or None for an unknown format."""
+    if not sig or len(sig) < _HEADER.size:
+        return None
+    magic, n_uni, n_bi = _HEADER.unpack_from(sig)
+    if magic != _MAGIC:
+        return None
+    n = n_uni + n_bi + MINHASH_K
+    if len(sig) != _HEADER.size + 4 * n:
+        return None
+    ids = struct.unpack_from(f"<{n}I", sig, _HEADER.size)
+    return (frozenset(ids[:n_uni]), frozenset(ids[n_uni:n_uni + n_bi])), tuple(ids[n_uni + n_bi:])
+
+
+def event_tokens(ev: Event) -> Tokens:
+    """Token id sets of an event title, from the stored signature when there is one."""
+    decoded = decode(ev.title_sig) if ev.title_sig else None
+    return decoded[0] if decoded else token_ids(ev.title)
+
+
+def event_minhash(ev: Event) -> tuple[int, ...]:
+    decoded = decode(ev.title_sig) if ev.title_sig else None
+    if decoded:
+        return decoded[1]
+    uni, bi = token_ids(ev.title)
+    return minhash(uni | bi)
+
+
+@sa_event.listens_for(Event.title, "set")
+def _refresh_signature(target: Event, value, oldvalue, initiator):
+    # Every write path (matcher, admin edits, scripts) keeps the signature in step
+    if value != oldvalue:
+        target.title_sig = title_signature(value)
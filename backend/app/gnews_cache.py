@@ -0,0 +1,264 @@
+"""
+Google News link -> publisher URL cache.
+
+GNews feeds hand out ``news.google.com/rss/articles/...`` links that only
+redirect to the real article, and the same links come back every cycle (and
+under several sources). Resolving one costs a protobuf decode at best and a
+redirect fetch through httpx/Playwright at worst, so resolutions are kept:
+
+* an in-process LRU of ``gnews_cache_size`` entries, in front of
+* a persistent tier shared by workers: the ``gnews:resolved`` Redis hash when
+  ``REDIS_URL`` is configured, otherwise the ``gnews_urls`` table.
+
+Entries come from two places: a successful ``decode_gnews_url`` and the
+``final_url`` a full-text fetch ended on. A fetched URL is what the browser
+actually landed on, so it replaces a decoded one, never the other way round.
+
+The crawler looks links up while parsing (so dedup sees the publisher URL)
+and ``fetch_article_full_text_async`` consults the cache before it touches
+the network. Lookups are counted per tier, and misses by how they were then
+resolved (decoded / fetched); ``stats_since()`` feeds the crawl log.
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import threading
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Iterable, Optional
+from urllib.parse import urlparse
+
+from . import metrics
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+_REDIS_KEY = "gnews:resolved"
+_FLUSH_BATCH = 200
+_RANK = {"decode": 0, "fetch": 1}
+
+
+def is_gnews(url: str) -> bool:
+    return "news.google.com/" in (url or "")
+
+
+def _is_google(url: str) -> bool:
+    host = urlparse(url).netloc.lower()
+    return host == "google.com" or host.endswith(".google.com")
+
+
+def url_hash(url: str) -> str:
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+
+class _DbStore:
+    """``gnews_urls`` table; writes are buffered and flushed in batches."""
+
+    def __init__(self):
+        self._pending: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, hashes: list[str]) -> dict[str, tuple[str, str]]:
+        from .database import SessionLocal
+        from .models import GnewsUrl
+        db = SessionLocal()
+        try:
+            rows = db.query(GnewsUrl.gnews_hash, GnewsUrl.resolved_url, GnewsUrl.method) \
+                .filter(GnewsUrl.gnews_hash.in_(hashes)).all()
+            return {h: (u, m) for h, u, m in rows}
+        finally:
+            db.close()
+
+    def put(self, h: str, gnews_url: str, resolved: str, method: str) -> None:
+        with self._lock:
+            prev = self._pending.get(h)
+            if prev is None or _RANK[method] >= _RANK[prev["method"]]:
+                self._pending[h] = {"gnews_hash": h, "gnews_url": gnews_url, "resolved_url": resolved,
+                                    "method": method, "created_at": datetime.utcnow()}
+            full = len(self._pending) >= _FLUSH_BATCH
+        if full:
+            self.flush()
+
+    def flush(self) -> int:
+        with self._lock:
+            rows, self._pending = self._pending, {}
+        if not rows:
+            return 0
+        from .database import SessionLocal
+        from .models import GnewsUrl
+        db = SessionLocal()
+        try:
+            existing = {r.gnews_hash: r for r in db.query(GnewsUrl).filter(GnewsUrl.gnews_hash.in_(list(rows)))}
+            for h, row in rows.items():
+                cur = existing.get(h)
+                if cur is None:
+                    db.add(GnewsUrl(**row))
+                elif _RANK[row["method"]] >= _RANK.get(cur.method, 0):
+                    cur.resolved_url, cur.method = row["resolved_url"], row["method"]
+            db.commit()
+            return len(rows)
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"[gnews-cache] flush of {len(rows)} rows failed: {e}")
+            return 0
+        finally:
+            db.close()
+
+
+class _RedisStore:
+    """One Redis hash: url hash -> {"u": resolved url, "m": method}."""
+
+    def __init__(self, client):
+        self.r = client
+
+    def get_many(self, hashes: list[str]) -> dict[str, tuple[str, str]]:
+        out = {}
+        for h, raw in zip(hashes, self.r.hmget(_REDIS_KEY, hashes)):
+            if raw:
+                rec = json.loads(raw)
+                out[h] = (rec["u"], rec["m"])
+        return out
+
+    def put(self, h: str, gnews_url: str, resolved: str, method: str) -> None:
+        if method != "fetch":
+            cur = self.r.hget(_REDIS_KEY, h)
+            if cur and json.loads(cur)["m"] == "fetch":
+                return
+        self.r.hset(_REDIS_KEY, h, json.dumps({"u": resolved, "m": method}))
+
+    def flush(self) -> int:
+        return 0
+
+
+class GnewsUrlCache:
+    def __init__(self, store=None, size: int | None = None):
+        self.size = size or settings.gnews_cache_size
+        self._store = store
+        self._lru: OrderedDict[str, tuple[str, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.counts: Counter = Counter()
+
+    @property
+    def store(self):
+        if self._store is None:
+            self._store = _default_store()
+        return self._store
+
+    def _lru_get(self, h: str) -> Optional[tuple[str, str]]:
+        with self._lock:
+            hit = self._lru.get(h)
+            if hit is not None:
+                self._lru.move_to_end(h)
+            return hit
+
+    def _lru_put(self, h: str, entry: tuple[str, str]) -> None:
+        with self._lock:
+            self._lru[h] = entry
+            self._lru.move_to_end(h)
+            while len(self._lru) > self.size:
+                self._lru.popitem(last=False)
+
+    def _count(self, result: str, n: int = 1) -> None:
+        if n:
+            self.counts[result] += n
+            metrics.GNEWS_CACHE_LOOKUPS.inc(n, result=result)
+
+    def lookup_many(self, urls: Iterable[str], count: bool = True) -> dict[str, str]:
+        """Cached resolutions for the GNews links among ``urls``; one store query for the LRU misses."""
+        wanted = {u: url_hash(u) for u in dict.fromkeys(urls) if is_gnews(u)}
+        found: dict[str, str] = {}
+        missing: dict[str, str] = {}
+        for u, h in wanted.items():
+            hit = self._lru_get(h)
+            if hit is not None:
+                found[u] = hit[0]
+            else:
+                missing[h] = u
+        if count:
+            self._count("lru", len(found))
+        if missing:
+            try:
+                stored = self.store.get_many(list(missing))
+            except Exception as e:
+                logger.warning(f"[gnews-cache] store lookup failed: {e}")
+                stored = {}
+            for h, entry in stored.items():
+                self._lru_put(h, entry)
+                found[missing[h]] = entry[0]
+            if count:
+                self._count("store", len(stored))
+                self._count("miss", len(missing) - len(stored))
+        return found
+
+    def lookup(self, url: str) -> Optional[str]:
+        return self.lookup_many([url]).get(url)
+
+    def remember(self, gnews_url: str, resolved: str, method: str = "fetch") -> None:
+        """Record a resolution; a decoded URL never replaces a fetched one."""
+        # Consent walls and unresolved redirects end on google.com
+        if not is_gnews(gnews_url) or not resolved or _is_google(resolved):
+            return
+        h = url_hash(gnews_url)
+        cur = self._lru_get(h)
+        if cur is not None and (cur[0] == resolved or _RANK[method] < _RANK[cur[1]]):
+            return
+        self._lru_put(h, (resolved, method))
+        self._count("decoded" if method == "decode" else "fetched")
+        try:
+            self.store.put(h, gnews_url, resolved, method)
+        except Exception as e:
+            logger.warning(f"[gnews-cache] store write failed: {e}")
+
+    def resolve(self, url: str) -> str:
+        """Publisher URL for a GNews link without network I/O: cache, then protobuf decode."""
+        if not is_gnews(url):
+            return url
+        # The crawler already counted this link when it parsed the feed
+        cached = self.lookup_many([url], count=False).get(url)
+        if cached:
+            return cached
+        from .html_scraper import decode_gnews_url
+        decoded = decode_gnews_url(url)
+        if decoded != url:
+            self.remember(url, decoded, "decode")
+        return decoded
+
+    def flush(self) -> int:
+        return self.store.flush() if self._store is not None else 0
+
+    def stats(self) -> dict:
+        return summarize(self.counts)
+
+
+def summarize(c: Counter) -> dict:
+    hits = c["lru"] + c["store"]
+    lookups = hits + c["miss"]
+    return {
+        "lookups": lookups,
+        "lru_hits": c["lru"],
+        "store_hits": c["store"],
+        "misses": c["miss"],
+        "decoded": c["decoded"],
+        "fetched": c["fetched"],
+        "hit_rate": round(hits / lookups, 3) if lookups else None,
+    }
+
+
+def _default_store():
+    if settings.redis_url and not settings.redis_url.startswith("memory://"):
+        from .job_queue import FakeRedis, get_redis_client
+        client = get_redis_client()
+        if not isinstance(client, FakeRedis):
+            return _RedisStore(client)
+    return _DbStore()
+
+
+cache = GnewsUrlCache()
+atexit.register(cache.flush)
+
+
+def stats_since(before: Counter) -> dict:
+    """Lookup counts accumulated since a ``cache.counts.copy()`` snapshot (one crawl cycle)."""
+    return summarize(cache.counts - before)
@@ -13,6 +13,7 @@ from typing import Optional, List
 import httpx
 import logging
 from .settings import settings
+from . import content_extract, gnews_cache, http_replay, metrics, raw_archive
 import random
 import re
 
@@ -142,7 +143,8 @@ class HTMLScraper:
                 timeout=self.timeout,
                 follow_redirects=True,
                 limits=limits,
-                headers={"User-Agent": self.default_ua}
+                headers={"User-Agent": self.default_ua},
+                transport=http_replay.wrap_transport(),
             )
         return HTMLScraper._shared_client
 
@@ -151,7 +153,7 @@ class HTMLScraper:
         
         for attempt in range(3):
             # INNER JITTER: Sleep between attempts and between different sources
-            await asyncio.sleep(random.uniform(0.5, 2.0))
+            await asyncio.sleep(random.uniform(0.5, 2.0) * settings.crawl_jitter_scale)
             
             try:
                 ua = random.choice(settings.user_agents) if hasattr(settings, 'user_agents') and settings.user_agents else self.default_ua
@@ -171,7 +173,7 @@ class HTMLScraper:
                 html = response.text
                 # Check for Cloudflare or empty content
                 if "cloudflare" in html.lower() or len(html) < 500:
-                    if _HAS_PLAYWRIGHT:
+                    if _browser_available():
                         logger.info(f"Detected Cloudflare or empty content at {url}, trying Playwright...")
                         pw_res = await fetch_with_playwright(url, timeout=20)
                         if pw_res:
@@ -180,7 +182,7 @@ class HTMLScraper:
                 return html
             except httpx.HTTPError as e:
                 if attempt == 2:
-                    if _HAS_PLAYWRIGHT:
+                    if _browser_available():
                         logger.info(f"HTTP error for {url}, attempting Playwright fallback...")
                         pw_res = await fetch_with_playwright(url, timeout=20)
                         if pw_res:
@@ -666,14 +668,29 @@ def decode_gnews_url(url: str) -> str:
         
     return url
 
+def _browser_available() -> bool:
+    # Recorded browser fetches replay even where Playwright is not installed
+    return _HAS_PLAYWRIGHT or http_replay.active_mode() == "replay"
+
+
 async def fetch_with_playwright(url: str, timeout: int = 30) -> Optional[dict]:
     """
     Fallback fetcher using Playwright to handle JS-heavy sites or bot detection.
     """
+    if http_replay.active_mode() == "replay":
+        return await http_replay.browser_lookup(url)
+
     if not _HAS_PLAYWRIGHT:
         logger.debug("Playwright not available - skipping browser fallback")
         return None
 
+    with metrics.PLAYWRIGHT_SECONDS.time():
+        result = await _fetch_with_playwright(url, timeout)
+    http_replay.browser_record(url, result)
+    return result
+
+
+async def _fetch_with_playwright(url: str, timeout: int) -> Optional[dict]:
     try:
         async with async_playwright() as p:
             # Proxy configuration
@@ -716,14 +733,11 @@ async def fetch_with_playwright(url: str, timeout: int = 30) -> Optional[dict]:
 async def fetch_article_full_text_async(url: str, timeout: int = 15) -> Optional[dict]:
     """
     Asynchronous version of fetch_article_full_text.
-    Returns a dict with 'text', 'images', 'final_url', and 'is_broken'.
+    Returns a dict with 'text', 'images', 'lead_image', 'meta', 'final_url', and 'is_broken'.
     """
-    if not _HAS_BS4: return None
-    
-    # 0. Decode Google News URL if possible
-    decoded_url = decode_gnews_url(url)
-    is_gnews = (decoded_url == url and "news.google.com" in url)
-    url = decoded_url
+    # 0. Resolve Google News links without network I/O (cache, then protobuf decode)
+    gnews_url = url if gnews_cache.is_gnews(url) else None
+    url = gnews_cache.cache.resolve(url)
     
     # Use a very browser-like header set
     headers = {
@@ -760,7 +774,7 @@ async def fetch_article_full_text_async(url: str, timeout: int = 15) -> Optional
     # --- NEW: Fallback to Playwright if content is missing, suspicious or blocked ---
     is_suspicious = not html_content or len(html_content) < 3000 or "cloudflare" in html_content.lower() or "javascript" in html_content.lower() and len(html_content) < 10000
     
-    if is_suspicious and _HAS_PLAYWRIGHT:
+    if is_suspicious and _browser_available():
         logger.info(f"Content from {url} is missing, suspicious or blocked. Retrying with Playwright...")
         pw_res = await fetch_with_playwright(url, timeout=20)
         if pw_res:
@@ -770,56 +784,32 @@ async def fetch_article_full_text_async(url: str, timeout: int = 15) -> Optional
 
     if not html_content:
         return None
+    if gnews_url:
+        gnews_cache.cache.remember(gnews_url, final_url, "fetch")
+
+    # Keep the raw page so extraction/NLP can be re-run offline (app.raw_archive)
+    await raw_archive.aput("html", final_url, html_content.encode("utf-8"), aliases=(url,) if url != final_url else ())
 
     try:
-        soup = BeautifulSoup(html_content, "html.parser")
-        meta = extract_metadata(soup)
-        
-        # 1. Image Extraction
-        images = []
-        if meta["image"]:
-            images.append(meta["image"])
-        
-        for img in soup.find_all("img", src=True):
-            src = img["src"]
-            if any(x in src.lower() for x in ["logo", "icon", "avatar", "ads", "placeholder"]):
-                continue
-            if src.startswith("http") and any(src.lower().endswith(ext) for ext in [".jpg", ".jpeg", ".png", ".webp"]):
-                images.append(src)
-                if len(images) > 3: break
-                
-        # 2. Text Extraction
-        content_text = ""
-        potential_containers = [
-            "article", ".article", ".fck_detail", ".detail-content", ".cms-body", ".post-content", 
-            ".content-detail", ".article-body", ".article__body", ".article__sapo", ".article-content",
-            ".content_detail", "#content_detail", ".main-content-detail", ".detail-content-body"
-        ]
-        
-        for selector in potential_containers:
-            container = soup.select_one(selector)
-            if container:
-                for unwanted in container.select("script, style, .sidebar, .ads, .comment"):
-                    unwanted.decompose()
-                content_text = container.get_text(separator="\n", strip=True)
-                if len(content_text) > 200:
-                    break
-                    
-        if len(content_text) < 200:
-            paragraphs = [p.get_text(strip=True) for p in soup.find_all("p") if len(p.get_text(strip=True)) > 40]
-            content_text = "\n".join(paragraphs)
-            
-        # 3. Meta Description Fallback
-        if len(content_text) < 150 and meta["description"]:
-            content_text = meta["description"]
-            
+        # Single tokenizer pass; per-domain selector cache gives repeat sites a fast path
+        t0 = time.perf_counter()
+        page = content_extract.extract(html_content, final_url)
+        metrics.CONTENT_EXTRACT_SECONDS.observe(time.perf_counter() - t0, path="fast" if page.fast_path else "full")
+        content_text = page.text
+
+        # Meta Description Fallback
+        if len(content_text) < 150 and page.meta["description"]:
+            content_text = page.meta["description"]
+
         return {
             "text": content_text if len(content_text) > 100 else None,
-            "images": list(dict.fromkeys(images)),
+            "images": page.images,
+            "lead_image": page.lead_image,
+            "meta": page.meta,
             "final_url": final_url,
             "is_broken": False
         }
-                
+
     except Exception as e:
         logger.error(f"Error parsing final HTML from {url}: {e}")
         return None
@@ -0,0 +1,242 @@
+"""
+Record / replay of the crawler's HTTP traffic for offline benchmarks.
+
+Record mode wraps the real httpx transport and stores every exchange in a
+zip archive:
+
+    blobs/<sha256>           response body (deflate, content-addressed, deduped)
+    requests/<key>.json      method, url, status, headers, body hash, elapsed
+    playwright/<key>.json    html hash and final url of a browser fallback
+
+``key`` is derived from method + URL only, so conditional headers and the
+rotating User-Agent do not affect matching.
+
+Replay mode serves the archive through a transport with simulated latency
+and optional error injection. Requests missing from the archive get a 404
+with ``x-replay-miss: 1``.
+
+    python -m app.crawler --once --record data/replay/cycle.zip
+    python -m app.crawler --replay data/replay/cycle.zip --latency-ms 80 --error-rate 0.05
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+import zipfile
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Headers that still make sense once the body is stored decoded
+_KEEP_HEADERS = ("content-type", "etag", "last-modified", "location", "cache-control")
+
+
+def request_key(method: str, url: str) -> str:
+    return hashlib.sha1(f"{method.upper()} {url}".encode("utf-8")).hexdigest()
+
+
+class HttpArchive:
+    """Zip-backed, content-addressed store of recorded responses."""
+
+    def __init__(self, path: str | Path, mode: str = "r"):
+        self.path = Path(path)
+        self.mode = mode
+        if mode == "a":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._zip = zipfile.ZipFile(self.path, mode, compression=zipfile.ZIP_DEFLATED, compresslevel=9)
+        self._names = set(self._zip.namelist())
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._zip.close()
+
+    def _put(self, name: str, data: bytes) -> None:
+        with self._lock:
+            if name not in self._names:
+                self._zip.writestr(name, data)
+                self._names.add(name)
+
+    def _put_blob(self, body: bytes) -> str:
+        digest = hashlib.sha256(body).hexdigest()
+        self._put(f"blobs/{digest}", body)
+        return digest
+
+    def _get_json(self, name: str) -> Optional[dict]:
+        with self._lock:
+            if name not in self._names:
+                return None
+            return json.loads(self._zip.read(name))
+
+    def _get_blob(self, digest: str) -> bytes:
+        with self._lock:
+            return self._zip.read(f"blobs/{digest}")
+
+    # HTTP
+    def store(self, method: str, url: str, status: int, headers: dict, body: bytes, elapsed: float) -> None:
+        record = {
+            "method": method.upper(),
+            "url": url,
+            "status": status,
+            "headers": {k: v for k, v in headers.items() if k.lower() in _KEEP_HEADERS},
+            "body": self._put_blob(body),
+            "elapsed": round(elapsed, 4),
+        }
+        self._put(f"requests/{request_key(method, url)}.json", json.dumps(record, ensure_ascii=False).encode("utf-8"))
+
+    def lookup(self, method: str, url: str) -> Optional[tuple[dict, bytes]]:
+        record = self._get_json(f"requests/{request_key(method, url)}.json")
+        if record is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return record, self._get_blob(record["body"])
+
+    # Playwright fallback
+    def store_browser(self, url: str, result: dict) -> None:
+        record = {"url": url, "final_url": result.get("final_url"), "html": self._put_blob(result["html"].encode("utf-8"))}
+        self._put(f"playwright/{request_key('BROWSER', url)}.json", json.dumps(record).encode("utf-8"))
+
+    def lookup_browser(self, url: str) -> Optional[dict]:
+        record = self._get_json(f"playwright/{request_key('BROWSER', url)}.json")
+        if record is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {"html": self._get_blob(record["html"]).decode("utf-8"), "final_url": record["final_url"]}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": sum(1 for n in self._names if n.startswith("requests/")),
+                "browser": sum(1 for n in self._names if n.startswith("playwright/")),
+                "blobs": sum(1 for n in self._names if n.startswith("blobs/")),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, archive: HttpArchive, inner: httpx.AsyncBaseTransport):
+        self.archive = archive
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        t0 = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+        raw = httpx.Response(response.status_code, headers=response.headers, stream=response.stream, request=request)
+        body = await raw.aread()  # decoded (gzip/br removed)
+        await response.aclose()
+        try:
+            self.archive.store(request.method, str(request.url), raw.status_code, dict(raw.headers), body, time.perf_counter() - t0)
+        except Exception as e:
+            logger.warning(f"[replay] failed to record {request.url}: {e}")
+        headers = {k: v for k, v in raw.headers.items() if k.lower() not in ("content-encoding", "content-length", "transfer-encoding")}
+        return httpx.Response(raw.status_code, headers=headers, content=body, request=request)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """
+    Serves recorded responses. ``latency_ms`` fixes the simulated latency
+    (±50% jitter); None replays the recorded elapsed time. ``error_rate`` is
+    the share of requests that fail with a timeout or a 503.
+    """
+
+    def __init__(self, archive: HttpArchive, latency_ms: float | None = None, error_rate: float = 0.0, seed: int | None = None):
+        self.archive = archive
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+
+    async def _sleep(self, recorded: float) -> None:
+        if self.latency_ms is None:
+            delay = recorded
+        else:
+            delay = self.latency_ms / 1000.0 * self.rng.uniform(0.5, 1.5)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.error_rate and self.rng.random() < self.error_rate:
+            await self._sleep(0.0)
+            if self.rng.random() < 0.5:
+                raise httpx.ConnectTimeout("injected timeout", request=request)
+            return httpx.Response(503, content=b"injected error", request=request)
+
+        found = self.archive.lookup(request.method, str(request.url))
+        if found is None:
+            return httpx.Response(404, headers={"x-replay-miss": "1"}, content=b"", request=request)
+        record, body = found
+        await self._sleep(record.get("elapsed", 0.0))
+        return httpx.Response(record["status"], headers=record["headers"], content=body, request=request)
+
+
+_archive: Optional[HttpArchive] = None
+_mode: Optional[str] = None  # "record" | "replay"
+_replay_opts: dict = {}
+
+
+def install(mode: str, path: str | Path, latency_ms: float | None = None, error_rate: float = 0.0, seed: int | None = None) -> HttpArchive:
+    """Route every crawler HTTP client (and the Playwright fallback) through the archive."""
+    global _archive, _mode, _replay_opts
+    from .settings import settings
+    uninstall()
+    # httpx mounts proxies over the client transport, which would bypass the archive
+    settings.crawler_proxies = []
+    if mode == "replay":
+        # Latency comes from the replay transport, not politeness jitter
+        settings.crawl_jitter_scale = 0.0
+    _archive = HttpArchive(path, "a" if mode == "record" else "r")
+    _mode = mode
+    _replay_opts = {"latency_ms": latency_ms, "error_rate": error_rate, "seed": seed}
+    return _archive
+
+
+def uninstall() -> None:
+    global _archive, _mode
+    if _archive is not None:
+        _archive.close()
+    _archive = None
+    _mode = None
+
+
+def active_mode() -> Optional[str]:
+    return _mode
+
+
+def wrap_transport(inner: httpx.AsyncBaseTransport | None = None) -> httpx.AsyncBaseTransport | None:
+    """Transport to hand to httpx.AsyncClient; ``inner`` unchanged when not recording/replaying."""
+    if _mode == "record":
+        return RecordingTransport(_archive, inner or httpx.AsyncHTTPTransport())
+    if _mode == "replay":
+        return ReplayTransport(_archive, **_replay_opts)
+    return inner
+
+
+async def browser_lookup(url: str) -> Optional[dict]:
+    if _mode != "replay":
+        return None
+    latency = _replay_opts.get("latency_ms")
+    if latency:
+        await asyncio.sleep(latency / 1000.0)
+    return _archive.lookup_browser(url)
+
+
+def browser_record(url: str, result: Optional[dict]) -> None:
+    if _mode == "record" and result and result.get("html"):
+        try:
+            _archive.store_browser(url, result)
+        except Exception as e:
+            logger.warning(f"[replay] failed to record browser fetch {url}: {e}")
@@ -0,0 +1,531 @@
+"""
+Distributed crawl job queue.
+
+Every source crawl is a job keyed by source name. Jobs live in Redis (the
+same server that backs ``CacheManager``) so any number of crawler nodes can
+pull from one queue:
+
+    crawl:ready          ZSET  source -> priority score (tier, then enqueue time)
+    crawl:delayed        ZSET  source -> unix time the job becomes ready again
+    crawl:inflight       ZSET  source -> lease deadline
+    crawl:lease:<source> STR   owner id, expires with the lease
+    crawl:attempts       HASH  source -> failed attempts of the current job
+    crawl:breaker        HASH  source -> {"failures": n, "open_until": ts}
+    crawl:feed_state     HASH  feed url -> {"etag", "last_modified", "fetched_at"}
+
+Without ``REDIS_URL`` (or with ``REDIS_URL=memory://``) an in-process
+``FakeRedis`` is used, which is enough for a single node and for tests. With
+``CRAWL_DISTRIBUTED`` a real Redis is required: a per-process queue would
+silently split the pool into nodes that each crawl everything.
+
+Lease renewal and release compare the owner and act in one Lua script, so a
+lease that expires and is re-claimed in between is never extended or dropped
+on behalf of the previous owner.
+"""
+
+import fnmatch
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+from . import metrics
+from .settings import settings
+from .sources import source_tier
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+READY_KEY = "crawl:ready"
+DELAYED_KEY = "crawl:delayed"
+INFLIGHT_KEY = "crawl:inflight"
+LEASE_PREFIX = "crawl:lease:"
+ATTEMPTS_KEY = "crawl:attempts"
+BREAKER_KEY = "crawl:breaker"
+FEED_STATE_KEY = "crawl:feed_state"
+
+# Score band per tier: a tier-0 job always sorts before any tier-1 job
+_TIER_BAND = 10_000_000_000
+
+# KEYS: lease, inflight; ARGV: owner, lease ms, new deadline, source. 1 if renewed
+_RENEW_LUA = """
+if redis.call('get', KEYS[1]) ~= ARGV[1] then return 0 end
+redis.call('pexpire', KEYS[1], ARGV[2])
+redis.call('zadd', KEYS[2], ARGV[3], ARGV[4])
+return 1
+"""
+# KEYS: lease, inflight; ARGV: owner, source. The other holder, or nil once released
+_RELEASE_LUA = """
+local holder = redis.call('get', KEYS[1])
+if holder and holder ~= ARGV[1] then return holder end
+if holder then redis.call('del', KEYS[1]) end
+redis.call('zrem', KEYS[2], ARGV[2])
+return false
+"""
+
+
+class FakeRedis:
+    """
+    Minimal in-process stand-in for the subset of redis-py used here
+    (strings with NX/XX/PX, hashes and sorted sets). Thread-safe, but not
+    shared between processes.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self._clock = clock
+        self._data: dict = {}
+        self._expiry: dict = {}
+        self._lock = threading.RLock()
+
+    def _alive(self, key):
+        exp = self._expiry.get(key)
+        if exp is not None and self._clock() >= exp:
+            self._data.pop(key, None)
+            self._expiry.pop(key, None)
+        return key in self._data
+
+    def ping(self):
+        return True
+
+    def eval(self, script, numkeys, *args):
+        """The Lua scripts of this module, run as their Python equivalents under the lock."""
+        keys, argv = args[:numkeys], args[numkeys:]
+        with self._lock:
+            return _FAKE_SCRIPTS[script](self, keys, argv)
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+    # strings
+    def get(self, key):
+        with self._lock:
+            return self._data.get(key) if self._alive(key) else None
+
+    def set(self, key, value, nx=False, xx=False, px=None, ex=None):
+        with self._lock:
+            exists = self._alive(key)
+            if (nx and exists) or (xx and not exists):
+                return None
+            self._data[key] = str(value)
+            self._expiry.pop(key, None)
+            if px is not None:
+                self._expiry[key] = self._clock() + px / 1000.0
+            elif ex is not None:
+                self._expiry[key] = self._clock() + ex
+            return True
+
+    def delete(self, *keys):
+        with self._lock:
+            n = 0
+            for k in keys:
+                if self._alive(k):
+                    n += 1
+                self._data.pop(k, None)
+                self._expiry.pop(k, None)
+            return n
+
+    def keys(self, pattern="*"):
+        with self._lock:
+            return [k for k in list(self._data) if self._alive(k) and fnmatch.fnmatch(k, pattern)]
+
+    # hashes
+    def _hash(self, key):
+        if not self._alive(key):
+            self._data[key] = {}
+        return self._data[key]
+
+    def hget(self, key, field):
+        with self._lock:
+            return self._hash(key).get(field)
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        with self._lock:
+            h = self._hash(key)
+            items = dict(mapping or {})
+            if field is not None:
+                items[field] = value
+            added = sum(1 for f in items if f not in h)
+            h.update({f: str(v) for f, v in items.items()})
+            return added
+
+    def hdel(self, key, *fields):
+        with self._lock:
+            h = self._hash(key)
+            return sum(1 for f in fields if h.pop(f, None) is not None)
+
+    def hincrbyfloat(self, key, field, amount=1.0):
+        with self._lock:
+            h = self._hash(key)
+            h[field] = repr(float(h.get(field, 0)) + amount)
+            return float(h[field])
+
+    def hgetall(self, key):
+        with self._lock:
+            return dict(self._hash(key))
+
+    def hincrby(self, key, field, amount=1):
+        with self._lock:
+            h = self._hash(key)
+            h[field] = str(int(h.get(field, 0)) + amount)
+            return int(h[field])
+
+    # sorted sets
+    def _zset(self, key):
+        if not self._alive(key):
+            self._data[key] = {}
+        return self._data[key]
+
+    def zadd(self, key, mapping, nx=False):
+        with self._lock:
+            z = self._zset(key)
+            added = 0
+            for m, s in mapping.items():
+                if m in z:
+                    if nx:
+                        continue
+                else:
+                    added += 1
+                z[m] = float(s)
+            return added
+
+    def zrem(self, key, *members):
+        with self._lock:
+            z = self._zset(key)
+            return sum(1 for m in members if z.pop(m, None) is not None)
+
+    def zscore(self, key, member):
+        with self._lock:
+            return self._zset(key).get(member)
+
+    def zcard(self, key):
+        with self._lock:
+            return len(self._zset(key))
+
+    def zrangebyscore(self, key, min, max, start=None, num=None, withscores=False):
+        with self._lock:
+            lo = float("-inf") if min == "-inf" else float(min)
+            hi = float("inf") if max == "+inf" else float(max)
+            items = sorted(((m, s) for m, s in self._zset(key).items() if lo <= s <= hi), key=lambda x: (x[1], x[0]))
+            if start is not None and num is not None:
+                items = items[start:start + num]
+            return items if withscores else [m for m, _ in items]
+
+
+class _FakePipeline:
+    """Queues FakeRedis calls until ``execute``, like a redis-py pipeline."""
+
+    def __init__(self, client: FakeRedis):
+        self._client = client
+        self._calls: list = []
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+
+        def queue(*args, **kwargs):
+            self._calls.append((method, args, kwargs))
+            return self
+        return queue
+
+    def execute(self) -> list:
+        calls, self._calls = self._calls, []
+        with self._client._lock:
+            return [method(*args, **kwargs) for method, args, kwargs in calls]
+
+
+def _fake_renew(r: FakeRedis, keys, argv):
+    if r.get(keys[0]) != argv[0]:
+        return 0
+    r.set(keys[0], argv[0], xx=True, px=int(argv[1]))
+    r.zadd(keys[1], {argv[3]: float(argv[2])})
+    return 1
+
+
+def _fake_release(r: FakeRedis, keys, argv):
+    holder = r.get(keys[0])
+    if holder is not None and holder != argv[0]:
+        return holder
+    if holder is not None:
+        r.delete(keys[0])
+    r.zrem(keys[1], argv[1])
+    return None
+
+
+_FAKE_SCRIPTS = {_RENEW_LUA: _fake_renew, _RELEASE_LUA: _fake_release}
+
+
+class CrawlJobQueue:
+    """Lease-based crawl job queue with tier priority, retry backoff and a per-source breaker."""
+
+    def __init__(self, client=None, owner: str | None = None, clock: Callable[[], float] = time.time,
+                 lease_seconds: int | None = None, max_attempts: int | None = None,
+                 backoff_seconds: int | None = None, breaker_threshold: int | None = None,
+                 breaker_cooldown_seconds: int | None = None):
+        self.r = client if client is not None else FakeRedis(clock=clock)
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self.clock = clock
+        self.lease_seconds = lease_seconds or settings.crawl_job_lease_seconds
+        self.max_attempts = max_attempts or settings.crawl_job_max_attempts
+        self.backoff_seconds = backoff_seconds or settings.crawl_job_backoff_seconds
+        self.breaker_threshold = breaker_threshold or settings.crawl_breaker_threshold
+        self.breaker_cooldown_seconds = breaker_cooldown_seconds or settings.crawl_breaker_cooldown_seconds
+
+    # --------------------------------------------------------------
+    # producer side
+    # --------------------------------------------------------------
+    def enqueue(self, sources: list[str]) -> int:
+        """Queue a crawl job per source. Sources already queued or in flight are skipped."""
+        now = self.clock()
+        added = 0
+        for name in sources:
+            if self.r.zscore(INFLIGHT_KEY, name) is not None or self.r.zscore(DELAYED_KEY, name) is not None:
+                continue
+            score = source_tier(name) * _TIER_BAND + now
+            added += self.r.zadd(READY_KEY, {name: score}, nx=True)
+        self._publish_depth()
+        return added
+
+    def promote_due(self) -> int:
+        """Move delayed jobs whose backoff has elapsed, and expired leases, back to ready."""
+        now = self.clock()
+        moved = 0
+        for name in self.r.zrangebyscore(DELAYED_KEY, "-inf", now):
+            if self.r.zrem(DELAYED_KEY, name):
+                moved += self.r.zadd(READY_KEY, {name: source_tier(name) * _TIER_BAND + now}, nx=True)
+        for name in self.r.zrangebyscore(INFLIGHT_KEY, "-inf", now):
+            # Lease ran out: the node that claimed it died or hung
+            if self.r.get(LEASE_PREFIX + name) is None and self.r.zrem(INFLIGHT_KEY, name):
+                logger.warning(f"[QUEUE] lease expired for {name}, re-queueing")
+                moved += self.r.zadd(READY_KEY, {name: source_tier(name) * _TIER_BAND + now}, nx=True)
+        return moved
+
+    # --------------------------------------------------------------
+    # consumer side
+    # --------------------------------------------------------------
+    def claim(self, max_jobs: int = 1) -> list[str]:
+        """Lease up to max_jobs ready sources for this owner, highest priority first."""
+        self.promote_due()
+        now = self.clock()
+        claimed: list[str] = []
+        offset = 0
+        while len(claimed) < max_jobs:
+            batch = self.r.zrangebyscore(READY_KEY, "-inf", "+inf", start=offset, num=max_jobs * 2)
+            if not batch:
+                break
+            for name in batch:
+                if len(claimed) >= max_jobs:
+                    break
+                open_until = self.breaker_open_until(name)
+                if open_until:
+                    # Source is tripped: park it until the cooldown ends
+                    if self.r.zrem(READY_KEY, name):
+                        self.r.zadd(DELAYED_KEY, {name: open_until})
+                    continue
+                if not self.r.set(LEASE_PREFIX + name, self.owner, nx=True, px=self.lease_seconds * 1000):
+                    offset += 1
+                    continue
+                if not self.r.zrem(READY_KEY, name):
+                    # Another node removed it between our read and our lease
+                    self.r.delete(LEASE_PREFIX + name)
+                    continue
+                self.r.zadd(INFLIGHT_KEY, {name: now + self.lease_seconds})
+                claimed.append(name)
+        self._publish_depth()
+        return claimed
+
+    def renew(self, name: str) -> bool:
+        """Extend our lease on a running job. False if we lost it."""
+        return bool(self.r.eval(_RENEW_LUA, 2, LEASE_PREFIX + name, INFLIGHT_KEY,
+                                self.owner, self.lease_seconds * 1000, self.clock() + self.lease_seconds, name))
+
+    @contextmanager
+    def leased(self, names: list[str], interval: float | None = None) -> Iterator[None]:
+        """Renew the leases on ``names`` from a heartbeat thread while the block runs."""
+        interval = interval or self.lease_seconds / 3
+        done = threading.Event()
+
+        def beat():
+            while not done.wait(interval):
+                for name in names:
+                    if not self.renew(name):
+                        logger.warning(f"[QUEUE] lost lease on {name} while crawling it")
+
+        thread = threading.Thread(target=beat, name="crawl-lease-heartbeat", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            done.set()
+            thread.join()
+
+    def _release(self, name: str) -> bool:
+        """Drop our lease and in-flight entry; False if another node owns the job now."""
+        holder = self.r.eval(_RELEASE_LUA, 2, LEASE_PREFIX + name, INFLIGHT_KEY, self.owner, name)
+        if holder is not None:
+            logger.warning(f"[QUEUE] {name} was re-leased by {holder}, leaving it to them")
+            return False
+        return True
+
+    def ack(self, name: str) -> None:
+        """Job finished successfully."""
+        if not self._release(name):
+            return
+        self.r.hdel(ATTEMPTS_KEY, name)
+        if self.r.hdel(BREAKER_KEY, name):
+            metrics.BREAKER_OPEN.set(0, source=name)
+
+    def requeue(self, name: str) -> bool:
+        """Job ran out of cycle budget: put it back at the front of its tier, no attempt counted."""
+        if not self._release(name):
+            return False
+        self.r.zadd(READY_KEY, {name: source_tier(name) * _TIER_BAND}, nx=True)
+        self._publish_depth()
+        return True
+
+    def fail(self, name: str, error: str | None = None) -> float | None:
+        """
+        Job failed. Retries with exponential backoff until max_attempts, then
+        drops the job. Returns the retry time, or None if dropped (or owned
+        by another node by now).
+        """
+        if not self._release(name):
+            return None
+        self._record_breaker_failure(name)
+        attempts = self.r.hincrby(ATTEMPTS_KEY, name, 1)
+        if attempts >= self.max_attempts:
+            self.r.hdel(ATTEMPTS_KEY, name)
+            logger.warning(f"[QUEUE] {name} failed {attempts} times, giving up until next schedule: {error}")
+            return None
+        retry_at = self.clock() + self.backoff_seconds * (2 ** (attempts - 1))
+        self.r.zadd(DELAYED_KEY, {name: retry_at})
+        return retry_at
+
+    # --------------------------------------------------------------
+    # per-source breaker
+    # --------------------------------------------------------------
+    def breaker_open_until(self, name: str) -> float | None:
+        raw = self.r.hget(BREAKER_KEY, name)
+        if not raw:
+            return None
+        state = json.loads(raw)
+        open_until = state.get("open_until")
+        return open_until if open_until and open_until > self.clock() else None
+
+    def _record_breaker_failure(self, name: str) -> None:
+        raw = self.r.hget(BREAKER_KEY, name)
+        state = json.loads(raw) if raw else {"failures": 0, "open_until": None}
+        state["failures"] += 1
+        if state["failures"] >= self.breaker_threshold:
+            state["open_until"] = self.clock() + self.breaker_cooldown_seconds
+            metrics.BREAKER_OPEN.set(1, source=name)
+            logger.warning(f"[QUEUE] breaker open for {name} ({state['failures']} consecutive failures)")
+        self.r.hset(BREAKER_KEY, name, json.dumps(state))
+
+    def _publish_depth(self) -> None:
+        for state, depth in self.stats().items():
+            metrics.JOB_QUEUE_DEPTH.set(depth, state=state)
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.r.zcard(READY_KEY),
+            "delayed": self.r.zcard(DELAYED_KEY),
+            "inflight": self.r.zcard(INFLIGHT_KEY),
+        }
+
+
+class SharedFeedState(dict):
+    """
+    ETag / Last-Modified store shared by all crawler nodes.
+
+    Behaves like the dict loaded from data/feed_state.json, but every write
+    goes straight to the ``crawl:feed_state`` hash.
+    """
+
+    def __init__(self, client):
+        super().__init__()
+        self.r = client
+        for url, raw in (client.hgetall(FEED_STATE_KEY) or {}).items():
+            try:
+                super().__setitem__(url, json.loads(raw))
+            except (TypeError, ValueError):
+                continue
+
+    def __setitem__(self, url, value):
+        super().__setitem__(url, value)
+        self.r.hset(FEED_STATE_KEY, url, json.dumps(value, ensure_ascii=False))
+
+
+_shared_client = None
+
+
+def get_redis_client():
+    """
+    Redis client for crawl coordination and metrics, or a process-local
+    FakeRedis. With ``crawl_distributed`` there is no fallback: RuntimeError
+    until Redis is reachable.
+    """
+    global _shared_client
+    if _shared_client is not None:
+        return _shared_client
+    url = settings.redis_url
+    if REDIS_AVAILABLE and url and not url.startswith("memory://"):
+        try:
+            client = redis.from_url(url, decode_responses=True)
+            client.ping()
+            _shared_client = client
+            return client
+        except Exception as e:
+            if settings.crawl_distributed:
+                raise RuntimeError(f"CRAWL_DISTRIBUTED needs Redis, connection to REDIS_URL failed: {e}") from e
+            logger.error(f"Redis connection failed: {e}. Using local in-memory crawl queue.")
+    elif settings.crawl_distributed:
+        raise RuntimeError("CRAWL_DISTRIBUTED needs a Redis REDIS_URL (and the redis package); "
+                           "an in-memory queue would not be shared between nodes")
+    _shared_client = FakeRedis()
+    return _shared_client
+
+
+def get_queue() -> CrawlJobQueue:
+    return CrawlJobQueue(get_redis_client())
+
+
+def run_consumer(batch_size: int | None = None, idle_sleep: float = 5.0, stop: threading.Event | None = None) -> None:
+    """
+    Pull jobs until ``stop`` is set. Each claimed batch runs through the
+    regular crawl pipeline; per-source errors decide ack vs retry, and sources
+    the cycle budget deferred are re-queued for the next free consumer.
+    """
+    from .crawler import process_once
+    queue = get_queue()
+    batch_size = batch_size or settings.crawl_consumer_batch_size
+    stop = stop or threading.Event()
+    logger.info(f"[QUEUE] consumer {queue.owner} started (batch={batch_size})")
+    while not stop.is_set():
+        names = queue.claim(batch_size)
+        if not names:
+            stop.wait(idle_sleep)
+            continue
+        try:
+            with queue.leased(names):
+                result = process_once(only_sources=names, trigger="consumer")
+        except Exception as e:
+            for name in names:
+                queue.fail(name, str(e))
+            continue
+        errors = {s["source"]: s.get("error") for s in result.get("per_source", [])}
+        deferred = {s["source"] for s in result.get("per_source", []) if s.get("deferred")}
+        for name in names:
+            if name in deferred:
+                queue.requeue(name)
+            elif errors.get(name):
+                queue.fail(name, errors[name])
+            else:
+                queue.ack(name)
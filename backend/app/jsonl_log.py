@@ -0,0 +1,246 @@
+"""
+Append-only JSONL logs with a background writer, segment rotation and an
+offset index.
+
+The crawler logs every skipped candidate (``review_potential_disasters``)
+and every run (``crawl_log``). Records are queued and written by one thread
+in batches, so a cycle never blocks on file I/O per record.
+
+Layout under ``logs/`` for a log named ``crawl_log``::
+
+    crawl_log.jsonl            active segment (plain JSONL, as before)
+    crawl_log.jsonl.idx        one 24-byte entry per record
+    crawl_log.000042.jsonl     rotated segments (+ .idx), oldest pruned
+
+An index entry is ``<offset u64, timestamp f64, tag1 u32, tag2 u32>``; the
+tags are CRC32s of two fields chosen per log (``action`` and ``source`` for
+the review log). "Last N", time-bounded and field-filtered queries walk the
+index backwards and only seek to and parse matching records.
+
+A segment is rotated once it exceeds ``log_segment_bytes``; the newest
+``max_segments`` are kept. An active segment without an index (a file
+written before this module) is indexed on first use.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import re
+import struct
+import threading
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, Optional
+
+from .settings import BASE_DIR, settings
+
+logger = logging.getLogger(__name__)
+
+LOGS_DIR = BASE_DIR / "logs"
+_ENTRY = struct.Struct("<QdII")
+_SEGMENT_RE = re.compile(r"\.(\d{6})\.jsonl$")
+
+
+def _tag(value) -> int:
+    return zlib.crc32(str(value).encode("utf-8")) if value is not None else 0
+
+
+def _ts(record: dict) -> float:
+    value = record.get("timestamp")
+    if value:
+        try:
+            dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=timezone.utc)
+            return dt.timestamp()
+        except ValueError:
+            pass
+    return datetime.now(timezone.utc).timestamp()
+
+
+class JsonlLog:
+    def __init__(self, name: str, tag_fields: tuple[str, str] = ("", ""), max_segments: int = 8,
+                 directory: Path | None = None, segment_bytes: int | None = None):
+        self.name = name
+        self.tag_fields = tag_fields
+        self.max_segments = max_segments
+        self.directory = Path(directory) if directory else LOGS_DIR
+        self.segment_bytes = segment_bytes or settings.log_segment_bytes
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._io_lock = threading.Lock()
+
+    @property
+    def path(self) -> Path:
+        return self.directory / f"{self.name}.jsonl"
+
+    @staticmethod
+    def _idx(segment: Path) -> Path:
+        return segment.with_name(segment.name + ".idx")
+
+    def segments(self) -> list[Path]:
+        """Oldest first; the active segment last."""
+        rotated = sorted(p for p in self.directory.glob(f"{self.name}.*.jsonl") if _SEGMENT_RE.search(p.name))
+        return rotated + ([self.path] if self.path.exists() else [])
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+    def append(self, record: dict) -> None:
+        """Queue a record; never blocks on disk."""
+        if self._thread is None or not self._thread.is_alive():
+            with self._start_lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name=f"jsonl-log-{self.name}", daemon=True)
+                    self._thread.start()
+        self._queue.put(record)
+
+    def flush(self) -> None:
+        """Block until everything queued so far is on disk."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def _run(self) -> None:
+        flush_seconds = settings.log_flush_ms / 1000.0
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < 500:
+                    batch.append(self._queue.get(timeout=flush_seconds))
+            except queue.Empty:
+                pass
+            try:
+                self.write(batch)
+            except Exception as e:
+                logger.warning(f"[log] {self.name}: dropped {len(batch)} records: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def write(self, records: list[dict]) -> None:
+        """Append records to the active segment synchronously."""
+        with self._io_lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._ensure_index(self.path)
+            data, entries = [], []
+            offset = self.path.stat().st_size if self.path.exists() else 0
+            for rec in records:
+                line = (json.dumps(rec, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+                entries.append(self._entry(offset, rec))
+                data.append(line)
+                offset += len(line)
+            # Data before index: a reader never gets an entry past the end of the file
+            with self.path.open("ab") as f:
+                f.write(b"".join(data))
+            with self._idx(self.path).open("ab") as f:
+                f.write(b"".join(entries))
+            if offset >= self.segment_bytes:
+                self._rotate()
+
+    def _entry(self, offset: int, rec: dict) -> bytes:
+        f1, f2 = self.tag_fields
+        return _ENTRY.pack(offset, _ts(rec), _tag(rec.get(f1)) if f1 else 0, _tag(rec.get(f2)) if f2 else 0)
+
+    def _rotate(self) -> None:
+        rotated = [p for p in self.segments() if p != self.path]
+        seq = int(_SEGMENT_RE.search(rotated[-1].name).group(1)) + 1 if rotated else 1
+        target = self.directory / f"{self.name}.{seq:06d}.jsonl"
+        os.replace(self._idx(self.path), self._idx(target))
+        os.replace(self.path, target)
+        keep = max(self.max_segments - 1, 1)  # the next active segment is the other one
+        for old in (rotated + [target])[:-keep]:
+            for p in (old, self._idx(old)):
+                try:
+                    p.unlink()
+                except FileNotFoundError:
+                    pass
+
+    def _ensure_index(self, segment: Path) -> None:
+        """Index a segment written without one (pre-existing logs)."""
+        idx = self._idx(segment)
+        if idx.exists() or not segment.exists():
+            return
+        offset = 0
+        with segment.open("rb") as f, idx.open("wb") as out:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    rec = None
+                if isinstance(rec, dict):
+                    out.write(self._entry(offset, rec))
+                offset += len(line)
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+    def _entries_reversed(self, segment: Path, chunk: int = 4096) -> Iterator[tuple[int, float, int, int]]:
+        idx = self._idx(segment)
+        with idx.open("rb") as f:
+            end = os.fstat(f.fileno()).st_size // _ENTRY.size
+            while end > 0:
+                start = max(0, end - chunk)
+                f.seek(start * _ENTRY.size)
+                buf = f.read((end - start) * _ENTRY.size)
+                for i in range(len(buf) // _ENTRY.size - 1, -1, -1):
+                    yield _ENTRY.unpack_from(buf, i * _ENTRY.size)
+                end = start
+
+    def iter_reversed(self, since: datetime | None = None, **filters) -> Iterator[dict]:
+        """Newest first. ``filters`` match the two tag fields exactly, e.g. ``action="auto_blacklisted"``."""
+        since_ts = since.replace(tzinfo=since.tzinfo or timezone.utc).timestamp() if since else None
+        want = {}
+        for pos, field in enumerate(self.tag_fields):
+            if field and filters.get(field) is not None:
+                want[pos] = (field, filters[field], _tag(filters[field]))
+        unknown = set(k for k, v in filters.items() if v is not None) - {w[0] for w in want.values()}
+        if unknown:
+            raise ValueError(f"{self.name} is not indexed on {', '.join(sorted(unknown))}")
+
+        for segment in reversed(self.segments()):
+            try:
+                with self._io_lock:
+                    self._ensure_index(segment)
+                with segment.open("rb") as data:
+                    for offset, ts, t1, t2 in self._entries_reversed(segment):
+                        if since_ts is not None and ts < since_ts:
+                            return
+                        if any((t1, t2)[pos] != tag for pos, (_, _, tag) in want.items()):
+                            continue
+                        data.seek(offset)
+                        try:
+                            rec = json.loads(data.readline())
+                        except ValueError:
+                            continue
+                        # CRC32 can collide; confirm on the record itself
+                        if all(rec.get(field) == value for field, value, _ in want.values()):
+                            yield rec
+            except FileNotFoundError:
+                continue  # rotated or pruned while reading
+
+    def tail(self, limit: int, since: datetime | None = None, **filters) -> list[dict]:
+        """Last ``limit`` matching records, oldest first (like ``lines[-limit:]``)."""
+        out = []
+        for rec in self.iter_reversed(since=since, **filters):
+            out.append(rec)
+            if len(out) >= limit:
+                break
+        out.reverse()
+        return out
+
+
+review_log = JsonlLog("review_potential_disasters", tag_fields=("action", "source"),
+                      max_segments=settings.log_review_max_segments)
+crawl_log = JsonlLog("crawl_log", tag_fields=("run_id", ""), max_segments=settings.log_crawl_max_segments)
+
+
+def flush_all() -> None:
+    review_log.flush()
+    crawl_log.flush()
+
+
+atexit.register(flush_all)
@@ -0,0 +1,386 @@
+"""
+Delta crawler for sources without a working RSS feed.
+
+Most Vietnamese publishers expose a ``news-sitemap`` (Google News sitemap,
+with title and publication date per article) or at least a ``sitemap.xml``.
+Those are preferred over scraping the homepage:
+
+* sitemap endpoints are discovered once per source (``robots.txt`` then the
+  usual paths) and kept in the feed state under ``sitemaps:<source>`` with
+  the date checked, so sources without one are re-probed only every
+  ``listing_rediscover_days``. A crawl never writes ``sources.json``; its
+  ``"sitemaps"`` entries, written by the ``discover`` command below or by
+  hand, take precedence;
+* sitemaps are fetched with the crawler's conditional GET (ETag /
+  Last-Modified in the feed state), so an unchanged sitemap costs a 304;
+* every listing is diffed against the snapshot of links seen before (one
+  ``listing_snapshots`` row per sitemap or listing page, so it is shared in
+  distributed mode and a change rewrites only that row) and only new links
+  go on to the keyword filter and the pipeline. Links enter the snapshot
+  once emitted or rejected; the overflow of a busy cycle stays new, and its
+  sitemap is re-read in full next cycle.
+
+Sources without a sitemap keep using ``HTMLScraper.scrape_source``; its
+output goes through the same snapshot diff.
+
+    python -m app.listing_crawler discover [--source NAME ...] [--refresh]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import html
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from . import http_replay
+from .database import SessionLocal
+from .models import ListingSnapshot
+from .risk_lookup import strip_accents
+from .settings import settings
+from .sources import CONFIG_FILE, DISASTER_KEYWORDS, Source
+
+logger = logging.getLogger(__name__)
+
+SITEMAP_PATHS = [
+    "/news-sitemap.xml", "/sitemap-news.xml", "/sitemaps/news.xml", "/sitemap_news.xml",
+    "/sitemap.xml", "/sitemap_index.xml", "/sitemaps.xml",
+]
+_SNAPSHOT_MAX = 2000
+_URL_RE = re.compile(r"<url>(.*?)</url>", re.S | re.I)
+_SITEMAP_RE = re.compile(r"<sitemap>(.*?)</sitemap>", re.S | re.I)
+_TITLE_RE = re.compile(r'<meta[^>]+property=["\']og:title["\'][^>]+content=["\']([^"\']+)|<title[^>]*>(.*?)</title>', re.S | re.I)
+_SLUG_SPLIT_RE = re.compile(r"[-_/]+|\.html?$|\d{5,}")
+
+# URL slugs are unaccented: multi-word disaster keywords survive that well enough
+# to pick which title-less sitemap entries are worth a page-title fetch
+_SLUG_RE = re.compile(r"\b(?:" + "|".join(sorted(
+    {re.escape(strip_accents(k.lower().strip())) for k in DISASTER_KEYWORDS if " " in k.strip()},
+    key=len, reverse=True)) + r")\b")
+
+Fetch = Callable[[str], Awaitable[dict]]
+
+
+@dataclass
+class ListingItem:
+    url: str
+    title: str
+    published_at: datetime
+    summary: str = ""
+
+
+def _tag(block: str, name: str) -> Optional[str]:
+    m = re.search(rf"<{name}[^>]*>(.*?)</{name}>", block, re.S | re.I)
+    if not m:
+        return None
+    value = m.group(1).strip()
+    if value.startswith("<![CDATA["):
+        value = value[9:-3]
+    return html.unescape(value).strip() or None
+
+
+def _parse_date(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def parse_sitemap(xml: str) -> tuple[list[tuple[str, Optional[datetime]]], list[ListingItem]]:
+    """(child sitemaps with lastmod, url entries) of a sitemap or sitemap index."""
+    children = []
+    for block in _SITEMAP_RE.findall(xml):
+        loc = _tag(block, "loc")
+        if loc:
+            children.append((loc, _parse_date(_tag(block, "lastmod"))))
+    items = []
+    for block in _URL_RE.findall(xml):
+        loc = _tag(block, "loc")
+        if not loc:
+            continue
+        published = _parse_date(_tag(block, "news:publication_date")) or _parse_date(_tag(block, "lastmod"))
+        items.append(ListingItem(loc, _tag(block, "news:title") or "", published or datetime.utcnow()))
+    return children, items
+
+
+def _is_sitemap(text: str) -> bool:
+    head = text[:2000].lower()
+    return "<urlset" in head or "<sitemapindex" in head
+
+
+def _is_news(url: str, text: str = "") -> bool:
+    return "news" in url.lower() or "xmlns:news" in text[:2000]
+
+
+def slug_matches(url: str) -> bool:
+    """Keyword filter on the URL slug, for sitemap entries without a title."""
+    slug = " ".join(_SLUG_SPLIT_RE.split(urlparse(url).path.lower()))
+    return bool(_SLUG_RE.search(slug))
+
+
+# ----------------------------------------------------------------------
+# Discovery
+# ----------------------------------------------------------------------
+async def discover(client: httpx.AsyncClient, domain: str) -> list[str]:
+    """Sitemap URLs of a domain, news sitemaps first."""
+    base = f"https://{domain.strip('/')}"
+    candidates: list[str] = []
+    try:
+        r = await client.get(base + "/robots.txt", timeout=10)
+        if r.status_code == 200:
+            candidates += [line.split(":", 1)[1].strip() for line in r.text.splitlines()
+                           if line.lower().startswith("sitemap:")]
+    except httpx.HTTPError:
+        pass
+    candidates += [base + p for p in SITEMAP_PATHS]
+
+    found, news = [], []
+    for url in dict.fromkeys(candidates):
+        try:
+            r = await client.get(url, timeout=10)
+        except httpx.HTTPError:
+            continue
+        if r.status_code != 200 or not _is_sitemap(r.text):
+            continue
+        (news if _is_news(url, r.text) else found).append(url)
+        if news and len(found) + len(news) >= 2:
+            break
+    return (news + found)[:3]
+
+
+def _discovery_key(name: str) -> str:
+    return f"sitemaps:{name}"
+
+
+def sitemaps_for(src: Source, feed_state: dict) -> Optional[list[str]]:
+    """Known sitemap URLs, or None when the source is due for (re)discovery."""
+    record = feed_state.get(_discovery_key(src.name))
+    if src.sitemaps or (src.sitemaps is not None and record is None):
+        sitemaps, checked = src.sitemaps, src.sitemaps_checked
+    elif record is not None:
+        sitemaps, checked = record.get("sitemaps", []), record.get("checked")
+    else:
+        return None
+    if not sitemaps and checked:
+        checked = _parse_date(checked)
+        if checked and checked < datetime.utcnow() - timedelta(days=settings.listing_rediscover_days):
+            return None
+    return list(sitemaps)
+
+
+def record_discovery(feed_state: dict, name: str, sitemaps: list[str]) -> None:
+    """Remember what a crawl discovered for a source, in the feed state (shared in distributed mode)."""
+    feed_state[_discovery_key(name)] = {"sitemaps": sitemaps, "checked": datetime.utcnow().date().isoformat()}
+
+
+def save_sitemaps(found: dict[str, list[str]], path: Path = CONFIG_FILE) -> None:
+    """Record discovery results in sources.json (the ``discover`` command), leaving everything else untouched."""
+    if http_replay.active_mode() == "replay":
+        return
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        today = datetime.utcnow().date().isoformat()
+        for entry in data.get("sources", []):
+            if entry["name"] in found:
+                entry["sitemaps"] = found[entry["name"]]
+                entry["sitemaps_checked"] = today
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, path)
+    except Exception as e:
+        logger.warning(f"[listing] could not save sitemaps to {path}: {e}")
+
+
+# ----------------------------------------------------------------------
+# Snapshot diff
+# ----------------------------------------------------------------------
+def _h(url: str) -> str:
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+
+
+class ListingSnapshots:
+    """
+    Snapshots by key, read from ``listing_snapshots`` once per crawl cycle;
+    ``snapshots[key] = hashes`` writes that one row. Any mapping with ``get``
+    and item assignment (a dict in tests) works in its place.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self._session = session_factory
+        self._cache: dict[str, Optional[list[str]]] = {}
+
+    def get(self, key: str, default=None):
+        if key not in self._cache:
+            with self._session() as db:
+                row = db.get(ListingSnapshot, key)
+                self._cache[key] = list(row.seen) if row is not None else None
+        value = self._cache[key]
+        return default if value is None else value
+
+    def __setitem__(self, key: str, seen: list[str]) -> None:
+        self._cache[key] = seen
+        try:
+            with self._session() as db:
+                db.merge(ListingSnapshot(key=key, seen=seen, updated_at=datetime.utcnow()))
+                db.commit()
+        except Exception as e:
+            # Worst case the links come up again next cycle, where dedup drops them
+            logger.warning(f"[listing] could not save snapshot {key}: {e}")
+
+
+def diff_snapshot(snapshots, key: str, urls: list[str]) -> set[str]:
+    """URLs not in the snapshot under ``key``; the snapshot itself is left as is."""
+    known = set(snapshots.get(key, []))
+    return {u for u in urls if _h(u) not in known}
+
+
+def mark_seen(snapshots, key: str, urls) -> None:
+    """Add ``urls`` to the snapshot under ``key``, once they were emitted or deliberately rejected."""
+    seen = snapshots.get(key, [])
+    known = set(seen)
+    added = list(dict.fromkeys(h for h in map(_h, urls) if h not in known))
+    if added:
+        snapshots[key] = (seen + added)[-_SNAPSHOT_MAX:]
+
+
+def _force_refetch(feed_state: dict, key: str) -> None:
+    """Drop a sitemap's validators so its next fetch is a full 200, not a 304 hiding carried-over links."""
+    entry = feed_state.get(key)
+    if entry and ("etag" in entry or "last_modified" in entry):
+        feed_state[key] = {k: v for k, v in entry.items() if k not in ("etag", "last_modified")}
+
+
+# ----------------------------------------------------------------------
+# Crawl
+# ----------------------------------------------------------------------
+async def _fetch_title(client: httpx.AsyncClient, url: str) -> Optional[str]:
+    try:
+        r = await client.get(url, timeout=settings.request_timeout_seconds)
+        r.raise_for_status()
+    except httpx.HTTPError:
+        return None
+    m = _TITLE_RE.search(r.text[:50000])
+    if not m:
+        return None
+    return re.sub(r"\s+", " ", html.unescape(m.group(1) or m.group(2))).strip() or None
+
+
+async def crawl_sitemaps(client: httpx.AsyncClient, fetch: Fetch, feed_state: dict, snapshots, sitemaps: list[str],
+                         since: datetime, limit: int = 50) -> tuple[list[ListingItem], dict]:
+    """
+    New articles from a source's sitemaps (at most ``limit``); ``fetch`` is the
+    crawler's conditional GET (validators in ``feed_state``), ``snapshots`` a
+    ``ListingSnapshots``. Links are added to the snapshot only once they
+    are returned or rejected by the slug filter; the rest (over ``limit``, over
+    the title-fetch budget, failed title fetches) stay new for the next cycle.
+    """
+    stat = {"sitemaps": 0, "not_modified": 0, "errors": 0, "listed": 0, "listed_24h": 0, "new": 0, "carried": 0}
+    day_ago = datetime.utcnow() - timedelta(hours=24)
+    queue, items, seen_urls = list(sitemaps), [], set()
+    origin: dict[str, list[str]] = {}
+    while queue and stat["sitemaps"] < 6:
+        url = queue.pop(0)
+        if url in seen_urls:
+            continue
+        seen_urls.add(url)
+        res = await fetch(url)
+        stat["sitemaps"] += 1
+        if res.get("not_modified"):
+            stat["not_modified"] += 1
+            continue
+        if "error" in res:
+            stat["errors"] += 1
+            logger.debug(f"[listing] {url}: {res['error']}")
+            continue
+        children, entries = await asyncio.to_thread(parse_sitemap, res.get("text", ""))
+        if children:
+            # Index: news sitemaps, else the most recently modified children
+            news = [c for c, _ in children if _is_news(c)]
+            recent = sorted(children, key=lambda c: c[1] or datetime.min, reverse=True)
+            queue += news[:2] or [c for c, _ in recent[:2]]
+        fresh = [e for e in entries if e.published_at >= since]
+        stat["listed"] += len(fresh)
+        stat["listed_24h"] += sum(1 for e in fresh if e.published_at >= day_ago)
+        new = diff_snapshot(snapshots, url, [e.url for e in fresh])
+        for e in fresh:
+            if e.url in new:
+                if e.url not in origin:
+                    items.append(e)
+                origin.setdefault(e.url, []).append(url)
+
+    # Plain sitemaps carry no titles: filter on the slug, then read the page title
+    titled = [e for e in items if e.title]
+    rejected = [e for e in items if not e.title and not slug_matches(e.url)]
+    untitled = [e for e in items if not e.title and slug_matches(e.url)]
+    for e in untitled[:settings.listing_title_fetches]:
+        e.title = await _fetch_title(client, e.url) or ""
+    out = (titled + [e for e in untitled if e.title])[:limit]
+
+    done: dict[str, list[str]] = {}
+    for e in out + rejected:
+        for key in origin[e.url]:
+            done.setdefault(key, []).append(e.url)
+    for key, urls in done.items():
+        mark_seen(snapshots, key, urls)
+    handled = {e.url for e in out + rejected}
+    for key in {k for e in items if e.url not in handled for k in origin[e.url]}:
+        _force_refetch(feed_state, key)
+    stat["new"] = len(out)
+    stat["carried"] = len(items) - len(handled)
+    return out, stat
+
+
+def diff_listing(snapshots, domain: str, scraped: list[dict]) -> list[dict]:
+    """Scraped listing links that were not on the page last time (see ``mark_listing_seen``)."""
+    new = diff_snapshot(snapshots, f"listing:{domain}", [a.get("url", "") for a in scraped if a.get("url")])
+    return [a for a in scraped if a.get("url") in new]
+
+
+def mark_listing_seen(snapshots, domain: str, urls) -> None:
+    mark_seen(snapshots, f"listing:{domain}", urls)
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+async def _discover_all(names: list[str] | None, refresh: bool) -> dict[str, list[str]]:
+    from .sources import SOURCES
+    todo = [s for s in SOURCES if (not names or s.name in names) and (refresh or s.sitemaps is None)]
+    found = {}
+    async with httpx.AsyncClient(follow_redirects=True, verify=False, transport=http_replay.wrap_transport(),
+                                 headers={"User-Agent": settings.user_agents[0]}) as client:
+        for src in todo:
+            found[src.name] = await discover(client, src.domain)
+            print(f"{src.name:<32} {', '.join(found[src.name]) or '-'}")
+    return found
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.listing_crawler")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("discover", help="Find sitemap endpoints and store them in sources.json")
+    p.add_argument("--source", action="append", help="Source name (repeatable); default all")
+    p.add_argument("--refresh", action="store_true", help="Re-probe sources that already have an entry")
+    args = parser.parse_args(argv)
+
+    found = asyncio.run(_discover_all(args.source, args.refresh))
+    save_sitemaps(found)
+    print(f"{sum(1 for v in found.values() if v)}/{len(found)} sources have a sitemap")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,29 @@
 import os
 import logging
+from collections import deque
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
 def truncate_jsonl(file_path: Path, max_lines: int = 5000):
-    """Keep only the last max_lines in a jsonl file."""
+    """Keep only the last max_lines in a jsonl file (streamed, never the whole file in memory)."""
     if not file_path.exists():
         return
 
     try:
-        # Read all lines
         with open(file_path, "r", encoding="utf-8") as f:
-            lines = f.readlines()
+            tail = deque(f, maxlen=max_lines + 1)
 
-        if len(lines) <= max_lines:
+        if len(tail) <= max_lines:
             return
+        tail.popleft()
 
         # Write back only the last N lines
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.writelines(lines[-max_lines:])
-        
+        tmp = file_path.with_suffix(file_path.suffix + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(tail)
+        os.replace(tmp, file_path)
+
         logger.info(f"Truncated {file_path.name} to {max_lines} lines.")
     except Exception as e:
         logger.error(f"Failed to truncate {file_path}: {e}")
@@ -31,11 +34,8 @@ def rotate_logs():
     if not logs_dir.exists():
         return
 
-    # 1. crawl_log.jsonl: Keep last 1000 entries (it grows fast)
-    truncate_jsonl(logs_dir / "crawl_log.jsonl", max_lines=1000)
-
-    # 2. review_potential_disasters.jsonl: Keep 5000 entries
-    truncate_jsonl(logs_dir / "review_potential_disasters.jsonl", max_lines=15000)
+    # 1-2. crawl_log / review_potential_disasters rotate by size as they are
+    # written (app.jsonl_log); nothing to rewrite here
 
     # 3. sse_buffer.jsonl: Broadcaster already manages it, but let's ensure it's not massive
     truncate_jsonl(logs_dir / "sse_buffer.jsonl", max_lines=500)
@@ -0,0 +1,280 @@
+"""
+Counters, gauges and histograms for the crawler and the API, exposed in the
+Prometheus text format on ``GET /metrics``.
+
+Each process records into a local buffer, and a background thread flushes
+the deltas into Redis every ``FLUSH_INTERVAL_SECONDS`` in one pipelined round
+trip (HINCRBYFLOAT into the ``metrics:values`` hash for counters/histograms);
+recording never waits on Redis. The API renders ``/metrics`` from that hash, so gunicorn
+workers, the scheduler worker and every ``--consume`` node are summed into
+one view. Gauges cannot be summed, so each process writes its current values
+to its own ``metrics:gauges:<host:pid>`` hash on every flush and they are
+rendered with a ``process`` label (aggregate with max()/sum() in PromQL);
+a process that has not flushed for ``GAUGE_TTL_SECONDS`` is dropped. Without
+Redis each process only sees its own numbers.
+"""
+
+import atexit
+import logging
+import os
+import re
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+METRICS_KEY = "metrics:values"
+GAUGES_KEY = "metrics:gauges"
+GAUGE_PROCESSES_KEY = "metrics:gauge_processes"
+FLUSH_INTERVAL_SECONDS = 10
+GAUGE_TTL_SECONDS = 6 * FLUSH_INTERVAL_SECONDS
+
+# Latency buckets (seconds) wide enough for both NLP calls and Playwright
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_lock = threading.Lock()
+_increments: dict[str, float] = {}
+_gauges: dict[str, float] = {}
+_flusher_pid: int | None = None
+_families: dict[str, "_Metric"] = {}
+_LE = re.compile(r',?le="([^"]*)"')
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _series(name: str, labels: dict) -> str:
+    if not labels:
+        return name
+    inner = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+    return f"{name}{{{inner}}}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        _families[name] = self
+
+    def _labels(self, labels: dict) -> dict:
+        return {k: labels.get(k, "") for k in self.labelnames}
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        _add(_series(self.name, self._labels(labels)), amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with _lock:
+            _gauges[_series(self.name, self._labels(labels))] = float(value)
+        _ensure_flusher()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels) -> None:
+        base = self._labels(labels)
+        with _lock:
+            for b in self.buckets:
+                if value <= b:
+                    key = _series(f"{self.name}_bucket", {**base, "le": repr(float(b))})
+                    _increments[key] = _increments.get(key, 0.0) + 1
+            inf = _series(f"{self.name}_bucket", {**base, "le": "+Inf"})
+            _increments[inf] = _increments.get(inf, 0.0) + 1
+            s = _series(f"{self.name}_sum", base)
+            _increments[s] = _increments.get(s, 0.0) + value
+            c = _series(f"{self.name}_count", base)
+            _increments[c] = _increments.get(c, 0.0) + 1
+        _ensure_flusher()
+
+    @contextmanager
+    def time(self, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+
+def _add(key: str, amount: float) -> None:
+    with _lock:
+        _increments[key] = _increments.get(key, 0.0) + amount
+    _ensure_flusher()
+
+
+def _flush_loop() -> None:
+    while True:
+        time.sleep(FLUSH_INTERVAL_SECONDS)
+        flush()
+
+
+def _ensure_flusher() -> None:
+    """Start this process's flush thread (again after a fork: threads do not survive it)."""
+    global _flusher_pid
+    pid = os.getpid()
+    if _flusher_pid == pid:
+        return
+    with _lock:
+        if _flusher_pid == pid:
+            return
+        _flusher_pid = pid
+    threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True).start()
+
+
+def _process() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _client():
+    from .job_queue import get_redis_client
+    return get_redis_client()
+
+
+def flush() -> None:
+    """Push buffered deltas, and this process's gauges, to the shared store in one pipelined round trip."""
+    with _lock:
+        incs = dict(_increments)
+        gauges = dict(_gauges)
+        _increments.clear()
+    if not incs and not gauges:
+        return
+    try:
+        pipe = _client().pipeline(transaction=False)
+        for key, amount in incs.items():
+            pipe.hincrbyfloat(METRICS_KEY, key, amount)
+        if gauges:
+            # Rewritten every flush: it doubles as this process's heartbeat
+            proc = _process()
+            pipe.hset(f"{GAUGES_KEY}:{proc}", mapping=gauges)
+            pipe.zadd(GAUGE_PROCESSES_KEY, {proc: time.time()})
+        pipe.execute()
+    except Exception as e:
+        # Put the deltas back so they are not lost on a transient Redis error
+        with _lock:
+            for key, amount in incs.items():
+                _increments[key] = _increments.get(key, 0.0) + amount
+        logger.warning(f"metrics flush failed: {e}")
+
+
+atexit.register(flush)
+
+
+def _family_of(series: str) -> str | None:
+    name = series.split("{", 1)[0]
+    if name in _families:
+        return name
+    for suffix in ("_bucket", "_sum", "_count"):
+        if name.endswith(suffix) and name[: -len(suffix)] in _families:
+            return name[: -len(suffix)]
+    return None
+
+
+def _with_process(series: str, proc: str) -> str:
+    label = f'process="{_escape(proc)}"'
+    if series.endswith("}"):
+        return f"{series[:-1]},{label}}}"
+    return f"{series}{{{label}}}"
+
+
+def _gauge_values(r) -> list[tuple[str, str]]:
+    """Gauges of every live process, labelled by process; hashes of dead ones are deleted."""
+    cutoff = time.time() - GAUGE_TTL_SECONDS
+    out = []
+    for proc, seen in r.zrangebyscore(GAUGE_PROCESSES_KEY, "-inf", "+inf", withscores=True):
+        key = f"{GAUGES_KEY}:{proc}"
+        if seen < cutoff:
+            r.delete(key)
+            r.zrem(GAUGE_PROCESSES_KEY, proc)
+            continue
+        out.extend((_with_process(series, proc), value) for series, value in (r.hgetall(key) or {}).items())
+    return out
+
+
+def _sort_key(item: tuple[str, str]) -> tuple:
+    # Buckets of one label set together, in ascending numeric ``le`` (+Inf last)
+    series = item[0]
+    m = _LE.search(series)
+    if m is None:
+        return (series, 0.0)
+    return (_LE.sub("", series, count=1), float(m.group(1)))
+
+
+def render() -> str:
+    """All series from every process, in the Prometheus text exposition format."""
+    flush()
+    try:
+        r = _client()
+        values = list((r.hgetall(METRICS_KEY) or {}).items()) + _gauge_values(r)
+    except Exception as e:
+        logger.warning(f"metrics read failed: {e}")
+        values = []
+    grouped: dict[str, list[tuple[str, str]]] = {}
+    for series, value in values:
+        fam = _family_of(series)
+        if fam:
+            grouped.setdefault(fam, []).append((series, value))
+    lines = []
+    for name in sorted(_families):
+        m = _families[name]
+        lines.append(f"# HELP {name} {m.help}")
+        lines.append(f"# TYPE {name} {m.kind}")
+        for series, value in sorted(grouped.get(name, []), key=_sort_key):
+            v = float(value)
+            lines.append(f"{series} {int(v) if v.is_integer() else v}")
+    return "\n".join(lines) + "\n"
+
+
+# ----------------------------------------------------------------------
+# Crawler
+# ----------------------------------------------------------------------
+CRAWL_CYCLES = Counter("vdw_crawl_cycles_total", "Completed crawl cycles")
+CRAWL_CYCLE_SECONDS = Histogram("vdw_crawl_cycle_seconds", "Wall time of one crawl cycle",
+                                buckets=(10, 30, 60, 120, 300, 600, 1200, 1800, 3600))
+CRAWL_STAGE_SECONDS = Histogram("vdw_crawl_stage_seconds", "Handler time per item in each pipeline stage", ("stage",))
+CRAWL_STAGE_BLOCKED_SECONDS = Counter("vdw_crawl_stage_blocked_seconds_total", "Time stages waited on a full downstream queue", ("stage",))
+CRAWL_STAGE_QUEUE_DEPTH = Gauge("vdw_crawl_stage_queue_max_depth", "Max input queue depth of a stage in the last cycle", ("stage",))
+FETCH_SECONDS = Histogram("vdw_crawl_fetch_seconds", "Feed fetch latency", ("source",))
+FETCH_RESULTS = Counter("vdw_crawl_fetch_total", "Feed fetches by result (ok, not_modified, error)", ("source", "result"))
+ENTRIES_PARSED = Counter("vdw_crawl_entries_parsed_total", "Feed/scraper entries parsed", ("source",))
+ARTICLES_ADDED = Counter("vdw_crawl_articles_added_total", "Articles inserted or upgraded", ("source",))
+PARSE_SECONDS = Histogram("vdw_crawl_feedparser_seconds", "feedparser.parse time")
+DEDUP_SECONDS = Histogram("vdw_crawl_dedup_seconds", "Blacklist/duplicate lookup time per entry")
+NLP_SECONDS = Histogram("vdw_crawl_nlp_seconds", "Scoring and extraction time per entry")
+INSERT_SECONDS = Histogram("vdw_crawl_insert_seconds", "Article insert/upgrade commit time")
+CLUSTER_SECONDS = Histogram("vdw_crawl_cluster_seconds", "Event matching time per article")
+EVENT_BATCH_SECONDS = Histogram("vdw_event_batch_seconds", "Batch event clustering time per crawl cycle")
+EVENT_KEY_CONFLICTS = Counter("vdw_event_key_conflicts_total", "New-event inserts retried under the next key suffix")
+EVENTS_BY_STATE = Gauge("vdw_events", "Events by lifecycle state (active, cooling, closed, archived)", ("state",))
+EVENT_INDEX_LOOKUPS = Counter("vdw_event_index_lookups_total", "Clustering candidate lookups served by the active-event index or the DB", ("result",))
+SYNDICATED_ARTICLES = Counter("vdw_syndicated_articles_total", "Enriched articles whose full text is a near-copy (SimHash) of an earlier one")
+ENRICH_SECONDS = Histogram("vdw_crawl_enrich_seconds", "Full-text fetch and re-extraction time")
+CONTENT_EXTRACT_SECONDS = Histogram("vdw_content_extract_seconds", "Main-content extraction time by path (fast = cached selector)", ("path",))
+GNEWS_CACHE_LOOKUPS = Counter("vdw_gnews_cache_lookups_total", "GNews link lookups by tier (lru, store, miss) and new resolutions (decoded, fetched)", ("result",))
+PLAYWRIGHT_SECONDS = Histogram("vdw_playwright_seconds", "Headless browser fallback time")
+BREAKER_OPEN = Gauge("vdw_crawl_breaker_open", "1 while a source's breaker is open", ("source",))
+JOB_QUEUE_DEPTH = Gauge("vdw_crawl_job_queue_depth", "Distributed crawl jobs by state", ("state",))
+
+# ----------------------------------------------------------------------
+# API
+# ----------------------------------------------------------------------
+HTTP_REQUESTS = Counter("vdw_http_requests_total", "API requests", ("method", "route", "status"))
+HTTP_SECONDS = Histogram("vdw_http_request_seconds", "API request latency", ("method", "route"))
+REPORTS_INGESTED = Counter("vdw_reports_ingested_total", "Crowdsourced reports stored, by event match", ("matched",))
+REPORT_BATCH_SIZE = Histogram("vdw_report_batch_size", "Reports per group commit", buckets=(1, 2, 5, 10, 20, 50, 100))
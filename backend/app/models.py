@@ -1,4 +1,4 @@
-from sqlalchemy import String, Integer, DateTime, Text, ForeignKey, Float, UniqueConstraint, JSON, Index, Boolean
+from sqlalchemy import String, Integer, DateTime, Text, ForeignKey, Float, UniqueConstraint, JSON, Index, Boolean, LargeBinary, BigInteger
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
@@ -52,6 +52,11 @@ class Article(Base):
     news_hash: Mapped[str | None] = mapped_column(String(64), index=True, nullable=True)
     is_red_alert: Mapped[bool] = mapped_column(Boolean, default=False, index=True)
 
+    # SimHash of full_text (app.syndication). Copies point at the original; no FK,
+    # purged pending originals leave a harmless dangling id
+    text_simhash: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    syndicated_from_id: Mapped[int | None] = mapped_column(Integer, nullable=True, index=True)
+
     __table_args__ = (
         UniqueConstraint("domain", "url", name="uq_article_url"),
         Index("ix_article_status_published", status, published_at),
@@ -91,6 +96,17 @@ class Event(Base):
     needs_verification: Mapped[bool] = mapped_column(Integer, default=0)
     image_url: Mapped[str | None] = mapped_column(Text, nullable=True)
     is_red_alert: Mapped[bool] = mapped_column(Boolean, default=False, index=True)
+    # Token ids + MinHash of the title, kept in step by app.event_signature
+    title_sig: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+    # Source/trust/VIP state folded in one article at a time, see app.event_aggregates
+    aggregates: Mapped[dict | None] = mapped_column(JSON().with_variant(JSONB, "postgresql"), nullable=True)
+    # active -> cooling -> closed after hazard-specific inactivity (app.event_lifecycle);
+    # active and cooling events (event_lifecycle.MATCHABLE) take new articles, closed ones do not
+    state: Mapped[str] = mapped_column(String(16), default="active", server_default="active")
+    # Row modification time; last_updated_at is the newest article's publish time, which late
+    # articles leave in the past. app.event_lsh tops up its index from this one
+    updated_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True, index=True,
+                                                        default=datetime.utcnow, onupdate=datetime.utcnow)
 
     articles = relationship("Article", back_populates="event")
 
@@ -98,6 +114,54 @@ class Event(Base):
         Index("ix_event_type_date", disaster_type, started_at),
         Index("ix_event_province_date", province, started_at),
         Index("ix_event_prov_type_date", province, disaster_type, started_at),
+        Index("ix_event_province_updated", province, last_updated_at),
+        Index("ix_event_state_province_updated", state, province, last_updated_at),
+    )
+
+class EventDuplicateDismissal(Base):
+    """Event pair an admin marked as not duplicates (app.event_lsh); event_a < event_b."""
+    __tablename__ = "event_duplicate_dismissals"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    event_a: Mapped[int] = mapped_column(Integer, index=True)
+    event_b: Mapped[int] = mapped_column(Integer, index=True)
+    user_id: Mapped[int | None] = mapped_column(ForeignKey("users.id"), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("event_a", "event_b", name="uq_event_duplicate_dismissal"),
+    )
+
+class EventArchive(Base):
+    """Summary of a closed event moved out of ``events`` (app.event_lifecycle); same id."""
+    __tablename__ = "events_archive"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    key: Mapped[str] = mapped_column(String(256))
+    title: Mapped[str] = mapped_column(Text)
+    disaster_type: Mapped[str] = mapped_column(String(32))
+    province: Mapped[str] = mapped_column(String(64))
+    commune: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    village: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    started_at: Mapped[datetime] = mapped_column(DateTime)
+    last_updated_at: Mapped[datetime] = mapped_column(DateTime)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    deaths: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    missing: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    injured: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    damage_billion_vnd: Mapped[float | None] = mapped_column(Float, nullable=True)
+    lat: Mapped[float | None] = mapped_column(Float, nullable=True)
+    lon: Mapped[float | None] = mapped_column(Float, nullable=True)
+    details: Mapped[dict | None] = mapped_column(JSON().with_variant(JSONB, "postgresql"), nullable=True)
+    confidence: Mapped[float] = mapped_column(Float, default=0.0)
+    sources_count: Mapped[int] = mapped_column(Integer, default=1)
+    needs_verification: Mapped[bool] = mapped_column(Integer, default=0)
+    is_red_alert: Mapped[bool] = mapped_column(Boolean, default=False)
+    # Articles keep their rows but lose the FK; their ids are kept here
+    article_ids: Mapped[list | None] = mapped_column(JSON().with_variant(JSONB, "postgresql"), nullable=True)
+
+    __table_args__ = (
+        Index("ix_event_archive_type_date", disaster_type, started_at),
+        Index("ix_event_archive_province_date", province, started_at),
     )
 
 class User(Base):
@@ -141,6 +205,12 @@ class CrowdsourcedReport(Base):
     user = relationship("User")
     event = relationship("Event")
 
+    __table_args__ = (
+        # Keyset pagination of the public feed and bbox queries on the map
+        Index("ix_report_status_id", status, id),
+        Index("ix_report_lat_lon", lat, lon),
+    )
+
 class EventFollow(Base):
     __tablename__ = "event_follows"
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
@@ -173,6 +243,116 @@ class CrawlerStatus(Base):
     articles_added: Mapped[int] = mapped_column(Integer, default=0)
     latency_ms: Mapped[int] = mapped_column(Integer, default=0)
     feed_used: Mapped[str | None] = mapped_column(String(255), nullable=True) # e.g. "primary_rss", "gnews", "html_scraper"
+    feeds_not_modified: Mapped[int | None] = mapped_column(Integer, nullable=True, default=0) # HTTP 304 responses last run
+
+class CrawlRun(Base):
+    """One crawl cycle. Sources are checkpointed as they finish so an interrupted run can resume."""
+    __tablename__ = "crawl_runs"
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)  # uuid4 hex
+    trigger: Mapped[str] = mapped_column(String(32), default="manual")  # startup, schedule, consumer, manual, replay
+    worker_id: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    status: Mapped[str] = mapped_column(String(20), default="running", index=True)  # running, completed, failed, interrupted
+    started_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    resumed_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    sources_total: Mapped[int] = mapped_column(Integer, default=0)
+    sources_done: Mapped[int] = mapped_column(Integer, default=0)
+    new_articles: Mapped[int] = mapped_column(Integer, default=0)
+
+    sources = relationship("CrawlRunSource", back_populates="run", cascade="all, delete-orphan")
+
+class CrawlRunSource(Base):
+    __tablename__ = "crawl_run_sources"
+    run_id: Mapped[str] = mapped_column(ForeignKey("crawl_runs.id", ondelete="CASCADE"), primary_key=True)
+    source_name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    status: Mapped[str] = mapped_column(String(20), default="pending")  # pending, done, deferred
+    articles_added: Mapped[int] = mapped_column(Integer, default=0)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+    run = relationship("CrawlRun", back_populates="sources")
+
+class ArticleSimhashBand(Base):
+    """One 8-bit band of an article's full-text SimHash; equal bands are near-copy candidates."""
+    __tablename__ = "article_simhash_bands"
+    article_id: Mapped[int] = mapped_column(ForeignKey("articles.id", ondelete="CASCADE"), primary_key=True)
+    band: Mapped[int] = mapped_column(Integer, primary_key=True)
+    value: Mapped[int] = mapped_column(Integer)
+    published_at: Mapped[datetime] = mapped_column(DateTime)
+
+    __table_args__ = (
+        Index("ix_simhash_band_value_published", band, value, published_at),
+    )
+
+class CrawlDeferred(Base):
+    """Work a crawl cycle ran out of budget for; the next cycle picks it up first."""
+    __tablename__ = "crawl_deferred"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    kind: Mapped[str] = mapped_column(String(16), index=True)  # "source" or "enrich"
+    source_name: Mapped[str] = mapped_column(String(64), index=True)
+    article_id: Mapped[int | None] = mapped_column(ForeignKey("articles.id", ondelete="CASCADE"), nullable=True)
+    article_kind: Mapped[str | None] = mapped_column(String(16), nullable=True)  # "feed" or "scrape"
+    priority: Mapped[int] = mapped_column(Integer, default=2)
+    deferred_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    times_deferred: Mapped[int] = mapped_column(Integer, default=1)
+    # Set while a cycle resumes the row; the row is deleted once it is done, and an
+    # expired claim (the cycle died) lets another cycle take it
+    claimed_by: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    claimed_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("kind", "source_name", "article_id", name="uq_crawl_deferred_item"),
+    )
+
+class ListingSnapshot(Base):
+    """Hashes of the links already handled on a sitemap or listing page (app.listing_crawler)."""
+    __tablename__ = "listing_snapshots"
+    key: Mapped[str] = mapped_column(String(512), primary_key=True)  # sitemap URL or "listing:<domain>"
+    seen: Mapped[list] = mapped_column(JSON().with_variant(JSONB, "postgresql"))
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class RawFetch(Base):
+    """Index of the raw page / feed archive (app.raw_archive); payloads live on disk by sha256."""
+    __tablename__ = "raw_fetches"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    kind: Mapped[str] = mapped_column(String(8), index=True)  # "feed" or "html"
+    url: Mapped[str] = mapped_column(Text)
+    url_hash: Mapped[str] = mapped_column(String(40))  # sha1(url), indexable for long GNews URLs
+    domain: Mapped[str] = mapped_column(String(128), index=True)
+    fetched_at: Mapped[datetime] = mapped_column(DateTime, index=True)
+    status_code: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    sha256: Mapped[str] = mapped_column(String(64), index=True)
+    dict_id: Mapped[str | None] = mapped_column(String(16), nullable=True)
+    size: Mapped[int] = mapped_column(Integer)
+    stored_size: Mapped[int] = mapped_column(Integer)
+
+    __table_args__ = (
+        Index("ix_raw_fetch_url_time", url_hash, fetched_at),
+    )
+
+class GnewsUrl(Base):
+    """Resolved Google News article links (see app.gnews_cache)."""
+    __tablename__ = "gnews_urls"
+    gnews_hash: Mapped[str] = mapped_column(String(40), primary_key=True)  # sha1(gnews_url)
+    gnews_url: Mapped[str] = mapped_column(Text)
+    resolved_url: Mapped[str] = mapped_column(Text)
+    method: Mapped[str] = mapped_column(String(8))  # "decode" or "fetch"
+    created_at: Mapped[datetime] = mapped_column(DateTime, index=True)
+
+class SourcePollState(Base):
+    """Learned polling interval per source (see app.poll_scheduler)."""
+    __tablename__ = "source_poll_state"
+    source_name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    interval_minutes: Mapped[float] = mapped_column(Float, default=60.0)
+    last_polled_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    next_poll_at: Mapped[datetime | None] = mapped_column(DateTime, index=True, nullable=True)
+    polls: Mapped[int] = mapped_column(Integer, default=0)
+    # Exponentially weighted averages over recent polls
+    publish_per_hour: Mapped[float] = mapped_column(Float, default=0.0)
+    not_modified_ratio: Mapped[float] = mapped_column(Float, default=0.0)
+    error_ratio: Mapped[float] = mapped_column(Float, default=0.0)
+    # From articles.published_at over the history window
+    hits_per_hour: Mapped[float] = mapped_column(Float, default=0.0)
+    boosted: Mapped[bool] = mapped_column(Boolean, default=False)
 
 class AiFeedback(Base):
     __tablename__ = "ai_feedback"
@@ -195,3 +375,16 @@ class RescueHotline(Base):
     phone: Mapped[str] = mapped_column(String(50))
     address: Mapped[str | None] = mapped_column(Text, nullable=True)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class WorkerHeartbeat(Base):
+    """Liveness record written by the standalone crawler worker (app.worker)."""
+    __tablename__ = "worker_heartbeats"
+    worker_id: Mapped[str] = mapped_column(String(128), primary_key=True) # "<hostname>:<pid>"
+    hostname: Mapped[str] = mapped_column(String(128))
+    pid: Mapped[int] = mapped_column(Integer)
+    status: Mapped[str] = mapped_column(String(20), default="running") # "running", "stopped"
+    started_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    last_beat_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+    last_job: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    last_job_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -9,6 +9,20 @@ def notify_followers_of_article(db: Session, event: models.Event, article: model
     """
     Thông báo cho những người đang theo dõi sự kiện về bài báo mới.
     """
+    notify_followers_of_articles(db, event, [article])
+
+def notify_followers_of_articles(db: Session, event: models.Event, articles: list[models.Article]):
+    """
+    Một thông báo cho mỗi người theo dõi, gộp các bài báo mới của cùng một sự kiện.
+    """
+    if not articles:
+        return
+    article = articles[0]
+    if len(articles) == 1:
+        message = f"Báo {article.source} vừa đăng: {article.title[:100]}..."
+    else:
+        sources = ", ".join(dict.fromkeys(a.source for a in articles))
+        message = f"{len(articles)} bài mới từ {sources[:100]}: {article.title[:100]}..."
     try:
         # Get followers
         followers = db.query(models.EventFollow).filter(models.EventFollow.event_id == event.id).all()
@@ -21,7 +35,7 @@ def notify_followers_of_article(db: Session, event: models.Event, article: model
                 user_id=follow.user_id,
                 type="new_article",
                 title=f"Cập nhật mới cho: {event.title[:50]}...",
-                message=f"Báo {article.source} vừa đăng: {article.title[:100]}...",
+                message=message,
                 link=f"/events/{event.id}",
                 created_at=datetime.utcnow()
             )
@@ -0,0 +1,168 @@
+"""
+Small staged-pipeline runner for the crawler.
+
+Each stage owns a bounded asyncio.Queue and a pool of worker coroutines.
+A stage handler receives one item and an ``emit`` callback that pushes
+results to the next stage; when the downstream queue is full ``emit``
+blocks, which is recorded as backpressure on the emitting stage.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterable
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+Emit = Callable[[Any], Awaitable[None]]
+Handler = Callable[[Any, Emit], Awaitable[None]]
+# Called after each handler run with (stage name, item, number of items emitted)
+ItemDone = Callable[[str, Any, int], None]
+
+
+@dataclass
+class StageMetrics:
+    name: str
+    concurrency: int
+    queue_size: int
+    items_in: int = 0
+    items_out: int = 0
+    errors: int = 0
+    busy_seconds: float = 0.0     # time spent inside the handler
+    blocked_seconds: float = 0.0  # time spent waiting on a full downstream queue
+    max_queue_depth: int = 0
+    first_start: float | None = None
+    last_finish: float | None = None
+
+    @property
+    def wall_seconds(self) -> float:
+        if self.first_start is None or self.last_finish is None:
+            return 0.0
+        return self.last_finish - self.first_start
+
+    def as_dict(self) -> dict:
+        wall = self.wall_seconds
+        return {
+            "stage": self.name,
+            "concurrency": self.concurrency,
+            "queue_size": self.queue_size,
+            "in": self.items_in,
+            "out": self.items_out,
+            "errors": self.errors,
+            "busy_s": round(self.busy_seconds, 3),
+            "blocked_s": round(self.blocked_seconds, 3),
+            "wall_s": round(wall, 3),
+            "max_queue": self.max_queue_depth,
+            "items_per_s": round(self.items_in / wall, 2) if wall > 0 else None,
+        }
+
+
+@dataclass
+class Stage:
+    name: str
+    handler: Handler
+    concurrency: int = 1
+    queue_size: int = 100
+    metrics: StageMetrics = field(init=False)
+
+    def __post_init__(self):
+        self.concurrency = max(1, int(self.concurrency))
+        self.queue_size = max(1, int(self.queue_size))
+        self.metrics = StageMetrics(self.name, self.concurrency, self.queue_size)
+
+
+class Pipeline:
+    """Runs items through a chain of stages connected by bounded queues."""
+
+    def __init__(self, stages: list[Stage], on_item_done: ItemDone | None = None):
+        if not stages:
+            raise ValueError("pipeline needs at least one stage")
+        self.stages = stages
+        self.on_item_done = on_item_done
+
+    async def run(self, items: Iterable[Any]) -> list[dict]:
+        queues = [asyncio.Queue(maxsize=s.queue_size) for s in self.stages]
+
+        async def _worker(idx: int) -> None:
+            stage = self.stages[idx]
+            q = queues[idx]
+            nxt = queues[idx + 1] if idx + 1 < len(queues) else None
+            nxt_metrics = self.stages[idx + 1].metrics if nxt is not None else None
+            m = stage.metrics
+            while True:
+                item = await q.get()
+                if item is _DONE:
+                    return
+                m.items_in += 1
+                blocked = 0.0
+                emitted = 0
+
+                async def emit(out: Any) -> None:
+                    nonlocal blocked, emitted
+                    emitted += 1
+                    m.items_out += 1
+                    if nxt is None:
+                        return
+                    t = time.perf_counter()
+                    await nxt.put(out)
+                    blocked += time.perf_counter() - t
+                    nxt_metrics.max_queue_depth = max(nxt_metrics.max_queue_depth, nxt.qsize())
+
+                t0 = time.perf_counter()
+                if m.first_start is None:
+                    m.first_start = t0
+                try:
+                    await stage.handler(item, emit)
+                except Exception as e:
+                    m.errors += 1
+                    logger.error(f"[pipeline] stage '{stage.name}' failed on item: {e}")
+                finally:
+                    now = time.perf_counter()
+                    metrics.CRAWL_STAGE_SECONDS.observe((now - t0) - blocked, stage=stage.name)
+                    m.busy_seconds += (now - t0) - blocked
+                    m.blocked_seconds += blocked
+                    m.last_finish = now
+                    if self.on_item_done is not None:
+                        try:
+                            self.on_item_done(stage.name, item, emitted)
+                        except Exception as e:
+                            logger.error(f"[pipeline] on_item_done failed after '{stage.name}': {e}")
+
+        async def _run_stage(idx: int) -> None:
+            stage = self.stages[idx]
+            await asyncio.gather(*(_worker(idx) for _ in range(stage.concurrency)))
+            if idx + 1 < len(self.stages):
+                for _ in range(self.stages[idx + 1].concurrency):
+                    await queues[idx + 1].put(_DONE)
+
+        async def _feed() -> None:
+            first = self.stages[0]
+            for item in items:
+                await queues[0].put(item)
+                first.metrics.max_queue_depth = max(first.metrics.max_queue_depth, queues[0].qsize())
+            for _ in range(first.concurrency):
+                await queues[0].put(_DONE)
+
+        await asyncio.gather(_feed(), *(_run_stage(i) for i in range(len(self.stages))))
+        return self.report()
+
+    def report(self) -> list[dict]:
+        return [s.metrics.as_dict() for s in self.stages]
+
+
+def format_report(report: list[dict]) -> str:
+    """Render a per-stage throughput table for the cycle log."""
+    header = f"{'stage':<10} {'conc':>4} {'in':>6} {'out':>6} {'err':>4} {'busy_s':>8} {'blocked_s':>9} {'max_q':>5} {'items/s':>8}"
+    lines = [header, "-" * len(header)]
+    for r in report:
+        ips = f"{r['items_per_s']:.2f}" if r["items_per_s"] is not None else "-"
+        lines.append(
+            f"{r['stage']:<10} {r['concurrency']:>4} {r['in']:>6} {r['out']:>6} {r['errors']:>4} "
+            f"{r['busy_s']:>8.2f} {r['blocked_s']:>9.2f} {r['max_queue']:>5} {ips:>8}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,149 @@
+"""
+Adaptive per-source polling.
+
+Instead of fixed tier intervals, every source gets its own interval learned
+from its history:
+
+* hits_per_hour       disaster articles stored per hour (articles.published_at)
+* publish_per_hour    feed entries published in the last 24h, averaged per poll
+* not_modified_ratio  share of feed requests answered with HTTP 304
+* error_ratio         share of polls that failed
+
+A source that rarely produces disaster news and keeps answering 304 drifts
+towards ``poll_max_minutes``; a busy source with frequent hits drifts towards
+``poll_min_minutes``. While a red alert or a storm/flood event is active, the
+sources reporting on it (and the official forecasters) poll
+``poll_boost_factor`` times faster.
+"""
+
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .models import Article, Event, SourcePollState
+from .settings import settings
+from .sources import SOURCES, source_tier
+
+logger = logging.getLogger(__name__)
+
+# The old fixed 120/240/480 minute jobs. A quiet source backs off to at most
+# poll_tier_backoff times its tier's interval, and never past poll_max_minutes
+_TIER_MINUTES = {0: 120, 1: 240, 2: 480}
+
+
+def compute_interval(hits_per_hour: float, publish_per_hour: float, not_modified_ratio: float,
+                     error_ratio: float = 0.0, tier: int = 2, boosted: bool = False) -> float:
+    """Polling interval in minutes for one source, clamped to the configured bounds."""
+    lo, hi = settings.poll_min_minutes, settings.poll_max_minutes
+    if tier in _TIER_MINUTES:
+        hi = min(hi, settings.poll_tier_backoff * _TIER_MINUTES[tier])
+
+    # Expected useful items per hour: disaster hits dominate, raw volume helps a little
+    rate = hits_per_hour + settings.poll_publish_weight * publish_per_hour
+    interval = 60.0 * settings.poll_target_items / rate if rate > 0 else hi
+    # Feeds that keep answering 304 or failing gain nothing from frequent polls
+    interval *= 1.0 + not_modified_ratio + error_ratio
+
+    if boosted:
+        interval /= settings.poll_boost_factor
+        hi = max(lo, hi / settings.poll_boost_factor)
+    return max(lo, min(hi, interval))
+
+
+def _ewma(prev: float, value: float, first: bool) -> float:
+    if first:
+        return value
+    a = settings.poll_ewma_alpha
+    return a * value + (1 - a) * prev
+
+
+def hit_rates(db: Session, now: datetime | None = None) -> dict[str, float]:
+    """Stored (non-rejected) disaster articles per hour, per source."""
+    now = now or datetime.utcnow()
+    days = settings.poll_history_days
+    rows = db.query(Article.source, func.count(Article.id)).filter(
+        Article.published_at >= now - timedelta(days=days),
+        Article.status != "rejected",
+    ).group_by(Article.source).all()
+    return {name: count / (days * 24.0) for name, count in rows}
+
+
+def boosted_sources(db: Session, now: datetime | None = None) -> set[str]:
+    """Sources related to hazard events that are currently active."""
+    now = now or datetime.utcnow()
+    active = db.query(Event.id).filter(
+        Event.last_updated_at >= now - timedelta(hours=settings.poll_boost_hours),
+        (Event.is_red_alert == True) | (Event.disaster_type.in_(settings.poll_boost_types)),  # noqa: E712
+    )
+    names = {
+        row[0] for row in db.query(Article.source).filter(Article.event_id.in_(active.scalar_subquery())).distinct()
+    }
+    if names:
+        # Official forecasters publish the bulletins every outlet follows
+        names.update(s.name for s in SOURCES if source_tier(s.name) == 0)
+    return names
+
+
+def record_polls(db: Session, per_source_stats: list[dict], now: datetime | None = None) -> None:
+    """Fold the stats of a finished crawl cycle into each source's schedule."""
+    if not per_source_stats:
+        return
+    now = now or datetime.utcnow()
+    try:
+        hits = hit_rates(db, now)
+        boosted = boosted_sources(db, now)
+        names = [s["source"] for s in per_source_stats]
+        states = {p.source_name: p for p in db.query(SourcePollState).filter(SourcePollState.source_name.in_(names))}
+        for stat in per_source_stats:
+            name = stat["source"]
+            p = states.get(name)
+            first = p is None or not p.polls
+            if p is None:
+                p = SourcePollState(source_name=name, polls=0)
+                db.add(p)
+            feeds = stat.get("feeds_requested") or 0
+            nm_ratio = (stat.get("not_modified") or 0) / feeds if feeds else 0.0
+            p.publish_per_hour = _ewma(p.publish_per_hour or 0.0, (stat.get("entries_24h") or 0) / 24.0, first)
+            p.not_modified_ratio = _ewma(p.not_modified_ratio or 0.0, nm_ratio, first)
+            p.error_ratio = _ewma(p.error_ratio or 0.0, 1.0 if stat.get("error") else 0.0, first)
+            p.hits_per_hour = hits.get(name, 0.0)
+            p.boosted = name in boosted
+            p.interval_minutes = compute_interval(
+                p.hits_per_hour, p.publish_per_hour, p.not_modified_ratio, p.error_ratio, source_tier(name), p.boosted,
+            )
+            p.polls = (p.polls or 0) + 1
+            p.last_polled_at = now
+            p.next_poll_at = now + timedelta(minutes=p.interval_minutes)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to update poll schedule: {e}")
+
+
+def due_sources(db: Session, now: datetime | None = None) -> list[str]:
+    """
+    Sources whose next poll is due, most overdue first. Sources never polled
+    are always due. A newly active hazard shortens intervals immediately,
+    without waiting for the stored next_poll_at.
+    """
+    now = now or datetime.utcnow()
+    states = {p.source_name: p for p in db.query(SourcePollState).all()}
+    boosted = boosted_sources(db, now)
+    due: list[tuple[datetime, str]] = []
+    for src in SOURCES:
+        p = states.get(src.name)
+        if p is None or p.last_polled_at is None:
+            due.append((datetime.min, src.name))
+            continue
+        next_at = p.next_poll_at or now
+        if src.name in boosted and not p.boosted:
+            interval = compute_interval(
+                p.hits_per_hour, p.publish_per_hour, p.not_modified_ratio, p.error_ratio, source_tier(src.name), True,
+            )
+            next_at = min(next_at, p.last_polled_at + timedelta(minutes=interval))
+        if next_at <= now:
+            due.append((next_at, src.name))
+    due.sort()
+    return [name for _, name in due]
@@ -0,0 +1,468 @@
+"""
+Content-addressed archive of raw feed payloads and article HTML.
+
+The crawler only keeps ``full_text[:100000]``; this archive keeps what was
+actually downloaded so extraction and NLP can be re-run after rule changes
+without touching the network (pages disappear, GNews links rot).
+
+Layout under ``RAW_ARCHIVE_DIR``::
+
+    blobs/<sha[:2]>/<sha256>   deflate payload, header b"RZ1" + len + dict id
+    dicts/<dict_id>.zdict      preset dictionary shared by one domain
+    dicts/current.json         "<kind>-<domain>" -> dict id used for new blobs
+
+Identical payloads (an unchanged feed, a page fetched twice) are stored once.
+The first ``raw_archive_dict_samples`` payloads of a domain train its
+dictionary: markup segments that occur in at least half of the samples (the
+site template), most frequent last because deflate reaches the end of the
+32 KB window most cheaply. Blobs name their dictionary, so old blobs stay
+readable when a domain gets a new one.
+
+Every fetch is indexed in ``raw_fetches`` (URL hash + fetch time). Rows are
+buffered and written in batches; the crawler flushes at the end of a cycle.
+
+    python -m app.raw_archive stats
+    python -m app.raw_archive prune [--days 90]
+    python -m app.raw_archive reprocess [--since 2025-10-01] [--source VnExpress] [--feeds] [--workers 4] [--dry-run]
+"""
+
+import argparse
+import asyncio
+import atexit
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import zlib
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlparse
+
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"RZ1"
+_MAX_DICT_BYTES = 32 * 1024        # deflate window
+_SAMPLE_HEAD, _SAMPLE_TAIL = 32 * 1024, 16 * 1024
+_SEGMENT_RE = re.compile(rb"[^>]*>|[^>]+$")
+_INDEX_BATCH = 200
+
+
+def url_hash(url: str) -> str:
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+
+def _domain(url: str) -> str:
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def build_dictionary(samples: list[bytes]) -> bytes:
+    """Markup segments shared by at least half of the samples, most frequent last."""
+    doc_freq: Counter = Counter()
+    first_seen: dict[bytes, int] = {}
+    for sample in samples:
+        for seg in set(_SEGMENT_RE.findall(sample)):
+            if len(seg) >= 8:
+                doc_freq[seg] += 1
+                first_seen.setdefault(seg, len(first_seen))
+    common = [seg for seg, n in doc_freq.items() if n * 2 >= len(samples)]
+    common.sort(key=lambda seg: (doc_freq[seg], -first_seen[seg]))
+    return b"".join(common)[-_MAX_DICT_BYTES:]
+
+
+class RawArchive:
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self._pending: list[dict] = []
+        self._samples: dict[str, list[bytes]] = defaultdict(list)
+        self._current: Optional[dict[str, str]] = None
+        self._dicts: dict[str, bytes] = {}
+
+    # --- dictionaries --------------------------------------------------
+    def _current_path(self) -> Path:
+        return self.root / "dicts" / "current.json"
+
+    def _current_map(self) -> dict[str, str]:
+        if self._current is None:
+            try:
+                self._current = json.loads(self._current_path().read_text(encoding="utf-8"))
+            except (FileNotFoundError, ValueError):
+                self._current = {}
+        return self._current
+
+    def load_dict(self, dict_id: str) -> bytes:
+        if dict_id not in self._dicts:
+            self._dicts[dict_id] = (self.root / "dicts" / f"{dict_id}.zdict").read_bytes()
+        return self._dicts[dict_id]
+
+    def _train(self, key: str, sample: bytes) -> None:
+        samples = self._samples[key]
+        samples.append(sample[:_SAMPLE_HEAD] + sample[-_SAMPLE_TAIL:])
+        if len(samples) < settings.raw_archive_dict_samples:
+            return
+        zdict = build_dictionary(samples)
+        del self._samples[key]
+        if len(zdict) < 256:
+            return  # no shared template worth a dictionary
+        dict_id = hashlib.sha256(zdict).hexdigest()[:16]
+        path = self.root / "dicts" / f"{dict_id}.zdict"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(zdict)
+        self._dicts[dict_id] = zdict
+        current = self._current_map()
+        current[key] = dict_id
+        tmp = self._current_path().with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(current, indent=2), encoding="utf-8")
+        os.replace(tmp, self._current_path())
+        logger.info(f"[raw-archive] built {len(zdict)} byte dictionary {dict_id} for {key}")
+
+    # --- blobs ---------------------------------------------------------
+    def blob_path(self, sha: str) -> Path:
+        return self.root / "blobs" / sha[:2] / sha
+
+    def _write_blob(self, sha: str, body: bytes, key: str) -> tuple[Optional[str], int]:
+        path = self.blob_path(sha)
+        if path.exists():
+            # Dedup hit; refresh mtime so pruning keeps it
+            os.utime(path)
+            with path.open("rb") as f:
+                head = f.read(4 + 16)
+            n = head[3]
+            return (head[4:4 + n].decode() or None), path.stat().st_size
+        with self._lock:
+            dict_id = self._current_map().get(key)
+            if dict_id is None:
+                self._train(key, body)
+        zdict = self.load_dict(dict_id) if dict_id else None
+        comp = zlib.compressobj(6, zdict=zdict) if zdict else zlib.compressobj(6)
+        ident = (dict_id or "").encode()
+        data = _MAGIC + bytes([len(ident)]) + ident + comp.compress(body) + comp.flush()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{sha}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        return dict_id, len(data)
+
+    def get(self, sha: str) -> bytes:
+        data = self.blob_path(sha).read_bytes()
+        if data[:3] != _MAGIC:
+            raise ValueError(f"not an archive blob: {sha}")
+        n = data[3]
+        dict_id = data[4:4 + n].decode()
+        decomp = zlib.decompressobj(zdict=self.load_dict(dict_id)) if dict_id else zlib.decompressobj()
+        return decomp.decompress(data[4 + n:]) + decomp.flush()
+
+    def put(self, kind: str, url: str, body: bytes, status_code: int | None = None,
+            aliases: tuple[str, ...] = (), fetched_at: datetime | None = None) -> Optional[str]:
+        """Store one payload and queue its index rows (one per URL it was fetched under)."""
+        if not body:
+            return None
+        sha = hashlib.sha256(body).hexdigest()
+        domain = _domain(url)
+        dict_id, stored = self._write_blob(sha, body, f"{kind}-{domain}")
+        fetched_at = fetched_at or datetime.utcnow()
+        rows = [
+            dict(kind=kind, url=u, url_hash=url_hash(u), domain=domain, fetched_at=fetched_at,
+                 status_code=status_code, sha256=sha, dict_id=dict_id, size=len(body), stored_size=stored)
+            for u in dict.fromkeys((url, *aliases))
+        ]
+        with self._lock:
+            self._pending.extend(rows)
+            full = len(self._pending) >= _INDEX_BATCH
+        if full:
+            self.flush_index()
+        return sha
+
+    def flush_index(self) -> int:
+        with self._lock:
+            rows, self._pending = self._pending, []
+        if not rows:
+            return 0
+        from .database import SessionLocal
+        from .models import RawFetch
+        db = SessionLocal()
+        try:
+            db.bulk_insert_mappings(RawFetch, rows)
+            db.commit()
+            return len(rows)
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"[raw-archive] index flush of {len(rows)} rows failed: {e}")
+            with self._lock:
+                if len(self._pending) < 10 * _INDEX_BATCH:
+                    self._pending[:0] = rows
+            return 0
+        finally:
+            db.close()
+
+
+_archive: Optional[RawArchive] = None
+
+
+def get_archive() -> Optional[RawArchive]:
+    """The process archive, or None when disabled or while replaying recorded traffic."""
+    global _archive
+    if not settings.raw_archive_enabled:
+        return None
+    from . import http_replay
+    if http_replay.active_mode() == "replay":
+        return None
+    if _archive is None:
+        _archive = RawArchive(settings.raw_archive_dir)
+    return _archive
+
+
+async def aput(kind: str, url: str, body: bytes, status_code: int | None = None, aliases: tuple[str, ...] = ()) -> None:
+    """Archive from the event loop; compression and disk I/O run in a thread. Never raises."""
+    archive = get_archive()
+    if archive is None:
+        return
+    try:
+        await asyncio.to_thread(archive.put, kind, url, body, status_code, aliases)
+    except Exception as e:
+        logger.warning(f"[raw-archive] failed to archive {url}: {e}")
+
+
+def flush_index() -> None:
+    if _archive is not None:
+        _archive.flush_index()
+
+
+atexit.register(flush_index)
+
+
+# ----------------------------------------------------------------------
+# Retention
+# ----------------------------------------------------------------------
+def prune(days: int | None = None) -> dict:
+    """Drop index rows older than the retention window, then unreferenced blobs."""
+    days = settings.raw_archive_retention_days if days is None else days
+    if not days:
+        return {"rows": 0, "blobs": 0}
+    from .database import SessionLocal
+    from .models import RawFetch
+    archive = RawArchive(settings.raw_archive_dir)
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    db = SessionLocal()
+    try:
+        rows = db.query(RawFetch).filter(RawFetch.fetched_at < cutoff).delete(synchronize_session=False)
+        db.commit()
+        live = {sha for (sha,) in db.query(RawFetch.sha256).distinct()}
+    finally:
+        db.close()
+    removed = 0
+    cutoff_ts = cutoff.timestamp()
+    blob_root = archive.root / "blobs"
+    if blob_root.exists():
+        for path in blob_root.glob("*/*"):
+            # Fresh blobs may belong to index rows still buffered in a crawler
+            if path.name not in live and path.stat().st_mtime < cutoff_ts:
+                path.unlink(missing_ok=True)
+                removed += 1
+    logger.info(f"[raw-archive] pruned {rows} index rows and {removed} blobs older than {days} days")
+    return {"rows": rows, "blobs": removed}
+
+
+def stats() -> dict:
+    from sqlalchemy import func
+    from .database import SessionLocal
+    from .models import RawFetch
+    db = SessionLocal()
+    try:
+        out = {}
+        for kind, fetches, blobs in db.query(
+            RawFetch.kind, func.count(RawFetch.id), func.count(func.distinct(RawFetch.sha256)),
+        ).group_by(RawFetch.kind):
+            out[kind] = {"fetches": fetches, "blobs": blobs, "size": 0, "stored": 0}
+        for kind, _sha, size, stored in db.query(
+            RawFetch.kind, RawFetch.sha256, func.max(RawFetch.size), func.max(RawFetch.stored_size),
+        ).group_by(RawFetch.kind, RawFetch.sha256):
+            out[kind]["size"] += size
+            out[kind]["stored"] += stored
+        return out
+    finally:
+        db.close()
+
+
+# ----------------------------------------------------------------------
+# Offline reprocessing
+# ----------------------------------------------------------------------
+_worker_archive: Optional[RawArchive] = None
+
+
+def derive_fields(title: str, text: str, full_page: bool) -> dict:
+    """NLP-derived article fields, as the crawler computes them."""
+    from . import nlp
+    from .crawler import _CrawlRun
+    text_for_nlp = f"{title}\n{text}"
+    fields = dict(
+        disaster_type=nlp.classify_disaster(text_for_nlp).get("primary_type", "unknown"),
+        stage=nlp.determine_event_stage(text_for_nlp),
+        impact_details=nlp.extract_impact_details(text_for_nlp),
+        **_CrawlRun._impact_fields(nlp.extract_impacts(text or title)),
+    )
+    province = nlp.extract_province(text_for_nlp)
+    if province and province != "unknown":
+        fields["province"] = province
+    if full_page:
+        fields["full_text"] = text[:100000]
+    return fields
+
+
+def _reprocess_one(job: tuple) -> tuple[int, Optional[dict]]:
+    """Runs in a worker process: archive read, extraction and NLP, no network, no DB."""
+    global _worker_archive
+    article_id, title, url, kind, payload, root = job
+    try:
+        if kind == "html":
+            from .content_extract import extract
+            if _worker_archive is None or str(_worker_archive.root) != root:
+                _worker_archive = RawArchive(root)
+            html = _worker_archive.get(payload).decode("utf-8", errors="replace")
+            text = extract(html, url, cache=None).text
+            if len(text) <= 100:
+                return article_id, None
+            return article_id, derive_fields(title, text, True)
+        return article_id, derive_fields(title, payload, False)
+    except Exception as e:
+        logger.warning(f"[reprocess] article {article_id} failed: {e}")
+        return article_id, None
+
+
+def _parse_feed(job: tuple) -> dict[str, str]:
+    sha, root = job
+    import feedparser
+    archive = RawArchive(root)
+    try:
+        feed = feedparser.parse(archive.get(sha))
+    except Exception:
+        return {}
+    return {e.link: getattr(e, "summary", "") or "" for e in feed.entries if getattr(e, "link", None)}
+
+
+def reprocess(since: datetime | None = None, source: str | None = None, workers: int | None = None,
+              feeds: bool = False, dry_run: bool = False, limit: int | None = None, batch_size: int = 500) -> dict:
+    """
+    Re-run extraction and NLP over archived payloads and update the articles.
+    Articles with archived HTML are re-extracted from it; with ``feeds`` the
+    rest fall back to their archived feed summary.
+    """
+    from sqlalchemy import func
+    from .database import SessionLocal
+    from .models import Article, RawFetch
+
+    root = str(Path(settings.raw_archive_dir).resolve())
+    db = SessionLocal()
+    counts: Counter = Counter()
+    try:
+        query = db.query(Article.id, Article.title, Article.url, Article.canonical_url)
+        if since:
+            query = query.filter(Article.published_at >= since)
+        if source:
+            query = query.filter(Article.source == source)
+        articles = query.order_by(Article.id).limit(limit).all() if limit else query.order_by(Article.id).all()
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            summaries: dict[str, str] = {}
+            if feeds:
+                feed_q = db.query(RawFetch.sha256).filter(RawFetch.kind == "feed")
+                if since:
+                    feed_q = feed_q.filter(RawFetch.fetched_at >= since)
+                feed_q = feed_q.group_by(RawFetch.sha256).order_by(func.min(RawFetch.fetched_at))
+                shas = [sha for (sha,) in feed_q]
+                # Oldest first so the latest version of an entry wins
+                for entries in pool.map(_parse_feed, [(sha, root) for sha in shas], chunksize=16):
+                    summaries.update(entries)
+
+            for start in range(0, len(articles), batch_size):
+                chunk = articles[start:start + batch_size]
+                hashes = {}
+                for a in chunk:
+                    for u in (a.url, a.canonical_url):
+                        if u:
+                            hashes[url_hash(u)] = a.id
+                latest: dict[int, tuple[datetime, str]] = {}
+                for h, sha, at in db.query(RawFetch.url_hash, RawFetch.sha256, RawFetch.fetched_at).filter(
+                    RawFetch.kind == "html", RawFetch.url_hash.in_(list(hashes)),
+                ):
+                    aid = hashes[h]
+                    if aid not in latest or at > latest[aid][0]:
+                        latest[aid] = (at, sha)
+
+                jobs = []
+                for a in chunk:
+                    if a.id in latest:
+                        jobs.append((a.id, a.title, a.url, "html", latest[a.id][1], root))
+                    elif feeds and a.url in summaries:
+                        jobs.append((a.id, a.title, a.url, "feed", summaries[a.url], root))
+                    else:
+                        counts["no_payload"] += 1
+
+                results = dict(pool.map(_reprocess_one, jobs, chunksize=8))
+                by_id = {a.id: a for a in db.query(Article).filter(Article.id.in_(list(results)))}
+                for aid, fields in results.items():
+                    if fields is None:
+                        counts["failed"] += 1
+                        continue
+                    article = by_id[aid]
+                    changed = False
+                    for key, value in fields.items():
+                        if isinstance(value, (dict, list)):
+                            # Compare as stored (JSON turns tuples into lists)
+                            value = json.loads(json.dumps(value, ensure_ascii=False))
+                        if getattr(article, key) != value:
+                            counts[f"changed:{key}"] += 1
+                            changed = True
+                            if not dry_run:
+                                setattr(article, key, value)
+                    counts["changed" if changed else "unchanged"] += 1
+                if dry_run:
+                    db.rollback()
+                else:
+                    db.commit()
+                print(f"[reprocess] {min(start + batch_size, len(articles))}/{len(articles)} articles")
+        counts["articles"] = len(articles)
+        return dict(counts)
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Raw page / feed archive")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Fetches, unique blobs and compression per kind")
+    p_prune = sub.add_parser("prune", help="Apply the retention window")
+    p_prune.add_argument("--days", type=int, default=None)
+    p_re = sub.add_parser("reprocess", help="Re-run extraction + NLP over the archive (no network)")
+    p_re.add_argument("--since", type=lambda s: datetime.fromisoformat(s), default=None, help="Articles published after (ISO date)")
+    p_re.add_argument("--source", default=None)
+    p_re.add_argument("--workers", type=int, default=None)
+    p_re.add_argument("--feeds", action="store_true", help="Fall back to archived feed summaries when no HTML is archived")
+    p_re.add_argument("--limit", type=int, default=None)
+    p_re.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        for kind, s in stats().items():
+            ratio = s["size"] / s["stored"] if s["stored"] else 0.0
+            print(f"{kind:<5} fetches={s['fetches']} blobs={s['blobs']} raw={s['size'] / 1e6:.1f}MB "
+                  f"stored={s['stored'] / 1e6:.1f}MB ratio={ratio:.1f}x")
+    elif args.command == "prune":
+        print(prune(args.days))
+    else:
+        result = reprocess(args.since, args.source, args.workers, args.feeds, args.dry_run, args.limit)
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        if not args.dry_run and result.get("changed"):
+            print("Events are not re-clustered; their aggregates may lag the updated articles.")
+
+
+if __name__ == "__main__":
+    main()
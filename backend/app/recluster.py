@@ -0,0 +1,385 @@
+"""
+Offline re-clustering of the whole article history.
+
+When thresholds or the matching logic in ``event_matcher`` change, existing
+events keep the grouping they were built with. This rebuilds them::
+
+    python -m app.recluster [--workers N] [--report FILE]   # build shadow tables + diff report
+    python -m app.recluster --swap [--report FILE]          # apply those shadow tables
+
+1. Approved/pending articles (except those of archived events) are
+   streamed in publish order (``yield_per``) and partitioned by
+   (disaster_type, province); clustering never crosses those, so partitions
+   are independent.
+2. A process pool replays the matcher per partition in memory: the same
+   ``match_score`` against an ``ActiveEventIndex`` of the partition's events,
+   ``new_event_for_article`` / ``merge_article_into_event`` for the writes.
+3. The resulting events go to ``events_shadow`` and the article links to
+   ``article_events_shadow``. Each new event keeps the id of the old event it
+   shares most articles with, so unchanged events (and their followers,
+   reports and URLs) keep their ids.
+4. ``--swap`` applies the shadow tables of the last build, the one whose
+   report was reviewed, in one transaction: retired events are deleted
+   (followers/reports move to the event that took most of their articles),
+   kept ids are updated in place, new ones inserted, and articles relinked.
+   Events without approved/pending articles ("ghost" events) are retired.
+
+The diff report counts unchanged, merged (one new event from several old
+ones), split (one old event into several) and new events. The build records
+the article/event counts it started from in ``recluster_shadow_state``;
+``--swap`` refuses shadow tables that are missing or stale (articles or
+events changed since), so run both with the crawler paused.
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import sqlalchemy as sa
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import event_lifecycle
+from . import nlp  # noqa: F401  (new_event_for_article needs it; load it once, before the pool forks)
+from .event_index import ActiveEventIndex
+from .event_matcher import _lower, column_values, event_key, match_score, match_window, merge_article_into_event, \
+    new_event_for_article
+from .event_signature import token_ids
+from .models import Article, Event, EventArchive, EventFollow, CrowdsourcedReport
+
+logger = logging.getLogger(__name__)
+
+# Article columns the matcher reads; full_text and friends stay in the DB
+_FIELDS = (
+    "id", "source", "domain", "title", "summary", "published_at", "disaster_type", "province",
+    "commune", "village", "route", "cause", "characteristics", "stage", "deaths", "missing", "injured",
+    "damage_billion_vnd", "needs_verification", "is_red_alert", "impact_details", "syndicated_from_id",
+)
+_EVENT_COLUMNS = [c.name for c in Event.__table__.columns]
+_CHUNK = 5000
+
+_meta = sa.MetaData()
+events_shadow = sa.Table(
+    "events_shadow", _meta,
+    *[sa.Column(c.name, c.type, primary_key=c.primary_key, autoincrement=False) for c in Event.__table__.columns],
+)
+article_events_shadow = sa.Table(
+    "article_events_shadow", _meta,
+    sa.Column("article_id", sa.Integer, primary_key=True, autoincrement=False),
+    sa.Column("event_id", sa.Integer, nullable=False),
+)
+shadow_state = sa.Table(
+    "recluster_shadow_state", _meta,
+    sa.Column("id", sa.Integer, primary_key=True, autoincrement=False),
+    sa.Column("built_at", sa.DateTime, nullable=False),
+    sa.Column("source_state", sa.Text, nullable=False),
+    sa.Column("report", sa.Text, nullable=False),
+)
+
+
+# ----------------------------------------------------------------------
+# Worker: one (disaster_type, province) partition
+# ----------------------------------------------------------------------
+def cluster_partition(rows: list[dict]) -> tuple[list[dict], list[int]]:
+    """Cluster one partition's articles in publish order.
+
+    Returns the events as column dicts (without ``id``) and, per input row,
+    the index of its event in that list.
+    """
+    index = ActiveEventIndex(datetime.min)
+    events: list[Event] = []
+    keys: set[str] = set()
+    assignment = []
+    for row in rows:
+        article = Article(**row)
+        window_start, window_end = match_window(article)
+        tokens = token_ids(article.title)
+        commune, village = _lower(article.commune), _lower(article.village)
+        best_score, best_id = 0.0, None
+        for cand in index.candidates(article.disaster_type, article.province, window_start, window_end):
+            score = match_score(tokens, commune, village, cand.tokens, cand.commune, cand.village)
+            if score > best_score:
+                best_score, best_id = score, cand.id
+
+        if best_id is None:
+            ev = new_event_for_article(None, article, key=event_key(article, keys.__contains__))
+            keys.add(ev.key)
+            events.append(ev)
+            n = len(events) - 1
+        else:
+            n = best_id
+            ev = events[n]
+            merge_article_into_event(None, ev, article)
+        # The index wants an id; the event itself stays id-less so the merge skips its DB-side promotion
+        ev.id = n
+        index.put(ev)
+        ev.id = None
+        assignment.append(n)
+
+    return [column_values(ev) for ev in events], assignment
+
+
+# ----------------------------------------------------------------------
+# Parent
+# ----------------------------------------------------------------------
+def _stream_partitions(db: Session) -> tuple[dict[tuple, list[dict]], dict[int, Optional[int]]]:
+    """Articles in publish order, partitioned; plus the current article -> event links."""
+    cols = [getattr(Article, f) for f in _FIELDS] + [Article.event_id]
+    query = db.query(*cols).filter(Article.status.in_(("approved", "pending"))) \
+        .order_by(Article.published_at, Article.id).yield_per(_CHUNK)
+    partitions: dict[tuple, list[dict]] = defaultdict(list)
+    old_links: dict[int, Optional[int]] = {}
+    archived = event_lifecycle.archived_article_ids(db)
+    for row in query:
+        if row[0] in archived:
+            continue
+        rec = dict(zip(_FIELDS, row[:-1]))
+        partitions[(rec["disaster_type"], rec["province"])].append(rec)
+        old_links[rec["id"]] = row[-1]
+    return partitions, old_links
+
+
+def _assign_ids(clusters: list[list[int]], old_links: dict[int, Optional[int]], next_id: int) -> list[int]:
+    """Give each new cluster the id of the old event it overlaps most (once), else a fresh id."""
+    overlaps = []
+    for n, members in enumerate(clusters):
+        for old_id, count in Counter(old_links[a] for a in members if old_links[a] is not None).items():
+            overlaps.append((-count, old_id, n))
+    overlaps.sort()
+    ids: list[Optional[int]] = [None] * len(clusters)
+    used: set[int] = set()
+    for _, old_id, n in overlaps:
+        if ids[n] is None and old_id not in used:
+            ids[n] = old_id
+            used.add(old_id)
+    for n in range(len(clusters)):
+        if ids[n] is None:
+            ids[n] = next_id
+            next_id += 1
+    return ids
+
+
+def diff_report(clusters: list[list[int]], ids: list[int], old_links: dict[int, Optional[int]],
+                old_event_ids: set[int]) -> dict:
+    old_members: dict[int, set[int]] = defaultdict(set)
+    for a, e in old_links.items():
+        if e is not None:
+            old_members[e].add(a)
+    new_of: dict[int, set[int]] = defaultdict(set)  # old event -> new events holding its articles
+    merged, unchanged, new = [], 0, 0
+    for members, new_id in zip(clusters, ids):
+        sources = {old_links[a] for a in members if old_links[a] is not None}
+        for e in sources:
+            new_of[e].add(new_id)
+        if not sources:
+            new += 1
+        elif len(sources) > 1:
+            merged.append({"event_id": new_id, "from": sorted(sources), "articles": len(members)})
+        elif old_members[next(iter(sources))] == set(members):
+            unchanged += 1
+    split = [{"event_id": e, "into": sorted(n), "articles": len(old_members[e])}
+             for e, n in new_of.items() if len(n) > 1]
+    kept = set(ids)
+    return {
+        "articles": len(old_links),
+        "events_before": len(old_event_ids),
+        "events_after": len(clusters),
+        "unchanged": unchanged,
+        "merged": len(merged),
+        "split": len(split),
+        "new": new,
+        "retired": len(old_event_ids - kept),
+        "merged_examples": sorted(merged, key=lambda m: -m["articles"])[:20],
+        "split_examples": sorted(split, key=lambda s: -s["articles"])[:20],
+    }
+
+
+def _source_state(db: Session) -> dict:
+    """What the shadow tables were built from; any change makes them stale."""
+    articles, max_article = db.query(func.count(Article.id), func.max(Article.id)) \
+        .filter(Article.status.in_(("approved", "pending"))).one()
+    events, updated = db.query(func.count(Event.id), func.max(Event.updated_at)).one()
+    return {"articles": articles, "max_article_id": max_article, "events": events,
+            "events_updated": updated.isoformat() if updated else None}
+
+
+def build_shadow(db: Session, workers: int | None = None) -> dict:
+    """Re-cluster everything into the shadow tables; returns the diff report."""
+    t0 = time.perf_counter()
+    state = _source_state(db)
+    partitions, old_links = _stream_partitions(db)
+    t_stream = time.perf_counter() - t0
+
+    # Largest partitions first so the pool is not left waiting on one straggler
+    keys = sorted(partitions, key=lambda k: -len(partitions[k]))
+    events: list[dict] = []
+    clusters: list[list[int]] = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for key, (part_events, assignment) in zip(keys, pool.map(cluster_partition, [partitions[k] for k in keys],
+                                                               chunksize=4)):
+            members: list[list[int]] = [[] for _ in part_events]
+            for row, n in zip(partitions[key], assignment):
+                members[n].append(row["id"])
+            events += part_events
+            clusters += members
+    t_cluster = time.perf_counter() - t0 - t_stream
+
+    old_event_ids = {i for (i,) in db.query(Event.id)}
+    # Archived events keep their ids too
+    max_id = max(max(old_event_ids, default=0), db.query(func.max(EventArchive.id)).scalar() or 0)
+    ids = _assign_ids(clusters, old_links, max_id + 1)
+
+    report = diff_report(clusters, ids, old_links, old_event_ids)
+    report["partitions"] = len(partitions)
+
+    bind = db.get_bind()
+    _meta.drop_all(bind)
+    _meta.create_all(bind)
+    with bind.begin() as conn:
+        rows = [{**ev, "id": i} for ev, i in zip(events, ids)]
+        for start in range(0, len(rows), _CHUNK):
+            conn.execute(events_shadow.insert(), rows[start:start + _CHUNK])
+        links = [{"article_id": a, "event_id": i} for members, i in zip(clusters, ids) for a in members]
+        for start in range(0, len(links), _CHUNK):
+            conn.execute(article_events_shadow.insert(), links[start:start + _CHUNK])
+        report["seconds"] = {"stream": round(t_stream, 1), "cluster": round(t_cluster, 1),
+                             "total": round(time.perf_counter() - t0, 1)}
+        conn.execute(shadow_state.insert().values(
+            id=1, built_at=datetime.utcnow(), source_state=json.dumps(state),
+            report=json.dumps(report, ensure_ascii=False)))
+    return report
+
+
+def shadow_report(db: Session) -> dict:
+    """The report of the shadow tables in place; ValueError when they are missing or stale."""
+    bind = db.get_bind()
+    if not all(sa.inspect(bind).has_table(t.name) for t in _meta.sorted_tables):
+        raise ValueError("no shadow tables; run `python -m app.recluster` first")
+    with bind.connect() as conn:
+        row = conn.execute(sa.select(shadow_state)).first()
+    if row is None:
+        raise ValueError("shadow tables are incomplete; run `python -m app.recluster` again")
+    if json.loads(row.source_state) != _source_state(db):
+        raise ValueError(f"shadow tables built at {row.built_at:%Y-%m-%d %H:%M} are stale (articles or events "
+                         f"changed since); run `python -m app.recluster` again")
+    report = json.loads(row.report)
+    report["built_at"] = row.built_at.isoformat()
+    return report
+
+
+def _successors(conn) -> dict[int, Optional[int]]:
+    """Retired event id -> the new event holding most of its articles (None if it had none)."""
+    a, s = Article.__table__, article_events_shadow
+    rows = conn.execute(
+        sa.select(a.c.event_id, s.c.event_id, sa.func.count())
+        .select_from(a.join(s, s.c.article_id == a.c.id))
+        .where(a.c.event_id.is_not(None))
+        .group_by(a.c.event_id, s.c.event_id)
+    ).all()
+    best: dict[int, tuple[int, int]] = {}
+    for old_id, new_id, count in rows:
+        if old_id not in best or (count, -new_id) > (best[old_id][0], -best[old_id][1]):
+            best[old_id] = (count, new_id)
+    kept = {i for (i,) in conn.execute(sa.select(events_shadow.c.id))}
+    retired = {i for (i,) in conn.execute(sa.select(Event.id))} - kept
+    return {old_id: best[old_id][1] if old_id in best else None for old_id in retired}
+
+
+def swap(db: Session) -> dict:
+    """Apply the shadow tables to events/articles in one transaction (check ``shadow_report`` first)."""
+    ev, art, shadow, links = Event.__table__, Article.__table__, events_shadow, article_events_shadow
+    follows, reports = EventFollow.__table__, CrowdsourcedReport.__table__
+    shadow_ids = sa.select(shadow.c.id)
+    # updated_at is stamped at swap time (by ``onupdate`` and below), not copied from the build
+    data_cols = [c for c in _EVENT_COLUMNS if c not in ("id", "updated_at")]
+
+    with db.get_bind().begin() as conn:
+        successors = _successors(conn)
+        retired = list(successors)
+
+        # Everything pointing at a retired event moves to its successor first
+        conn.execute(art.update().where(art.c.event_id.in_(retired)).values(event_id=None))
+        for old_id, new_id in successors.items():
+            conn.execute(reports.update().where(reports.c.event_id == old_id).values(event_id=new_id))
+            if new_id is None:
+                conn.execute(follows.delete().where(follows.c.event_id == old_id))
+                continue
+            already = sa.select(follows.c.user_id).where(follows.c.event_id == new_id).scalar_subquery()
+            conn.execute(follows.delete().where(follows.c.event_id == old_id, follows.c.user_id.in_(already)))
+            conn.execute(follows.update().where(follows.c.event_id == old_id).values(event_id=new_id))
+
+        # New events may reuse a key an old row still holds: park kept keys first
+        for start in range(0, len(retired), _CHUNK):
+            conn.execute(ev.delete().where(ev.c.id.in_(retired[start:start + _CHUNK])))
+        conn.execute(ev.update().where(ev.c.id.in_(shadow_ids)).values(key=sa.literal("~recluster~") +
+                                                                        sa.cast(ev.c.id, sa.String)))
+        conn.execute(ev.update().where(ev.c.id.in_(shadow_ids)).values({
+            ev.c[c]: sa.select(shadow.c[c]).where(shadow.c.id == ev.c.id).scalar_subquery() for c in data_cols
+        }))
+        existing = sa.select(ev.c.id)
+        conn.execute(ev.insert().from_select(["id", *data_cols, "updated_at"], sa.select(
+            shadow.c.id, *[shadow.c[c] for c in data_cols], sa.literal(datetime.utcnow(), sa.DateTime),
+        ).where(shadow.c.id.not_in(existing))))
+        conn.execute(art.update().where(art.c.id.in_(sa.select(links.c.article_id))).values(
+            event_id=sa.select(links.c.event_id).where(links.c.article_id == art.c.id).scalar_subquery()))
+        if conn.dialect.name == "postgresql":
+            conn.execute(sa.text("SELECT setval(pg_get_serial_sequence('events', 'id'), "
+                                 "COALESCE((SELECT MAX(id) FROM events), 1))"))
+
+    _meta.drop_all(db.get_bind())
+    # Rebuilt events start out active; put the quiet ones back to cooling/closed
+    event_lifecycle.advance(db)
+    try:
+        from .cache import cache
+        for pattern in ("ev_detail_*", "stats_*", "articles_latest_*"):
+            cache.delete_match(pattern)
+    except Exception as e:
+        logger.warning(f"[recluster] cache invalidation failed: {e}")
+    return {"retired": len(retired), "follows_or_reports_moved": sum(1 for v in successors.values() if v)}
+
+
+def _summary(report: dict) -> str:
+    return (f"{report['articles']} articles in {report['partitions']} partitions: "
+            f"{report['events_before']} -> {report['events_after']} events "
+            f"(unchanged {report['unchanged']}, merged {report['merged']}, split {report['split']}, "
+            f"new {report['new']}, retired {report['retired']})")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.recluster", description="Rebuild all events from articles")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count)")
+    parser.add_argument("--swap", action="store_true",
+                        help="Apply the shadow tables of the last build (default: build them and report)")
+    parser.add_argument("--report", type=Path, default=None, help="Write the diff report as JSON")
+    args = parser.parse_args(argv)
+
+    from .database import SessionLocal
+    db = SessionLocal()
+    try:
+        if args.swap:
+            try:
+                report = shadow_report(db)
+            except ValueError as e:
+                parser.exit(1, f"{parser.prog}: {e}\n")
+            print(f"applying build of {report['built_at']}: {_summary(report)}")
+            report["swap"] = swap(db)
+            print(f"swapped in; {report['swap']['retired']} events retired")
+        else:
+            report = build_shadow(db, args.workers)
+            print(f"{_summary(report)} in {report['seconds']['total']}s")
+            print("shadow tables left in place; review the report, then run with --swap to apply them")
+        if args.report:
+            args.report.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Crowdsourced report ingestion.
+
+``POST /api/user/crowdsource/submit`` no longer commits inline: submissions
+are queued in-process and written by a single task in group commits of up to
+``report_batch_size`` reports (or whatever arrived within ``report_flush_ms``).
+Each request still gets its stored row back, so the API contract is
+unchanged, but a storm-day spike costs one transaction per batch instead of
+one per report.
+
+Every batch is linked to events before the commit: reports are grouped by
+province (inferred from lat/lon when missing), candidates come from
+``event_matcher.candidate_events`` - the same index the article clustering
+uses - and the closest event updated within ``report_match_hours`` and
+``report_match_radius_km`` wins.
+"""
+
+import asyncio
+import logging
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from . import metrics, schemas
+from .database import SessionLocal
+from .event_matcher import candidate_events
+from .models import CrowdsourcedReport, Event
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    r1, r2 = math.radians(lat1), math.radians(lat2)
+    dlat, dlon = r2 - r1, math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(r1) * math.cos(r2) * math.sin(dlon / 2) ** 2
+    return 6371.0 * 2 * math.asin(math.sqrt(a))
+
+
+def nearest_province(lat: float, lon: float) -> str | None:
+    """Province whose centroid is closest, if within the match radius."""
+    from .nlp import PROVINCE_COORDINATES
+    best, best_km = None, settings.report_match_radius_km
+    for name, (plat, plon) in PROVINCE_COORDINATES.items():
+        km = haversine_km(lat, lon, plat, plon)
+        if km <= best_km:
+            best, best_km = name, km
+    return best
+
+
+def _best_event(report: CrowdsourcedReport, events: list[Event]) -> Event | None:
+    at = report.created_at
+    window = timedelta(hours=settings.report_match_hours)
+    best, best_key = None, None
+    for ev in events:
+        if ev.last_updated_at < at - window or (ev.started_at and ev.started_at > at + timedelta(hours=1)):
+            continue
+        km = settings.report_match_radius_km
+        if report.lat is not None and report.lon is not None and ev.lat is not None and ev.lon is not None:
+            km = haversine_km(report.lat, report.lon, ev.lat, ev.lon)
+            if km > settings.report_match_radius_km:
+                continue
+        # Closest first, then the most recently updated
+        key = (km, -ev.last_updated_at.timestamp())
+        if best_key is None or key < best_key:
+            best, best_key = ev, key
+    return best
+
+
+def match_reports(db: Session, reports: list[CrowdsourcedReport], now: datetime | None = None) -> int:
+    """Link reports without an event to a live event; one candidate query per province."""
+    now = now or datetime.utcnow()
+    by_province: dict[str, list[CrowdsourcedReport]] = defaultdict(list)
+    for r in reports:
+        if r.event_id:
+            continue
+        if r.created_at is None:
+            r.created_at = now
+        if not r.province and r.lat is not None and r.lon is not None:
+            r.province = nearest_province(r.lat, r.lon)
+        if r.province:
+            by_province[r.province].append(r)
+
+    matched = 0
+    window = timedelta(hours=settings.report_match_hours)
+    for province, group in by_province.items():
+        times = [r.created_at for r in group]
+        events = candidate_events(db, province, min(times) - window, max(times) + timedelta(hours=1))
+        if not events:
+            continue
+        for r in group:
+            ev = _best_event(r, events)
+            if ev is not None:
+                r.event_id = ev.id
+                matched += 1
+    return matched
+
+
+def _write(db: Session, payloads: list[dict]) -> list[schemas.CrowdsourcedReportOut]:
+    now = datetime.utcnow()
+    reports = [CrowdsourcedReport(created_at=now, **p) for p in payloads]
+    db.add_all(reports)
+    matched = match_reports(db, reports, now)
+    db.commit()
+    metrics.REPORTS_INGESTED.inc(matched, matched="yes")
+    metrics.REPORTS_INGESTED.inc(len(reports) - matched, matched="no")
+    return [schemas.CrowdsourcedReportOut.model_validate(r) for r in reports]
+
+
+def write_batch(payloads: list[dict]) -> list[schemas.CrowdsourcedReportOut | Exception]:
+    """Insert and match one batch in a single transaction; fall back to row by row on error."""
+    db = SessionLocal()
+    try:
+        try:
+            return _write(db, payloads)
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Report batch of {len(payloads)} failed ({e}); retrying one by one")
+        results: list = []
+        for p in payloads:
+            try:
+                results.extend(_write(db, [p]))
+            except Exception as e:
+                db.rollback()
+                results.append(e)
+        return results
+    finally:
+        db.close()
+
+
+class ReportIngestor:
+    """Single consumer task that group-commits queued submissions."""
+
+    def __init__(self, batch_size: int | None = None, flush_ms: int | None = None):
+        self.batch_size = batch_size or settings.report_batch_size
+        self.flush_seconds = (flush_ms if flush_ms is not None else settings.report_flush_ms) / 1000.0
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._loop = None
+        self._busy = False
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run())
+
+    async def submit(self, payload: dict) -> schemas.CrowdsourcedReportOut:
+        self._ensure_started()
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((payload, fut))
+        return await fut
+
+    async def _collect(self) -> list[tuple[dict, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            self._busy = True
+            metrics.REPORT_BATCH_SIZE.observe(len(batch))
+            try:
+                results = await asyncio.to_thread(write_batch, [p for p, _ in batch])
+            except Exception as e:
+                results = [e] * len(batch)
+            for (_, fut), result in zip(batch, results):
+                if fut.done():
+                    continue
+                if isinstance(result, Exception):
+                    fut.set_exception(result)
+                else:
+                    fut.set_result(result)
+            self._busy = False
+
+    async def close(self) -> None:
+        """Write whatever is still queued, then stop the consumer."""
+        if self._task is None:
+            return
+        while self._busy or not self._queue.empty():
+            await asyncio.sleep(0.05)
+        self._task.cancel()
+        self._task = None
+
+
+ingestor = ReportIngestor()
+
+
+async def submit(payload: dict) -> schemas.CrowdsourcedReportOut:
+    return await ingestor.submit(payload)
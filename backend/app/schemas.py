@@ -26,6 +26,7 @@ class ArticleOut(BaseModel):
     image_url: str | None
     is_red_alert: bool = False
     event_id: int | None
+    syndicated_from_id: int | None = None
     needs_verification: int = 0
     status: str | None = None
     score: float | None = None
@@ -61,6 +62,8 @@ class EventOut(BaseModel):
     needs_verification: int = 0
     image_url: str | None = None
     is_red_alert: bool = False
+    # active, cooling, closed (app.event_lifecycle) or archived
+    state: str = "active"
     source: str | None = None
     source_url: str | None = None
 
@@ -70,6 +73,15 @@ class EventOut(BaseModel):
 class EventDetailOut(EventOut):
     articles: list[ArticleOut]
 
+class RelatedEventOut(EventOut):
+    similarity: float
+    probable_duplicate: bool = False
+
+class DuplicatePairOut(BaseModel):
+    a: EventOut
+    b: EventOut
+    similarity: float
+
 class EventUpdate(BaseModel):
     title: str | None = None
     disaster_type: str | None = None
@@ -0,0 +1,150 @@
+"""
+Vectorized title similarity for event matching.
+
+``event_matcher.match_score`` compares one article with one candidate using
+Python sets. Batch clustering (app.event_batch) needs every new article of a
+cycle against every other one and against the live events of the same
+hazard/province, so titles are turned into sparse binary rows instead:
+
+* the unigram and bigram token ids (app.event_signature) of both sides are
+  mapped to columns of a shared vocabulary;
+* one sparse product per n-gram order gives all intersections, set sizes
+  give the unions;
+* the hybrid Jaccard (0.4 unigram + 0.6 bigram, unigram only when neither
+  title has a bigram), the 0.7 threshold and the commune (+0.3) / village
+  (+0.4) boosts are evaluated on the non-zero entries only, with the same
+  float64 operations as ``_calculate_similarity``, so scores are identical.
+
+Pairs without a shared unigram can never reach the threshold, which keeps the
+result as sparse as the intersection matrix.
+
+scipy comes with scikit-learn (requirements.txt).
+"""
+
+from typing import Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+
+Tokens = tuple[frozenset, frozenset]
+
+THRESHOLD = 0.7
+UNIGRAM_WEIGHT = 0.4
+BIGRAM_WEIGHT = 0.6
+COMMUNE_BOOST = 0.3
+VILLAGE_BOOST = 0.4
+
+
+class TitleMatrix:
+    """Unigram/bigram incidence rows plus lowercased commune/village of a list of titles."""
+
+    def __init__(self, tokens: Sequence[Tokens], communes: Sequence[Optional[str]] | None = None,
+                 villages: Sequence[Optional[str]] | None = None):
+        self.tokens = list(tokens)
+        n = len(self.tokens)
+        self.communes = list(communes) if communes is not None else [None] * n
+        self.villages = list(villages) if villages is not None else [None] * n
+        self.uni_len = np.fromiter((len(t[0]) for t in self.tokens), dtype=np.int64, count=n)
+        self.bi_len = np.fromiter((len(t[1]) for t in self.tokens), dtype=np.int64, count=n)
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+
+def _incidence(a: list[frozenset], b: list[frozenset]) -> tuple[sparse.csr_matrix, sparse.csr_matrix]:
+    """Binary rows of ``a`` and ``b`` over their common vocabulary."""
+    def flat(sets):
+        lengths = np.fromiter((len(s) for s in sets), dtype=np.int64, count=len(sets))
+        ids = np.fromiter((x for s in sets for x in s), dtype=np.int64, count=int(lengths.sum()))
+        return lengths, ids
+
+    a_len, a_ids = flat(a)
+    b_len, b_ids = flat(b)
+    vocab = np.unique(np.concatenate([a_ids, b_ids]))
+
+    def csr(lengths, ids):
+        indptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        data = np.ones(len(ids), dtype=np.int32)
+        return sparse.csr_matrix((data, np.searchsorted(vocab, ids), indptr), shape=(len(lengths), len(vocab)))
+
+    return csr(a_len, a_ids), csr(b_len, b_ids)
+
+
+def _codes(a: list, b: list) -> tuple[np.ndarray, np.ndarray]:
+    """Integer codes for equality tests; None/empty is -1 and never equal to anything."""
+    table: dict[str, int] = {}
+
+    def enc(values):
+        return np.fromiter((-1 if not v else table.setdefault(v, len(table)) for v in values),
+                           dtype=np.int64, count=len(values))
+
+    return enc(a), enc(b)
+
+
+def match_scores(queries: TitleMatrix, candidates: TitleMatrix) -> sparse.csr_matrix:
+    """``match_score`` of every query against every candidate; entries below the threshold are absent."""
+    shape = (len(queries), len(candidates))
+    if not len(queries) or not len(candidates):
+        return sparse.csr_matrix(shape, dtype=np.float64)
+
+    qu, cu = _incidence([t[0] for t in queries.tokens], [t[0] for t in candidates.tokens])
+    u_inter = (qu @ cu.T).tocoo()
+    rows, cols = u_inter.row, u_inter.col
+    u_i = u_inter.data.astype(np.int64)
+    if not len(u_i):
+        return sparse.csr_matrix(shape, dtype=np.float64)
+
+    qb, cb = _incidence([t[1] for t in queries.tokens], [t[1] for t in candidates.tokens])
+    # Bigram intersections at the (rows, cols) of the unigram ones
+    b_inter = (qb @ cb.T).tocoo()
+    m = shape[1]
+    b_keys = b_inter.row.astype(np.int64) * m + b_inter.col
+    order = np.argsort(b_keys)
+    b_keys, b_data = b_keys[order], b_inter.data[order].astype(np.int64)
+    keys = rows.astype(np.int64) * m + cols
+    if len(b_keys):
+        pos = np.minimum(np.searchsorted(b_keys, keys), len(b_keys) - 1)
+        b_i = np.where(b_keys[pos] == keys, b_data[pos], 0)
+    else:
+        b_i = np.zeros_like(u_i)
+
+    u_union = queries.uni_len[rows] + candidates.uni_len[cols] - u_i
+    b_union = queries.bi_len[rows] + candidates.bi_len[cols] - b_i
+    u_sim = u_i / u_union
+    with np.errstate(divide="ignore", invalid="ignore"):
+        b_sim = np.where(b_union > 0, b_i / np.where(b_union > 0, b_union, 1), 0.0)
+    title_sim = np.where(b_union > 0, (u_sim * UNIGRAM_WEIGHT) + (b_sim * BIGRAM_WEIGHT), u_sim)
+
+    keep = title_sim >= THRESHOLD
+    rows, cols, score = rows[keep], cols[keep], title_sim[keep]
+
+    # LOCATION BOOST, in the same order as match_score
+    qc, cc = _codes(queries.communes, candidates.communes)
+    score = score + np.where((qc[rows] >= 0) & (qc[rows] == cc[cols]), COMMUNE_BOOST, 0.0)
+    qv, cv = _codes(queries.villages, candidates.villages)
+    score = score + np.where((qv[rows] >= 0) & (qv[rows] == cv[cols]), VILLAGE_BOOST, 0.0)
+
+    return sparse.csr_matrix((score, (rows, cols)), shape=shape)
+
+
+def within(scores: sparse.csr_matrix, lo: np.ndarray, hi: np.ndarray, at: np.ndarray) -> sparse.csr_matrix:
+    """Keep entries whose candidate value ``at[col]`` lies in ``[lo[row], hi[row]]`` (e.g. a time window)."""
+    coo = scores.tocoo()
+    keep = (at[coo.col] >= lo[coo.row]) & (at[coo.col] <= hi[coo.row])
+    return sparse.csr_matrix((coo.data[keep], (coo.row[keep], coo.col[keep])), shape=scores.shape)
+
+
+def best_matches(scores: sparse.csr_matrix) -> list[tuple[int, float]]:
+    """Per row: (column, score) of the highest score, lowest column on ties, or (-1, 0.0)."""
+    scores = scores.tocsr()
+    scores.sort_indices()
+    out = []
+    for r in range(scores.shape[0]):
+        start, end = scores.indptr[r], scores.indptr[r + 1]
+        if start == end:
+            out.append((-1, 0.0))
+            continue
+        i = start + int(np.argmax(scores.data[start:end]))  # first maximum = lowest column
+        out.append((int(scores.indices[i]), float(scores.data[i])))
+    return out
@@ -315,6 +315,8 @@ class Source:
     note: str | None = None
     trusted: bool | None = False
     authority_level: int = 1         # 1: Normal, 2: Trusted, 3: High Authority (Direct Gov/VTV)
+    sitemaps: tuple[str, ...] | None = None  # None: not probed yet (see app.listing_crawler)
+    sitemaps_checked: str | None = None
 
 GNEWS_IMPACT_KEYWORDS = [ 
     "thiệt hại","tổn thất", "đổ nhà","đổ tường", "hư hỏng","cuốn trôi", "trôi nhà","ngập nhà","vỡ đê","tràn đê",
@@ -374,10 +376,43 @@ def load_sources_from_json(file_path: str) -> List[Source]:
             backup_rss=s.get("backup_rss"),
             note=s.get("note"),
             trusted=s.get("trusted", False),
-            authority_level=s.get("authority_level", 2 if s.get("trusted") else 1)
+            authority_level=s.get("authority_level", 2 if s.get("trusted") else 1),
+            sitemaps=tuple(s["sitemaps"]) if s.get("sitemaps") is not None else None,
+            sitemaps_checked=s.get("sitemaps_checked"),
         ))
     return sources
 
+# Tier 1: Critical Official Sources
+# Includes National/Provincial KTTV, Earthquake Center, and Dyke Management
+TIER1_KEYWORDS = [
+    "KTTV Quốc gia", "KTTV Ninh Bình", "KTTV Thanh Hóa", "Cục PCTT (MARD)", "PCTT Hà Nội",
+    "Cục Kiểm lâm (PCCCR)", "Viện Vật lý Địa cầu", "KTTV An Giang", "KTTV Hưng Yên", "KTTV Yên Bái",
+    "Cục Quản lý đê điều", "VMRCC (Cứu nạn hàng hải)", "Tạp chí Khí tượng Thủy văn",
+    "Ủy ban Sông Mê Công Việt Nam", "Báo Biên phòng",
+]
+
+# Tier 2: Major National News
+# These sources have high coverage and fast reporting but are not official disaster agencies.
+TIER2_SOURCES = [
+    "VnExpress", "Tuổi Trẻ", "Thanh Niên", "Dân Trí", "SGGP", "Lao Động",
+    "VietnamPlus", "Báo Tin tức", "CAND", "QĐND", "VTV News", "Pháp luật TP.HCM",
+    "VietNamNet", "Nhân Dân", "Tiền Phong", "Người Lao Động", "Quân đội Nhân dân", "Báo Chính Phủ",
+    "Nông Nghiệp & Môi trường", "Báo Dân tộc và Phát triển", "Báo Giao thông", "Cổng TTĐT Chính phủ (Công báo)",
+    "Bnews", "Báo Nông nghiệp VN", "Tạp chí Giao thông", "Báo Công lý", "Báo Văn hóa", "Báo Xây dựng",
+    "VnEconomy", "VTC News", "Báo Quốc tế", "Dân Việt", "VOV", "Báo Công Thương", "Vietnam.vn",
+    "Báo Thanh tra", "Bộ Công an", "Giáo dục & Thời đại",
+]
+
+
+
+def source_tier(name: str) -> int:
+    """0 = critical official, 1 = major national, 2 = everything else."""
+    if any(kw in name for kw in TIER1_KEYWORDS):
+        return 0
+    if name in TIER2_SOURCES:
+        return 1
+    return 2
+
 CONFIG_FILE = Path(__file__).parent.parent / "sources.json"
 SOURCES = load_sources_from_json(str(CONFIG_FILE))
 CONFIG = {}
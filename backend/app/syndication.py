@@ -0,0 +1,136 @@
+"""
+SimHash fingerprints of article full texts: syndicated copies.
+
+Agency stories (TTXVN/VNA, baotintuc, government portals) are republished
+by many outlets under their own titles. Each copy used to count as an
+independent source in ``sources_count``, confidence and the 3-domain
+consensus promotion, although nobody confirmed anything twice.
+
+During enrichment every full text of at least ``MIN_WORDS`` words gets a
+64-bit SimHash of its 3-word shingles (``articles.text_simhash``, stored
+signed). Copies differ by a byline, a photo caption or a reworded sentence,
+which moves the fingerprint by 3-10 bits; unrelated texts land ~32 bits
+apart and practically never under 13. The fingerprint is split into
+``BANDS`` 8-bit bands (``article_simhash_bands``, indexed on band, value and
+publish time): by pigeonhole two fingerprints within ``MAX_DISTANCE`` bits
+share at least one band exactly, so a lookup is one indexed scan over the
+``WINDOW`` before the article, re-checked by Hamming distance. Fingerprinting
+a 5,000-word text takes a few milliseconds.
+
+A copy points at the earliest such article (or at its root, if that one is
+itself a copy) through ``articles.syndicated_from_id``; app.event_aggregates
+then counts one source per root.
+"""
+
+import logging
+import re
+import zlib
+from datetime import timedelta
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from . import metrics
+from .event_aggregates import recompute
+from .models import Article, ArticleSimhashBand, Event
+
+logger = logging.getLogger(__name__)
+
+MIN_WORDS = 50
+BANDS = 8
+BAND_BITS = 64 // BANDS
+MAX_DISTANCE = BANDS - 1
+WINDOW = timedelta(hours=72)
+
+_WORD_RE = re.compile(r"\w+")
+_M1 = np.uint64(0xBF58476D1CE4E5B9)
+_M2 = np.uint64(0x94D049BB133111EB)
+_PRIME = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer: spreads shingle hashes over all 64 bits."""
+    x = x ^ (x >> np.uint64(30))
+    x = x * _M1
+    x = x ^ (x >> np.uint64(27))
+    x = x * _M2
+    return x ^ (x >> np.uint64(31))
+
+
+def fingerprint(text: Optional[str]) -> Optional[int]:
+    """Signed 64-bit SimHash of ``text``'s word shingles, None for short texts."""
+    words = _WORD_RE.findall((text or "").lower())
+    if len(words) < MIN_WORDS:
+        return None
+    ids = np.fromiter((zlib.crc32(w.encode()) for w in words), dtype=np.uint64, count=len(words))
+    with np.errstate(over="ignore"):
+        h = ids[:-2] * _PRIME
+        h = (h ^ ids[1:-1]) * _PRIME
+        h = _mix(h ^ ids[2:])
+    bits = np.unpackbits(h.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 > len(h)
+    value = int.from_bytes(np.packbits(votes, bitorder="little").tobytes(), "little")
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def bands(fp: int) -> tuple[int, ...]:
+    value = fp & 0xFFFFFFFFFFFFFFFF
+    mask = (1 << BAND_BITS) - 1
+    return tuple((value >> (i * BAND_BITS)) & mask for i in range(BANDS))
+
+
+def distance(a: int, b: int) -> int:
+    return ((a ^ b) & 0xFFFFFFFFFFFFFFFF).bit_count()
+
+
+def find_original(db: Session, article: Article) -> Optional[tuple[int, Optional[int]]]:
+    """(id, syndicated_from_id) of the earliest article within MAX_DISTANCE of ``article``."""
+    fp = article.text_simhash
+    if fp is None or article.published_at is None:
+        return None
+    probes = [and_(ArticleSimhashBand.band == i, ArticleSimhashBand.value == v) for i, v in enumerate(bands(fp))]
+    rows = db.query(Article.id, Article.text_simhash, Article.syndicated_from_id, Article.published_at) \
+        .join(ArticleSimhashBand, ArticleSimhashBand.article_id == Article.id).filter(
+            or_(*probes),
+            ArticleSimhashBand.published_at >= article.published_at - WINDOW,
+            ArticleSimhashBand.published_at <= article.published_at,
+            Article.id != article.id,
+        ).distinct().order_by(Article.published_at, Article.id)
+    for row in rows:
+        if row.text_simhash is not None and distance(fp, row.text_simhash) <= MAX_DISTANCE:
+            return row.id, row.syndicated_from_id
+    return None
+
+
+def link(db: Session, article: Article, text: Optional[str]) -> bool:
+    """Fingerprint ``text`` onto ``article`` and point it at the text's original; True when it is a copy."""
+    fp = fingerprint(text)
+    previous, article.text_simhash = article.text_simhash, fp
+    if article.id is None:
+        return False
+    if previous is not None:
+        db.query(ArticleSimhashBand).filter(ArticleSimhashBand.article_id == article.id).delete(synchronize_session=False)
+    if fp is None:
+        return False
+    db.bulk_insert_mappings(ArticleSimhashBand, [
+        {"article_id": article.id, "band": i, "value": v, "published_at": article.published_at}
+        for i, v in enumerate(bands(fp))
+    ])
+    original = find_original(db, article)
+    root = (original[1] or original[0]) if original else None
+    if root == article.id:
+        root = None
+    changed = root != article.syndicated_from_id
+    article.syndicated_from_id = root
+    if changed and article.event_id is not None:
+        # Already clustered (sequential mode): recount the event's sources
+        ev = db.get(Event, article.event_id)
+        if ev is not None:
+            db.flush()
+            recompute(db, ev)
+    if root is None:
+        return False
+    metrics.SYNDICATED_ARTICLES.inc()
+    return True
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 from .database import get_db
-from . import models, schemas, auth
+from . import models, schemas, auth, report_ingest
 from datetime import datetime
 from typing import List
 
@@ -9,23 +9,51 @@ router = APIRouter(prefix="/api/user", tags=["user"])
 
 # Crowdsourcing
 @router.post("/crowdsource/submit", response_model=schemas.CrowdsourcedReportOut)
-def submit_report(
+async def submit_report(
     report: schemas.CrowdsourcedReportCreate,
-    db: Session = Depends(get_db),
     current_user: models.User | None = Depends(auth.get_current_user_optional)
 ):
-    db_report = models.CrowdsourcedReport(
-        user_id=current_user.id if current_user else None,
+    # Queued and group-committed with other submissions, then matched to an event
+    return await report_ingest.submit({
+        "user_id": current_user.id if current_user else None,
         **report.model_dump()
-    )
-    db.add(db_report)
-    db.commit()
-    db.refresh(db_report)
-    return db_report
+    })
+
+def _parse_bbox(bbox: str) -> tuple[float, float, float, float]:
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(x) for x in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be min_lon,min_lat,max_lon,max_lat")
+    if min_lon > max_lon or min_lat > max_lat:
+        raise HTTPException(status_code=400, detail="bbox min must not exceed max")
+    return min_lon, min_lat, max_lon, max_lat
 
 @router.get("/crowdsource/approved", response_model=List[schemas.CrowdsourcedReportOut])
-def get_approved_reports(db: Session = Depends(get_db)):
-    return db.query(models.CrowdsourcedReport).filter(models.CrowdsourcedReport.status == "approved").all()
+def get_approved_reports(
+    response: Response,
+    limit: int = Query(200, ge=1, le=1000),
+    cursor: int | None = Query(None, description="X-Next-Cursor of the previous page"),
+    bbox: str | None = Query(None, description="min_lon,min_lat,max_lon,max_lat"),
+    event_id: int | None = None,
+    db: Session = Depends(get_db)
+):
+    """Newest first, keyset-paginated: pass the X-Next-Cursor header back as ``cursor``."""
+    query = db.query(models.CrowdsourcedReport).filter(models.CrowdsourcedReport.status == "approved")
+    if cursor is not None:
+        query = query.filter(models.CrowdsourcedReport.id < cursor)
+    if event_id is not None:
+        query = query.filter(models.CrowdsourcedReport.event_id == event_id)
+    if bbox:
+        min_lon, min_lat, max_lon, max_lat = _parse_bbox(bbox)
+        query = query.filter(
+            models.CrowdsourcedReport.lat.between(min_lat, max_lat),
+            models.CrowdsourcedReport.lon.between(min_lon, max_lon),
+        )
+    rows = query.order_by(models.CrowdsourcedReport.id.desc()).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = str(rows[-1].id)
+    return rows
 
 # Event Following
 @router.post("/events/{event_id}/follow")
@@ -147,6 +175,9 @@ def approve_report(
         raise HTTPException(status_code=404, detail="Report not found")
     
     report.status = "approved"
+    if report.event_id is None:
+        # Retry for reports that found no event at submission
+        report_ingest.match_reports(db, [report])
     
     # Notify user
     notif = models.Notification(
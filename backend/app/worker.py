@@ -0,0 +1,328 @@
+"""
+Standalone crawler / scheduler process.
+
+Run with ``python -m app.worker``. This process owns every APScheduler job
+(adaptive source polling, source monitor, log rotation, pending cleanup) so the API
+workers behind gunicorn only serve requests. Run exactly one instance per
+deployment; liveness is recorded in the ``worker_heartbeats`` table.
+"""
+
+import asyncio
+import functools
+import logging
+import os
+import signal
+import socket
+import threading
+from datetime import datetime, timedelta
+
+from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_EXECUTED
+from apscheduler.schedulers.blocking import BlockingScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+
+from .settings import settings
+from .database import SessionLocal, engine, Base
+from .models import WorkerHeartbeat
+
+logger = logging.getLogger(__name__)
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+HEARTBEAT_SECONDS = 30
+# A worker whose last beat is older than this is considered dead by /api/health/crawler
+HEARTBEAT_STALE_SECONDS = HEARTBEAT_SECONDS * 4
+
+# One crawl at a time per process. The startup crawl and the interval tick are
+# separate jobs (max_instances does not serialize them), and a cycle owns the
+# module-level event index, GNews cache and shared scraper client.
+_crawl_lock = threading.Lock()
+
+
+def _exclusive(job):
+    """Run a crawl entry point, or skip it while another crawl runs in this process."""
+    @functools.wraps(job)
+    def run() -> None:
+        if not _crawl_lock.acquire(blocking=False):
+            logger.info(f"{job.__name__.lstrip('_')}: a crawl is still running, skipping")
+            return
+        try:
+            job()
+        finally:
+            _crawl_lock.release()
+    return run
+
+
+def _crawl_due() -> None:
+    """
+    Crawl every source whose adaptive poll interval has elapsed. Locally this
+    runs the pipeline in-process; with CRAWL_DISTRIBUTED the sources are
+    enqueued for the consumer pool instead.
+    """
+    from .crawler import process_once
+    from .poll_scheduler import due_sources
+    db = SessionLocal()
+    try:
+        names = due_sources(db)
+    finally:
+        db.close()
+    if not names:
+        return
+    if settings.crawl_distributed:
+        from .job_queue import get_queue
+        added = get_queue().enqueue(names)
+        logger.info(f"Enqueued {added}/{len(names)} crawl jobs")
+        return
+    logger.info(f"Polling {len(names)} due sources")
+    process_once(only_sources=names, trigger="schedule")
+
+
+def _crawl_startup() -> None:
+    """
+    First crawl after boot. A run left ``running`` by a worker that died
+    mid-cycle is resumed for its unfinished sources only; if a run completed
+    within ``crawl_startup_skip_minutes`` the startup crawl is skipped and the
+    regular tick takes over.
+    """
+    from .crawler import interrupted_run, process_once
+    from .models import CrawlRun
+    db = SessionLocal()
+    try:
+        fresh = datetime.utcnow() - timedelta(seconds=HEARTBEAT_STALE_SECONDS)
+        alive = {
+            row[0] for row in db.query(WorkerHeartbeat.worker_id).filter(
+                WorkerHeartbeat.last_beat_at >= fresh, WorkerHeartbeat.status == "running",
+            )
+        }
+        run = interrupted_run(db, alive)
+        if run is not None:
+            pending = [s.source_name for s in run.sources if s.status == "pending"]
+            run_id = run.id
+            if settings.crawl_distributed and pending:
+                from .job_queue import get_queue
+                run.status = "interrupted"
+                run.finished_at = datetime.utcnow()
+                db.commit()
+                added = get_queue().enqueue(pending)
+                logger.info(f"Crawl run {run_id} was interrupted; re-enqueued {added}/{len(pending)} sources")
+                return
+        else:
+            pending = None
+            window = datetime.utcnow() - timedelta(minutes=settings.crawl_startup_skip_minutes)
+            recent = db.query(CrawlRun).filter(
+                CrawlRun.status == "completed", CrawlRun.finished_at >= window,
+            ).order_by(CrawlRun.finished_at.desc()).first()
+            if recent is not None:
+                logger.info(f"Skipping startup crawl: run {recent.id} completed at {recent.finished_at}")
+                return
+    finally:
+        db.close()
+
+    if pending is None:
+        _crawl_due()
+    elif pending:
+        logger.info(f"Resuming crawl run {run_id}: {len(pending)} unfinished sources")
+        process_once(only_sources=pending, resume_run_id=run_id, trigger="resume")
+    else:
+        logger.info(f"Crawl run {run_id} had no unfinished sources; starting a regular poll")
+        _crawl_due()
+
+
+crawl_due = _exclusive(_crawl_due)
+crawl_startup = _exclusive(_crawl_startup)
+
+
+def _beat(status: str = "running", job_id: str | None = None, error: str | None = None) -> None:
+    """Upsert this worker's heartbeat row."""
+    db = SessionLocal()
+    try:
+        hb = db.query(WorkerHeartbeat).filter(WorkerHeartbeat.worker_id == WORKER_ID).first()
+        now = datetime.utcnow()
+        if not hb:
+            hb = WorkerHeartbeat(
+                worker_id=WORKER_ID,
+                hostname=socket.gethostname(),
+                pid=os.getpid(),
+                started_at=now,
+            )
+            db.add(hb)
+        hb.status = status
+        hb.last_beat_at = now
+        if job_id:
+            hb.last_job = job_id
+            hb.last_job_at = now
+            hb.last_error = error
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Heartbeat update failed: {e}")
+    finally:
+        db.close()
+
+
+def _on_job_event(event) -> None:
+    if event.job_id == "worker_heartbeat":
+        return
+    error = str(event.exception)[:500] if getattr(event, "exception", None) else None
+    _beat(job_id=event.job_id, error=error)
+
+
+def build_scheduler() -> BlockingScheduler:
+    from .crawler import cleanup_old_pending_articles
+    from .source_monitor import monitor_now
+    from .log_utils import rotate_logs
+    from .raw_archive import prune as prune_raw_archive
+    from .event_lifecycle import run as advance_event_lifecycle
+
+    # coalesce=True rolls up missed executions into one. A single worker
+    # process owns the jobs, so one instance per job is enough.
+    job_defaults = {
+        'coalesce': True,
+        'max_instances': 1,
+        'misfire_grace_time': 300
+    }
+    scheduler = BlockingScheduler(timezone=settings.app_timezone, job_defaults=job_defaults)
+
+    # Initial crawl shortly after the worker boots: resume an interrupted run,
+    # skip if one just completed, otherwise poll the due sources
+    scheduler.add_job(
+        crawl_startup,
+        'date',
+        run_date=datetime.now() + timedelta(seconds=15),
+        id="startup_crawl"
+    )
+
+    # Job 1: Adaptive polling - every tick, crawl the sources whose learned
+    # interval has elapsed (see app.poll_scheduler). Replaces the fixed
+    # 120/240/480 minute tier jobs.
+    scheduler.add_job(
+        crawl_due,
+        trigger=IntervalTrigger(minutes=settings.poll_tick_minutes),
+        id="crawl_due_sources",
+        replace_existing=True,
+        misfire_grace_time=300
+    )
+
+    # Job 4: Source Health Monitor (Periodic Check) - Frequency: 12 HOURS (720 mins)
+    # Checks for broken RSS feeds and inactive sources.
+    scheduler.add_job(
+        lambda: asyncio.run(monitor_now()),
+        trigger=IntervalTrigger(minutes=720, jitter=60),
+        id="source_health_monitor",
+        replace_existing=True,
+        misfire_grace_time=300
+    )
+
+    # Job 6: Log Rotation & Cleanup - Frequency: 12 HOURS
+    # Keeps log files small and prevents disk full issues.
+    scheduler.add_job(
+        rotate_logs,
+        trigger=IntervalTrigger(hours=12, jitter=60),
+        id="log_rotation",
+        replace_existing=True,
+        misfire_grace_time=600
+    )
+
+    # Job 7: Database Maintenance - Frequency: 24 HOURS
+    # Automatically deletes pending articles older than 30 days.
+    scheduler.add_job(
+        cleanup_old_pending_articles,
+        trigger=IntervalTrigger(hours=24, jitter=120),
+        id="db_cleanup_pending",
+        replace_existing=True,
+        misfire_grace_time=3600
+    )
+
+    # Raw page / feed archive retention (RAW_ARCHIVE_RETENTION_DAYS)
+    scheduler.add_job(
+        prune_raw_archive,
+        trigger=IntervalTrigger(hours=24, jitter=300),
+        id="raw_archive_retention",
+        replace_existing=True,
+        misfire_grace_time=3600
+    )
+
+    # Event lifecycle: cool/close inactive events, archive long-closed ones
+    scheduler.add_job(
+        advance_event_lifecycle,
+        trigger=IntervalTrigger(hours=1, jitter=120),
+        id="event_lifecycle",
+        replace_existing=True,
+        misfire_grace_time=600
+    )
+
+    # Heartbeat runs in its own thread so long crawls don't look like a dead worker
+    scheduler.add_job(
+        _beat,
+        trigger=IntervalTrigger(seconds=HEARTBEAT_SECONDS),
+        id="worker_heartbeat",
+        replace_existing=True,
+    )
+
+    scheduler.add_listener(_on_job_event, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
+    return scheduler
+
+
+def check_alive() -> bool:
+    """True if a worker on this host has beaten within HEARTBEAT_STALE_SECONDS."""
+    db = SessionLocal()
+    try:
+        cutoff = datetime.utcnow() - timedelta(seconds=HEARTBEAT_STALE_SECONDS)
+        return db.query(WorkerHeartbeat).filter(
+            WorkerHeartbeat.hostname == socket.gethostname(),
+            WorkerHeartbeat.status == "running",
+            WorkerHeartbeat.last_beat_at >= cutoff,
+        ).first() is not None
+    finally:
+        db.close()
+
+
+def main():
+    import argparse
+    import sys
+    parser = argparse.ArgumentParser(description="Crawler / scheduler worker")
+    parser.add_argument("--check", action="store_true", help="Exit 0 if this host's worker heartbeat is fresh (container healthcheck)")
+    parser.add_argument("--consume", action="store_true", help="Only pull crawl jobs from the shared queue (no scheduler)")
+    args = parser.parse_args()
+    if args.check:
+        sys.exit(0 if check_alive() else 1)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    Base.metadata.create_all(bind=engine)
+
+    if args.consume:
+        import threading
+        from .job_queue import run_consumer
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+        def _beat_loop():
+            while not stop.wait(HEARTBEAT_SECONDS):
+                _beat()
+
+        _beat("running", job_id="consumer")
+        threading.Thread(target=_beat_loop, daemon=True).start()
+        try:
+            run_consumer(stop=stop)
+        finally:
+            _beat("stopped")
+        return
+
+    scheduler = build_scheduler()
+
+    def _stop(signum, frame):
+        logger.info(f"Worker {WORKER_ID} received signal {signum}, shutting down.")
+        scheduler.shutdown(wait=False)
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    _beat("running")
+    logger.info(f"Crawler worker {WORKER_ID} started with {len(scheduler.get_jobs())} jobs.")
+    try:
+        scheduler.start()
+    finally:
+        _beat("stopped")
+
+
+if __name__ == "__main__":
+    main()
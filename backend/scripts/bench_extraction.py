@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+"""Benchmark main-content extraction: the BeautifulSoup selector chain that
+fetch_article_full_text_async used before vs app.content_extract.
+
+Usage:
+  cd backend
+  python scripts/bench_extraction.py --fetch 20 --pages data/bench_pages   # save one article per top-20 source
+  python scripts/bench_extraction.py --pages data/bench_pages              # benchmark the saved pages
+  python scripts/bench_extraction.py --archive data/replay/cycle.zip       # or the HTML in a replay archive
+
+For every page it reports the legacy time, the new engine's full scoring
+pass, the cached-selector fast path (second page of the same domain), the
+extracted length and the word overlap with the legacy text.
+"""
+import argparse
+import asyncio
+import json
+import re
+import statistics
+import sys
+import time
+import zipfile
+from pathlib import Path
+
+repo_root = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(repo_root / "backend"))
+
+from app import content_extract
+from app.content_extract import SelectorCache
+
+_WORD_RE = re.compile(r"\w+", re.U)
+
+
+def legacy_extract(html: str) -> str:
+    """Text extraction of fetch_article_full_text_async before app.content_extract."""
+    from bs4 import BeautifulSoup
+    from app.html_scraper import extract_metadata
+    soup = BeautifulSoup(html, "html.parser")
+    meta = extract_metadata(soup)
+    images = []
+    if meta["image"]:
+        images.append(meta["image"])
+    for img in soup.find_all("img", src=True):
+        src = img["src"]
+        if any(x in src.lower() for x in ["logo", "icon", "avatar", "ads", "placeholder"]):
+            continue
+        if src.startswith("http") and any(src.lower().endswith(ext) for ext in [".jpg", ".jpeg", ".png", ".webp"]):
+            images.append(src)
+            if len(images) > 3:
+                break
+    content_text = ""
+    potential_containers = [
+        "article", ".article", ".fck_detail", ".detail-content", ".cms-body", ".post-content",
+        ".content-detail", ".article-body", ".article__body", ".article__sapo", ".article-content",
+        ".content_detail", "#content_detail", ".main-content-detail", ".detail-content-body"
+    ]
+    for selector in potential_containers:
+        container = soup.select_one(selector)
+        if container:
+            for unwanted in container.select("script, style, .sidebar, .ads, .comment"):
+                unwanted.decompose()
+            content_text = container.get_text(separator="\n", strip=True)
+            if len(content_text) > 200:
+                break
+    if len(content_text) < 200:
+        paragraphs = [p.get_text(strip=True) for p in soup.find_all("p") if len(p.get_text(strip=True)) > 40]
+        content_text = "\n".join(paragraphs)
+    if len(content_text) < 150 and meta["description"]:
+        content_text = meta["description"]
+    return content_text
+
+
+def _overlap(a: str, b: str) -> float:
+    wa, wb = set(_WORD_RE.findall(a.lower())), set(_WORD_RE.findall(b.lower()))
+    return len(wa & wb) / len(wa | wb) if wa | wb else 1.0
+
+
+def _timed(fn, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000, result
+
+
+async def fetch_pages(out_dir: Path, count: int, per_source: int) -> None:
+    """Save article pages linked from the feeds of the ``count`` highest-tier sources."""
+    import feedparser
+    import httpx
+    from app.sources import SOURCES, source_tier
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    index_path = out_dir / "index.json"
+    index = json.loads(index_path.read_text(encoding="utf-8")) if index_path.exists() else {}
+    sources = sorted((s for s in SOURCES if s.primary_rss), key=lambda s: source_tier(s.name))[:count]
+    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"}
+    async with httpx.AsyncClient(timeout=20, follow_redirects=True, headers=headers, verify=False) as client:
+        for src in sources:
+            try:
+                feed = feedparser.parse((await client.get(src.primary_rss)).content)
+                links = [e.link for e in feed.entries if getattr(e, "link", None)][:per_source]
+            except Exception as e:
+                print(f"[SKIP] {src.name}: {e}")
+                continue
+            for n, link in enumerate(links):
+                try:
+                    resp = await client.get(link)
+                    resp.raise_for_status()
+                except Exception as e:
+                    print(f"[SKIP] {link}: {e}")
+                    continue
+                name = f"{re.sub(r'[^a-z0-9]+', '_', src.domain.lower())}_{n}.html"
+                (out_dir / name).write_text(resp.text, encoding="utf-8")
+                index[name] = {"source": src.name, "url": str(resp.url)}
+                print(f"[OK] {src.name}: {resp.url}")
+    index_path.write_text(json.dumps(index, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def load_pages(pages_dir: Path | None, archive: Path | None) -> list[tuple[str, str, str]]:
+    """(label, url, html) triples."""
+    pages = []
+    if pages_dir:
+        index_path = pages_dir / "index.json"
+        index = json.loads(index_path.read_text(encoding="utf-8")) if index_path.exists() else {}
+        for path in sorted(pages_dir.glob("*.html")):
+            info = index.get(path.name, {})
+            # The fast path is keyed by domain, so pages without a known URL get a stand-in one
+            url = info.get("url") or f"https://{path.stem}.local/"
+            pages.append((info.get("source", path.stem), url, path.read_text(encoding="utf-8", errors="replace")))
+    if archive:
+        with zipfile.ZipFile(archive) as zf:
+            for name in zf.namelist():
+                if not name.startswith("requests/"):
+                    continue
+                rec = json.loads(zf.read(name))
+                ctype = {k.lower(): v for k, v in rec["headers"].items()}.get("content-type", "")
+                if rec["status"] != 200 or "html" not in ctype:
+                    continue
+                html = zf.read(f"blobs/{rec['body']}").decode("utf-8", errors="replace")
+                pages.append((content_extract._domain(rec["url"]), rec["url"], html))
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=Path, help="Directory of saved .html pages (+ index.json)")
+    parser.add_argument("--archive", type=Path, help="http_replay archive to take HTML responses from")
+    parser.add_argument("--fetch", type=int, metavar="N", help="Download pages of the top N sources into --pages first")
+    parser.add_argument("--per-source", type=int, default=1, help="Pages per source with --fetch")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions per page (best is kept)")
+    args = parser.parse_args()
+
+    if args.fetch:
+        if not args.pages:
+            parser.error("--fetch needs --pages")
+        asyncio.run(fetch_pages(args.pages, args.fetch, args.per_source))
+    pages = load_pages(args.pages, args.archive)
+    if not pages:
+        parser.error("no pages to benchmark")
+
+    rows = []
+    for label, url, html in pages:
+        legacy_ms, legacy_text = _timed(lambda: legacy_extract(html), args.repeat)
+        full_ms, full = _timed(lambda: content_extract.extract(html, url, cache=None), args.repeat)
+        # Warm a private cache as if this domain had been seen before, then time the fast path
+        cache = SelectorCache(None)
+        for _ in range(content_extract._LEARN_AFTER):
+            cache.record_win(content_extract._domain(url), full.selector)
+        fast_ms, fast = _timed(lambda: content_extract.extract(html, url, cache=cache), args.repeat)
+        rows.append((label[:28], legacy_ms, full_ms, fast_ms if fast.fast_path else None,
+                     len(legacy_text), len(full.text), _overlap(legacy_text, full.text), full.selector or "-"))
+
+    print(f"{'page':<28} {'legacy ms':>9} {'full ms':>8} {'fast ms':>8} {'legacy ch':>9} {'new ch':>7} {'overlap':>7}  selector")
+    for label, legacy_ms, full_ms, fast_ms, lc, nc, ov, sel in rows:
+        fast_s = f"{fast_ms:8.2f}" if fast_ms is not None else f"{'-':>8}"
+        print(f"{label:<28} {legacy_ms:9.2f} {full_ms:8.2f} {fast_s} {lc:9d} {nc:7d} {ov:7.2f}  {sel}")
+    fast_all = [r[3] for r in rows if r[3] is not None]
+    print("-" * 100)
+    summary = (f"pages={len(rows)}  median legacy={statistics.median(r[1] for r in rows):.2f}ms  "
+               f"full={statistics.median(r[2] for r in rows):.2f}ms  ")
+    if fast_all:
+        summary += f"fast={statistics.median(fast_all):.2f}ms ({len(fast_all)} pages)  "
+    print(summary + f"median overlap={statistics.median(r[6] for r in rows):.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""Benchmark event-matching title similarity: pair-by-pair match_score vs
+app.similarity's sparse matrix products, at storm-scale volumes.
+
+Usage:
+  cd backend
+  python scripts/bench_similarity.py                       # 2000 articles x 500 live events
+  python scripts/bench_similarity.py --articles 5000 --events 1000 --repeat 5
+
+Titles are synthetic: a pool of stories, each article a reworded copy of
+one (words inserted, dropped or reordered), with random communes/villages.
+Both paths must pick the same best event for every article; the script
+exits non-zero if they do not.
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+repo_root = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(repo_root / "backend"))
+
+from app import similarity
+from app.event_matcher import match_score
+from app.event_signature import token_ids
+
+WORDS = ("mưa lớn gây sạt lở đất lũ quét cuốn trôi nhà dân tại huyện xã bản người chết mất tích "
+         "thiệt hại nặng nề giao thông chia cắt bão số đổ bộ ngập úng sâu cô lập hàng trăm hộ "
+         "khẩn cấp sơ tán tỉnh thủy điện xả đê vỡ triều cường").split()
+
+
+def synth(n: int, stories: list[str], rnd: random.Random) -> tuple[list, list, list]:
+    titles = []
+    for _ in range(n):
+        words = rnd.choice(stories).split()
+        for _ in range(rnd.randint(0, 3)):
+            if rnd.random() < 0.5:
+                words.insert(rnd.randint(0, len(words)), rnd.choice(WORDS))
+            elif len(words) > 3:
+                words.pop(rnd.randrange(len(words)))
+        titles.append(" ".join(words))
+    communes = [rnd.choice([None, "xã a", "xã b", "xã c"]) for _ in titles]
+    villages = [rnd.choice([None, None, "bản x", "bản y"]) for _ in titles]
+    return [token_ids(t) for t in titles], communes, villages
+
+
+def scalar(q, c) -> list[tuple[int, float]]:
+    out = []
+    for i in range(len(q[0])):
+        best, best_j = 0.0, -1
+        for j in range(len(c[0])):
+            s = match_score(q[0][i], q[1][i], q[2][i], c[0][j], c[1][j], c[2][j])
+            if s > best:
+                best, best_j = s, j
+        out.append((best_j, best))
+    return out
+
+
+def vectorized(q, c) -> list[tuple[int, float]]:
+    scores = similarity.match_scores(similarity.TitleMatrix(*q), similarity.TitleMatrix(*c))
+    return similarity.best_matches(scores)
+
+
+def timed(fn, repeat: int):
+    runs, result = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        runs.append(time.perf_counter() - t0)
+    return statistics.median(runs), result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=2000)
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--stories", type=int, default=400, help="distinct underlying stories")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    stories = [" ".join(rnd.choice(WORDS) for _ in range(rnd.randint(6, 14))) for _ in range(args.stories)]
+    q = synth(args.articles, stories, rnd)
+    c = synth(args.events, stories, rnd)
+    pairs = args.articles * args.events
+    print(f"{args.articles} articles x {args.events} events = {pairs:,} pairs")
+
+    t_scalar, r_scalar = timed(lambda: scalar(q, c), 1)
+    t_vec, r_vec = timed(lambda: vectorized(q, c), args.repeat)
+    t_self, _ = timed(lambda: similarity.match_scores(similarity.TitleMatrix(*q), similarity.TitleMatrix(*q)),
+                      args.repeat)
+    matched = sum(1 for col, _ in r_vec if col >= 0)
+
+    print(f"  match_score loop     {t_scalar * 1000:9.1f} ms  ({pairs / t_scalar:,.0f} pairs/s)")
+    print(f"  sparse match_scores  {t_vec * 1000:9.1f} ms  ({pairs / t_vec:,.0f} pairs/s)  x{t_scalar / t_vec:.0f}")
+    print(f"  articles x articles  {t_self * 1000:9.1f} ms  (batch grouping, {args.articles ** 2:,} pairs)")
+    print(f"  {matched} articles matched an event; identical best matches: {r_scalar == r_vec}")
+    return 0 if r_scalar == r_vec else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
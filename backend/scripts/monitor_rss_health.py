@@ -5,38 +5,29 @@ RSS health monitoring - track source reliability over time.
 Parses crawl_log.jsonl to generate reports.
 """
 
-import json
+import sys
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from collections import defaultdict
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.jsonl_log import crawl_log
+
 
 def load_crawl_logs(days: int = 7) -> list[dict]:
-    """Load crawl logs from last N days."""
-    logs_file = Path(__file__).parent / "logs" / "crawl_log.jsonl"
-    
-    if not logs_file.exists():
-        print(f"❌ crawl_log.jsonl not found at {logs_file}")
+    """Load crawl logs from last N days (all rotated segments, via the offset index)."""
+    if not crawl_log.segments():
+        print(f"❌ crawl_log.jsonl not found at {crawl_log.path}")
         return []
-    
-    cutoff_time = datetime.utcnow() - timedelta(days=days)
-    logs = []
-    
+
+    cutoff_time = datetime.now(timezone.utc) - timedelta(days=days)
     try:
-        with open(logs_file, "r", encoding="utf-8") as f:
-            for line in f:
-                if not line.strip():
-                    continue
-                try:
-                    record = json.loads(line)
-                    ts = datetime.fromisoformat(record.get("timestamp", ""))
-                    if ts >= cutoff_time:
-                        logs.append(record)
-                except Exception:
-                    pass
+        logs = list(crawl_log.iter_reversed(since=cutoff_time))
     except Exception as e:
         print(f"❌ Error reading logs: {e}")
-    
+        return []
+    logs.reverse()
     return logs
 
 
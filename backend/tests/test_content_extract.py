@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""Learned content selectors: unique in the page, and evicted when the fast path keeps missing."""
+import sys
+
+sys.path.insert(0, '.')
+from app import content_extract
+from app.content_extract import SelectorCache, extract
+
+BODY = " ".join(f"Mưa lớn kéo dài khiến nước sông dâng cao, đoạn {n} của tuyến đê bị sạt lở." for n in range(8))
+MENU = " ".join(f"Chuyên mục số {n} gồm thời sự, kinh tế, xã hội và thể thao trong ngày." for n in range(6))
+
+
+def _page(body_classes):
+    return (
+        "<html><body>"
+        f"<div class='col-md-8'><p>{MENU}</p></div>"
+        f"<div class='{body_classes}'><h1>Sạt lở đê</h1><p>{BODY}</p></div>"
+        "</body></html>"
+    )
+
+
+def test_selector_skips_shared_grid_classes():
+    cache = SelectorCache(path=None)
+    html = _page("col-md-8 fck_detail")
+    for _ in range(3):
+        res = extract(html, "https://baomoi.example/a.html", cache=cache)
+    assert res.fast_path and res.selector == "div.fck_detail"
+    assert res.text.endswith("bị sạt lở.") and "Chuyên mục" not in res.text
+    # No unique, content-like name: nothing to learn
+    res = extract(_page("col-md-8"), "https://other.example/a.html", cache=cache)
+    assert res.selector is None
+
+
+def test_misses_are_not_reset_by_the_fallback_win():
+    cache = SelectorCache(path=None)
+    for _ in range(content_extract._LEARN_AFTER):
+        cache.record_win("x.vn", "div.col-md-8")
+    for n in range(1, content_extract._EVICT_AFTER):
+        cache.record_fast("x.vn", False)
+        cache.record_win("x.vn", "div.col-md-8", after_miss=True)
+        assert cache._data["x.vn"]["misses"] == n
+    cache.record_fast("x.vn", False)
+    assert cache.get("x.vn") is None
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""Crawl runs are checkpointed per source and resumed; deferred work is leased until finished."""
+import sys
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+sys.path.insert(0, '.')
+_stdout = sys.stdout
+from app import crawler  # noqa: E402
+# crawler re-wraps sys.stdout as UTF-8 on first import; hand the capture buffer back unclosed
+if sys.stdout is not _stdout:
+    sys.stdout.detach()
+    sys.stdout = _stdout
+from app import worker
+from app.database import Base
+from app.models import Article, CrawlDeferred, CrawlRun
+from app.settings import settings
+
+
+def _cycle(deferred_sources=()):
+    return SimpleNamespace(deferred_sources=list(deferred_sources), deferred_enrich=[])
+
+
+def _engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'ckpt.db'}")
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def _plan(*names):
+    return [{"source": SimpleNamespace(name=n), "articles_added": 0, "stat": {}} for n in names]
+
+
+def test_interrupted_run_resumes_unfinished_sources(tmp_path, monkeypatch):
+    engine = _engine(tmp_path)
+    plan = _plan("KTTV Quốc gia", "VnExpress", "Tuổi Trẻ")
+    with Session(engine) as db:
+        run_id = crawler._start_run(db, plan, "schedule", None)
+        run = crawler._CrawlRun(db, None, run_id=run_id)
+        monkeypatch.setattr(run, "record_source_status", lambda src_info: src_info["stat"])
+        run.finish_source(plan[0])
+        assert db.get(CrawlRun, run_id).sources_done == 1
+
+        # Its worker is still beating somewhere else: not ours to resume
+        db.get(CrawlRun, run_id).worker_id = "other:1"
+        db.commit()
+        assert crawler.interrupted_run(db, {"other:1"}) is None
+        assert crawler.interrupted_run(db, set()).id == run_id
+
+    calls = []
+    monkeypatch.setattr(worker, "SessionLocal", sessionmaker(engine))
+    monkeypatch.setattr(crawler, "process_once", lambda **kwargs: calls.append(kwargs))
+    worker._crawl_startup()
+    assert len(calls) == 1
+    assert sorted(calls[0].pop("only_sources")) == ["Tuổi Trẻ", "VnExpress"]
+    assert calls[0] == {"resume_run_id": run_id, "trigger": "resume"}
+
+    with Session(engine) as db:
+        assert crawler._start_run(db, plan[1:], "resume", run_id) == run_id
+        run = db.get(CrawlRun, run_id)
+        assert (run.status, run.sources_total, run.sources_done) == ("running", 3, 1)
+        assert run.resumed_at is not None
+
+
+def test_recently_completed_run_skips_startup_crawl(tmp_path, monkeypatch):
+    engine = _engine(tmp_path)
+    with Session(engine) as db:
+        db.add(CrawlRun(id="r1", status="completed", finished_at=datetime.utcnow()))
+        db.commit()
+    calls = []
+    monkeypatch.setattr(worker, "SessionLocal", sessionmaker(engine))
+    monkeypatch.setattr(worker, "_crawl_due", lambda: calls.append("due"))
+    monkeypatch.setattr(crawler, "process_once", lambda **kwargs: calls.append(kwargs))
+    worker._crawl_startup()
+    assert calls == []
+
+
+def test_deferred_sources_go_first_next_cycle(tmp_path, monkeypatch):
+    engine = _engine(tmp_path)
+    plan = _plan("Báo A", "Báo B", "Báo C")
+    monkeypatch.setattr(settings, "crawl_distributed", False)
+    monkeypatch.setattr(crawler.poll_scheduler, "boosted_sources", lambda db: {"Báo C"})
+    monkeypatch.setattr(crawler, "source_tier", lambda name: 2)
+    with Session(engine) as db:
+        crawler._save_checkpoint(db, _cycle([plan[1]]), plan, [], [])
+        carried, _ = crawler._load_checkpoint(db)
+        assert carried == {"Báo B"}
+        order = [si["source"].name for si in crawler._prioritize(db, plan, carried)]
+        assert order == ["Báo C", "Báo B", "Báo A"]
+
+        # Finished next cycle: the checkpoint is cleared
+        crawler._save_checkpoint(db, _cycle(), plan, [], [])
+        assert crawler._load_checkpoint(db)[0] == set()
+
+
+def test_claimed_enrichments_survive_a_dead_cycle(tmp_path):
+    engine = _engine(tmp_path)
+    with Session(engine) as db:
+        a = Article(title="Sạt lở đất ở Hòa Bình", url="https://x.vn/a1", source="VnExpress", domain="x.vn",
+                    published_at=datetime.utcnow())
+        db.add(a)
+        db.flush()
+        db.add(CrawlDeferred(kind="enrich", source_name="VnExpress", article_id=a.id, article_kind="feed"))
+        db.commit()
+
+        _, claimed = crawler._load_checkpoint(db)
+        assert len(claimed) == 1
+        # Another cycle does not take it while the claim holds; the row itself stays
+        assert crawler._load_checkpoint(db)[1] == []
+        assert db.query(CrawlDeferred).count() == 1
+
+        # The claiming cycle died: once the lease expires the row is claimable again
+        db.query(CrawlDeferred).update({CrawlDeferred.claimed_at: datetime.utcnow() - timedelta(
+            seconds=settings.crawl_job_lease_seconds + 1)})
+        db.commit()
+        _, claimed = crawler._load_checkpoint(db)
+        assert len(claimed) == 1
+
+        # No budget left to resume: released for the next cycle
+        crawler._save_checkpoint(db, _cycle(), [], claimed, [])
+        row = db.query(CrawlDeferred).one()
+        assert row.claimed_by is None and row.claimed_at is None
+
+        # Resumed: done
+        _, claimed = crawler._load_checkpoint(db)
+        crawler._save_checkpoint(db, _cycle(), [], claimed, claimed)
+        assert db.query(CrawlDeferred).count() == 0
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""The crawl prefilter drops known entries before any NLP runs."""
+import sys
+from datetime import datetime
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, '.')
+_stdout = sys.stdout
+from app import crawler  # noqa: E402
+# crawler re-wraps sys.stdout as UTF-8 on first import; hand the capture buffer back unclosed
+if sys.stdout is not _stdout:
+    sys.stdout.detach()
+    sys.stdout = _stdout
+from app.database import Base
+from app.dedup import get_article_hash
+from app.models import Article, Blacklist
+
+SRC = SimpleNamespace(name="VnExpress", domain="vnexpress.net", authority_level=1, trusted=True)
+
+
+def _cand(title, link):
+    return crawler._Candidate(src_info={"source": SRC}, kind="feed", title=title, link=link,
+                              published_at=datetime.utcnow(), summary_raw="")
+
+
+def _run(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'prefilter.db'}")
+    Base.metadata.create_all(engine)
+    db = Session(engine)
+    now = datetime.utcnow()
+    for status in ("approved", "rejected", "pending"):
+        db.add(Article(title=f"Lũ quét ở Lào Cai {status}", url=f"https://vnexpress.net/{status}",
+                       source=SRC.name, domain=SRC.domain, published_at=now, status=status))
+    db.add(Blacklist(news_hash=get_article_hash("Tin rác", SRC.domain, "https://vnexpress.net/spam")))
+    db.commit()
+    return crawler._CrawlRun(db, None)
+
+
+def _no_nlp(*args, **kwargs):
+    raise AssertionError("diagnose() ran for a known entry")
+
+
+def test_known_entries_skip_nlp(tmp_path, monkeypatch):
+    monkeypatch.setattr(crawler.nlp, "diagnose", _no_nlp)
+    run = _run(tmp_path)
+    assert not run._prefilter_sync(_cand("Lũ quét ở Lào Cai approved", "https://vnexpress.net/approved"))
+    assert not run._prefilter_sync(_cand("Lũ quét ở Lào Cai rejected", "https://vnexpress.net/rejected"))
+    assert run.nlp_skipped == 2
+    # Blacklisted: dropped, but it was never going to be scored anyway
+    assert not run._prefilter_sync(_cand("Tin rác", "https://vnexpress.net/spam"))
+    assert run.nlp_skipped == 2
+    run.db.close()
+
+
+def test_new_and_pending_entries_reach_nlp(tmp_path, monkeypatch):
+    run = _run(tmp_path)
+    new = _cand("Động đất ở Điện Biên", "https://vnexpress.net/new")
+    assert run._prefilter_sync(new) and new.existing is None and new.news_hash
+
+    pending = _cand("Lũ quét ở Lào Cai pending", "https://vnexpress.net/pending")
+    assert run._prefilter_sync(pending) and pending.existing.status == "pending"
+    monkeypatch.setattr(crawler.nlp, "diagnose", lambda *a, **kw: {"score": 14.0, "reason": "", "signals": {}})
+    monkeypatch.setattr(crawler.nlp, "extract_impacts", lambda text: {})
+    assert run._analyze_sync(pending) and pending.action == "upgrade"
+    assert run.nlp_skipped == 0
+    run.db.close()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""Incrementally maintained event aggregates equal a rebuild from every linked article."""
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, '.')
+from app import event_aggregates
+from app.database import Base
+from app.event_matcher import upsert_event_for_article
+from app.models import Article, Event
+
+NOW = datetime.utcnow()
+TITLE = "Lũ quét cuốn trôi nhiều nhà dân tại xã Bản Hồ, huyện Sa Pa"
+
+
+def _article(n, source, domain, **kwargs):
+    return Article(title=TITLE, url=f"https://{domain}/{n}", source=source, domain=domain,
+                   published_at=NOW + timedelta(minutes=n), disaster_type="flood", province="Lào Cai",
+                   status="approved", **kwargs)
+
+
+def test_incremental_equals_recompute(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'agg.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        ids = []
+        for n, (source, domain, kwargs) in enumerate([
+            ("Báo Địa phương X", "baoxa.vn", {}),
+            ("VnExpress", "vnexpress.net", {"summary": "Tin bão khẩn cấp: nước dâng cao"}),
+            # A republished copy of the VnExpress story is not another source
+            ("Báo Địa phương Y", "baoya.vn", {"syndicated_from": 1}),
+            ("Dân Trí", "dantri.com.vn", {"deaths": 2}),
+        ]):
+            root = kwargs.pop("syndicated_from", None)
+            a = _article(n, source, domain, **kwargs)
+            if root is not None:
+                a.syndicated_from_id = ids[root]
+            db.add(a)
+            db.flush()
+            ids.append(a.id)
+            ev = upsert_event_for_article(db, a)
+            db.commit()
+
+        assert db.query(Event).count() == 1
+        agg = ev.aggregates
+        assert agg["sources"] == ["Báo Địa phương X", "VnExpress", "Dân Trí"]
+        assert agg["domains"] == ["baoxa.vn", "vnexpress.net", "dantri.com.vn"]
+        assert (agg["lead_trusted"], agg["has_trusted"], agg["has_vip"], agg["has_strong_metrics"]) == (False, True, True, True)
+        assert ev.sources_count == 3 and ev.confidence == 1.0
+
+        articles = db.query(Article).order_by(Article.id).all()
+        assert event_aggregates.fold(articles) == agg
+        assert event_aggregates.repair(db) == 0
+
+        # Lost aggregates (an admin unlink) are rebuilt to the same state
+        ev.aggregates, ev.sources_count, ev.confidence = None, 0, 0.0
+        db.commit()
+        assert event_aggregates.repair(db) == 1
+        assert (ev.aggregates, ev.sources_count, ev.confidence) == (agg, 3, 1.0)
+
+
+def test_confidence_from_aggregates():
+    agg = event_aggregates.empty()
+    assert event_aggregates.confidence({**agg, "sources": ["a"]}, False) == 0.3
+    assert event_aggregates.confidence({**agg, "sources": ["a", "b", "c"]}, False) == 0.75
+    assert event_aggregates.confidence({**agg, "sources": ["a"]}, True) == 1.0
+    assert event_aggregates.confidence({**agg, "sources": ["a", "b"], "has_trusted": True}, False) == 0.95
+    assert event_aggregates.confidence({**agg, "sources": ["a"], "has_trusted": True, "has_sensitive": True}, False) == 0.98
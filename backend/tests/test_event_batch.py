@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""Batch clustering of a cycle's articles agrees with one-at-a-time upserts."""
+import itertools
+import random
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, '.')
+_stdout = sys.stdout
+from app import crawler  # noqa: E402
+# crawler re-wraps sys.stdout as UTF-8 on first import; hand the capture buffer back unclosed
+if sys.stdout is not _stdout:
+    sys.stdout.detach()
+    sys.stdout = _stdout
+from app import event_batch, event_index
+from app.database import Base
+from app.event_matcher import upsert_event_for_article
+from app.models import Article, Event
+from app.settings import settings
+
+NOW = datetime(2026, 10, 19, 12)
+WORDS = ("mưa lớn gây sạt lở đất lũ quét cuốn trôi nhà dân tại huyện xã bản người chết "
+         "mất tích thiệt hại nặng nề giao thông chia cắt").split()
+
+
+def _rows(n, seed=1):
+    rnd, r2 = random.Random(seed), random.Random(99)
+    bases = [" ".join(r2.choice(WORDS) for _ in range(10)) for _ in range(30)]
+    return [dict(title=rnd.choice(bases) + ("" if rnd.random() < .5 else " " + rnd.choice(WORDS)),
+                 url=f"https://x/{i}", source=rnd.choice(["VnExpress", "Báo A", "Báo B"]),
+                 domain=rnd.choice(["a.vn", "b.vn", "c.vn"]), published_at=NOW - timedelta(minutes=rnd.randint(0, 600)),
+                 disaster_type=rnd.choice(["flood", "landslide"]), province=rnd.choice(["Lào Cai", "Yên Bái"]),
+                 status="pending", summary="") for i in range(n)]
+
+
+def _db(tmp_path, name):
+    engine = create_engine(f"sqlite:///{tmp_path / name}")
+    Base.metadata.create_all(engine)
+    db = Session(engine)
+    event_index.load(db, hours=24 * 3650)
+    return db
+
+
+def _cluster(db, rows, batch):
+    articles = [Article(**r) for r in rows]
+    db.add_all(articles)
+    db.commit()
+    if batch:
+        return event_batch.cluster_batch(db, articles)
+    for a in sorted(articles, key=lambda a: (a.published_at, a.id)):
+        upsert_event_for_article(db, a)
+        db.commit()
+
+
+def _partition(db):
+    return {a.url: a.event_id for a in db.query(Article)}
+
+
+def _same_clusters(p, q):
+    return all((p[u] == p[v]) == (q[u] == q[v]) for u, v in itertools.combinations(p, 2))
+
+
+def test_batch_matches_sequential(tmp_path):
+    rows = _rows(150)
+    parts = []
+    for batch in (False, True):
+        db = _db(tmp_path, f"b{batch}.db")
+        _cluster(db, rows, batch)
+        parts.append(_partition(db))
+        event_index.clear()
+        db.close()
+    assert _same_clusters(*parts)
+
+
+def test_batch_joins_live_events(tmp_path):
+    rows = sorted(_rows(150, seed=5), key=lambda r: r["published_at"])
+    parts = []
+    for batch in (False, True):
+        db = _db(tmp_path, f"inc{batch}.db")
+        _cluster(db, rows[:75], False)
+        events_before = db.query(Event).count()
+        stat = _cluster(db, rows[75:], batch)
+        if batch:
+            assert stat["events_updated"] > 0 and stat["errors"] == 0
+            assert db.query(Event).count() == events_before + stat["events_created"]
+        parts.append(_partition(db))
+        event_index.clear()
+        db.close()
+    assert parts[0] == parts[1]
+
+
+def test_one_write_and_announcement_per_event(tmp_path, monkeypatch):
+    announced = []
+    monkeypatch.setattr(event_batch, "announce_new_event", lambda db, ev: announced.append(ev.id))
+    title = "Sạt lở đất vùi lấp nhà dân ở xã Bản Hồ, huyện Sa Pa"
+    rows = [dict(title=title, url=f"https://{d}/1", source=s, domain=d, published_at=NOW + timedelta(minutes=i),
+                 disaster_type="landslide", province="Lào Cai", status="pending", summary="")
+            for i, (s, d) in enumerate([("Báo A", "a.vn"), ("Báo B", "b.vn"), ("Báo C", "c.vn")])]
+    rows.append(dict(rows[0], title="Lũ quét cuốn trôi cầu treo ở Yên Bái", url="https://a.vn/2"))
+    db = _db(tmp_path, "small.db")
+    stat = _cluster(db, rows, True)
+    assert (stat["groups"], stat["events_created"], stat["events_updated"]) == (2, 2, 0)
+    assert len(announced) == 2
+    # Three outlets: consensus promotes every member, including the ones merged before the third
+    event_id = db.query(Article.event_id).filter(Article.url == "https://a.vn/1").scalar()
+    members = db.query(Article).filter(Article.event_id == event_id).all()
+    assert len(members) == 3 and {a.status for a in members} == {"approved"}
+    event_index.clear()
+    db.close()
+
+
+def test_sweep_skips_articles_of_running_cycles(tmp_path, monkeypatch):
+    db = _db(tmp_path, "sweep.db")
+    now = datetime.utcnow()
+    lease = timedelta(seconds=settings.crawl_job_lease_seconds)
+    for url, fetched_at in (("https://a.vn/old", now - 2 * lease), ("https://a.vn/fresh", now)):
+        db.add(Article(title="Lũ quét", url=url, source="Báo A", domain="a.vn", published_at=now,
+                       fetched_at=fetched_at, disaster_type="flood", province="Lào Cai", status="approved"))
+    db.commit()
+    seen = []
+    monkeypatch.setattr(settings, "event_batch_clustering", True)
+    monkeypatch.setattr(crawler.event_batch, "cluster_batch", lambda db, articles: seen.extend(a.url for a in articles))
+    crawler._CrawlRun(db, None).cluster_pending()
+    assert seen == ["https://a.vn/old"]
+    event_index.clear()
+    db.close()
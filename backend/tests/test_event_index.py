@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""The active-event index returns the same candidates as the DB query it replaces."""
+import random
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, '.')
+from app import event_index
+from app.database import Base
+from app.event_matcher import candidate_events
+from app.models import Event
+
+NOW = datetime.utcnow().replace(microsecond=0)
+HAZARDS = ("flood", "storm", "landslide")
+PROVINCES = ("Lào Cai", "Yên Bái", "Quảng Nam")
+STATES = ("active", "active", "cooling", "closed")
+
+
+def _db(tmp_path, n=300, seed=11, states=STATES):
+    engine = create_engine(f"sqlite:///{tmp_path / 'index.db'}")
+    Base.metadata.create_all(engine)
+    rng = random.Random(seed)
+    db = Session(engine)
+    for i in range(n):
+        at = NOW - timedelta(minutes=rng.randrange(0, 72 * 60))
+        db.add(Event(key=f"k{i}", title=f"Mưa lũ gây thiệt hại ở xã {i % 17}", disaster_type=rng.choice(HAZARDS),
+                     province=rng.choice(PROVINCES), state=rng.choice(states), started_at=at, last_updated_at=at))
+    db.commit()
+    return db, rng
+
+
+def test_candidates_match_the_db_query(tmp_path):
+    db, rng = _db(tmp_path)
+    index = event_index.load(db, hours=96)
+    assert len(index) == db.query(Event).filter(Event.state != "closed").count()
+    for _ in range(200):
+        start = NOW - timedelta(minutes=rng.randrange(0, 80 * 60))
+        end = start + timedelta(hours=36)
+        hazard, province = rng.choice(HAZARDS), rng.choice(PROVINCES)
+        expected = [ev.id for ev in candidate_events(db, province, start, end, hazard)]
+        assert [e.id for e in index.candidates(hazard, province, start, end)] == expected
+    event_index.clear()
+    db.close()
+
+
+def test_put_moves_an_updated_event(tmp_path):
+    db, _ = _db(tmp_path, n=1, states=("active",))
+    ev = db.query(Event).one()
+    index = event_index.load(db, hours=96)
+    window = (ev.disaster_type, ev.province, ev.last_updated_at - timedelta(hours=1), ev.last_updated_at + timedelta(hours=1))
+    assert [e.id for e in index.candidates(*window)] == [ev.id]
+
+    ev.last_updated_at = NOW + timedelta(hours=30)
+    index.put(ev)
+    assert index.candidates(*window) == []
+    assert len(index) == 1
+    index.discard(ev.id)
+    assert len(index) == 0
+    event_index.clear()
+    db.close()
+
+
+def test_lookup_falls_back_outside_the_loaded_range(tmp_path):
+    db, _ = _db(tmp_path, n=10)
+    assert event_index.lookup(db, "flood", "Lào Cai", NOW - timedelta(hours=1), NOW) is None
+    event_index.load(db, hours=24)
+    assert event_index.lookup(db, "flood", "Lào Cai", NOW - timedelta(hours=1), NOW) is not None
+    assert event_index.lookup(db, "flood", "Lào Cai", NOW - timedelta(hours=30), NOW) is None
+    event_index.clear()
+    db.close()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""Event key allocation: no probe queries, and two crawlers racing on one key base both succeed."""
+import multiprocessing
+import sys
+from datetime import datetime
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, '.')
+from app import event_index
+from app.database import Base
+from app.event_matcher import insert_event, new_event_for_article
+from app.models import Article, Event
+
+PUBLISHED = datetime(2026, 10, 19, 8, 30)
+BASE = "flood|Lào Cai|202610190830"
+
+
+def _article(n):
+    return Article(title=f"Lũ quét bản {n}", url=f"https://x/{n}", source="VnExpress", domain="vnexpress.net",
+                   published_at=PUBLISHED, disaster_type="flood", province="Lào Cai", status="approved")
+
+
+def _crawler(url, offset, count, start, errors):
+    engine = create_engine(url, connect_args={"timeout": 30})
+    try:
+        with Session(engine) as db:
+            # Both load their index before either inserts: every suffix they expect is stale
+            event_index.load(db, hours=24 * 365 * 10)
+            start.wait()
+            for n in range(offset, offset + count):
+                ev = insert_event(db, new_event_for_article(db, _article(n)))
+                event_index.active().put(ev)
+                db.commit()
+    except Exception as e:  # pragma: no cover - reported to the parent
+        errors.put(repr(e))
+
+
+def test_keys_allocated_without_probes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'keys.db'}")
+    Base.metadata.create_all(engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+    with Session(engine) as db:
+        event_index.load(db, hours=24 * 365 * 10)
+        keys = []
+        for n in range(4):
+            ev = insert_event(db, new_event_for_article(db, _article(n)))
+            event_index.active().put(ev)
+            keys.append(ev.key)
+        db.commit()
+    event_index.clear()
+    assert keys == [BASE, f"{BASE}_1", f"{BASE}_2", f"{BASE}_3"]
+    # One INSERT per event, no SELECTs on events.key
+    assert not [s for s in statements if s.lstrip().upper().startswith("SELECT") and "events.key" in s]
+    assert sum(1 for s in statements if s.lstrip().upper().startswith("INSERT")) == 4
+
+
+def test_two_crawlers_race_on_the_same_key_base(tmp_path):
+    url = f"sqlite:///{tmp_path / 'race.db'}"
+    Base.metadata.create_all(create_engine(url))
+    ctx = multiprocessing.get_context("fork")
+    start, errors = ctx.Event(), ctx.Queue()
+    procs = [ctx.Process(target=_crawler, args=(url, offset, 15, start, errors)) for offset in (0, 100)]
+    for p in procs:
+        p.start()
+    start.set()
+    for p in procs:
+        p.join(60)
+    assert errors.empty(), errors.get()
+    assert all(p.exitcode == 0 for p in procs)
+
+    with Session(create_engine(url)) as db:
+        keys = sorted(k for (k,) in db.query(Event.key))
+    assert len(keys) == 30
+    assert set(keys) == {BASE} | {f"{BASE}_{n}" for n in range(1, 30)}
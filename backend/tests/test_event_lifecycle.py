@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""Late articles still join an event that went cooling while they were in flight."""
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, '.')
+from app import event_index, event_lifecycle
+from app.database import Base
+from app.event_matcher import upsert_event_for_article
+from app.models import Article, Event
+
+NOW = datetime.utcnow()
+TITLE = "Lũ quét cuốn trôi nhiều nhà dân tại xã Bản Hồ, huyện Sa Pa"
+
+
+def _article(n, published_at):
+    return Article(title=TITLE, url=f"https://x/{n}", source="VnExpress", domain="vnexpress.net",
+                   published_at=published_at, disaster_type="flood", province="Lào Cai", status="approved")
+
+
+def test_late_article_joins_the_cooling_event(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'lc.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        first = _article(0, NOW - timedelta(hours=60))
+        db.add(first)
+        db.flush()
+        ev = upsert_event_for_article(db, first)
+        db.commit()
+        event_lifecycle.advance(db)
+        assert db.get(Event, ev.id).state == event_lifecycle.COOLING
+
+        # Published an hour after the first one, picked up two days later; once through the DB, once the index
+        for n, indexed in ((1, False), (2, True)):
+            if indexed:
+                event_index.load(db, hours=96)
+            late = _article(n, first.published_at + timedelta(hours=1))
+            db.add(late)
+            db.flush()
+            assert upsert_event_for_article(db, late).id == ev.id
+            db.commit()
+        event_index.clear()
+        assert db.query(Event).count() == 1
+        # Still quiet as of now: stays cooling until an update lands inside the cooling period
+        assert db.get(Event, ev.id).state == event_lifecycle.COOLING
+        event_lifecycle.touch(ev, now=first.published_at + timedelta(hours=2))
+        assert ev.state == event_lifecycle.ACTIVE
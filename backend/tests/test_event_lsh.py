@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""MinHash-LSH event index: near-duplicate titles are found, unrelated ones are not."""
+import sys
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, '.')
+from app import event_lsh
+from app.event_signature import title_signature
+
+T0 = datetime(2026, 10, 19, 8, 0)
+
+
+def _ev(id, title, province="Lào Cai", hours=0, disaster_type="landslide", stored_sig=True):
+    return SimpleNamespace(id=id, title=title, title_sig=title_signature(title) if stored_sig else None,
+                           disaster_type=disaster_type, province=province,
+                           started_at=T0 + timedelta(hours=hours), last_updated_at=T0 + timedelta(hours=hours))
+
+
+def _index(*events):
+    idx = event_lsh.LshIndex()
+    for ev in events:
+        idx.put(ev)
+    return idx
+
+
+def test_near_duplicate_in_another_province_is_found():
+    idx = _index(
+        _ev(1, "Sạt lở đất vùi lấp 3 ngôi nhà tại xã Bản Khoang, 2 người mất tích"),
+        _ev(2, "Sạt lở vùi lấp 3 ngôi nhà ở xã Bản Khoang khiến 2 người mất tích", province="Yên Bái", hours=2,
+            stored_sig=False),
+        _ev(3, "Mưa lớn gây ngập úng nhiều tuyến phố ở thành phố Huế", disaster_type="flood"),
+    )
+    hits = idx.similar(1, event_lsh.RELATED_SIMILARITY)
+    assert [e.id for e, _ in hits] == [2]
+    entry, (other, sim) = idx.get(1), hits[0]
+    assert event_lsh.is_probable_duplicate(entry, other, sim)
+    # Same titles, too far apart in time to be the same incident
+    later = _index(_ev(4, "Sạt lở vùi lấp 3 ngôi nhà ở xã Bản Khoang khiến 2 người mất tích", hours=200)).get(4)
+    assert not event_lsh.is_probable_duplicate(entry, later, sim)
+
+
+def test_discard_and_retitle():
+    a = _ev(1, "Lũ quét cuốn trôi 5 ngôi nhà ở bản Nậm Cọ")
+    b = _ev(2, "Lũ quét cuốn trôi 5 ngôi nhà tại bản Nậm Cọ")
+    idx = _index(a, b)
+    assert [e.id for e, _ in idx.similar(1, 0.5)] == [2]
+    idx.discard(2)
+    assert idx.similar(1, 0.5) == [] and len(idx) == 1
+    b.title, b.title_sig = "Động đất 4,5 độ ở Kon Tum", title_signature("Động đất 4,5 độ ở Kon Tum")
+    idx.put(b)
+    assert idx.similar(1, 0.25) == []
+
+
+def test_refresh_picks_up_events_of_late_articles(tmp_path):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from app.database import Base
+    from app.models import Event
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'lsh.db'}")
+    Base.metadata.create_all(engine)
+
+    def add(db, n, title, published_at):
+        db.add(Event(key=f"k{n}", title=title, disaster_type="flood", province="Lào Cai",
+                     started_at=published_at, last_updated_at=published_at, title_sig=title_signature(title)))
+        db.commit()
+
+    now = datetime.utcnow()
+    with Session(engine) as db:
+        event_lsh.clear()
+        # A feed item dated in the future must not hide later updates
+        add(db, 1, "Mưa lớn gây ngập sâu nhiều tuyến phố ở thành phố Lào Cai", now + timedelta(days=2))
+        event_lsh.refresh(db)
+        add(db, 2, "Lũ quét cuốn trôi 5 ngôi nhà ở bản Nậm Cọ", now - timedelta(days=1))
+        event_lsh.refresh(db)
+        assert event_lsh._index.get(2) is not None
+    event_lsh.clear()
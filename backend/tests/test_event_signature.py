@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""Stored title signatures: exact round trip, matcher-identical scores, kept in step with the title."""
+import sys
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, '.')
+from app.database import Base
+from app.event_matcher import _calculate_similarity, _get_tokens
+from app.event_signature import (MINHASH_K, decode, encode, estimate_jaccard, event_tokens, minhash,
+                                 title_signature, token_ids)
+from app.models import Event
+
+TITLES = [
+    "Lũ quét cuốn trôi nhiều nhà dân tại xã Bản Hồ, huyện Sa Pa",
+    "Lũ quét cuốn trôi nhà dân ở Bản Hồ (Sa Pa)",
+    "Bão số 3 đổ bộ Quảng Ninh, gió giật cấp 14",
+    "Sạt lở đất vùi lấp 2 nhà ở Yên Bái",
+    "",
+]
+
+
+def test_round_trip_and_unknown_formats():
+    for title in TITLES:
+        tokens = token_ids(title)
+        assert decode(encode(tokens)) == (tokens, minhash(tokens[0] | tokens[1]))
+    sig = title_signature(TITLES[0])
+    assert decode(b"") is None
+    assert decode(b"S2" + sig[2:]) is None
+    assert decode(sig[:-4]) is None
+
+
+def test_scores_equal_the_string_tokens():
+    for a in TITLES:
+        for b in TITLES:
+            expected = _calculate_similarity(_get_tokens(a), _get_tokens(b))
+            assert _calculate_similarity(token_ids(a), token_ids(b)) == expected
+
+
+def test_minhash_estimate():
+    same = minhash(token_ids(TITLES[0])[0])
+    assert estimate_jaccard(same, same) == 1.0
+    a, b = (minhash(u | bi) for u, bi in (token_ids(TITLES[0]), token_ids(TITLES[2])))
+    assert estimate_jaccard(a, b) <= 2 / MINHASH_K
+
+
+def test_signature_follows_the_title(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sig.db'}")
+    Base.metadata.create_all(engine)
+    now = datetime.utcnow()
+    with Session(engine) as db:
+        ev = Event(key="k", title=TITLES[0], disaster_type="flood", province="Lào Cai", started_at=now, last_updated_at=now)
+        db.add(ev)
+        db.commit()
+        assert ev.title_sig == title_signature(TITLES[0])
+        ev.title = TITLES[1]
+        db.commit()
+    with Session(engine) as db:
+        ev = db.query(Event).one()
+        assert ev.title_sig == title_signature(TITLES[1])
+        assert event_tokens(ev) == token_ids(TITLES[1])
+        # Rows from before the column (NULL) fall back to tokenizing the title
+        ev.title_sig = None
+        assert event_tokens(ev) == token_ids(TITLES[1])
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""Test the GNews link cache: LRU in front of the shared store, fetched over decoded."""
+import sys
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, '.')
+from app import database
+from app.database import Base
+from app.gnews_cache import GnewsUrlCache, _DbStore, _RedisStore
+from app.models import GnewsUrl
+
+LINKS = [f"https://news.google.com/rss/articles/CBMi{i}?oc=5" for i in range(3)]
+
+
+def _db_store(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'gnews.db'}")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(engine)
+    monkeypatch.setattr(database, "SessionLocal", Session)
+    return Session
+
+
+class _HashOnly:
+    """The three hash commands _RedisStore uses."""
+
+    def __init__(self):
+        self.h = {}
+
+    def hget(self, key, field):
+        return self.h.get(field)
+
+    def hmget(self, key, fields):
+        return [self.h.get(f) for f in fields]
+
+    def hset(self, key, field, value):
+        self.h[field] = value
+
+
+def test_lru_then_store(tmp_path, monkeypatch):
+    _db_store(tmp_path, monkeypatch)
+    writer = GnewsUrlCache(store=_DbStore(), size=2)
+    for i, link in enumerate(LINKS):
+        writer.remember(link, f"https://vnexpress.net/tin-{i}.html", "decode")
+    assert writer.flush() == 3
+
+    # Another worker: nothing in its LRU, one store query for all three
+    reader = GnewsUrlCache(store=_DbStore(), size=2)
+    found = reader.lookup_many(LINKS + ["https://vnexpress.net/khac.html", "https://news.google.com/rss/articles/X"])
+    assert found == {link: f"https://vnexpress.net/tin-{i}.html" for i, link in enumerate(LINKS)}
+    stats = reader.stats()
+    assert (stats["lru_hits"], stats["store_hits"], stats["misses"]) == (0, 3, 1)
+
+    # Least recently used goes first once the LRU is full
+    lru = GnewsUrlCache(store=_DbStore(), size=2)
+    for link in (LINKS[0], LINKS[1], LINKS[0], LINKS[2], LINKS[0], LINKS[1]):
+        lru.lookup(link)
+    assert (lru.counts["lru"], lru.counts["store"]) == (2, 4)
+
+
+def test_fetched_url_wins_over_decoded(tmp_path, monkeypatch):
+    Session = _db_store(tmp_path, monkeypatch)
+    link = LINKS[0]
+    first = GnewsUrlCache(store=_DbStore())
+    first.remember(link, "https://tuoitre.vn/bai-that.htm", "fetch")
+    first.remember(link, "https://tuoitre.vn/bai-giai-ma.htm", "decode")
+    assert first.lookup(link) == "https://tuoitre.vn/bai-that.htm"
+    first.flush()
+
+    # A decode on another worker (empty LRU) does not overwrite the stored fetch
+    second = GnewsUrlCache(store=_DbStore())
+    second.remember(link, "https://tuoitre.vn/bai-giai-ma.htm", "decode")
+    second.flush()
+    with Session() as db:
+        row = db.query(GnewsUrl).one()
+    assert (row.resolved_url, row.method) == ("https://tuoitre.vn/bai-that.htm", "fetch")
+
+    # Consent walls and non-GNews links are never cached
+    second.remember(LINKS[1], "https://consent.google.com/ml?continue=x", "fetch")
+    second.remember("https://tuoitre.vn/a.htm", "https://tuoitre.vn/b.htm", "fetch")
+    assert second.flush() == 0
+
+
+def test_redis_store_keeps_fetched_url():
+    store = _RedisStore(_HashOnly())
+    cache = GnewsUrlCache(store=store)
+    cache.remember(LINKS[0], "https://dantri.com.vn/that.htm", "fetch")
+    GnewsUrlCache(store=store).remember(LINKS[0], "https://dantri.com.vn/giai-ma.htm", "decode")
+    assert GnewsUrlCache(store=store).lookup(LINKS[0]) == "https://dantri.com.vn/that.htm"
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""Test HTTP record/replay: what is recorded is served back offline."""
+import asyncio
+import gzip
+import sys
+
+import httpx
+
+sys.path.insert(0, '.')
+from app.http_replay import HttpArchive, RecordingTransport, ReplayTransport
+
+FEED = "<rss><channel><title>Lũ lụt</title></channel></rss>".encode("utf-8")
+
+
+def _origin(request: httpx.Request) -> httpx.Response:
+    if request.url.path == "/gone":
+        return httpx.Response(410, content=b"")
+    # Same body for both feeds, gzip on the wire
+    return httpx.Response(200, headers={"content-type": "application/rss+xml", "content-encoding": "gzip",
+                                        "etag": '"v1"', "set-cookie": "sid=1"}, content=gzip.compress(FEED))
+
+
+async def _get_all(transport, urls):
+    async with httpx.AsyncClient(transport=transport) as client:
+        return [await client.get(u) for u in urls]
+
+
+def _record(path, urls):
+    archive = HttpArchive(path, "a")
+    responses = asyncio.run(_get_all(RecordingTransport(archive, httpx.MockTransport(_origin)), urls))
+    stats = archive.stats()
+    archive.close()
+    return responses, stats
+
+
+def test_recorded_responses_replay_offline(tmp_path):
+    urls = ["https://a.vn/rss", "https://b.vn/rss", "https://a.vn/gone"]
+    recorded, stats = _record(tmp_path / "cycle.zip", urls)
+    assert [r.status_code for r in recorded] == [200, 200, 410]
+    assert recorded[0].content == FEED
+    # Identical bodies are stored once
+    assert stats["requests"] == 3 and stats["blobs"] == 2
+
+    archive = HttpArchive(tmp_path / "cycle.zip")
+    replayed = asyncio.run(_get_all(ReplayTransport(archive, latency_ms=0), urls + ["https://c.vn/rss"]))
+    assert [r.status_code for r in replayed] == [200, 200, 410, 404]
+    assert replayed[0].content == FEED
+    assert replayed[0].headers["etag"] == '"v1"'
+    assert "set-cookie" not in replayed[0].headers and "content-encoding" not in replayed[0].headers
+    assert replayed[3].headers["x-replay-miss"] == "1"
+    assert (archive.hits, archive.misses) == (3, 1)
+    archive.close()
+
+
+def test_injected_errors(tmp_path):
+    _record(tmp_path / "cycle.zip", ["https://a.vn/rss"])
+    archive = HttpArchive(tmp_path / "cycle.zip")
+    transport = ReplayTransport(archive, latency_ms=0, error_rate=1.0, seed=7)
+    outcomes = set()
+    for _ in range(20):
+        try:
+            outcomes.add(asyncio.run(_get_all(transport, ["https://a.vn/rss"]))[0].status_code)
+        except httpx.ConnectTimeout:
+            outcomes.add("timeout")
+    assert outcomes == {503, "timeout"}
+    assert archive.hits == 0
+    archive.close()
+
+
+def test_browser_fallback_round_trip(tmp_path):
+    archive = HttpArchive(tmp_path / "cycle.zip", "a")
+    archive.store_browser("https://a.vn/tin", {"html": "<p>Sạt lở</p>", "final_url": "https://a.vn/tin-1"})
+    archive.close()
+    archive = HttpArchive(tmp_path / "cycle.zip")
+    assert archive.lookup_browser("https://a.vn/tin") == {"html": "<p>Sạt lở</p>", "final_url": "https://a.vn/tin-1"}
+    assert archive.lookup_browser("https://a.vn/other") is None
+    archive.close()
+
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""Test the distributed crawl job queue against the in-process FakeRedis."""
+import sys
+import time
+
+sys.path.insert(0, '.')
+from app.job_queue import CrawlJobQueue, FakeRedis, SharedFeedState
+
+
+class Clock:
+    def __init__(self, t=1_000_000.0):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+def _queue(r, clock, owner, breaker_threshold=2):
+    return CrawlJobQueue(r, owner=owner, clock=clock, lease_seconds=60, max_attempts=3,
+                         backoff_seconds=10, breaker_threshold=breaker_threshold, breaker_cooldown_seconds=300)
+
+
+def test_tier_priority_order():
+    clock = Clock()
+    q = _queue(FakeRedis(clock), clock, "a")
+    q.enqueue(["Báo Địa phương X", "VnExpress", "KTTV Quốc gia"])
+    assert q.claim(3) == ["KTTV Quốc gia", "VnExpress", "Báo Địa phương X"]
+
+
+def test_enqueue_is_idempotent_and_skips_inflight():
+    clock = Clock()
+    q = _queue(FakeRedis(clock), clock, "a")
+    assert q.enqueue(["VnExpress", "VnExpress"]) == 1
+    assert q.claim(1) == ["VnExpress"]
+    assert q.enqueue(["VnExpress"]) == 0
+
+
+def test_lease_is_exclusive_across_nodes():
+    clock = Clock()
+    r = FakeRedis(clock)
+    a, b = _queue(r, clock, "node-a"), _queue(r, clock, "node-b")
+    a.enqueue(["VnExpress", "Tuổi Trẻ"])
+    got_a = a.claim(1)
+    got_b = b.claim(5)
+    assert got_a and got_b
+    assert not set(got_a) & set(got_b)
+    assert b.claim(5) == []
+
+
+def test_expired_lease_is_requeued():
+    clock = Clock()
+    r = FakeRedis(clock)
+    a, b = _queue(r, clock, "node-a"), _queue(r, clock, "node-b")
+    a.enqueue(["VnExpress"])
+    assert a.claim(1) == ["VnExpress"]
+    clock.t += 61
+    assert b.claim(1) == ["VnExpress"]
+    # The dead node can no longer renew
+    assert not a.renew("VnExpress")
+
+
+def test_retry_backoff_and_give_up():
+    clock = Clock()
+    q = _queue(FakeRedis(clock), clock, "a", breaker_threshold=10)
+    q.enqueue(["VnExpress"])
+    q.claim(1)
+    assert q.fail("VnExpress", "timeout") == clock.t + 10
+    assert q.claim(1) == []
+    clock.t += 10
+    assert q.claim(1) == ["VnExpress"]
+    assert q.fail("VnExpress") == clock.t + 20
+    clock.t += 20
+    q.claim(1)
+    assert q.fail("VnExpress") is None
+    assert q.stats() == {"ready": 0, "delayed": 0, "inflight": 0}
+
+
+def test_breaker_parks_failing_source():
+    clock = Clock()
+    q = _queue(FakeRedis(clock), clock, "a")
+    for _ in range(2):
+        q.enqueue(["VnExpress"])
+        clock.t += 100
+        q.claim(1)
+        q.fail("VnExpress")
+        clock.t += 100
+    assert q.breaker_open_until("VnExpress") == clock.t - 100 + 300
+    q.enqueue(["VnExpress"])
+    assert q.claim(1) == []
+    clock.t += 300
+    assert q.claim(1) == ["VnExpress"]
+    q.ack("VnExpress")
+    assert q.breaker_open_until("VnExpress") is None
+
+
+def test_shared_feed_state():
+    r = FakeRedis()
+    state = SharedFeedState(r)
+    state["https://a/rss"] = {"etag": "x"}
+    other = SharedFeedState(r)
+    assert other.get("https://a/rss") == {"etag": "x"}
+
+
+def test_release_leaves_a_re_leased_job_alone():
+    clock = Clock()
+    r = FakeRedis(clock)
+    a, b = _queue(r, clock, "node-a"), _queue(r, clock, "node-b")
+    a.enqueue(["VnExpress"])
+    a.claim(1)
+    clock.t += 61
+    assert b.claim(1) == ["VnExpress"]
+    # The slow node finishing late must not drop node-b's in-flight entry
+    a.ack("VnExpress")
+    assert a.fail("VnExpress") is None
+    assert r.zscore("crawl:inflight", "VnExpress") is not None
+    assert r.get("crawl:lease:VnExpress") == "node-b"
+    b.ack("VnExpress")
+    assert b.stats() == {"ready": 0, "delayed": 0, "inflight": 0}
+
+
+def test_heartbeat_keeps_the_lease():
+    clock = Clock()
+    r = FakeRedis(clock)
+    a, b = _queue(r, clock, "node-a"), _queue(r, clock, "node-b")
+    a.enqueue(["VnExpress"])
+    a.claim(1)
+    with a.leased(["VnExpress"], interval=0.01):
+        for _ in range(5):
+            clock.t += 30
+            time.sleep(0.05)
+            assert b.claim(1) == []
+    a.ack("VnExpress")
+    assert a.stats() == {"ready": 0, "delayed": 0, "inflight": 0}
+
+
+def test_deferred_job_goes_back_to_the_front_of_its_tier():
+    clock = Clock()
+    q = _queue(FakeRedis(clock), clock, "a")
+    q.enqueue(["VnExpress"])
+    assert q.claim(1) == ["VnExpress"]
+    clock.t += 5
+    q.enqueue(["Tuổi Trẻ"])
+    assert q.requeue("VnExpress")
+    assert q.claim(2) == ["VnExpress", "Tuổi Trẻ"]
+    assert q.r.hget("crawl:attempts", "VnExpress") is None
+
+
+def test_renew_does_not_extend_a_re_leased_job():
+    clock = Clock()
+    r = FakeRedis(clock)
+    a, b = _queue(r, clock, "node-a"), _queue(r, clock, "node-b")
+    a.enqueue(["VnExpress"])
+    a.claim(1)
+    clock.t += 61
+    assert b.claim(1) == ["VnExpress"]
+    assert not a.renew("VnExpress")
+    assert r.zscore("crawl:inflight", "VnExpress") == clock.t + 60
+    assert b.renew("VnExpress")
+
+
+def test_distributed_mode_refuses_the_in_process_fallback(monkeypatch):
+    import pytest
+    from app import job_queue
+    monkeypatch.setattr(job_queue, "_shared_client", None)
+    monkeypatch.setattr(job_queue.settings, "crawl_distributed", True)
+    monkeypatch.setattr(job_queue.settings, "redis_url", "memory://")
+    with pytest.raises(RuntimeError):
+        job_queue.get_queue()
+    monkeypatch.setattr(job_queue.settings, "crawl_distributed", False)
+    assert isinstance(job_queue.get_redis_client(), FakeRedis)
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Test the indexed JSONL log: segment rotation, pruning and indexed reads."""
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+sys.path.insert(0, '.')
+from app.jsonl_log import JsonlLog
+
+T0 = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+
+def _record(i: int) -> dict:
+    return {
+        "timestamp": (T0 + timedelta(minutes=i)).isoformat(),
+        "action": "auto_blacklisted" if i % 3 == 0 else "skipped",
+        "source": "VnExpress" if i % 2 == 0 else "Tuổi Trẻ",
+        "title": f"Bản tin số {i}",
+        "i": i,
+    }
+
+
+def _log(tmp_path, **kwargs) -> JsonlLog:
+    return JsonlLog("review", tag_fields=("action", "source"), directory=tmp_path, **kwargs)
+
+
+def test_rotation_keeps_newest_segments(tmp_path):
+    log = _log(tmp_path, max_segments=3, segment_bytes=1000)
+    for start in range(0, 100, 5):
+        log.write([_record(i) for i in range(start, start + 5)])
+    # A full segment is rotated right after the batch that filled it
+    log.write([_record(100)])
+    segments = log.segments()
+    assert len(segments) == 3 and segments[-1] == log.path
+    assert all(s.with_name(s.name + ".idx").exists() for s in segments)
+
+    kept = [r["i"] for r in log.tail(1000)]
+    # Whatever survived pruning is the newest records, contiguous and in order
+    assert kept == list(range(kept[0], 101)) and kept[0] > 0
+    assert [r["i"] for r in log.tail(3)] == [98, 99, 100]
+
+
+def test_filtered_and_time_bounded_reads(tmp_path):
+    log = _log(tmp_path, segment_bytes=2000)
+    for start in range(0, 60, 6):
+        log.write([_record(i) for i in range(start, start + 6)])
+    assert len(log.segments()) > 1
+
+    hits = log.tail(4, action="auto_blacklisted", source="VnExpress")
+    assert [r["i"] for r in hits] == [36, 42, 48, 54]
+    recent = log.tail(100, since=T0 + timedelta(minutes=55), source="Tuổi Trẻ")
+    assert [r["i"] for r in recent] == [55, 57, 59]
+    with pytest.raises(ValueError):
+        log.tail(10, title="Bản tin số 1")
+
+
+def test_legacy_file_is_indexed_and_appended_to(tmp_path):
+    log = _log(tmp_path)
+    with log.path.open("w", encoding="utf-8") as f:
+        for i in range(5):
+            f.write(json.dumps(_record(i), ensure_ascii=False) + "\n")
+        f.write("not json\n")
+    assert [r["i"] for r in log.tail(10, action="auto_blacklisted")] == [0, 3]
+
+    log.append(_record(5))
+    log.append(_record(6))
+    log.flush()
+    assert [r["i"] for r in log.tail(3)] == [4, 5, 6]
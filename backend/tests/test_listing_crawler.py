@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""Sitemap delta: links past the emit cap are carried over, snapshots are stored per key."""
+import asyncio
+import sys
+from datetime import datetime
+
+sys.path.insert(0, '.')
+from app import listing_crawler
+
+SITEMAP = "https://baomoi.example/news-sitemap.xml"
+
+
+def _xml(n):
+    now = datetime.utcnow().isoformat()
+    urls = "".join(
+        f"<url><loc>https://baomoi.example/a{i}.html</loc><news:news><news:publication_date>{now}"
+        f"</news:publication_date><news:title>Lũ quét bản {i}</news:title></news:news></url>"
+        for i in range(n)
+    )
+    return f"<urlset>{urls}</urlset>"
+
+
+def test_overflow_is_carried_over():
+    state, snapshots = {SITEMAP: {"etag": '"v1"'}}, {}
+    fetched = []
+
+    async def fetch(url):
+        fetched.append(state[url].get("etag"))
+        return {"text": _xml(8)}
+
+    async def cycle():
+        return await listing_crawler.crawl_sitemaps(None, fetch, state, snapshots, [SITEMAP], datetime(2020, 1, 1),
+                                                    limit=5)
+
+    items, stat = asyncio.run(cycle())
+    assert [it.url[-8:] for it in items] == [f"/a{i}.html" for i in range(5)]
+    assert stat["carried"] == 3
+    # The validators are dropped so the sitemap is not answered with a 304
+    assert "etag" not in state[SITEMAP]
+    items, stat = asyncio.run(cycle())
+    assert [it.url[-8:] for it in items] == [f"/a{i}.html" for i in range(5, 8)]
+    assert stat["carried"] == 0
+    items, _ = asyncio.run(cycle())
+    assert items == []
+    assert fetched == ['"v1"', None, None]
+
+
+def test_discoveries_go_to_the_feed_state_not_the_config():
+    from datetime import timedelta
+    from app.settings import settings
+    from app.sources import Source
+
+    src, state = Source(name="Báo Mới", domain="baomoi.example"), {}
+    assert listing_crawler.sitemaps_for(src, state) is None
+    listing_crawler.record_discovery(state, src.name, [SITEMAP])
+    assert listing_crawler.sitemaps_for(src, state) == [SITEMAP]
+    # Hand-written entries in sources.json still win
+    configured = Source(name="Báo Mới", domain="baomoi.example", sitemaps=("https://baomoi.example/s.xml",))
+    assert listing_crawler.sitemaps_for(configured, state) == ["https://baomoi.example/s.xml"]
+    # Nothing found: probed again once listing_rediscover_days have passed
+    listing_crawler.record_discovery(state, src.name, [])
+    assert listing_crawler.sitemaps_for(src, state) == []
+    old = datetime.utcnow() - timedelta(days=settings.listing_rediscover_days + 1)
+    state[f"sitemaps:{src.name}"]["checked"] = old.date().isoformat()
+    assert listing_crawler.sitemaps_for(src, state) is None
+
+
+def test_snapshots_write_only_the_changed_key(tmp_path):
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.orm import sessionmaker
+    from app.database import Base
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'snap.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    listing_crawler.mark_listing_seen(listing_crawler.ListingSnapshots(factory), "a.example", ["https://a.example/1"])
+    writes = []
+    event.listen(engine, "before_cursor_execute", lambda *a: writes.append(a[2]) if "SELECT" not in a[2] else None)
+    snapshots = listing_crawler.ListingSnapshots(factory)
+    listing_crawler.mark_listing_seen(snapshots, "b.example", ["https://b.example/1"])
+    assert len(writes) == 1 and writes[0].startswith("INSERT INTO listing_snapshots")
+    # Read back by the next cycle
+    scraped = [{"url": "https://a.example/1"}, {"url": "https://a.example/2"}]
+    assert listing_crawler.diff_listing(listing_crawler.ListingSnapshots(factory), "a.example", scraped) == scraped[1:]
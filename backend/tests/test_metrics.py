@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""Test metrics flushing and rendering against the in-process FakeRedis."""
+import os
+import sys
+import time
+
+sys.path.insert(0, '.')
+from app import metrics
+from app.job_queue import FakeRedis
+
+
+def _setup(monkeypatch):
+    r = FakeRedis()
+    monkeypatch.setattr(metrics, "_client", lambda: r)
+    monkeypatch.setattr(metrics, "_flusher_pid", os.getpid())
+    monkeypatch.setattr(metrics, "_increments", {})
+    monkeypatch.setattr(metrics, "_gauges", {})
+    return r
+
+
+def test_gauges_of_each_process_are_kept(monkeypatch):
+    r = _setup(monkeypatch)
+    for proc, depth in (("api:1", 3), ("worker:2", 7)):
+        monkeypatch.setattr(metrics, "_process", lambda proc=proc: proc)
+        monkeypatch.setattr(metrics, "_gauges", {})
+        metrics.JOB_QUEUE_DEPTH.set(depth, state="pending")
+        metrics.flush()
+    out = metrics.render()
+    assert 'vdw_crawl_job_queue_depth{state="pending",process="api:1"} 3' in out
+    assert 'vdw_crawl_job_queue_depth{state="pending",process="worker:2"} 7' in out
+
+
+def test_dead_process_gauges_are_dropped(monkeypatch):
+    r = _setup(monkeypatch)
+    monkeypatch.setattr(metrics, "_process", lambda: "worker:2")
+    metrics.JOB_QUEUE_DEPTH.set(7, state="pending")
+    metrics.flush()
+    r.zadd(metrics.GAUGE_PROCESSES_KEY, {"worker:2": time.time() - metrics.GAUGE_TTL_SECONDS - 1})
+    monkeypatch.setattr(metrics, "_gauges", {})
+    assert 'process="worker:2"' not in metrics.render()
+    assert r.hgetall(f"{metrics.GAUGES_KEY}:worker:2") == {}
+
+
+def test_histogram_buckets_in_numeric_order(monkeypatch):
+    _setup(monkeypatch)
+    metrics.REPORT_BATCH_SIZE.observe(3)
+    lines = [line for line in metrics.render().splitlines() if line.startswith("vdw_report_batch_size_bucket")]
+    les = [line.split('le="', 1)[1].split('"', 1)[0] for line in lines]
+    assert les == ["5.0", "10.0", "20.0", "50.0", "100.0", "+Inf"]
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""Test the staged crawl pipeline: flow, error isolation, concurrency and backpressure."""
+import asyncio
+import sys
+
+sys.path.insert(0, '.')
+from app.pipeline import Pipeline, Stage
+
+
+def test_items_flow_through_every_stage():
+    out, done = [], []
+
+    async def double(x, emit):
+        if x == 3:
+            raise ValueError("bad item")
+        await emit(x)
+        await emit(x)
+
+    async def collect(x, emit):
+        out.append(x)
+        await emit(x)
+
+    pipe = Pipeline([Stage("double", double), Stage("collect", collect)],
+                    on_item_done=lambda stage, item, emitted: done.append((stage, item, emitted)))
+    report = asyncio.run(pipe.run(range(5)))
+    assert sorted(out) == [0, 0, 1, 1, 2, 2, 4, 4]
+    assert [(r["in"], r["out"], r["errors"]) for r in report] == [(5, 8, 1), (8, 8, 0)]
+    # The failing item is still reported done, with nothing emitted
+    assert ("double", 3, 0) in done and len(done) == 13
+
+
+def test_stage_concurrency():
+    running = peak = 0
+
+    async def slow(x, emit):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    asyncio.run(Pipeline([Stage("slow", slow, concurrency=3)]).run(range(9)))
+    assert peak == 3
+
+
+def test_full_queue_blocks_the_upstream_stage():
+    async def produce(x, emit):
+        await emit(x)
+
+    async def consume(x, emit):
+        await asyncio.sleep(0.01)
+
+    stages = [Stage("produce", produce, queue_size=1), Stage("consume", consume, queue_size=2)]
+    report = asyncio.run(Pipeline(stages).run(range(10)))
+    produce_r, consume_r = report
+    assert consume_r["in"] == 10
+    assert consume_r["max_queue"] <= 2
+    # The producer spent most of the run waiting on the consumer's queue
+    assert produce_r["blocked_s"] >= 0.05
+    assert produce_r["busy_s"] < produce_r["blocked_s"]
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""Adaptive polling: quiet sources back off past their old fixed tier interval."""
+import sys
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, '.')
+from app import poll_scheduler
+from app.database import Base
+from app.models import SourcePollState
+from app.settings import settings
+
+NOW = datetime(2026, 10, 19, 8, 0)
+
+
+def test_quiet_source_widens_past_its_old_tier_interval(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'poll.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        # A portal with no new items: every feed request answered 304
+        stat = {"source": "Báo Địa Phương Yên Tĩnh", "feeds_requested": 2, "not_modified": 2, "entries_24h": 0}
+        poll_scheduler.record_polls(db, [stat], NOW)
+        p = db.get(SourcePollState, stat["source"])
+        assert p.interval_minutes > 480
+        assert p.interval_minutes == settings.poll_max_minutes
+    # Busier tiers back off too, within their own ceiling
+    assert 120 < poll_scheduler.compute_interval(0, 0, 1.0, tier=0) <= 120 * settings.poll_tier_backoff
+    assert poll_scheduler.compute_interval(0, 0, 1.0, tier=1) > 240
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""Test the raw payload archive: dedup, domain dictionaries and retention."""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, '.')
+from app import database, raw_archive
+from app.database import Base
+from app.models import RawFetch
+from app.settings import settings
+
+
+def _page(i: int) -> bytes:
+    template = "".join(f'<div class="menu-item-{n}"><a href="/muc-{n}">Chuyên mục {n}</a></div>' for n in range(40))
+    return f"<html><head><title>Tin {i}</title></head><body>{template}<p>Bài {i}: mưa lớn ở Quảng Nam</p></body></html>".encode("utf-8")
+
+
+def _setup(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'raw.db'}")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(engine)
+    monkeypatch.setattr(database, "SessionLocal", Session)
+    monkeypatch.setattr(settings, "raw_archive_dir", str(tmp_path / "archive"))
+    monkeypatch.setattr(settings, "raw_archive_dict_samples", 3)
+    return Session, raw_archive.RawArchive(tmp_path / "archive")
+
+
+def test_put_dedups_and_trains_a_domain_dictionary(tmp_path, monkeypatch):
+    Session, archive = _setup(tmp_path, monkeypatch)
+    shas = [archive.put("page", f"https://www.baomoi.vn/tin-{i}", _page(i)) for i in range(5)]
+    # Same bytes under a redirect alias: one blob, one index row per URL
+    assert archive.put("page", "https://baomoi.vn/tin-0-amp", _page(0), aliases=("https://baomoi.vn/r/0",)) == shas[0]
+    assert archive.flush_index() == 7
+    assert len(list((tmp_path / "archive" / "blobs").glob("*/*"))) == 5
+
+    current = raw_archive.RawArchive(tmp_path / "archive")._current_map()
+    assert list(current) == ["page-baomoi.vn"]
+    with Session() as db:
+        dict_ids = [db.query(RawFetch.dict_id).filter(RawFetch.sha256 == sha).first()[0] for sha in shas]
+    # Trained after the third sample; later blobs use it, earlier ones stay plain
+    assert dict_ids[:3] == [None, None, None]
+    assert dict_ids[3:] == [current["page-baomoi.vn"]] * 2
+    fresh = raw_archive.RawArchive(tmp_path / "archive")
+    assert [fresh.get(sha) for sha in shas] == [_page(i) for i in range(5)]
+
+
+def test_prune_keeps_referenced_and_fresh_blobs(tmp_path, monkeypatch):
+    Session, archive = _setup(tmp_path, monkeypatch)
+    old = datetime.utcnow() - timedelta(days=100)
+    stale = archive.put("feed", "https://a.vn/rss", b"<rss>old</rss>", fetched_at=old)
+    shared = archive.put("feed", "https://a.vn/rss", b"<rss>same</rss>", fetched_at=old)
+    archive.put("feed", "https://b.vn/rss", b"<rss>same</rss>")
+    unindexed = archive.put("feed", "https://c.vn/rss", b"<rss>buffered</rss>")
+    archive.flush_index()
+    with Session() as db:
+        db.query(RawFetch).filter(RawFetch.url == "https://c.vn/rss").delete()
+        db.commit()
+    for sha in (stale, shared):
+        os.utime(archive.blob_path(sha), (time.time(), time.time() - 100 * 86400))
+
+    assert raw_archive.prune(days=90) == {"rows": 2, "blobs": 1}
+    assert not archive.blob_path(stale).exists()
+    # Still referenced by a fresh fetch / possibly by a row not flushed yet
+    assert archive.blob_path(shared).exists() and archive.blob_path(unindexed).exists()
+    with Session() as db:
+        assert [u for (u,) in db.query(RawFetch.url)] == ["https://b.vn/rss"]
+    assert raw_archive.prune(days=0) == {"rows": 0, "blobs": 0}
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""Offline re-clustering: shadow build report, stale-build refusal, and the swap that relinks and retires events."""
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+sys.path.insert(0, '.')
+from app import database, recluster
+from app.database import Base
+from app.models import Article, CrowdsourcedReport, Event, EventFollow
+
+NOW = datetime.utcnow().replace(microsecond=0)
+T_SAME = "Lũ quét cuốn trôi nhiều nhà dân tại xã Bản Hồ, huyện Sa Pa"
+T_MERGE = "Sạt lở đất vùi lấp hai nhà dân ở xã Trạm Tấu, tỉnh Yên Bái"
+T_SPLIT_A = "Mưa lớn gây ngập sâu nhiều tuyến phố trung tâm thành phố"
+T_SPLIT_B = "Cháy rừng phòng hộ lan rộng trên núi Hồng Lĩnh"
+
+
+def _event(db, id, title):
+    db.add(Event(id=id, key=f"old-{id}", title=title, disaster_type="flood", province="Lào Cai",
+                 started_at=NOW, last_updated_at=NOW))
+
+
+def _article(db, n, title, event_id):
+    db.add(Article(title=title, url=f"https://vnexpress.net/{n}", source="VnExpress", domain="vnexpress.net",
+                   published_at=NOW + timedelta(minutes=n), disaster_type="flood", province="Lào Cai",
+                   status="approved", event_id=event_id))
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rc.db'}")
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(engine))
+    with Session(engine) as db:
+        for id, title in ((1, T_SAME), (2, T_MERGE), (3, T_MERGE), (4, T_SPLIT_A), (5, "Ghost")):
+            _event(db, id, title)
+        # 1 unchanged; 2 and 3 hold one story (3 has more of it); 4 holds two; 5 has no articles
+        for n, (title, event_id) in enumerate([(T_SAME, 1), (T_SAME, 1), (T_MERGE, 2), (T_MERGE, 3),
+                                               (T_MERGE, 3), (T_SPLIT_A, 4), (T_SPLIT_B, 4)]):
+            _article(db, n, title, event_id)
+        # User 7 follows both halves of the merge; user 8 only the retired one
+        db.add_all([EventFollow(user_id=7, event_id=2), EventFollow(user_id=7, event_id=3),
+                    EventFollow(user_id=8, event_id=2), EventFollow(user_id=8, event_id=5)])
+        db.add_all([CrowdsourcedReport(event_id=2, description="Nhà tôi bị vùi"),
+                    CrowdsourcedReport(event_id=5, description="?")])
+        db.commit()
+        yield db
+
+
+def test_build_reports_the_diff(db):
+    report = recluster.build_shadow(db, workers=2)
+    counts = {k: report[k] for k in ("articles", "events_before", "events_after", "unchanged", "merged",
+                                     "split", "new", "retired")}
+    assert counts == {"articles": 7, "events_before": 5, "events_after": 4, "unchanged": 1, "merged": 1,
+                      "split": 1, "new": 0, "retired": 2}
+    assert report["merged_examples"] == [{"event_id": 3, "from": [2, 3], "articles": 3}]
+    assert report["split_examples"] == [{"event_id": 4, "into": [4, 6], "articles": 2}]
+    # Nothing touched yet
+    assert db.query(Event).count() == 5
+    assert recluster.shadow_report(db)["events_after"] == 4
+
+
+def test_swap_refuses_missing_or_stale_shadow_tables(db):
+    with pytest.raises(ValueError, match="no shadow tables"):
+        recluster.shadow_report(db)
+    with pytest.raises(SystemExit) as exc:
+        recluster.main(["--swap"])
+    assert exc.value.code == 1
+
+    recluster.build_shadow(db, workers=2)
+    _article(db, 9, T_SAME, None)
+    db.commit()
+    with pytest.raises(ValueError, match="stale"):
+        recluster.shadow_report(db)
+
+    recluster.build_shadow(db, workers=2)
+    recluster.shadow_report(db)
+    db.get(Event, 1).confidence = 0.5  # an event written since the build
+    db.commit()
+    with pytest.raises(ValueError, match="stale"):
+        recluster.shadow_report(db)
+    with pytest.raises(SystemExit):
+        recluster.main(["--swap"])
+    assert db.query(Event).count() == 5
+
+
+def test_swap_relinks_and_retires(db):
+    recluster.build_shadow(db, workers=2)
+    recluster.main(["--swap"])
+    db.expire_all()
+
+    assert sorted(i for (i,) in db.query(Event.id)) == [1, 3, 4, 6]
+    links = {a.url.rsplit("/", 1)[1]: a.event_id for a in db.query(Article)}
+    assert links == {"0": 1, "1": 1, "2": 3, "3": 3, "4": 3, "5": 4, "6": 6}
+    assert db.get(Event, 6).title == T_SPLIT_B
+    assert len({e.key for e in db.query(Event)}) == 4
+
+    # Followers and reports of the retired half move to the event that took its articles, without duplicates
+    follows = sorted((f.user_id, f.event_id) for f in db.query(EventFollow))
+    assert follows == [(7, 3), (8, 3)]
+    reports = {r.description: r.event_id for r in db.query(CrowdsourcedReport)}
+    assert reports == {"Nhà tôi bị vùi": 3, "?": None}
+
+    # Applied once: the shadow tables are gone
+    with pytest.raises(ValueError, match="no shadow tables"):
+        recluster.shadow_report(db)
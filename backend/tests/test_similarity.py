@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""The vectorized scorer must reproduce event_matcher.match_score exactly."""
+import random
+import sys
+
+import numpy as np
+
+sys.path.insert(0, '.')
+from app import similarity
+from app.event_matcher import match_score
+from app.event_signature import token_ids
+
+WORDS = ("mưa lớn gây sạt lở đất lũ quét cuốn trôi nhà dân tại huyện xã bản người chết "
+         "mất tích thiệt hại nặng nề giao thông chia cắt bão số 3 đổ bộ").split()
+COMMUNES = [None, "", "xã a", "xã b", "xã c"]
+VILLAGES = [None, "bản x", "bản y"]
+
+
+def _titles(n, seed):
+    base_rnd = random.Random(0)  # shared stories, so both sides have near-duplicates
+    bases = [" ".join(base_rnd.choice(WORDS) for _ in range(base_rnd.randint(1, 12))) for _ in range(15)]
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(n):
+        words = rnd.choice(bases).split()
+        for _ in range(rnd.randint(0, 2)):
+            op = rnd.random()
+            if op < 0.4:
+                words.insert(rnd.randint(0, len(words)), rnd.choice(WORDS))
+            elif op < 0.7 and len(words) > 1:
+                words.pop(rnd.randrange(len(words)))
+            else:
+                words = list(reversed(words))
+        out.append(" ".join(words))
+    return out + ["", "lũ", "Lũ!!", "mưa lớn"]
+
+
+def _side(titles, seed):
+    rnd = random.Random(seed)
+    return ([token_ids(t) for t in titles],
+            [rnd.choice(COMMUNES) for _ in titles],
+            [rnd.choice(VILLAGES) for _ in titles])
+
+
+def test_scores_match_scalar_exactly():
+    q = _side(_titles(120, 1), 2)
+    c = _side(_titles(90, 3), 4)
+    got = similarity.match_scores(similarity.TitleMatrix(*q), similarity.TitleMatrix(*c)).toarray()
+    for i in range(len(q[0])):
+        for j in range(len(c[0])):
+            expected = match_score(q[0][i], q[1][i] or None, q[2][i], c[0][j], c[1][j] or None, c[2][j])
+            assert got[i, j] == expected, (i, j)
+    assert np.count_nonzero(got) > 50
+
+
+def test_best_match_breaks_ties_like_the_matcher():
+    q = _side(_titles(60, 5), 6)
+    c = _side(_titles(60, 5), 7)  # same titles: plenty of equal scores
+    scores = similarity.match_scores(similarity.TitleMatrix(*q), similarity.TitleMatrix(*c))
+    for i, (col, score) in enumerate(similarity.best_matches(scores)):
+        best, best_j = 0.0, -1
+        for j in range(len(c[0])):
+            s = match_score(q[0][i], q[1][i] or None, q[2][i], c[0][j], c[1][j] or None, c[2][j])
+            if s > best:
+                best, best_j = s, j
+        assert (col, score) == (best_j, best)
+
+
+def test_window_filter():
+    toks = [token_ids("lũ quét cuốn trôi nhà dân")] * 3
+    m = similarity.TitleMatrix(toks)
+    scores = similarity.within(similarity.match_scores(m, m), np.array([0, 5, 10]), np.array([4, 9, 20]),
+                               np.array([3, 6, 30]))
+    assert similarity.best_matches(scores) == [(0, 1.0), (1, 1.0), (-1, 0.0)]
+
+
+def test_empty_sides():
+    m = similarity.TitleMatrix([token_ids("lũ quét")])
+    assert similarity.match_scores(m, similarity.TitleMatrix([])).shape == (1, 0)
+    assert similarity.best_matches(similarity.match_scores(m, similarity.TitleMatrix([token_ids("")]))) == [(-1, 0.0)]
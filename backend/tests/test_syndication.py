@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""SimHash syndication: republished agency texts are linked and counted as one source."""
+import random
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, '.')
+from app import event_aggregates, syndication
+from app.database import Base
+from app.models import Article
+
+T0 = datetime(2026, 10, 19, 8, 0)
+_rng = random.Random(7)
+_VOCAB = ["mưa", "lũ", "sạt", "lở", "đất", "xã", "huyện", "người", "nhà", "đường", "sông", "nước", "lực", "lượng",
+          "cứu", "hộ", "tỉnh", "Lào", "Cai", "Yên", "Bái", "thiệt", "hại", "tài", "sản", "ngập", "sâu", "tuyến",
+          "quốc", "lộ", "chính", "quyền", "sơ", "tán", "dân", "khẩn", "cấp", "gia", "đình", "bị", "vùi", "lấp"]
+
+
+def _text(n):
+    return " ".join(_rng.choice(_VOCAB) + str(_rng.randrange(40)) for _ in range(n))
+
+
+STORY = _text(400)
+COPY = "(Baotintuc.vn) - " + STORY + " Ảnh: TTXVN phát"
+OTHER = _text(400)
+
+
+def test_fingerprint_distances():
+    assert syndication.fingerprint("Mưa lớn gây ngập") is None
+    a, b, c = syndication.fingerprint(STORY), syndication.fingerprint(COPY), syndication.fingerprint(OTHER)
+    assert syndication.distance(a, b) <= syndication.MAX_DISTANCE
+    assert syndication.distance(a, c) > 2 * syndication.MAX_DISTANCE
+    assert any(x == y for x, y in zip(syndication.bands(a), syndication.bands(b)))
+
+
+def test_copies_link_to_the_original_and_count_once(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'syn.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        rows = [("TTXVN", "vnanet.vn", STORY, 0), ("Báo Tin tức", "baotintuc.vn", COPY, 2),
+                ("Dân trí", "dantri.com.vn", COPY, 3), ("VnExpress", "vnexpress.net", OTHER, 1)]
+        articles = []
+        for n, (source, domain, text, hours) in enumerate(rows):
+            a = Article(title=f"Sạt lở {n}", url=f"https://{domain}/{n}", source=source, domain=domain,
+                        published_at=T0 + timedelta(hours=hours), disaster_type="landslide", province="Lào Cai")
+            db.add(a)
+            db.flush()
+            syndication.link(db, a, text)
+            articles.append(a)
+        db.commit()
+        original, copy1, copy2, other = articles
+        assert original.syndicated_from_id is None and other.syndicated_from_id is None
+        assert copy1.syndicated_from_id == original.id and copy2.syndicated_from_id == original.id
+
+        agg = event_aggregates.fold([copy1, copy2, other, original])
+        assert agg["sources"] == ["Báo Tin tức", "VnExpress"]
+        assert len(agg["domains"]) == 2
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""Crawl entry points never overlap within the worker process."""
+import sys
+import threading
+
+sys.path.insert(0, '.')
+from app import worker
+
+
+def test_crawl_entry_points_share_one_lock():
+    started, release, calls = threading.Event(), threading.Event(), []
+
+    def _startup():
+        started.set()
+        release.wait(5)
+        calls.append("startup")
+
+    startup = worker._exclusive(_startup)
+    tick = worker._exclusive(lambda: calls.append("tick"))
+    t = threading.Thread(target=startup)
+    t.start()
+    started.wait(5)
+    tick()  # the interval tick lands while the startup crawl is still running
+    release.set()
+    t.join(5)
+    tick()
+    assert calls == ["startup", "tick"]